@@ -54,8 +54,9 @@ gcloud run deploy $SERVICE_NAME \
   --min-instances 0 \
   --max-instances 1 \
   --concurrency 40 \
-  --memory 512Mi \
+  --memory 1Gi \
   --cpu 1 \
+  --no-cpu-throttling \
   --allow-unauthenticated \
   --set-env-vars "WEBHOOK_SECRET_TOKEN=$WEBHOOK_SECRET" \
   --set-env-vars "DB_POOL_SIZE=2,DB_MAX_OVERFLOW=3,DB_POOL_TIMEOUT=30,DB_POOL_RECYCLE=1800" \
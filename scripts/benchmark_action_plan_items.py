@@ -0,0 +1,122 @@
+"""
+Micro-benchmark da gravação dos itens do plano de ação.
+
+Compara o caminho antigo (um ActionPlanItem ORM por item + flush da UoW)
+com o novo (ActionPlanRepository.bulk_insert_items: executemany / COPY).
+
+Uso:
+    python scripts/benchmark_action_plan_items.py                      # SQLite em memória
+    python scripts/benchmark_action_plan_items.py --database-url postgresql://...
+    python scripts/benchmark_action_plan_items.py --sizes 50,200,1000 --repeat 5
+
+No Postgres tudo roda dentro de uma transação que é desfeita no final
+(inclusive a criação das tabelas), então o banco não é alterado.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import JSON, create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from src.models_db import (
+    ActionPlan, ActionPlanItem, ActionPlanItemStatus, Base, Establishment, Inspection, SeverityLevel,
+)
+from src.repositories.action_plan_repository import ActionPlanRepository
+
+
+def _rows(plan_id, size):
+    return [
+        {
+            'id': uuid.uuid4(),
+            'action_plan_id': plan_id,
+            'problem_description': f'Problema {i}',
+            'sector': f'Setor {i % 5}',
+            'severity': SeverityLevel.HIGH if i % 2 else SeverityLevel.LOW,
+            'status': ActionPlanItemStatus.OPEN if i % 2 else ActionPlanItemStatus.RESOLVED,
+            'original_status': 'Não Conforme' if i % 2 else 'Conforme',
+            'original_score': 0.0,
+            'legal_basis': 'RDC 216/2004',
+            'corrective_action': 'Corrigir o problema identificado.',
+            'ai_suggested_deadline': '7 dias',
+            'order_index': i,
+        }
+        for i in range(size)
+    ]
+
+
+def _orm_path(session, plan, rows):
+    for row in rows:
+        session.add(ActionPlanItem(**row))
+    session.flush()
+
+
+def _bulk_path(session, plan, rows, copy_threshold):
+    ActionPlanRepository(session).bulk_insert_items(rows, copy_threshold=copy_threshold)
+
+
+def _new_plan(session):
+    est = Establishment(id=uuid.uuid4(), name='Benchmark')
+    inspection = Inspection(id=uuid.uuid4(), drive_file_id=f'bench-{uuid.uuid4()}', establishment=est)
+    plan = ActionPlan(id=uuid.uuid4(), inspection=inspection)
+    session.add_all([est, inspection, plan])
+    session.flush()
+    return plan
+
+
+def _measure(session, fn, size, repeat):
+    timings = []
+    for _ in range(repeat):
+        plan = _new_plan(session)
+        rows = _rows(plan.id, size)
+        start = time.perf_counter()
+        fn(session, plan, rows)
+        timings.append((time.perf_counter() - start) * 1000)
+        session.expunge_all()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:///:memory:')
+    parser.add_argument('--sizes', default='50,200,1000')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--copy-threshold', type=int, default=500)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != 'postgresql':
+        # Mesmo mapeamento dos testes: JSONB -> JSON fora do Postgres
+        for table in Base.metadata.tables.values():
+            for column in table.columns:
+                if isinstance(column.type, JSONB):
+                    column.type = JSON()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    print(f"📊 Benchmark itens do plano ({engine.dialect.name}, mediana de {args.repeat} execuções)")
+    print(f"{'itens':>6} | {'ORM (ms)':>10} | {'bulk (ms)':>10} | {'ganho':>6}")
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            Base.metadata.create_all(conn)
+            session = Session(bind=conn)
+            for size in sizes:
+                orm_ms = _measure(session, _orm_path, size, args.repeat)
+                bulk_ms = _measure(
+                    session, lambda s, p, r: _bulk_path(s, p, r, args.copy_threshold), size, args.repeat
+                )
+                print(f"{size:>6} | {orm_ms:>10.1f} | {bulk_ms:>10.1f} | {orm_ms / bulk_ms:>5.1f}x")
+            session.close()
+        finally:
+            trans.rollback()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark do JobRepository.get_job_info_map.
+
+Compara o caminho antigo (LIKE '%file_id%' sobre o input_payload de todos os
+jobs + filtro em Python) com o novo (IN indexado na coluna jobs.file_id),
+buscando os arquivos de uma página do dashboard.
+
+Uso:
+    python scripts/benchmark_job_info_map.py                          # SQLite em memória
+    python scripts/benchmark_job_info_map.py --database-url postgresql://...
+    python scripts/benchmark_job_info_map.py --sizes 10000,100000,1000000 --lookup 50
+
+No Postgres tudo roda dentro de uma transação que é desfeita no final
+(inclusive a criação das tabelas), então o banco não é alterado.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import JSON, String, cast, create_engine, insert, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from src.models_db import Base, Job, JobStatus
+from src.repositories.job_repository import JobRepository
+
+BATCH = 10_000
+
+
+def _old_job_info_map(session, file_ids):
+    file_ids_set = set(file_ids)
+    jobs = session.query(Job).filter(cast(Job.input_payload, String).like('%file_id%')).all()
+    result = {}
+    for job in jobs:
+        payload = job.input_payload or {}
+        fid = payload.get('file_id')
+        if fid and fid in file_ids_set:
+            result[fid] = {
+                'filename': payload.get('filename', ''),
+                'uploaded_by_name': payload.get('uploaded_by_name', ''),
+            }
+    return result
+
+
+def _seed(session, start, size):
+    now = datetime.utcnow()
+    for offset in range(start, size, BATCH):
+        rows = []
+        for i in range(offset, min(offset + BATCH, size)):
+            payload = {
+                'file_id': f'upload:{i}',
+                'filename': f'relatorio_{i}.pdf',
+                'establishment_id': str(uuid.uuid4()),
+                'uploaded_by_name': 'Consultor',
+            }
+            rows.append({
+                'id': uuid.uuid4(),
+                'type': 'PROCESS_REPORT',
+                'status': JobStatus.COMPLETED,
+                'created_at': now - timedelta(seconds=size - i),
+                'input_payload': payload,
+                **Job.payload_columns(payload),
+            })
+        session.execute(insert(Job), rows)
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(text('ANALYZE jobs'))
+
+
+def _measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:///:memory:')
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--lookup', type=int, default=50, help='Quantidade de file_ids buscados por chamada')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != 'postgresql':
+        # Mesmo mapeamento dos testes: JSONB -> JSON fora do Postgres
+        for table in Base.metadata.tables.values():
+            for column in table.columns:
+                if isinstance(column.type, JSONB):
+                    column.type = JSON()
+
+    sizes = sorted(int(s) for s in args.sizes.split(','))
+    print(f"📊 Benchmark get_job_info_map ({engine.dialect.name}, {args.lookup} arquivos, mediana de {args.repeat})")
+    print(f"{'jobs':>9} | {'LIKE (ms)':>10} | {'IN (ms)':>8} | {'ganho':>7}")
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            Base.metadata.create_all(conn)
+            session = Session(bind=conn)
+            repo = JobRepository(session)
+            seeded = 0
+            for size in sizes:
+                _seed(session, seeded, size)
+                seeded = size
+                file_ids = [f'upload:{i}' for i in random.sample(range(size), args.lookup)]
+
+                old_ms = _measure(lambda: _old_job_info_map(session, file_ids), args.repeat)
+                session.expunge_all()
+                new_ms = _measure(lambda: repo.get_job_info_map(file_ids), args.repeat)
+                assert _old_job_info_map(session, file_ids) == repo.get_job_info_map(file_ids)
+                session.expunge_all()
+                print(f"{size:>9} | {old_ms:>10.1f} | {new_ms:>8.2f} | {old_ms / new_ms:>6.0f}x")
+            session.close()
+        finally:
+            trans.rollback()
+
+
+if __name__ == '__main__':
+    main()
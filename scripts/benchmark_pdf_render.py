@@ -0,0 +1,106 @@
+"""
+Micro-benchmark da renderização de PDF (PDFService.generate_pdf_bytes).
+
+Compara o caminho antigo (Environment Jinja novo, style.css parseado e
+FontConfiguration criada a cada PDF) com o novo (RenderContext compartilhado
+do processo: templates compilados, CSS e fontes reaproveitados).
+
+Os planos usam o mesmo formato dos dados de tests/unit/services/test_pdf_service.py
+(areas_inspecionadas/itens com status e pontuação), em tamanhos crescentes.
+
+Uso (precisa do WeasyPrint instalado com Pango):
+    python scripts/benchmark_pdf_render.py
+    python scripts/benchmark_pdf_render.py --items 5,50,200 --repeat 5
+"""
+import argparse
+import copy
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.getcwd())
+
+from jinja2 import Environment, FileSystemLoader
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+
+from src.services.pdf_service import PDFService
+
+STATUSES = ['Conforme', 'Não Conforme', 'Parcialmente Conforme', 'OPEN', 'RESOLVED']
+
+
+def _plan(items):
+    areas = []
+    for a in range(max(1, items // 10)):
+        areas.append({
+            'nome_area': f'Área {a}',
+            'pontuacao_maxima_item': 10,
+            'itens': [
+                {
+                    'item_verificado': f'Item {a}.{i}',
+                    'status': STATUSES[i % len(STATUSES)],
+                    'pontuacao': (i % 3) * 5,
+                    'observacao': 'Observação de teste ' * 3,
+                    'acao_corretiva_sugerida': 'Corrigir conforme RDC 216/2004.',
+                }
+                for i in range(min(10, items - a * 10))
+            ],
+        })
+    return {
+        'nome_estabelecimento': 'Restaurante Benchmark',
+        'data_inspecao': '01/01/2026',
+        'resumo_geral': 'Resumo',
+        'pontuacao_geral': 70,
+        'pontuacao_maxima_geral': 100,
+        'areas_inspecionadas': areas,
+    }
+
+
+def _old_render(svc, data):
+    """Caminho anterior: tudo recriado a cada chamada."""
+    env = Environment(loader=FileSystemLoader(svc.template_dir), autoescape=True)
+    env.filters['resolve_path'] = svc.resolve_path
+    svc.enrich_data(data)
+    html_out = env.get_template('pdf_template.html').render(
+        relatorio=data, data_geracao=datetime.now().strftime("%d/%m/%Y")
+    )
+    style_path = os.path.join(svc.template_dir, 'style.css')
+    stylesheets = [CSS(style_path)] if os.path.exists(style_path) else []
+    project_root = os.path.abspath(os.path.join(svc.template_dir, '..'))
+    return HTML(string=html_out, base_url=project_root).write_pdf(
+        stylesheets=stylesheets, font_config=FontConfiguration()
+    )
+
+
+def _measure(fn, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        payload = copy.deepcopy(data)
+        start = time.perf_counter()
+        fn(payload)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', default='5,50,200')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    svc = PDFService()
+    svc.warm_up(render_sample=True)
+
+    print(f"📊 Benchmark render de PDF (mediana de {args.repeat} execuções)")
+    print(f"{'itens':>6} | {'antes (ms)':>11} | {'depois (ms)':>11} | {'economia':>9}")
+    for items in (int(i) for i in args.items.split(',')):
+        data = _plan(items)
+        old_ms = _measure(lambda d: _old_render(svc, d), data, args.repeat)
+        new_ms = _measure(svc.generate_pdf_bytes, data, args.repeat)
+        print(f"{items:>6} | {old_ms:>11.1f} | {new_ms:>11.1f} | {old_ms - new_ms:>7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
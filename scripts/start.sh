@@ -0,0 +1,33 @@
+#!/bin/bash
+# Entrypoint do container no Cloud Run: servidor web (gunicorn) + worker de
+# processamento (python -m src.worker) como processo separado, para o
+# processamento dos relatórios não disputar o GIL com as requisições.
+#
+# - Precisa de CPU fora das requisições (deploy com --no-cpu-throttling): o
+#   worker consome a fila `jobs` entre uma requisição e outra.
+# - Se um dos dois processos cair, o outro é encerrado e o container sai; o
+#   Cloud Run sobe uma instância nova com os dois.
+# - SIGTERM (scale-in/deploy) é repassado aos dois; o worker termina o job em
+#   andamento (ReportWorker.stop). Jobs interrompidos ficam em PROCESSING e,
+#   após 30 min, o Zombie Killer do sync os devolve à fila (PENDING) até
+#   WORKER_MAX_ATTEMPTS execuções; depois disso o job é marcado como FAILED.
+# - RUN_WORKER=0 sobe só o web (worker rodando em outro lugar).
+set -u
+
+pids=()
+if [ "${RUN_WORKER:-1}" = "1" ]; then
+    python -m src.worker &
+    pids+=($!)
+    echo "🧵 Worker de processamento iniciado (pid $!)"
+fi
+
+gunicorn --bind ":${PORT:-8080}" --workers 1 --threads 8 --timeout 0 src.app:app &
+pids+=($!)
+
+trap 'kill -TERM "${pids[@]}" 2>/dev/null' TERM INT
+
+wait -n
+status=$?
+kill -TERM "${pids[@]}" 2>/dev/null
+wait
+exit $status
@@ -7,6 +7,7 @@ REGION="us-central1"
 SERVICE_NAME="mvp-web"
 BUCKET_NAME="assets-${PROJECT_ID}" # Nomes de bucket devem ser globais, usando ID do projeto ajuda
 SCHEDULER_JOB_NAME="sync-drive-cron"
+CHANGES_JOB_NAME="drive-changes-cron"
 SERVICE_ACCOUNT_EMAIL=""
 
 echo "🚀 Iniciando Setup de Infraestrutura Cloud..."
@@ -86,7 +87,29 @@ TARGET_URI="${SERVICE_URL}/api/cron/sync_drive"
 # fi
 # echo "✅ Cloud Scheduler configurado para bater em $TARGET_URI a cada 15 min."
 
+# Varredura de mudanças do Drive que ficaram pendentes (webhook com debounce).
+# Sem marcador no banco o endpoint só faz uma leitura e responde "skipped".
+# Autentica por ?secret= (o _check_cron_auth não usa OIDC).
+CHANGES_URI="${SERVICE_URL}/api/cron/drive_changes?secret=${WEBHOOK_SECRET_TOKEN:-}"
+if [ -z "${WEBHOOK_SECRET_TOKEN:-}" ]; then
+    echo "⚠️  WEBHOOK_SECRET_TOKEN não definido: pulando $CHANGES_JOB_NAME"
+elif gcloud scheduler jobs describe $CHANGES_JOB_NAME --location=$REGION > /dev/null 2>&1; then
+    echo "🔄 Atualizando Job existente: $CHANGES_JOB_NAME"
+    gcloud scheduler jobs update http $CHANGES_JOB_NAME \
+        --location=$REGION \
+        --schedule="*/2 * * * *" \
+        --uri="$CHANGES_URI" \
+        --http-method=POST
+else
+    echo "🆕 Criando Job: $CHANGES_JOB_NAME"
+    gcloud scheduler jobs create http $CHANGES_JOB_NAME \
+        --location=$REGION \
+        --schedule="*/2 * * * *" \
+        --uri="$CHANGES_URI" \
+        --http-method=POST
+fi
+
 echo "--------------------------------------------------"
 echo "🎉 Setup CLOUD concluído com sucesso!"
 echo "📂 Bucket: gs://$BUCKET_NAME"
-echo "⏰ Scheduler: $SCHEDULER_JOB_NAME"
+echo "⏰ Scheduler: $SCHEDULER_JOB_NAME, $CHANGES_JOB_NAME (a cada 2 min)"
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
 from src.models_db import UserRole, AppConfig, JobStatus
+from src.config_helper import config_cache, invalidate_config_cache
 from functools import wraps
 import os
 import logging
@@ -167,7 +168,7 @@ def delete_manager(user_id):
 @admin_required
 def trigger_test_job():
     from src.container import get_uow
-    from src.models_db import Job, JobStatus
+    from src.services.job_tracker import new_job
     uow = get_uow()
     try:
         company_id = current_user.company_id
@@ -179,12 +180,11 @@ def trigger_test_job():
                 flash("Nenhuma empresa encontrada para associar o Job.", "error")
                 return redirect(url_for('admin.index'))
 
-        job = Job(
-            id=uuid.uuid4(),
+        job = new_job(
+            "TEST_JOB",
             company_id=company_id,
-            type="TEST_JOB",
-            status=JobStatus.PENDING,
             input_payload={"delay": 5, "triggered_by": current_user.email},
+            id=uuid.uuid4(),
         )
         uow.jobs.add(job)
         job_id = str(job.id)
@@ -275,14 +275,14 @@ def api_monitor_stats():
 
     uow = get_uow()
     try:
-        jobs = uow.jobs.get_for_monitor(limit=50)
+        # Uma única query: jobs + empresa + status/última mensagem da inspeção
+        rows = uow.jobs.get_for_monitor_with_inspection(limit=50)
         monitor_list = []
 
-        for job in jobs:
+        for job, insp_status, last_log_message in rows:
             payload = job.input_payload or {}
             filename = payload.get('filename', 'N/A')
             est_name = payload.get('establishment_name') or payload.get('establishment', 'N/A')
-            file_id = payload.get('file_id')
 
             duration = None
             if job.finished_at and job.created_at:
@@ -294,24 +294,16 @@ def api_monitor_stats():
             tokens_out = job.cost_tokens_output or 0
 
             current_stage = "Upload"
-            inspection_status = None
-            last_log_message = None
-
-            if file_id:
-                inspection = uow.inspections.get_by_drive_file_id(file_id)
-                if inspection:
-                    inspection_status = inspection.status.value if inspection.status else None
-                    stage_map = {
-                        'PROCESSING': 'Processando IA',
-                        'PENDING_MANAGER_REVIEW': 'Aguardando Gestor',
-                        'PENDING_CONSULTANT_VERIFICATION': 'Aguardando Visita',
-                        'COMPLETED': 'Concluído',
-                        'REJECTED': 'Rejeitado',
-                    }
-                    current_stage = stage_map.get(inspection_status, current_stage)
-
-                    if inspection.processing_logs and len(inspection.processing_logs) > 0:
-                        last_log_message = inspection.processing_logs[-1].get('message', '')
+            inspection_status = insp_status.value if insp_status else None
+            if inspection_status:
+                stage_map = {
+                    'PROCESSING': 'Processando IA',
+                    'PENDING_MANAGER_REVIEW': 'Aguardando Gestor',
+                    'PENDING_CONSULTANT_VERIFICATION': 'Aguardando Visita',
+                    'COMPLETED': 'Concluído',
+                    'REJECTED': 'Rejeitado',
+                }
+                current_stage = stage_map.get(inspection_status, current_stage)
 
             error_details, error_code = _parse_error_log(job.error_log)
 
@@ -391,11 +383,13 @@ def api_recent_errors():
     """API for recent job errors (last 20 FAILED jobs)."""
     from src.container import get_uow
     from src.models_db import Job, JobStatus
+    from sqlalchemy.orm import joinedload
     import json
 
     uow = get_uow()
     try:
-        failed_jobs = uow.session.query(Job).filter(
+        # joinedload: job.company abaixo não dispara uma query por job
+        failed_jobs = uow.session.query(Job).options(joinedload(Job.company)).filter(
             Job.status.in_([JobStatus.FAILED, JobStatus.SKIPPED])
         ).order_by(Job.created_at.desc()).limit(20).all()
 
@@ -582,7 +576,52 @@ def save_settings():
             saved_count += 1
 
         uow.commit()
+        invalidate_config_cache()
         return jsonify({'success': True, 'message': f'{saved_count} configuracao(oes) salva(s).'})
     except Exception as e:
         uow.rollback()
         return jsonify({'error': str(e)}), 500
+
+
+@admin_bp.route('/api/settings/cache')
+@login_required
+@admin_required
+def get_settings_cache_stats():
+    """Hits/misses do cache de configuração (get_config) neste processo."""
+    return jsonify(config_cache.stats())
+
+
+@admin_bp.route('/api/drive-metrics')
+@login_required
+@admin_required
+def api_drive_metrics():
+    """Pool de clients do Drive (clients, espera por vaga) e varreduras disparadas pelo webhook."""
+    from src.services.change_scan_scheduler import change_scan_scheduler
+    from src.services.drive_service import drive_service
+    return jsonify({**drive_service.stats(), 'change_scans': change_scan_scheduler.stats()})
+
+
+@admin_bp.route('/api/render-metrics')
+@login_required
+@admin_required
+def api_render_metrics():
+    """Tempos e contadores da renderização de PDF (fila, timeouts, reciclagens) e dos caches em disco."""
+    from src.services.render_executor import render_executor
+    from src.services.storage_service import evidence_cache, pdf_cache
+    return jsonify({
+        **render_executor.stats(),
+        'evidence_cache': evidence_cache.stats(),
+        'pdf_cache': pdf_cache.stats(),
+    })
+
+
+@admin_bp.route('/api/query-metrics', methods=['GET', 'DELETE'])
+@login_required
+@admin_required
+def api_query_metrics():
+    """Queries por requisição agregadas por endpoint (DELETE zera o agregado)."""
+    from src.infrastructure.query_metrics import registry
+    if request.method == 'DELETE':
+        registry.reset()
+        return jsonify({'success': True})
+    return jsonify(registry.snapshot())
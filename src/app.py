@@ -5,7 +5,7 @@ import json
 import logging
 import io
 import threading
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, send_file, get_flashed_messages, session, after_this_request, make_response, current_app
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, send_file, get_flashed_messages, session, after_this_request, make_response
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
@@ -93,12 +93,13 @@ init_limiter(app)
 from src.config import config
 from src import database # Import module to access updated db_session
 from src.database import get_db, init_db # Keep functions
-from src.models_db import User, Company, Establishment, Job, JobStatus, UserRole
+from src.models_db import User, Company, Establishment, UserRole
 from datetime import datetime
 from src.auth import role_required, admin_required, login_manager, auth_bp
 from src.services.email_service import EmailService
-from src.services.storage_service import storage_service
-from src.config_helper import get_config
+from src.services.storage_service import storage_service, pdf_cache
+from src.services.render_executor import render_executor, RenderQueueFull, RenderTimeout
+from src.config_helper import get_config, invalidate_config_cache
 
 # Configurações do App
 app.secret_key = config.SECRET_KEY
@@ -133,6 +134,10 @@ logger.info("⚡ Migrações Puladas (Modo Dev)")
 # Inicializa Flask-Login
 login_manager.init_app(app)
 
+# Contagem/tempo de queries por requisição (+ detector de N+1)
+from src.infrastructure import query_metrics
+query_metrics.init_app(app)
+
 # Registra Blueprints
 # Import Blueprints - Late Import to avoid circular dependencies
 logger.info("🔧 Carregando Blueprints...")
@@ -313,14 +318,10 @@ def _ensure_system_folder(drive_svc, root_folder_id, config_key, folder_name):
     from src.models_db import AppConfig
     current_id = get_config(config_key)
     if current_id:
-        try:
-            drive_svc.service.files().get(
-                fileId=current_id, fields='id', supportsAllDrives=True
-            ).execute()
+        if drive_svc.get_file(current_id):
             logger.info(f"✅ {config_key} válido: {current_id}")
             return
-        except Exception:
-            logger.warning(f"⚠️ {config_key} inválido ({current_id}), recriando...")
+        logger.warning(f"⚠️ {config_key} inválido ({current_id}), recriando...")
 
     folder_id, _ = drive_svc.create_folder(folder_name, parent_id=root_folder_id)
     if folder_id:
@@ -333,6 +334,7 @@ def _ensure_system_folder(drive_svc, root_folder_id, config_key, folder_name):
                 db.add(AppConfig(key=config_key, value=folder_id))
             db.commit()
             db.close()
+            invalidate_config_cache()
         except Exception as e:
             logger.warning(f"⚠️ Falha ao salvar {config_key} no DB: {e}")
         logger.info(f"✅ {config_key} criado: {folder_id}")
@@ -340,8 +342,9 @@ def _ensure_system_folder(drive_svc, root_folder_id, config_key, folder_name):
         logger.error(f"❌ Falha ao criar pasta '{folder_name}' no Drive")
 
 try:
-    from src.services.drive_service import DriveService
-    app.drive_service = DriveService()
+    # Mesma instância usada por processor/approval_service: um pool de clients por processo
+    from src.services.drive_service import drive_service as shared_drive_service
+    app.drive_service = shared_drive_service
     drive_service = app.drive_service # Global alias for routes
     logger.info("✅ Serviço do Drive Inicializado")
 
@@ -367,6 +370,7 @@ except Exception as e:
 try:
     from src.services.pdf_service import PDFService
     app.pdf_service = PDFService()
+    app.pdf_service.warm_up()  # compila pdf_template.html e parseia style.css antes da 1ª requisição
     pdf_service = app.pdf_service
     logger.info("✅ Serviço de PDF Inicializado")
 except Exception as e:
@@ -447,7 +451,8 @@ def get_friendly_error_message(e):
 def upload_file():
     """
     Rota para upload de múltiplos relatórios de vistoria.
-    Realiza o processamento inicial e enfileira jobs assíncronos.
+    Valida, faz o smart match de estabelecimento e enfileira jobs PENDING
+    para o worker (`python -m src.worker`). Não processa na requisição.
     """
     if request.method == 'GET':
         return redirect(url_for('dashboard_consultant'))
@@ -481,7 +486,6 @@ def upload_file():
                 return redirect(url_for('dashboard_consultant'))
 
         # [FIX] Capture user details early to avoid DetachedInstanceError in exception handler
-        user_email = current_user.email
         user_name = current_user.name
 
         # Initialize file validator (validates magic bytes, not just extension)
@@ -543,14 +547,13 @@ def upload_file():
                 upload_id = f"upload:{uuid.uuid4()}"
                 logger.info(f"📄 Upload direto (sem Drive): {file.filename} -> {upload_id}")
 
-                # 4. Ler bytes do arquivo para processamento direto
-                with open(caminho_temp, 'rb') as f_temp:
-                    file_bytes = f_temp.read()
+                # 4. Gravar bytes no storage para o worker (processamento fora da requisição)
+                from src.worker import JOB_TYPE_PROCESS_REPORT, stage_upload
+                from src.services.job_tracker import new_job
+                staged_path = stage_upload(file_content, upload_id)
 
-                # 5. Criar Job e Inspection
+                # 5. Criar Inspection (visível na UI) e enfileirar Job PENDING
                 db = next(get_db())
-                job = None
-                job_id_saved = None
                 try:
                     from src.models_db import Inspection, InspectionStatus
 
@@ -561,16 +564,14 @@ def upload_file():
                         establishment_id=est_alvo_id  # Usa valor primitivo (evita DetachedInstanceError)
                     )
                     db.add(new_insp)
-                    db.flush()
-                    logger.info(f"✅ Registro de Inspeção {new_insp.id} pré-criado para visibilidade na UI.")
 
                     # Usar valores primitivos salvos (evita DetachedInstanceError)
                     job_company_id = current_user.company_id or est_alvo_company_id
 
-                    job = Job(
+                    # Job PENDING consumido por `python -m src.worker`
+                    job = new_job(
+                        JOB_TYPE_PROCESS_REPORT,
                         company_id=job_company_id,
-                        type="PROCESS_REPORT",
-                        status=JobStatus.PROCESSING,  # [FIX] Já inicia como PROCESSING (não PENDING)
                         input_payload={
                             'file_id': upload_id,
                             'filename': file.filename,
@@ -578,163 +579,22 @@ def upload_file():
                             'establishment_name': est_alvo_name,  # Valor primitivo
                             'uploaded_by_id': str(current_user.id),
                             'uploaded_by_name': user_name,
+                            'staged_path': staged_path,
                         }
                     )
                     db.add(job)
-                    db.flush()  # Gera o ID sem fechar a sessão
-
-                    # Salvar ID ANTES do commit (evita DetachedInstanceError)
-                    job_id_saved = job.id
-
                     db.commit()
-                    db.close()  # [FIX] Fechar sessão explicitamente antes do processamento
-
-                    # [SYNC-MVP] Processar Imediatamente (Sem Worker)
-                    logger.info(f"⏳ [SYNC] Iniciando processamento de {file.filename} (Job: {job_id_saved})")
-
-                    from src.services.processor import processor_service
-
-                    file_meta = {'id': upload_id, 'name': file.filename}
-
-                    result = processor_service.process_single_file(
-                        file_meta,
-                        company_id=job_company_id,
-                        establishment_id=est_alvo_id,  # Valor primitivo (evita DetachedInstanceError)
-                        job_id=job_id_saved,
-                        file_content=file_bytes
-                    )
-
-                    # [FIX] Verificar se arquivo foi pulado por duplicação
-                    if result and result.get('status') == 'skipped' and result.get('reason') == 'duplicate':
-                        logger.info(f"♻️ Arquivo duplicado: {file.filename} (já existe como {result.get('existing_id')})")
-
-                        # Atualizar Job como SKIPPED
-                        db_skip = next(get_db())
-                        try:
-                            skip_job = db_skip.get(Job, job_id_saved)
-                            if skip_job:
-                                skip_job.status = JobStatus.SKIPPED
-                                skip_job.finished_at = datetime.utcnow()
-                                skip_job.error_log = f"Arquivo duplicado - já processado anteriormente"
-                                db_skip.commit()
-                        finally:
-                            db_skip.close()
-
-                        # Remover Inspection órfã criada para este upload
-                        db_cleanup = next(get_db())
-                        try:
-                            orphan = db_cleanup.query(Inspection).filter_by(
-                                drive_file_id=upload_id,
-                                status=InspectionStatus.PROCESSING
-                            ).first()
-                            if orphan:
-                                db_cleanup.delete(orphan)
-                                db_cleanup.commit()
-                                logger.info(f"🧹 Removida Inspection órfã para duplicado: {file.filename}")
-                        finally:
-                            db_cleanup.close()
-
-                        # Informar usuário sobre duplicação
-                        flash(f'Arquivo "{file.filename}" já foi processado anteriormente. Verifique na lista de relatórios.', 'warning')
-                        continue  # Próximo arquivo
-
-                    # Re-fetch job in fresh session (processor closes/detaches our objects)
-                    db_fresh = next(get_db())
-                    try:
-                        fresh_job = db_fresh.get(Job, job_id_saved)
-                        if fresh_job:
-                            fresh_job.status = JobStatus.COMPLETED
-                            fresh_job.finished_at = datetime.utcnow()
-                            if fresh_job.created_at:
-                                fresh_job.execution_time_seconds = (fresh_job.finished_at - fresh_job.created_at.replace(tzinfo=None)).total_seconds()
-                            fresh_job.attempts = (fresh_job.attempts or 0) + 1
-                            db_fresh.commit()
-
-                            total_cost = (fresh_job.cost_input_usd or 0) + (fresh_job.cost_output_usd or 0)
-                            logger.info(f"✅ [SYNC] Processamento concluído: {file.filename} (Cost: ${total_cost:.4f})")
-                    finally:
-                        db_fresh.close()
-
+                    logger.info(f"📥 Job enfileirado para {file.filename} (Inspeção pré-criada para visibilidade na UI)")
                     sucesso += 1
-
                 except Exception as job_e:
-                    logger.error(f"Erro no processamento síncrono para {file.filename}: {job_e}")
-
-                    # Cleanup: Update Job and remove orphan Inspection
-                    try:
-                        db_err = next(get_db())
-
-                        # Update Job status
-                        if job_id_saved:
-                            err_job = db_err.get(Job, job_id_saved)
-                            if err_job:
-                                err_job.status = JobStatus.FAILED
-                                err_job.error_log = str(job_e)
-
-                        # Remove orphan Inspection (was created but processing failed)
-                        orphan_insp = db_err.query(Inspection).filter_by(
-                            drive_file_id=upload_id,
-                            status=InspectionStatus.PROCESSING
-                        ).first()
-                        if orphan_insp:
-                            db_err.delete(orphan_insp)
-                            logger.info(f"🧹 Removida Inspection órfã para {file.filename}")
-
-                        db_err.commit()
-                        db_err.close()
-                    except Exception as cleanup_e:
-                        logger.error(f"Failed to cleanup after error for {file.filename}: {cleanup_e}")
-
+                    db.rollback()
+                    # Sem job apontando para ele, o PDF em staging ficaria órfão
+                    storage_service.delete_file(staged_path)
+                    logger.error(f"Erro ao enfileirar {file.filename}: {job_e}")
                     falha += 1
-
-                    # [NOTIFY] Avisar consultor sobre erro crítico
-                    try:
-                        if app.email_service and user_email:
-                            subj = f"Erro no Processamento: {file.filename}"
-
-                            body_html = f"""
-                            <html>
-                            <head></head>
-                            <body style="font-family: sans-serif; color: #333;">
-                                <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #fecaca; border-radius: 10px; background: #fef2f2;">
-                                    <h2 style="color: #dc2626;"><span style="font-size: 1.5rem;">⚠️</span> Erro no Processamento</h2>
-                                    <p>Olá, <strong>{user_name}</strong>.</p>
-                                    <p>Ocorreu um erro ao processar o relatório:</p>
-                                    <div style="background: #fff; padding: 15px; border-radius: 5px; margin: 20px 0; border-left: 4px solid #dc2626;">
-                                        <p style="margin: 0; font-weight: bold; color: #333;">{file.filename}</p>
-                                    </div>
-                                    <p style="font-size: 0.9rem; color: #666;">O arquivo pode estar corrompido, em formato inválido, ou houve uma falha temporária no sistema.</p>
-                                    <p><strong>O que fazer:</strong></p>
-                                    <ul style="color: #666;">
-                                        <li>Verifique se o arquivo é um PDF válido</li>
-                                        <li>Tente enviar novamente</li>
-                                        <li>Se o erro persistir, contate o suporte</li>
-                                    </ul>
-                                    <hr style="border: none; border-top: 1px solid #fecaca; margin: 20px 0;">
-                                    <p style="font-size: 0.75rem; color: #999;">Erro técnico: {str(job_e)[:200]}</p>
-                                </div>
-                            </body>
-                            </html>
-                            """
-
-                            body_text = f"""
-Olá {user_name},
-
-Ocorreu um erro ao processar o relatório "{file.filename}".
-
-O que fazer:
-- Verifique se o arquivo é um PDF válido
-- Tente enviar novamente
-- Se o erro persistir, contate o suporte
-
-Erro técnico: {str(job_e)[:200]}
-                            """
-
-                            app.email_service.send_email(user_email, subj, body_html, body_text)
-                    except Exception as mail_e:
-                        logger.error(f"Falha ao enviar email de erro: {mail_e}")
-
-                    flash(f"Erro ao processar {file.filename}: {str(job_e)}", 'error')
+                    flash(f"Erro ao enviar {file.filename}: {get_friendly_error_message(job_e)}", 'error')
+                finally:
+                    db.close()
 
             except Exception as e:
                 friendly_msg = get_friendly_error_message(e)
@@ -891,9 +751,9 @@ def download_pdf_route(json_id):
     try:
         # Pega metadados do JSON para saber o nome
         # O ID passado pode ser o do PDF direto se ajustamos antes, mas assumindo JSON ID.
-        try:
-             json_file = drive_service.service.files().get(fileId=json_id, fields='name, mimeType', supportsAllDrives=True).execute()
-        except:
+        # Metadados e busca por nome saem do cache do DriveService quando possível
+        json_file = drive_service.get_file(json_id)
+        if not json_file:
              # Talvez seja o ID do PDF ja?
              json_file = {'name': 'unknown.json', 'mimeType': 'application/json'}
 
@@ -911,15 +771,10 @@ def download_pdf_route(json_id):
         pdf_name = json_name.replace('.json', '.pdf')
         
         # Procura o PDF na pasta de saída
-        # Isso é ineficiente (listar tudo), mas para MVP ok. 
         # Ideal: Guardar ID do PDF no JSON.
-        query = f"'{FOLDER_OUT}' in parents and name = '{pdf_name}' and trashed=false"
-        results = drive_service.service.files().list(
-            q=query, fields='files(id)', supportsAllDrives=True, includeItemsFromAllDrives=True
-        ).execute()
-        files = results.get('files', [])
+        pdf_file = drive_service.find_file(FOLDER_OUT, pdf_name)
         
-        if not files:
+        if not pdf_file:
             # Fuzzy match: same base name but maybe different casing or prefix
             base_name = pdf_name.replace('.pdf', '')
             query_fuzzy = f"'{FOLDER_OUT}' in parents and name contains '{base_name}' and trashed=false"
@@ -938,7 +793,7 @@ def download_pdf_route(json_id):
             else:
                 return "PDF não encontrado", 404
         else:
-            pdf_id = files[0]['id']
+            pdf_id = pdf_file['id']
             
         file_content = drive_service.download_file(pdf_id)
         
@@ -1233,7 +1088,11 @@ def save_review(file_id):
 
         # NOTE: Consultant changes are saved but inspection stays in PENDING_CONSULTANT_VERIFICATION
         # The PDF will only show these changes after consultant finalizes via finalize_verification endpoint
+        inspection = uow.inspections.get_by_drive_file_id(file_id)
+        if inspection:
+            uow.inspections.refresh_summary(inspection)
         uow.commit()
+        pdf_cache.invalidate(file_id)
         return jsonify({'success': True})
     except Exception as e:
         logger.error(f"[SAVE_REVIEW] Erro ao salvar revisao {file_id}: {e}")
@@ -1273,6 +1132,10 @@ def upload_evidence():
             public_url = storage_service.upload_file(file, destination_folder=folder, filename=filename)
             logger.info(f"[EVIDENCE] Upload concluido: {public_url}")
 
+            # Versões reduzidas (PDF/miniatura, sem EXIF) geradas em background
+            from src.services.evidence_images import schedule_derivatives
+            schedule_derivatives(filename, file_content, storage_service)
+
             # Always normalize to use the proxy route for resilience
             # This ensures evidence works even if GCS is not available or container restarts
             if public_url and not public_url.startswith('http'):
@@ -1293,27 +1156,53 @@ def upload_evidence():
 
 @app.route('/evidence/<path:filename>')
 def serve_evidence(filename):
-    """Proxy route for evidence images - tries GCS first, then local storage."""
-    import mimetypes
-    from flask import Response, send_from_directory
+    """
+    Evidence images - GCS first (streamed with Range/ETag, or a redirect to a
+    signed URL with EVIDENCE_DELIVERY=signed), then local storage.
+    `?v=thumb` / `?v=pdf` serve the reduced derivative, falling back to the original.
+    """
+    from src.services.evidence_delivery import FALLBACK_CACHE, IMMUTABLE_CACHE, evidence_delivery
+    from src.services.evidence_images import VARIANTS, variant_filename
+
+    # URL emitida por um signer local: válida só até `expires`, e não redireciona de novo
+    signed = 'sig' in request.args
+    if signed and not evidence_delivery.verify(filename, request.args):
+        return "Link expirado", 403
+
+    # Nomes com uuid nunca mudam: cache imutável
+    cache_control = IMMUTABLE_CACHE
+    variant = request.args.get('v')
+    if variant in VARIANTS:
+        response = _load_evidence(variant_filename(filename, variant), IMMUTABLE_CACHE, signed)
+        if response is not None:
+            return response
+        # Derivado ainda não gerado: o original não pode ficar preso nesta URL
+        cache_control = FALLBACK_CACHE
+
+    response = _load_evidence(filename, cache_control, signed)
+    if response is not None:
+        return response
+
+    logger.warning(f"Evidence not found: {filename}")
+    return "Imagem não encontrada", 404
+
+
+def _load_evidence(filename, cache_control, signed=False):
+    """Response with the evidence file from GCS or local storage, or None."""
+    from src.services.evidence_delivery import evidence_delivery
     from src.services.storage_service import storage_service
 
     # 1. Try GCS first (persistent storage)
     if storage_service.client and storage_service.bucket_name:
         try:
             bucket = storage_service.client.bucket(storage_service.bucket_name)
-            blob = bucket.blob(f"evidence/{filename}")
-            if blob.exists():
-                data = blob.download_as_bytes()
-                content_type = mimetypes.guess_type(filename)[0] or 'image/png'
-                return Response(data, mimetype=content_type, headers={
-                    'Cache-Control': 'public, max-age=86400'
-                })
+            response = evidence_delivery.gcs_response(bucket, filename, cache_control, allow_redirect=not signed)
+            if response is not None:
+                return response
         except Exception as e:
             logger.warning(f"GCS evidence fetch failed for {filename}: {e}")
 
-    # 2. Try local storage as fallback
-    import os
+    # 2. Try local storage as fallback (send_from_directory já trata Range e ETag)
     local_paths = [
         os.path.join('src', 'static', 'uploads', 'evidence'),
         os.path.join('static', 'uploads', 'evidence'),
@@ -1321,10 +1210,10 @@ def serve_evidence(filename):
     for local_dir in local_paths:
         full_path = os.path.join(local_dir, filename)
         if os.path.exists(full_path):
-            return send_from_directory(os.path.abspath(local_dir), filename)
-
-    logger.warning(f"Evidence not found: {filename}")
-    return "Imagem não encontrada", 404
+            response = send_from_directory(os.path.abspath(local_dir), filename)
+            response.headers['Cache-Control'] = cache_control
+            return response
+    return None
 
 # Duplicate Route REMOVED: @app.route('/admin/api/jobs') matches src/admin_routes.py
 # If you need this logic, ensure it does not conflict with admin_routes.py
@@ -1348,15 +1237,34 @@ def download_revised_pdf(file_id):
         if 'detalhe_pontuacao' not in data:
             data['detalhe_pontuacao'] = data.get('by_sector', {})
 
-        # Generate PDF
-        pdf_bytes = pdf_service.generate_pdf_bytes(data)
+        # Versão do conteúdo = ETag: links compartilhados reabertos não renderizam de novo
+        version = pdf_cache.content_version(data)
+        if request.if_none_match.contains(version):
+            response = make_response('', 304)
+            response.set_etag(version)
+            return response
+
+        pdf_bytes = pdf_cache.get(file_id, version)
+        if pdf_bytes is None:
+            pdf_bytes = render_executor.render(pdf_service, data)
+            pdf_cache.put(file_id, version, pdf_bytes)
 
         filename = f"Plano_Revisado_{data.get('nome_estabelecimento', 'Relatorio').replace(' ', '_')}.pdf"
         response = make_response(pdf_bytes)
         response.headers['Content-Type'] = 'application/pdf'
         response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+        response.headers['Cache-Control'] = 'private, no-cache'  # sempre revalida via ETag
+        response.set_etag(version)
         return response
 
+    except RenderQueueFull as e:
+        logger.warning(f'PDF {file_id}: {e}')
+        response = make_response('Muitos PDFs sendo gerados agora. Tente novamente em instantes.', 503)
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except RenderTimeout as e:
+        logger.error(f'PDF {file_id}: {e}')
+        return 'Tempo esgotado ao gerar o PDF.', 504
     except Exception as e:
         logger.error(f'Erro PDF Gen: {e}')
         return f'Erro ao gerar PDF: {e}', 500
@@ -1446,17 +1354,11 @@ def webhook_drive():
     if resource_state == 'sync':
         return jsonify({'success': True, 'msg': 'Sync received'}), 200
     
-    # Se for mudança ('change', 'add', etc), disparamos o processamento global
-    # Idealmente, envie para Task Queue. Para MVP, roda inline (cuidado com timeout).
-    
+    # Se for mudança ('change', 'add', etc): só marca "mudanças pendentes" e responde na hora.
+    # A varredura (process_global_changes) roda em background, uma por janela de debounce.
     try:
-        from src.services.sync_service import process_global_changes
-        drive = current_app.drive_service
-        
-        # Chamada Sincrona (Cuidado com timeout de 60s)
-        result = process_global_changes(drive)
-        logger.info(f"Webhook Processing Result: {result}")
-        
+        from src.services.change_scan_scheduler import change_scan_scheduler
+        change_scan_scheduler.notify()
     except Exception as e:
         logger.error(f"Webhook Global Error: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
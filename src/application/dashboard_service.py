@@ -154,7 +154,8 @@ class DashboardService:
         max_score = 0
 
         if establishment_ids:
-            completed = self._uow.inspections.get_for_consultant(
+            # Só as colunas de pontuação (resumo desnormalizado), sem ler o ai_raw_response
+            completed = self._uow.inspections.get_score_rows(
                 establishment_ids=establishment_ids,
                 statuses=[
                     InspectionStatus.COMPLETED,
@@ -162,13 +163,10 @@ class DashboardService:
                     InspectionStatus.APPROVED,
                 ],
             )
-            for insp in completed:
-                if insp.ai_raw_response and isinstance(insp.ai_raw_response, dict):
-                    score = insp.ai_raw_response.get('pontuacao_geral', 0)
-                    max_s = insp.ai_raw_response.get('pontuacao_maxima_geral', 100)
-                    if score and max_s:
-                        total_score += float(score)
-                        max_score += float(max_s)
+            for score, max_s in completed:
+                if score and max_s:
+                    total_score += float(score)
+                    max_score += float(max_s)
 
         avg_score = round((total_score / max_score * 100), 2) if max_score > 0 else 0
 
@@ -198,7 +196,8 @@ class DashboardService:
         if not company_id:
             return []
 
-        failed_records = self._uow.jobs.get_failed_recent(
+        # Status da inspeção vem na mesma query (sem uma consulta por job)
+        failed_records = self._uow.jobs.get_failed_recent_with_inspection(
             company_id=company_id,
             minutes=30,
             limit=10,
@@ -207,7 +206,7 @@ class DashboardService:
         alerts = []
         seen_filenames = set()
 
-        for job in failed_records:
+        for job, insp_status, _ in failed_records:
             payload = job.input_payload or {}
             filename = payload.get('filename', 'Arquivo')
 
@@ -215,11 +214,8 @@ class DashboardService:
                 continue
 
             # Skip if file already processed successfully
-            file_id = payload.get('file_id')
-            if file_id:
-                success = self._uow.inspections.get_by_drive_file_id(file_id)
-                if success and success.status != InspectionStatus.PROCESSING:
-                    continue
+            if insp_status is not None and insp_status != InspectionStatus.PROCESSING:
+                continue
 
             seen_filenames.add(filename)
 
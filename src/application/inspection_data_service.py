@@ -88,6 +88,7 @@ class InspectionDataService:
         # Add raw status for template conditional logic (hide consultant changes until finalized)
         data['inspection_status'] = status_val
         data['is_completed'] = (status_val == 'COMPLETED')
+        data.setdefault('detalhe_pontuacao', data.get('by_sector', {}))
 
         return data
 
@@ -22,10 +22,11 @@ class PlanResult:
 class PlanService:
     """Handles plan save, approve, and review finalization."""
 
-    def __init__(self, uow, pdf_service=None, storage_service=None):
+    def __init__(self, uow, pdf_service=None, storage_service=None, pdf_cache=None):
         self._uow = uow
         self._pdf_service = pdf_service
         self._storage_service = storage_service
+        self._pdf_cache = pdf_cache
 
     def save_plan(self, file_id, data, current_user):
         """
@@ -51,6 +52,7 @@ class PlanService:
             )
 
         plan = inspection.action_plan
+        self._invalidate_pdf(file_id)
 
         # Save enriched fields
         if 'summary_text' in data:
@@ -69,6 +71,7 @@ class PlanService:
         if data.get('approve'):
             whatsapp_link = self._do_approve(inspection, plan, current_user, data)
 
+        self._uow.inspections.refresh_summary(inspection, plan)
         self._uow.commit()
         return PlanResult(success=True, message='Plano salvo com sucesso!', whatsapp_link=whatsapp_link)
 
@@ -88,6 +91,7 @@ class PlanService:
             return PlanResult(success=False, message='Plan not found', error='NOT_FOUND')
 
         plan = inspection.action_plan
+        self._invalidate_pdf(file_id)
         whatsapp_link = self._do_approve(inspection, plan, current_user, {})
 
         self._uow.commit()
@@ -127,7 +131,9 @@ class PlanService:
             if 'evidence_image_url' in item_data:
                 item.evidence_image_url = item_data['evidence_image_url']
 
+        self._uow.inspections.refresh_summary(inspection, plan)
         self._uow.commit()
+        self._invalidate_pdf(file_id)
         return PlanResult(success=True, message='Review salva com sucesso!')
 
     def finalize_verification(self, file_id):
@@ -145,7 +151,9 @@ class PlanService:
             return PlanResult(success=False, message='Inspection not found', error='NOT_FOUND')
 
         inspection.status = InspectionStatus.COMPLETED
+        self._uow.inspections.refresh_summary(inspection)
         self._uow.commit()
+        self._invalidate_pdf(file_id)
         return PlanResult(success=True, message='Verificação finalizada!')
 
     def _process_items(self, plan, items_payload):
@@ -254,6 +262,10 @@ class PlanService:
             pdf_data = data_service.get_pdf_data(inspection.drive_file_id)
 
             pdf_bytes = self._pdf_service.generate_pdf_bytes(pdf_data)
+            if self._pdf_cache:
+                # Mesma versão que /download_revised_pdf calcula: o primeiro download já sai do cache
+                version = self._pdf_cache.content_version(pdf_data)
+                self._pdf_cache.put(inspection.drive_file_id, version, pdf_bytes)
             filename = f'Plano_Aprovado_{inspection.id}.pdf'
             pdf_url = self._storage_service.upload_file(
                 io.BytesIO(pdf_bytes),
@@ -264,6 +276,11 @@ class PlanService:
         except Exception:
             pass  # Don't block approval
 
+    def _invalidate_pdf(self, file_id):
+        """Drop cached PDF versions after the plan or its items change."""
+        if self._pdf_cache:
+            self._pdf_cache.invalidate(file_id)
+
     @staticmethod
     def _build_whatsapp_link(phone, name, inspection, plan):
         """Build WhatsApp share link with approval message."""
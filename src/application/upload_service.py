@@ -1,12 +1,11 @@
-"""Service for handling file uploads and processing."""
+"""Service for handling file uploads and job enqueueing."""
 import os
 import uuid
-import tempfile
-from datetime import datetime
 from dataclasses import dataclass, field
 from typing import Optional
 
-from src.models_db import Inspection, InspectionStatus, Job, JobStatus
+from src.models_db import Inspection, InspectionStatus
+from src.services.job_tracker import new_job
 
 
 @dataclass
@@ -22,17 +21,20 @@ class UploadResult:
 
 
 class UploadService:
-    """Handles file upload validation, smart matching, and processing."""
+    """Handles file upload validation, smart matching, and job enqueueing."""
 
-    def __init__(self, uow, processor, file_validator=None):
+    def __init__(self, uow, storage, file_validator=None):
         self._uow = uow
-        self._processor = processor
+        self._storage = storage
         self._validator = file_validator
 
     def process_upload(self, file_content, filename, establishment_id, user,
                        company_id=None):
         """
-        Process a single file upload.
+        Validate a single file upload and enqueue it for the report worker.
+
+        The PDF is staged in storage and a PENDING job is created; the actual
+        AI processing happens in `python -m src.worker`.
 
         Args:
             file_content: Raw bytes of the uploaded file.
@@ -44,6 +46,8 @@ class UploadService:
         Returns:
             UploadResult with success/error details.
         """
+        from src.worker import JOB_TYPE_PROCESS_REPORT, stage_upload
+
         # 1. Validate file
         if self._validator:
             validation = self._validator.validate(file_content, filename)
@@ -66,103 +70,61 @@ class UploadService:
                 if est.company_id and not job_company_id:
                     job_company_id = est.company_id
 
-        # 3. Create inspection record
+        # 3. Stage file for the worker
         upload_id = f'upload:{uuid.uuid4()}'
-        new_insp = Inspection(
-            drive_file_id=upload_id,
-            status=InspectionStatus.PROCESSING,
-            establishment_id=uuid.UUID(est_id) if est_id else None,
-        )
-        self._uow.inspections.add(new_insp)
-        self._uow.flush()
-
-        # 4. Create job
-        job = Job(
-            company_id=job_company_id,
-            type='PROCESS_REPORT',
-            status=JobStatus.PROCESSING,
-            input_payload={
-                'file_id': upload_id,
-                'filename': filename,
-                'establishment_id': est_id,
-                'establishment_name': est_name,
-            },
-        )
-        self._uow.jobs.add(job)
-        self._uow.flush()
-        job_id = job.id
-        self._uow.commit()
+        try:
+            staged_path = stage_upload(file_content, upload_id, storage=self._storage)
+        except Exception as e:
+            return UploadResult(
+                success=False,
+                message=f'Erro ao enviar arquivo: {e}',
+                error=str(e),
+            )
 
-        # 5. Process file
+        # 4. Create inspection record (visible in UI while queued) and enqueue job
         try:
-            file_meta = {'id': upload_id, 'name': filename}
-            result = self._processor.process_single_file(
-                file_meta,
-                company_id=job_company_id,
+            new_insp = Inspection(
+                drive_file_id=upload_id,
+                status=InspectionStatus.PROCESSING,
                 establishment_id=uuid.UUID(est_id) if est_id else None,
-                job_id=job_id,
-                file_content=file_content,
             )
+            self._uow.inspections.add(new_insp)
 
-            # Check for duplicates
-            if result.get('status') == 'skipped' and result.get('reason') == 'duplicate':
-                # Clean up orphan inspection
-                orphan = self._uow.inspections.get_by_drive_file_id(upload_id)
-                if orphan:
-                    self._uow.inspections.delete(orphan)
-                # Mark job as skipped
-                job_record = self._uow.jobs.get_by_id(job_id)
-                if job_record:
-                    job_record.status = JobStatus.SKIPPED
-                self._uow.commit()
-
-                return UploadResult(
-                    success=True,
-                    message='Arquivo duplicado detectado.',
-                    skipped=True,
-                    file_id=upload_id,
-                )
-
-            # Mark job as completed
-            job_record = self._uow.jobs.get_by_id(job_id)
-            if job_record:
-                job_record.status = JobStatus.COMPLETED
-                job_record.finished_at = datetime.utcnow()
-                job_record.attempts += 1
-            self._uow.commit()
-
-            return UploadResult(
-                success=True,
-                message='Arquivo processado com sucesso!',
-                file_id=upload_id,
-                job_id=str(job_id),
-                establishment_name=est_name,
+            job = new_job(
+                JOB_TYPE_PROCESS_REPORT,
+                company_id=job_company_id,
+                input_payload={
+                    'file_id': upload_id,
+                    'filename': filename,
+                    'establishment_id': est_id,
+                    'establishment_name': est_name,
+                    'uploaded_by_id': str(user.id) if getattr(user, 'id', None) else None,
+                    'uploaded_by_name': getattr(user, 'name', None),
+                    'staged_path': staged_path,
+                },
             )
-
+            self._uow.jobs.add(job)
+            self._uow.flush()
+            job_id = job.id
+            self._uow.commit()
         except Exception as e:
-            # Update job to failed
-            try:
-                job_record = self._uow.jobs.get_by_id(job_id)
-                if job_record:
-                    job_record.status = JobStatus.FAILED
-                    job_record.error_log = str(e)
-                    job_record.finished_at = datetime.utcnow()
-
-                # Delete orphan inspection
-                orphan = self._uow.inspections.get_by_drive_file_id(upload_id)
-                if orphan:
-                    self._uow.inspections.delete(orphan)
-
-                self._uow.commit()
-            except Exception:
-                self._uow.rollback()
-
+            # Sem job apontando para ele, o arquivo em staging ficaria órfão
+            self._uow.rollback()
+            self._storage.delete_file(staged_path)
             return UploadResult(
                 success=False,
-                message=f'Erro ao processar arquivo: {e}',
+                message=f'Erro ao enfileirar arquivo: {e}',
                 error=str(e),
             )
 
+        return UploadResult(
+            success=True,
+            message='Arquivo enviado para processamento.',
+            file_id=upload_id,
+            job_id=str(job_id),
+            establishment_name=est_name,
+        )
+
     def smart_match_establishment(self, pdf_text, user_establishments):
         """
         Match establishment by checking if name appears in PDF text.
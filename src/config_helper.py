@@ -1,26 +1,106 @@
 import os
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-def get_config(key, default=None):
+# TTL do cache de configuração (lido só do ambiente: o cache não pode depender de si mesmo)
+DEFAULT_CONFIG_CACHE_TTL = 60.0
+
+
+class ConfigCache:
     """
-    Busca configuracao com prioridade:
-    1. Tabela AppConfig no banco de dados
-    2. Variavel de ambiente (os.getenv)
-    3. Valor default
+    Cache em memória (por processo) da tabela AppConfig.
+
+    Todas as linhas são carregadas em uma única query e servidas da memória
+    até o TTL expirar. Salvar configurações pelo admin chama `invalidate()`,
+    então a próxima leitura já busca os valores novos.
     """
-    try:
+
+    def __init__(self, loader=None, ttl=None):
+        self._loader = loader or self._load_from_db
+        self._ttl = ttl
+        self._values = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        try:
+            return float(os.getenv('CONFIG_CACHE_TTL_SECONDS', DEFAULT_CONFIG_CACHE_TTL))
+        except ValueError:
+            return DEFAULT_CONFIG_CACHE_TTL
+
+    @staticmethod
+    def _load_from_db():
         from src.database import get_db
         from src.models_db import AppConfig
         db = next(get_db())
         try:
-            entry = db.query(AppConfig).get(key)
-            if entry and entry.value is not None and entry.value.strip() != '':
-                return entry.value
+            return {
+                key: value for key, value in db.query(AppConfig.key, AppConfig.value).all()
+                if value is not None and value.strip() != ''
+            }
         finally:
             db.close()
-    except Exception:
-        pass  # Fallback silencioso para env var
 
+    def _is_fresh(self):
+        return self._values is not None and (time.monotonic() - self._loaded_at) < self.ttl
+
+    def get(self, key):
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return self._values.get(key)
+            self.misses += 1
+            try:
+                self._values = self._loader()
+                self._loaded_at = time.monotonic()
+            except Exception as e:
+                # Banco indisponível: mantém o snapshot anterior (se houver) e tenta de novo na próxima leitura
+                logger.debug(f"Config cache load failed: {e}")
+                return self._values.get(key) if self._values is not None else None
+            return self._values.get(key)
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+            self._loaded_at = 0.0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'keys': len(self._values) if self._values is not None else 0,
+                'ttl_seconds': self.ttl,
+            }
+
+
+# Singleton
+config_cache = ConfigCache()
+
+
+def get_config(key, default=None):
+    """
+    Busca configuracao com prioridade:
+    1. Tabela AppConfig no banco de dados (via cache com TTL)
+    2. Variavel de ambiente (os.getenv)
+    3. Valor default
+    """
+    value = config_cache.get(key)
+    if value is not None:
+        return value
     return os.getenv(key, default)
+
+
+def invalidate_config_cache():
+    """Descarta o cache após gravar na tabela AppConfig."""
+    config_cache.invalidate()
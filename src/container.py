@@ -31,14 +31,14 @@ def get_dashboard_service():
 
 
 def get_upload_service():
-    """Get UploadService with processor and validator."""
+    """Get UploadService with storage and validator."""
     from src.application.upload_service import UploadService
-    from src.services.processor import processor_service
+    from src.services.storage_service import storage_service
     from src.domain.validators import FileValidator
 
     return UploadService(
         get_uow(),
-        processor=processor_service,
+        storage=storage_service,
         file_validator=FileValidator.create_pdf_validator(),
     )
 
@@ -49,9 +49,11 @@ def get_plan_service():
 
     pdf_svc = getattr(current_app, 'pdf_service', None)
     storage_svc = None
+    cache = None
     try:
-        from src.services.storage_service import storage_service
+        from src.services.storage_service import storage_service, pdf_cache
         storage_svc = storage_service
+        cache = pdf_cache
     except Exception:
         pass
 
@@ -59,6 +61,7 @@ def get_plan_service():
         get_uow(),
         pdf_service=pdf_svc,
         storage_service=storage_svc,
+        pdf_cache=cache,
     )
 
 
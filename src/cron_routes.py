@@ -64,3 +64,29 @@ def cron_renew_webhook():
     except Exception as e:
         logger.error(f"Cron webhook renewal failed: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
+
+
+@cron_bp.route('/api/cron/drive_changes', methods=['GET', 'POST'])
+def cron_drive_changes():
+    """
+    Consome notificações do webhook do Drive que ficaram pendentes (marcador no banco),
+    ex.: o processo parou antes da varredura em background. Sem marcador, não faz nada.
+    `?force=1` varre mesmo sem marcador.
+    """
+    logger = logging.getLogger('cron_webhook')
+
+    if not _check_cron_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        from src.services.change_scan_scheduler import change_scan_scheduler
+
+        if not request.args.get('force') and not change_scan_scheduler.has_persisted_marker():
+            return jsonify({'status': 'ok', 'action': 'skipped'}), 200
+
+        result = change_scan_scheduler.run_now()
+        logger.info(f"Cron drive changes result: {result}")
+        return jsonify({'status': 'ok', 'action': 'scanned', 'result': result}), 200
+    except Exception as e:
+        logger.error(f"Cron drive changes failed: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
@@ -14,6 +14,8 @@ from sqlalchemy.engine import make_url
 engine = None
 db_session = None
 SessionLocal = None
+# Sessões avulsas (fora da scoped_session compartilhada com o fluxo principal)
+DedicatedSession = None
 
 from .config import config
 import logging
@@ -57,7 +59,7 @@ def normalize_database_url(database_url: Optional[str]) -> Optional[str]:
     return url.render_as_string(hide_password=False)
 
 def init_db():
-    global engine, db_session, SessionLocal
+    global engine, db_session, SessionLocal, DedicatedSession
     # Restore normalization
     database_url = normalize_database_url(config.DATABASE_URL)
     # database_url = config.DATABASE_URL
@@ -107,9 +109,13 @@ def init_db():
                 database_url,
                 **pool_args
             )
+            # Contagem/tempo de queries por requisição (src/infrastructure/query_metrics.py)
+            from src.infrastructure.query_metrics import instrument_engine
+            instrument_engine(engine)
             # scoped_session registry
             db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
             SessionLocal = db_session
+            DedicatedSession = sessionmaker(bind=engine)
             logger.info("✅ Conexão com Banco de Dados Inicializada")
         except Exception as e:
             logger.error(f"❌ Erro ao criar engine do banco: {e}")
@@ -143,3 +149,17 @@ def get_db():
         # If db_session is still None after init attempt, it's a critical configuration error
         logger.critical("🔥 Critical: Database session could not be initialized. Check DATABASE_URL.")
         raise ConnectionError("Database not initialized. Check server logs/configuration.")
+
+
+def new_session():
+    """
+    Abre uma sessão independente da scoped_session (trace, jobs, checkpoints).
+    Fechar ou fazer rollback nela não afeta a sessão do fluxo principal.
+    O chamador é responsável por fechá-la.
+    """
+    if DedicatedSession is None:
+        init_db()
+    if DedicatedSession is None:
+        logger.critical("🔥 Critical: Database session could not be initialized. Check DATABASE_URL.")
+        raise ConnectionError("Database not initialized. Check server logs/configuration.")
+    return DedicatedSession()
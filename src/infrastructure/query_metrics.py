@@ -0,0 +1,201 @@
+"""
+Instrumentação de queries SQLAlchemy por requisição (e por bloco de código).
+
+Hooks `before/after_cursor_execute` no engine registram, para o escopo ativo
+(uma requisição Flask ou um `track_queries()` nos testes):
+- número de statements e tempo total de banco;
+- statements mais lentos;
+- statements idênticos repetidos (mesmo SQL, parâmetros diferentes), que é a
+  assinatura de um N+1.
+
+O resumo de cada requisição é agregado por endpoint (`registry`, com os
+statements mais lentos já vistos em cada um) e exposto em
+/admin/api/query-metrics. Com QUERY_METRICS_HEADERS=true os headers
+X-DB-Query-Count / X-DB-Time-Ms / X-DB-Repeated / X-DB-Slowest vão em cada
+resposta.
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Mesmo SQL executado N+ vezes em um escopo é reportado como possível N+1
+N_PLUS_ONE_THRESHOLD = 5
+SLOWEST_LIMIT = 5
+SQL_PREVIEW_CHARS = 200
+
+_current = ContextVar('query_recorder', default=None)
+
+
+class QueryRecorder:
+    """Statements executados dentro de um escopo (escopos aninhados também registram no pai)."""
+
+    def __init__(self, parent=None):
+        self.statements = []  # (sql, ms)
+        self._parent = parent
+
+    def record(self, statement, elapsed_ms):
+        self.statements.append((statement, elapsed_ms))
+        if self._parent is not None:
+            self._parent.record(statement, elapsed_ms)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def total_ms(self):
+        return round(sum(ms for _, ms in self.statements), 2)
+
+    def slowest(self, limit=SLOWEST_LIMIT):
+        ranked = sorted(self.statements, key=lambda s: s[1], reverse=True)[:limit]
+        return [{'sql': sql[:SQL_PREVIEW_CHARS], 'ms': round(ms, 2)} for sql, ms in ranked]
+
+    def repeated(self, threshold=2):
+        counts = Counter(sql for sql, _ in self.statements)
+        return [
+            {'sql': sql[:SQL_PREVIEW_CHARS], 'count': n}
+            for sql, n in counts.most_common() if n >= threshold
+        ]
+
+
+class QueryMetricsRegistry:
+    """Agregado por endpoint dos resumos de requisição (por processo)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def add(self, endpoint, recorder):
+        suspects = recorder.repeated(N_PLUS_ONE_THRESHOLD)
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries_total': 0, 'queries_max': 0,
+                'db_ms_total': 0.0, 'n_plus_one_requests': 0, 'n_plus_one_sample': None,
+                'slowest': [],
+            })
+            stats['requests'] += 1
+            stats['queries_total'] += recorder.count
+            stats['queries_max'] = max(stats['queries_max'], recorder.count)
+            stats['db_ms_total'] = round(stats['db_ms_total'] + recorder.total_ms, 2)
+            if suspects:
+                stats['n_plus_one_requests'] += 1
+                stats['n_plus_one_sample'] = suspects[0]
+            stats['slowest'] = self._merge_slowest(stats['slowest'], recorder.slowest())
+        return suspects
+
+    @staticmethod
+    def _merge_slowest(current, new):
+        """Top SLOWEST_LIMIT do endpoint: um registro por SQL, com o maior tempo visto."""
+        by_sql = {entry['sql']: entry for entry in current}
+        for entry in new:
+            if entry['sql'] not in by_sql or entry['ms'] > by_sql[entry['sql']]['ms']:
+                by_sql[entry['sql']] = entry
+        return sorted(by_sql.values(), key=lambda e: e['ms'], reverse=True)[:SLOWEST_LIMIT]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    **stats,
+                    'slowest': [dict(entry) for entry in stats['slowest']],
+                    'queries_avg': round(stats['queries_total'] / stats['requests'], 2),
+                    'db_ms_avg': round(stats['db_ms_total'] / stats['requests'], 2),
+                }
+                for endpoint, stats in self._endpoints.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+# Singleton
+registry = QueryMetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_start')
+    if not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.record(statement, elapsed_ms)
+
+
+def instrument_engine(engine):
+    """Registra os hooks no engine (idempotente)."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@contextmanager
+def track_queries():
+    """Registra os statements executados dentro do bloco (em qualquer engine instrumentado)."""
+    recorder = QueryRecorder(parent=_current.get())
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+def _headers_enabled(app):
+    return app.debug or os.getenv('QUERY_METRICS_HEADERS', 'false').lower() in ('true', '1', 'yes')
+
+
+def _header_value(sql):
+    """SQL em uma linha e em ASCII (valor de header HTTP)."""
+    return ' '.join(sql.split()).encode('ascii', 'replace').decode('ascii')
+
+
+def init_app(app):
+    """Abre um escopo por requisição, agrega por endpoint e (opcional) expõe em headers."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_query_tracking():
+        g._query_recorder = QueryRecorder(parent=_current.get())
+        g._query_token = _current.set(g._query_recorder)
+
+    @app.after_request
+    def _query_headers(response):
+        recorder = g.get('_query_recorder')
+        if recorder is not None and _headers_enabled(app):
+            response.headers['X-DB-Query-Count'] = str(recorder.count)
+            response.headers['X-DB-Time-Ms'] = str(recorder.total_ms)
+            response.headers['X-DB-Repeated'] = str(sum(r['count'] for r in recorder.repeated()))
+            slowest = recorder.slowest(1)
+            if slowest:
+                response.headers['X-DB-Slowest'] = f"{slowest[0]['ms']}ms {_header_value(slowest[0]['sql'])}"
+        return response
+
+    @app.teardown_request
+    def _finish_query_tracking(exc=None):
+        # teardown roda também quando a view levanta exceção (after_request não)
+        recorder = g.pop('_query_recorder', None)
+        token = g.pop('_query_token', None)
+        if recorder is None:
+            return
+        try:
+            _current.reset(token)
+        except ValueError:
+            _current.set(recorder._parent)
+
+        endpoint = request.endpoint or request.path
+        suspects = registry.add(endpoint, recorder)
+        for suspect in suspects:
+            logger.warning(f"⚠️ Possível N+1 em {endpoint}: {suspect['count']}x {suspect['sql']}")
@@ -603,6 +603,7 @@ def _try_migrate_from_drive(file_id):
                 order_index=idx,
             ))
 
+        uow.inspections.refresh_summary(inspection, plan)
         uow.commit()
 
         # Re-fetch via service for consistent format
@@ -691,6 +692,7 @@ def api_status():
             company_id=current_user.company_id,
             establishment_id=est_id_filter,
             limit=100,
+            with_consultants=True,  # fallback do consultor abaixo
         )
 
         from src.app import to_brazil_time
@@ -720,19 +722,6 @@ def api_status():
                 except Exception:
                     pass
 
-            # Count NC / Parcialmente Conforme from action plan items
-            nc_count = 0
-            pc_count = 0
-            total_items = 0
-            if hasattr(insp, 'action_plan') and insp.action_plan and insp.action_plan.items:
-                for item in insp.action_plan.items:
-                    total_items += 1
-                    orig = (item.original_status or '').lower()
-                    if 'parcial' in orig:
-                        pc_count += 1
-                    elif 'não' in orig or 'nao' in orig:
-                        nc_count += 1
-
             processed_list.append({
                 'id': str(insp.id),
                 'establishment': est_name,
@@ -741,9 +730,10 @@ def api_status():
                 'date': date_str,
                 'status': insp.status.value if insp.status else 'PENDING',
                 'review_link': review_link,
-                'nc_count': nc_count,
-                'pc_count': pc_count,
-                'total_items': total_items,
+                # Contadores desnormalizados (InspectionRepository.refresh_summary): sem carregar itens
+                'nc_count': insp.nc_count or 0,
+                'pc_count': insp.pc_count or 0,
+                'total_items': insp.total_items or 0,
             })
 
         # Fetch pending jobs
@@ -27,3 +27,24 @@ class ChecklistSanitario(BaseModel):
     data_inspecao: Optional[str] = Field(description="Data em que a inspeção foi realizada, encontrada no cabeçalho ou corpo do texto (DD/MM/AAAA).", default=None)
     pontos_fortes: str = Field(description="Lista de pontos positivos e boas práticas observadas.", default="")
     areas_inspecionadas: List[AreaInspecao] = Field(description="Lista de áreas inspecionadas com seus respectivos itens.")
+
+# Enriquecimento de itens pré-extraídos localmente (src/services/report_parser.py)
+class ItemEnriquecido(BaseModel):
+    id: str = Field(description="Identificador do item EXATAMENTE como recebido (ex: '2.1').")
+    status: str = Field(description="'Não Conforme', 'Parcialmente Conforme' ou 'Conforme' (somente para itens marcados [VERIFICAR] sem problema real).")
+    observacao: str = Field(description="Descrição objetiva da evidência, incluindo o comentário do auditor quando houver.")
+    fundamento_legal: str = Field(description="Base legal específica (ex: 'RDC 216/2004 item 4.1.1', 'CVS-5/2013 Art. 23').")
+    acao_corretiva_sugerida: str = Field(description="Ação corretiva técnica imediata.")
+    prazo_sugerido: str = Field(description="Prazo baseado no risco: 'Imediato', '24 horas', '7 dias', '15 dias' ou '30 dias'.")
+
+class ResumoArea(BaseModel):
+    nome_area: str = Field(description="Nome da área EXATAMENTE como recebido.")
+    resumo_area: str = Field(description="Um curto parágrafo resumindo a situação da área.")
+
+class EnriquecimentoRelatorio(BaseModel):
+    nome_estabelecimento: str = Field(description="Nome do estabelecimento que foi auditado.")
+    data_inspecao: Optional[str] = Field(description="Data da inspeção (DD/MM/AAAA).", default=None)
+    resumo_geral: str = Field(description="Parágrafo resumindo o resultado geral, destacando as principais áreas críticas.")
+    pontos_fortes: str = Field(description="Pontos positivos e boas práticas observadas.", default="")
+    resumos_areas: List[ResumoArea] = Field(description="Resumo de cada área recebida.")
+    itens: List[ItemEnriquecido] = Field(description="Um registro para CADA item recebido, sem omitir nenhum.")
@@ -4,7 +4,7 @@ from typing import Optional, List
 import uuid
 
 from sqlalchemy import String, Boolean, ForeignKey, Index, Text, Date, TIMESTAMP, Integer, Float
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, validates
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 # 1. Declaração Base
@@ -159,6 +159,15 @@ class Inspection(Base):
     ai_raw_response: Mapped[dict] = mapped_column(JSONB, nullable=True)
     file_hash: Mapped[Optional[str]] = mapped_column(String, index=True) # Checksum para evitar duplicatas
 
+    # Resumo desnormalizado para os dashboards (InspectionRepository.refresh_summary)
+    total_items: Mapped[Optional[int]] = mapped_column(Integer)
+    nc_count: Mapped[Optional[int]] = mapped_column(Integer)
+    pc_count: Mapped[Optional[int]] = mapped_column(Integer)
+    resolved_count: Mapped[Optional[int]] = mapped_column(Integer)
+    score: Mapped[Optional[float]] = mapped_column(Float)
+    max_score: Mapped[Optional[float]] = mapped_column(Float)
+    percentage: Mapped[Optional[float]] = mapped_column(Float)
+
     # Relacionamentos
     # client: Mapped["Client"] = relationship(back_populates="inspections") # REMOVED
     establishment: Mapped[Optional["Establishment"]] = relationship(back_populates="inspections")
@@ -377,26 +386,89 @@ class Job(Base):
     type: Mapped[str] = mapped_column(String, nullable=False) # 'OCR', 'RAG', 'REPORT'
     status: Mapped[JobStatus] = mapped_column(default=JobStatus.PENDING, index=True)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))  # Preenchido quando um worker reivindica o job
     finished_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
     
     # Cost & Observability
     cost_tokens_input: Mapped[int] = mapped_column(default=0)
     cost_tokens_output: Mapped[int] = mapped_column(default=0)
+    cost_tokens_cached: Mapped[int] = mapped_column(default=0)  # Parte do input servida do cache de prompt
     execution_time_seconds: Mapped[float] = mapped_column(default=0.0)
     cost_input_usd: Mapped[float] = mapped_column(default=0.0)
     cost_output_usd: Mapped[float] = mapped_column(default=0.0)
     cost_input_brl: Mapped[float] = mapped_column(default=0.0)
     cost_output_brl: Mapped[float] = mapped_column(default=0.0)
     api_calls_count: Mapped[int] = mapped_column(default=0)
+    # Compactação do texto enviado à IA (antes/depois, tokens estimados)
+    prompt_chars_raw: Mapped[int] = mapped_column(default=0)
+    prompt_chars_sent: Mapped[int] = mapped_column(default=0)
+    prompt_tokens_est_raw: Mapped[int] = mapped_column(default=0)
+    prompt_tokens_est_sent: Mapped[int] = mapped_column(default=0)
     attempts: Mapped[int] = mapped_column(default=0)
 
+    # Campos do input_payload promovidos a colunas (lookup indexado por arquivo/loja)
+    file_id: Mapped[Optional[str]] = mapped_column(String, index=True)
+    filename: Mapped[Optional[str]] = mapped_column(String)
+    uploaded_by_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True))
+    uploaded_by_name: Mapped[Optional[str]] = mapped_column(String)
+    establishment_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), index=True)
+
     # Payloads for Debug/Retry
     input_payload: Mapped[dict] = mapped_column(JSONB, nullable=True)
     result_payload: Mapped[dict] = mapped_column(JSONB, nullable=True)
-    error_log: Mapped[Optional[str]] = mapped_column(Text)
+    error_log: Mapped[Optional[str]] = mapped_column(Text)  # Último erro (JSON), exibido nas telas
+    errors: Mapped[Optional[list]] = mapped_column(JSONB, nullable=True)  # Histórico estruturado (append via JobTracker)
 
     # POC Rich Data
 
 
     # Relationships
     company: Mapped["Company"] = relationship()
+
+    # Chaves do input_payload que também são gravadas em colunas próprias (indexadas)
+    PAYLOAD_COLUMNS = ('file_id', 'filename', 'uploaded_by_id', 'uploaded_by_name', 'establishment_id')
+
+    @staticmethod
+    def payload_columns(input_payload):
+        """Valores das colunas promovidas extraídos do input_payload (ids inválidos viram None)."""
+        payload = input_payload or {}
+        columns = {key: payload.get(key) for key in Job.PAYLOAD_COLUMNS}
+        for key in ('uploaded_by_id', 'establishment_id'):
+            value = columns[key]
+            if value and not isinstance(value, uuid.UUID):
+                try:
+                    value = uuid.UUID(str(value))
+                except ValueError:
+                    value = None
+            columns[key] = value or None
+        return columns
+
+    @validates('input_payload')
+    def _promote_payload(self, key, value):
+        # Preenche as colunas promovidas que ainda não foram definidas explicitamente
+        for column, column_value in Job.payload_columns(value).items():
+            if getattr(self, column) is None:
+                setattr(self, column, column_value)
+        return value
+
+class ProcessingCheckpoint(Base):
+    """
+    Resultado persistido de um estágio do processamento (texto extraído, análise da IA).
+    Chave: hash do arquivo + estágio + versão do prompt + modelo.
+    Permite que retries retomem do último estágio concluído sem gastar tokens.
+    """
+    __tablename__ = "processing_checkpoints"
+    __table_args__ = (
+        Index('ix_processing_checkpoints_key', 'file_hash', 'stage', 'prompt_version', 'model_name', unique=True),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    file_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    stage: Mapped[str] = mapped_column(String(32), nullable=False)  # 'text', 'ai_result'
+    prompt_version: Mapped[str] = mapped_column(String(32), nullable=False, default='')
+    model_name: Mapped[str] = mapped_column(String(64), nullable=False, default='')
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, default=0)
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+    last_used_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow, index=True)
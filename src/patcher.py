@@ -5,6 +5,8 @@ from src.database import engine
 
 logger = logging.getLogger(__name__)
 
+UUID_RE = '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+
 def run_auto_patch():
     """
     Executa patches de schema críticos diretamente via SQL raw.
@@ -51,7 +53,72 @@ def run_auto_patch():
         # Table: jobs (Just in case)
         "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS cost_tokens_input INTEGER DEFAULT 0",
         "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS cost_tokens_output INTEGER DEFAULT 0",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS cost_tokens_cached INTEGER DEFAULT 0",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS errors JSONB",
         "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS finished_at TIMESTAMP",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS started_at TIMESTAMP",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS prompt_chars_raw INTEGER DEFAULT 0",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS prompt_chars_sent INTEGER DEFAULT 0",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS prompt_tokens_est_raw INTEGER DEFAULT 0",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS prompt_tokens_est_sent INTEGER DEFAULT 0",
+        # Campos do input_payload promovidos a colunas indexadas (lookup por arquivo/loja)
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS file_id VARCHAR",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS filename VARCHAR",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS uploaded_by_id UUID",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS uploaded_by_name VARCHAR",
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS establishment_id UUID",
+        "CREATE INDEX IF NOT EXISTS ix_jobs_file_id ON jobs (file_id)",
+        "CREATE INDEX IF NOT EXISTS ix_jobs_establishment_id ON jobs (establishment_id)",
+        # Backfill dos jobs antigos (idempotente: só linhas ainda sem file_id)
+        f"""UPDATE jobs SET
+            file_id = input_payload->>'file_id',
+            filename = input_payload->>'filename',
+            uploaded_by_name = input_payload->>'uploaded_by_name',
+            uploaded_by_id = CASE WHEN input_payload->>'uploaded_by_id' ~* '{UUID_RE}'
+                THEN (input_payload->>'uploaded_by_id')::uuid END,
+            establishment_id = CASE WHEN input_payload->>'establishment_id' ~* '{UUID_RE}'
+                THEN (input_payload->>'establishment_id')::uuid END
+        WHERE file_id IS NULL AND input_payload ? 'file_id'""",
+        # Índice parcial para o worker reivindicar jobs pendentes (FOR UPDATE SKIP LOCKED)
+        "CREATE INDEX IF NOT EXISTS ix_jobs_pending_queue ON jobs (created_at) WHERE status = 'PENDING'",
+
+        # Table: inspections - resumo desnormalizado para os dashboards
+        "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS total_items INTEGER",
+        "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS nc_count INTEGER",
+        "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS pc_count INTEGER",
+        "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS resolved_count INTEGER",
+        "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS score FLOAT",
+        "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS max_score FLOAT",
+        "ALTER TABLE inspections ADD COLUMN IF NOT EXISTS percentage FLOAT",
+        # Backfill (idempotente: só inspeções ainda sem resumo)
+        """UPDATE inspections i SET
+            total_items = s.total_items, nc_count = s.nc_count,
+            pc_count = s.pc_count, resolved_count = s.resolved_count
+        FROM (
+            SELECT ap.inspection_id,
+                COUNT(*) AS total_items,
+                COUNT(*) FILTER (WHERE lower(it.original_status) NOT LIKE '%parcial%'
+                    AND (lower(it.original_status) LIKE '%não%' OR lower(it.original_status) LIKE '%nao%')) AS nc_count,
+                COUNT(*) FILTER (WHERE lower(it.original_status) LIKE '%parcial%') AS pc_count,
+                COUNT(*) FILTER (WHERE it.status = 'RESOLVED') AS resolved_count
+            FROM action_plans ap JOIN action_plan_items it ON it.action_plan_id = ap.id
+            GROUP BY ap.inspection_id
+        ) s
+        WHERE s.inspection_id = i.id AND i.total_items IS NULL""",
+        """UPDATE inspections i SET
+            score = (ap.stats_json->>'score')::float,
+            max_score = (ap.stats_json->>'max_score')::float,
+            percentage = (ap.stats_json->>'percentage')::float
+        FROM action_plans ap
+        WHERE ap.inspection_id = i.id AND i.score IS NULL
+            AND jsonb_typeof(ap.stats_json->'score') = 'number'
+            AND jsonb_typeof(ap.stats_json->'max_score') = 'number'""",
+        """UPDATE inspections SET
+            score = (ai_raw_response->>'pontuacao_geral')::float,
+            max_score = (ai_raw_response->>'pontuacao_maxima_geral')::float
+        WHERE score IS NULL
+            AND jsonb_typeof(ai_raw_response->'pontuacao_geral') = 'number'
+            AND jsonb_typeof(ai_raw_response->'pontuacao_maxima_geral') = 'number'""",
 
         # Table: action_plan_items (V16)
         "ALTER TABLE action_plan_items ADD COLUMN IF NOT EXISTS original_status VARCHAR(50)",
@@ -60,6 +127,22 @@ def run_auto_patch():
         # Table: action_plan_items - correction_notes (consultor)
         "ALTER TABLE action_plan_items ADD COLUMN IF NOT EXISTS correction_notes TEXT",
 
+        # Table: processing_checkpoints (checkpoints de estágios do processamento)
+        """CREATE TABLE IF NOT EXISTS processing_checkpoints (
+            id UUID PRIMARY KEY,
+            file_hash VARCHAR(64) NOT NULL,
+            stage VARCHAR(32) NOT NULL,
+            prompt_version VARCHAR(32) NOT NULL DEFAULT '',
+            model_name VARCHAR(64) NOT NULL DEFAULT '',
+            payload JSONB NOT NULL,
+            size_bytes INTEGER DEFAULT 0,
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP WITH TIME ZONE,
+            last_used_at TIMESTAMP WITH TIME ZONE
+        )""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_processing_checkpoints_key ON processing_checkpoints (file_hash, stage, prompt_version, model_name)",
+        "CREATE INDEX IF NOT EXISTS ix_processing_checkpoints_last_used_at ON processing_checkpoints (last_used_at)",
+
         # Enum: jobstatus (add SKIPPED if missing)
         "ALTER TYPE jobstatus ADD VALUE IF NOT EXISTS 'SKIPPED'"
     ]
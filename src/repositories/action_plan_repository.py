@@ -1,7 +1,11 @@
 """Repository for ActionPlan and ActionPlanItem entities."""
 from typing import Optional, List
+import csv
+import enum
+import io
 import uuid
 
+from sqlalchemy import insert
 from sqlalchemy.orm import joinedload
 
 from src.models_db import ActionPlan, ActionPlanItem
@@ -47,5 +51,50 @@ class ActionPlanRepository:
         self._session.add(item)
         return item
 
+    def bulk_insert_items(self, rows: List[dict], copy_threshold: int = 500) -> int:
+        """
+        Insere itens como mapeamentos simples (sem unit-of-work por objeto).
+        Todas as linhas devem ter as mesmas chaves (incluindo `id`).
+
+        Postgres com muitas linhas: COPY FROM STDIN. Caso contrário, um único
+        INSERT executemany.
+        """
+        if not rows:
+            return 0
+        if len(rows) >= copy_threshold and self._session.get_bind().dialect.name == 'postgresql':
+            self._copy_items(rows)
+        else:
+            self._session.execute(insert(ActionPlanItem), rows)
+        return len(rows)
+
+    def _copy_items(self, rows: List[dict]) -> None:
+        columns = list(rows[0].keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[col]) for col in columns])
+        buffer.seek(0)
+
+        # Mesma transação da sessão (conexão DBAPI subjacente, psycopg2)
+        cursor = self._session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {ActionPlanItem.__tablename__} ({', '.join(columns)}) "
+                "FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+        finally:
+            cursor.close()
+
     def delete(self, plan: ActionPlan) -> None:
         self._session.delete(plan)
+
+
+def _copy_value(value):
+    """Converte um valor Python para o texto aceito pelo COPY (csv)."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, enum.Enum):
+        # Colunas Enum do SQLAlchemy persistem o NOME do membro
+        return value.name
+    return value
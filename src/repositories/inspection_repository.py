@@ -2,14 +2,37 @@
 from typing import Optional, List
 import uuid
 
-from sqlalchemy.orm import joinedload
+from sqlalchemy import func
+from sqlalchemy.orm import defer, joinedload
 
 from src.models_db import (
-    Inspection, InspectionStatus, ActionPlan, ActionPlanItem,
+    Inspection, InspectionStatus, ActionPlan, ActionPlanItem, ActionPlanItemStatus,
     Establishment, Company,
 )
 
 
+def last_log_message(session):
+    """Expressão SQL com a mensagem da última entrada de processing_logs (sem carregar o array)."""
+    if session.get_bind().dialect.name == 'postgresql':
+        return Inspection.processing_logs[-1]['message'].astext
+    return func.json_extract(Inspection.processing_logs, '$[#-1].message')
+
+
+def summarize_items(items) -> dict:
+    """Contadores do resumo a partir de pares (original_status, status) dos itens do plano."""
+    summary = {'total_items': 0, 'nc_count': 0, 'pc_count': 0, 'resolved_count': 0}
+    for original_status, status in items:
+        summary['total_items'] += 1
+        orig = (original_status or '').lower()
+        if 'parcial' in orig:
+            summary['pc_count'] += 1
+        elif 'não' in orig or 'nao' in orig:
+            summary['nc_count'] += 1
+        if status == ActionPlanItemStatus.RESOLVED:
+            summary['resolved_count'] += 1
+    return summary
+
+
 class InspectionRepository:
     def __init__(self, session):
         self._session = session
@@ -71,8 +94,12 @@ class InspectionRepository:
         establishment_id: uuid.UUID = None,
         statuses: List[InspectionStatus] = None,
         limit: int = 50,
+        with_consultants: bool = False,
     ) -> List[Inspection]:
-        """Get inspections visible to a manager."""
+        """
+        Get inspections visible to a manager.
+        `with_consultants` carrega os consultores de cada estabelecimento em uma query extra.
+        """
         if statuses is None:
             statuses = [
                 InspectionStatus.PENDING_MANAGER_REVIEW,
@@ -81,10 +108,14 @@ class InspectionRepository:
                 InspectionStatus.COMPLETED,
             ]
 
+        # Listagens usam só as colunas de resumo: não carrega plano/itens nem os JSONB grandes
         query = self._session.query(Inspection).options(
             joinedload(Inspection.establishment),
-            joinedload(Inspection.action_plan),
+            defer(Inspection.ai_raw_response),
+            defer(Inspection.processing_logs),
         ).filter(Inspection.status.in_(statuses))
+        if with_consultants:
+            query = query.options(joinedload(Inspection.establishment).selectinload(Establishment.users))
 
         if establishment_id:
             query = query.filter(Inspection.establishment_id == establishment_id)
@@ -140,6 +171,45 @@ class InspectionRepository:
             joinedload(Inspection.action_plan),
         ).filter(Inspection.drive_file_id.in_(file_ids)).all()
 
+    def get_score_rows(
+        self,
+        establishment_ids: List[uuid.UUID],
+        statuses: List[InspectionStatus],
+        limit: int = 50,
+    ) -> List[tuple]:
+        """(score, max_score) das inspeções mais recentes, sem carregar as entidades."""
+        return self._session.query(Inspection.score, Inspection.max_score).filter(
+            Inspection.status.in_(statuses),
+            Inspection.establishment_id.in_(establishment_ids),
+        ).order_by(Inspection.created_at.desc()).limit(limit).all()
+
+    def refresh_summary(self, inspection: Inspection, plan: Optional[ActionPlan] = None) -> None:
+        """
+        Recalcula as colunas de resumo (contadores e pontuação) da inspeção.
+        Deve ser chamado na mesma transação que alterou os itens do plano.
+        """
+        plan = plan if plan is not None else inspection.action_plan
+        # A sessão de produção é autoflush=False: itens novos/alterados precisam chegar ao banco antes da contagem
+        self._session.flush()
+        items = []
+        if plan is not None and plan.id is not None:
+            items = self._session.query(ActionPlanItem.original_status, ActionPlanItem.status).filter(
+                ActionPlanItem.action_plan_id == plan.id
+            ).all()
+        for key, value in summarize_items(items).items():
+            setattr(inspection, key, value)
+
+        stats = (plan.stats_json if plan is not None else None) or {}
+        raw = inspection.ai_raw_response if isinstance(inspection.ai_raw_response, dict) else {}
+        score = stats.get('score', raw.get('pontuacao_geral'))
+        max_score = stats.get('max_score', raw.get('pontuacao_maxima_geral'))
+        inspection.score = float(score) if score is not None else None
+        inspection.max_score = float(max_score) if max_score is not None else None
+        percentage = stats.get('percentage')
+        if percentage is None and score is not None and max_score:
+            percentage = round(float(score) / float(max_score) * 100, 2)
+        inspection.percentage = float(percentage) if percentage is not None else None
+
     def add(self, inspection: Inspection) -> Inspection:
         self._session.add(inspection)
         return inspection
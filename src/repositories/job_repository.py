@@ -3,10 +3,11 @@ from typing import Optional, List
 import uuid
 from datetime import datetime, timedelta
 
-from sqlalchemy import or_
+from sqlalchemy import or_, func
 from sqlalchemy.orm import joinedload
 
-from src.models_db import Job, JobStatus
+from src.models_db import Job, JobStatus, Inspection
+from src.repositories.inspection_repository import last_log_message
 
 
 class JobRepository:
@@ -38,9 +39,9 @@ class JobRepository:
         if company_id:
             filters.append(Job.company_id == company_id)
         if establishment_ids:
-            ids_str = [str(uid) for uid in establishment_ids if uid]
-            if ids_str:
-                filters.append(Job.input_payload['establishment_id'].astext.in_(ids_str))
+            ids = [uid for uid in establishment_ids if uid]
+            if ids:
+                filters.append(Job.establishment_id.in_(ids))
         if filters:
             query = query.filter(or_(*filters))
 
@@ -52,13 +53,18 @@ class JobRepository:
             joinedload(Job.company),
         ).order_by(Job.created_at.desc()).limit(limit).all()
 
-    def get_failed_recent(
-        self,
-        company_id: uuid.UUID = None,
-        minutes: int = 60,
-        limit: int = 10,
-    ) -> List[Job]:
-        """Get recently failed jobs."""
+    def _with_inspection(self, query):
+        """Junta a inspeção do arquivo: cada linha vira (job, inspection_status, last_log_message)."""
+        return query.outerjoin(Inspection, Inspection.drive_file_id == Job.file_id).add_columns(
+            Inspection.status, last_log_message(self._session),
+        )
+
+    def get_for_monitor_with_inspection(self, limit: int = 50) -> List[tuple]:
+        """Jobs recentes com status/última mensagem da inspeção, em uma única query."""
+        query = self._session.query(Job).options(joinedload(Job.company))
+        return self._with_inspection(query).order_by(Job.created_at.desc()).limit(limit).all()
+
+    def _failed_recent_query(self, company_id=None, minutes=60):
         cutoff = datetime.utcnow() - timedelta(minutes=minutes)
 
         query = self._session.query(Job).filter(
@@ -67,28 +73,81 @@ class JobRepository:
         )
         if company_id:
             query = query.filter(Job.company_id == company_id)
+        return query
 
+    def get_failed_recent(
+        self,
+        company_id: uuid.UUID = None,
+        minutes: int = 60,
+        limit: int = 10,
+    ) -> List[Job]:
+        """Get recently failed jobs."""
+        query = self._failed_recent_query(company_id, minutes)
+        return query.order_by(Job.created_at.desc()).limit(limit).all()
+
+    def get_failed_recent_with_inspection(
+        self,
+        company_id: uuid.UUID = None,
+        minutes: int = 60,
+        limit: int = 10,
+    ) -> List[tuple]:
+        """Como get_failed_recent, com (job, inspection_status, last_log_message) em uma única query."""
+        query = self._with_inspection(self._failed_recent_query(company_id, minutes))
         return query.order_by(Job.created_at.desc()).limit(limit).all()
 
     def get_job_info_map(self, file_ids: List[str]) -> dict:
         """Return {file_id: {filename, uploaded_by_name}} for a list of drive_file_ids."""
         if not file_ids:
             return {}
-        from sqlalchemy import cast, String
-        file_ids_set = set(file_ids)
-        jobs = self._session.query(Job).filter(
-            cast(Job.input_payload, String).like('%file_id%'),
-        ).all()
-        result = {}
-        for job in jobs:
-            payload = job.input_payload or {}
-            fid = payload.get('file_id')
-            if fid and fid in file_ids_set:
-                result[fid] = {
-                    'filename': payload.get('filename', ''),
-                    'uploaded_by_name': payload.get('uploaded_by_name', ''),
-                }
-        return result
+        rows = self._session.query(Job.file_id, Job.filename, Job.uploaded_by_name).filter(
+            Job.file_id.in_(set(file_ids)),
+        ).order_by(Job.created_at.asc()).all()
+        # Mais de um job por arquivo (reprocessamento): o mais recente prevalece
+        return {
+            fid: {'filename': filename or '', 'uploaded_by_name': uploaded_by_name or ''}
+            for fid, filename, uploaded_by_name in rows
+        }
+
+    def claim_next(self, job_type: str = None) -> Optional[Job]:
+        """
+        Reivindica o job PENDING mais antigo, marcando-o como PROCESSING.
+
+        Postgres: SELECT ... FOR UPDATE SKIP LOCKED, então workers concorrentes
+        nunca pegam a mesma linha. SQLite (testes/local) não tem lock de linha,
+        então usa UPDATE condicional ao status (compare-and-set).
+        O chamador deve fazer commit para liberar o lock.
+        """
+        query = self._session.query(Job).filter(Job.status == JobStatus.PENDING)
+        if job_type:
+            query = query.filter(Job.type == job_type)
+        query = query.order_by(Job.created_at.asc())
+
+        now = datetime.utcnow()
+        if self._session.get_bind().dialect.name == 'postgresql':
+            job = query.with_for_update(skip_locked=True).first()
+            if not job:
+                return None
+            job.status = JobStatus.PROCESSING
+            job.started_at = now
+            job.attempts = (job.attempts or 0) + 1
+            self._session.flush()
+            return job
+
+        candidate_ids = [row.id for row in query.with_entities(Job.id).limit(10).all()]
+        for candidate_id in candidate_ids:
+            updated = self._session.query(Job).filter(
+                Job.id == candidate_id,
+                Job.status == JobStatus.PENDING,
+            ).update({
+                Job.status: JobStatus.PROCESSING,
+                Job.started_at: now,
+                Job.attempts: func.coalesce(Job.attempts, 0) + 1,
+            }, synchronize_session=False)
+            if updated:
+                job = self._session.get(Job, candidate_id)
+                self._session.refresh(job)
+                return job
+        return None
 
     def add(self, job: Job) -> Job:
         self._session.add(job)
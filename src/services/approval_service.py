@@ -9,6 +9,7 @@ from src.database import db_session, get_db
 from src.models_db import Establishment, Contact, ActionPlan, InspectionStatus
 from src.services.drive_service import drive_service
 from src.services.pdf_service import pdf_service
+from src.services.render_executor import render_executor
 from src.whatsapp import WhatsAppService
 from src.config import config
 
@@ -236,7 +237,8 @@ class ApprovalService:
                 # Fallback to original JSON data flow (already loaded)
                 pass
 
-            pdf_bytes = pdf_service.generate_pdf_bytes(json_data)
+            # Background: espera vaga no pool em vez de falhar com a fila cheia
+            pdf_bytes = render_executor.render(pdf_service, json_data, wait_for_slot=render_executor.timeout)
             date_str = json_data.get('data_inspecao', '').replace('/', '-')
             import tempfile
             filename = f"Plano_Acao_{est_name.replace(' ', '_')}_{date_str}.pdf"
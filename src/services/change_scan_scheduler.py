@@ -0,0 +1,165 @@
+"""
+Consumo das notificações do webhook do Drive fora da requisição.
+
+O Drive manda várias notificações por lote de mudanças. O webhook só chama
+`notify()`: grava o marcador "mudanças pendentes" e responde 200 na hora.
+Uma única thread consumidora (single-flight) espera a janela de debounce
+(DRIVE_WEBHOOK_DEBOUNCE_SECONDS) contada da primeira notificação pendente e
+roda UMA varredura (`process_global_changes`) para todas as notificações da
+janela. Notificações que chegam durante a varredura abrem a próxima janela.
+
+O marcador também fica no banco (AppConfig `drive_changes_pending_at`): se o
+processo parar antes da varredura (scale-to-zero, CPU fora de requisição),
+`/api/cron/drive_changes` consome o que ficou pendente.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PENDING_MARKER_KEY = 'drive_changes_pending_at'
+
+
+class ChangeScanScheduler:
+    """Debounce + single-flight das varreduras do feed de mudanças do Drive."""
+
+    def __init__(self, scan=None, debounce_seconds=None, persist_marker=True):
+        self.debounce_seconds = (
+            debounce_seconds if debounce_seconds is not None
+            else float(os.getenv('DRIVE_WEBHOOK_DEBOUNCE_SECONDS', '10'))
+        )
+        self._scan = scan
+        self._persist_marker = persist_marker
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()  # uma varredura por vez (thread ou cron)
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pending_since = None  # monotonic da primeira notificação ainda não varrida
+        self._counters = {'notifications': 0, 'coalesced': 0, 'scans': 0, 'scan_errors': 0}
+        self._last_scan = None
+
+    def notify(self):
+        """Registra "mudanças pendentes" e acorda o consumidor. Não espera a varredura."""
+        with self._lock:
+            self._counters['notifications'] += 1
+            first = self._pending_since is None
+            if first:
+                self._pending_since = time.monotonic()
+            else:
+                self._counters['coalesced'] += 1
+            self._ensure_consumer()
+        if first:
+            self._write_marker(datetime.utcnow().isoformat())
+        self._wakeup.set()
+
+    def run_now(self):
+        """Varre imediatamente (cron/testes), respeitando o single-flight."""
+        with self._lock:
+            self._pending_since = None
+        return self._run_scan()
+
+    def _ensure_consumer(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._consume, name='drive-change-scan', daemon=True)
+            self._thread.start()
+
+    def _consume(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                since = self._pending_since
+                if since is None:
+                    self._wakeup.clear()
+                    continue
+            remaining = since + self.debounce_seconds - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            with self._lock:
+                if self._pending_since is None:  # o cron já varreu esta janela (run_now)
+                    continue
+                self._pending_since = None
+                self._wakeup.clear()
+            try:
+                self._run_scan()
+            except Exception as e:
+                logger.error(f"❌ Varredura de mudanças do Drive falhou: {e}", exc_info=True)
+
+    def _run_scan(self):
+        with self._scan_lock:
+            started = time.perf_counter()
+            try:
+                result = self._default_scan() if self._scan is None else self._scan()
+            except Exception:
+                with self._lock:
+                    self._counters['scans'] += 1
+                    self._counters['scan_errors'] += 1
+                raise
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # process_global_changes devolve {'error': ...} em vez de levantar
+            failed = isinstance(result, dict) and bool(result.get('error'))
+            with self._lock:
+                self._counters['scans'] += 1
+                if failed:
+                    self._counters['scan_errors'] += 1
+                self._last_scan = {'at': datetime.utcnow().isoformat(), 'ms': round(elapsed_ms, 1), 'result': result}
+                still_pending = self._pending_since is not None
+            if not still_pending and not failed:
+                self._write_marker(None)
+            logger.info(f"🌍 Varredura de mudanças do Drive em {elapsed_ms:.0f}ms: {result}")
+            return result
+
+    @staticmethod
+    def _default_scan():
+        from src.services.drive_service import drive_service
+        from src.services.sync_service import process_global_changes
+        return process_global_changes(drive_service)
+
+    def _write_marker(self, value):
+        if not self._persist_marker:
+            return
+        try:
+            from src.database import get_db
+            from src.models_db import AppConfig
+            db = next(get_db())
+            try:
+                entry = db.get(AppConfig, PENDING_MARKER_KEY)
+                if value is None:
+                    if entry is None:
+                        return
+                    db.delete(entry)
+                elif entry is None:
+                    db.add(AppConfig(key=PENDING_MARKER_KEY, value=value))
+                else:
+                    entry.value = value
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao gravar marcador de mudanças pendentes: {e}")
+
+    @staticmethod
+    def has_persisted_marker():
+        """Há notificação registrada no banco e ainda não varrida?"""
+        from src.database import get_db
+        from src.models_db import AppConfig
+        db = next(get_db())
+        try:
+            return db.get(AppConfig, PENDING_MARKER_KEY) is not None
+        finally:
+            db.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'pending': self._pending_since is not None,
+                'debounce_seconds': self.debounce_seconds,
+                'last_scan': self._last_scan,
+            }
+
+
+# Singleton
+change_scan_scheduler = ChangeScanScheduler()
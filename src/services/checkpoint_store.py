@@ -0,0 +1,172 @@
+"""
+Checkpoints persistentes dos estágios do processamento de relatórios.
+
+Cada estágio concluído de `ProcessorService.process_single_file` (texto
+extraído, resultado da IA + usage) é gravado na tabela
+`processing_checkpoints`, com chave (file_hash, stage, prompt_version,
+model_name). Um retry do mesmo arquivo retoma do último estágio concluído
+e conteúdo idêntico sob a mesma versão de prompt/modelo não gasta tokens.
+
+Eviction: entradas sem uso há mais de CHECKPOINT_MAX_AGE_DAYS são removidas
+e, se o total passar de CHECKPOINT_MAX_SIZE_MB, as menos usadas
+recentemente (LRU por last_used_at) são descartadas.
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from src.config_helper import get_config
+from src.models_db import ProcessingCheckpoint
+
+logger = logging.getLogger(__name__)
+
+STAGE_TEXT = 'text'
+STAGE_AI_RESULT = 'ai_result'
+
+
+class CheckpointStore:
+    def __init__(self, session_factory=None, max_age_days=None, max_size_mb=None):
+        self._session_factory = session_factory
+        self._max_age_days = max_age_days
+        self._max_size_mb = max_size_mb
+
+    @property
+    def max_age_days(self):
+        if self._max_age_days is None:
+            return int(get_config('CHECKPOINT_MAX_AGE_DAYS', '30'))
+        return self._max_age_days
+
+    @property
+    def max_size_bytes(self):
+        if self._max_size_mb is None:
+            return int(float(get_config('CHECKPOINT_MAX_SIZE_MB', '200')) * 1024 * 1024)
+        return int(self._max_size_mb * 1024 * 1024)
+
+    def _session(self):
+        if self._session_factory:
+            return self._session_factory()
+        from src.database import new_session
+        return new_session()
+
+    def _close(self, session):
+        if not self._session_factory:
+            session.close()
+
+    def get(self, file_hash, stage, prompt_version='', model_name=''):
+        """Retorna o payload salvo para o estágio ou None."""
+        if not file_hash:
+            return None
+        session = self._session()
+        try:
+            entry = session.query(ProcessingCheckpoint).filter_by(
+                file_hash=file_hash,
+                stage=stage,
+                prompt_version=prompt_version,
+                model_name=model_name,
+            ).first()
+            if not entry:
+                return None
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_used_at = datetime.utcnow()
+            payload = entry.payload
+            session.commit()
+            logger.info(f"♻️ Checkpoint HIT: {stage} ({file_hash[:8]})")
+            return payload
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao ler checkpoint {stage} ({file_hash[:8]}): {e}")
+            session.rollback()
+            return None
+        finally:
+            self._close(session)
+
+    def put(self, file_hash, stage, payload, prompt_version='', model_name=''):
+        """Grava (ou substitui) o payload do estágio. Falhas nunca interrompem o processamento."""
+        if not file_hash:
+            return False
+        session = self._session()
+        try:
+            size = len(json.dumps(payload, default=str).encode('utf-8'))
+            now = datetime.utcnow()
+            entry = session.query(ProcessingCheckpoint).filter_by(
+                file_hash=file_hash,
+                stage=stage,
+                prompt_version=prompt_version,
+                model_name=model_name,
+            ).first()
+            if entry:
+                entry.payload = payload
+                entry.size_bytes = size
+                entry.last_used_at = now
+            else:
+                session.add(ProcessingCheckpoint(
+                    file_hash=file_hash,
+                    stage=stage,
+                    prompt_version=prompt_version,
+                    model_name=model_name,
+                    payload=payload,
+                    size_bytes=size,
+                    created_at=now,
+                    last_used_at=now,
+                ))
+            session.commit()
+            self._evict(session)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao gravar checkpoint {stage} ({file_hash[:8]}): {e}")
+            session.rollback()
+            return False
+        finally:
+            self._close(session)
+
+    def invalidate(self, file_hash):
+        """Remove todos os checkpoints de um arquivo (ex: reprocessamento forçado)."""
+        session = self._session()
+        try:
+            deleted = session.query(ProcessingCheckpoint).filter_by(file_hash=file_hash).delete()
+            session.commit()
+            return deleted
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao invalidar checkpoints ({file_hash[:8]}): {e}")
+            session.rollback()
+            return 0
+        finally:
+            self._close(session)
+
+    def _evict(self, session):
+        """Remove entradas antigas e aplica o limite de tamanho (LRU)."""
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=self.max_age_days)
+            expired = session.query(ProcessingCheckpoint).filter(
+                ProcessingCheckpoint.last_used_at < cutoff
+            ).delete(synchronize_session=False)
+
+            total = session.query(func.coalesce(func.sum(ProcessingCheckpoint.size_bytes), 0)).scalar() or 0
+            limit = self.max_size_bytes
+            evicted = 0
+            if total > limit:
+                rows = session.query(
+                    ProcessingCheckpoint.id, ProcessingCheckpoint.size_bytes
+                ).order_by(ProcessingCheckpoint.last_used_at.asc()).all()
+                to_delete = []
+                for row_id, size in rows:
+                    if total <= limit:
+                        break
+                    to_delete.append(row_id)
+                    total -= size or 0
+                if to_delete:
+                    evicted = session.query(ProcessingCheckpoint).filter(
+                        ProcessingCheckpoint.id.in_(to_delete)
+                    ).delete(synchronize_session=False)
+
+            session.commit()
+            if expired or evicted:
+                logger.info(f"🧹 Checkpoints removidos: {expired} expirados, {evicted} por limite de tamanho")
+        except Exception as e:
+            logger.warning(f"⚠️ Falha na limpeza de checkpoints: {e}")
+            session.rollback()
+
+
+# Singleton
+checkpoint_store = CheckpointStore()
@@ -2,7 +2,12 @@ import os
 import io
 import json
 import logging
+import random
 import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
 import google.auth
 from src.config_helper import get_config
 from google.oauth2.service_account import Credentials
@@ -11,23 +16,259 @@ from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload, MediaIoBa
 
 logger = logging.getLogger(__name__)
 
+# Limite de sub-requests por batch HTTP da API do Drive
+BATCH_MAX_REQUESTS = 100
+BATCH_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+# Campos guardados pelo DriveMetadataCache (e pedidos nas buscas que o alimentam)
+METADATA_FIELDS = 'id, name, mimeType, parents, webViewLink'
+
+
+def _is_retryable(error):
+    """Erro temporário (rate limit, 5xx, conexão) que vale reenviar."""
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    if status is None:
+        return isinstance(error, (OSError, TimeoutError))
+    if int(status) in BATCH_RETRY_STATUSES:
+        return True
+    return int(status) == 403 and 'ratelimitexceeded' in str(error).lower()
+
+
+class DriveClientPool:
+    """
+    Um client do Drive (build('drive', 'v3') com transporte HTTP próprio) por
+    thread, criado na primeira chamada dela. O httplib2 não é thread-safe, então
+    um client nunca é compartilhado; as credenciais são (um refresh vale para
+    todos). `size` limita quantas chamadas ao Drive correm ao mesmo tempo no
+    processo; o tempo de espera por uma vaga vai para `stats()`.
+    """
+
+    def __init__(self, credentials, size, client_options=None):
+        self.credentials = credentials
+        self.size = max(1, size)
+        self._client_options = client_options
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._clients_created = 0
+        self._in_use = 0
+        self._acquired = 0
+        self._waited = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+
+    def client(self):
+        """Client da thread atual (criado sob demanda)."""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build(
+                'drive', 'v3', credentials=self.credentials,
+                cache_discovery=False, client_options=self._client_options,
+            )
+            self._local.service = service
+            with self._lock:
+                self._clients_created += 1
+        return service
+
+    @contextmanager
+    def acquire(self):
+        """Ocupa uma vaga do pool durante o bloco e entrega o client da thread."""
+        started = time.perf_counter()
+        self._slots.acquire()
+        wait_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._acquired += 1
+            self._in_use += 1
+            self._wait_ms_total += wait_ms
+            self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+            if wait_ms >= 1:
+                self._waited += 1
+        try:
+            yield self.client()
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'in_use': self._in_use,
+                'clients_created': self._clients_created,
+                'acquired': self._acquired,
+                'waited': self._waited,
+                'wait_ms_avg': round(self._wait_ms_total / self._acquired, 2) if self._acquired else 0.0,
+                'wait_ms_max': round(self._wait_ms_max, 2),
+            }
+
+
+class DriveMetadataCache:
+    """
+    Cache em memória (por processo) dos metadados do Drive: arquivo por id
+    (nome, mimeType, pais) e id por (pasta, nome).
+
+    Cada entrada vale por DRIVE_METADATA_CACHE_TTL_SECONDS. O feed de mudanças
+    (`DriveService.list_changes`, lido pelo sync_service) descarta os arquivos
+    alterados e guarda o metadado novo; as escritas do próprio app (criar
+    pasta, upload, mover, apagar) também atualizam o cache. Só resultados
+    encontrados são guardados: uma busca sem resultado sempre vai à API.
+    """
+
+    def __init__(self, ttl=None, max_entries=None, clock=time.monotonic):
+        self.ttl = ttl if ttl is not None else float(os.getenv('DRIVE_METADATA_CACHE_TTL_SECONDS', '300'))
+        self.max_entries = max_entries or int(os.getenv('DRIVE_METADATA_CACHE_MAX_ENTRIES', '5000'))
+        self._clock = clock
+        self._files = OrderedDict()  # id -> (metadados, momento em que foi guardado)
+        self._names = {}  # (pasta, nome) -> id
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, file_id):
+        """Metadados de `file_id`, ou None se não estiverem no cache (ou expiraram)."""
+        with self._lock:
+            meta = self._fresh(file_id)
+            if meta is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(meta)
+
+    def find(self, parent_id, name, mime_type=None):
+        """Arquivo chamado `name` dentro de `parent_id`, ou None se não estiver no cache."""
+        with self._lock:
+            file_id = self._names.get((parent_id, name))
+            meta = self._fresh(file_id) if file_id else None
+            if meta is None or (mime_type and meta.get('mimeType') != mime_type):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(meta)
+
+    def put(self, meta):
+        """Guarda metadados completos (id, name, mimeType, parents)."""
+        if not meta or not meta.get('id') or meta.get('trashed'):
+            return
+        with self._lock:
+            self._store(dict(meta))
+
+    def put_many(self, files):
+        with self._lock:
+            for meta in files:
+                if meta.get('id') and not meta.get('trashed'):
+                    self._store(dict(meta))
+
+    def update(self, file_id, **fields):
+        """Aplica uma escrita do app (ex.: novos `parents`) a uma entrada já guardada."""
+        with self._lock:
+            entry = self._files.get(file_id)
+            if entry is not None:
+                self._store({**entry[0], **fields})
+
+    def invalidate(self, file_id):
+        with self._lock:
+            if self._drop(file_id):
+                self.invalidations += 1
+
+    def apply_changes(self, changes):
+        """Uma página do feed de mudanças: descarta o que mudou e guarda o metadado novo."""
+        with self._lock:
+            for change in changes:
+                file = change.get('file') or {}
+                file_id = change.get('fileId') or file.get('id')
+                if self._drop(file_id):
+                    self.invalidations += 1
+                if file.get('id') and not change.get('removed') and not file.get('trashed'):
+                    self._store(dict(file))
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self._names.clear()
+
+    def _fresh(self, file_id):
+        entry = self._files.get(file_id)
+        if entry is None:
+            return None
+        meta, stored_at = entry
+        if self._clock() - stored_at >= self.ttl:
+            self._drop(file_id)
+            return None
+        self._files.move_to_end(file_id)
+        return meta
+
+    def _store(self, meta):
+        file_id = meta['id']
+        self._drop(file_id)
+        self._files[file_id] = (meta, self._clock())
+        if meta.get('name'):
+            for parent in meta.get('parents') or []:
+                self._names[(parent, meta['name'])] = file_id
+        while len(self._files) > self.max_entries:
+            self._drop(next(iter(self._files)))
+
+    def _drop(self, file_id):
+        entry = self._files.pop(file_id, None)
+        if entry is None:
+            return False
+        meta = entry[0]
+        for parent in meta.get('parents') or []:
+            key = (parent, meta.get('name'))
+            if self._names.get(key) == file_id:
+                del self._names[key]
+        return True
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'invalidations': self.invalidations,
+                'entries': len(self._files),
+                'ttl_seconds': self.ttl,
+            }
+
 class DriveService:
-    def __init__(self, credentials_file='credentials.json'):
+    def __init__(self, credentials_file='credentials.json', pool_size=None, client_options=None, metadata_cache=None):
         # drive.file is insufficient: app needs access to pre-existing folders
         # (ROOT_FOLDER_ID created manually in Drive). drive.file only allows
         # access to files/folders created by the app itself.
         self.scopes = ['https://www.googleapis.com/auth/drive']
         self.credentials_file = credentials_file
         self.creds = None
-        self._service = None
-        self.lock = threading.Lock()
+        self.pool_size = pool_size or int(os.getenv('DRIVE_POOL_SIZE', '8'))
+        self.client_options = client_options
+        self._pool = None
+        self._auth_lock = threading.Lock()
+        self.metadata_cache = metadata_cache or DriveMetadataCache()
         # self._authenticate() # Lazy load instead
 
+    @property
+    def pool(self):
+        if self._pool is None:
+            with self._auth_lock:
+                if self._pool is None:
+                    self._authenticate()
+        return self._pool
+
     @property
     def service(self):
-        if not self._service:
-             self._authenticate()
-        return self._service
+        """Client do Drive da thread atual (None se a autenticação falhou)."""
+        pool = self.pool
+        return pool.client() if pool else None
+
+    def _drive(self):
+        """Vaga no pool + client da thread atual: `with self._drive() as service:`."""
+        return self.pool.acquire()
+
+    def stats(self):
+        pool = self._pool.stats() if self._pool else {'size': self.pool_size, 'clients_created': 0}
+        return {**pool, 'metadata_cache': self.metadata_cache.stats()}
 
     def _authenticate(self):
         try:
@@ -87,14 +328,15 @@ class DriveService:
                 logger.warning("⚠️ Impersonation requested but credentials do not support with_subject.")
             # -------------------------------------------
 
-            self._service = build('drive', 'v3', credentials=self.creds)
-            logger.info("✅ Serviço do Drive Autenticado")
+            self._pool = DriveClientPool(self.creds, self.pool_size, self.client_options)
+            self._pool.client()  # valida a configuração já na autenticação
+            logger.info(f"✅ Serviço do Drive Autenticado (pool de {self.pool_size} clients)")
         except Exception as e:
             logger.error(f"❌ Falha ao autenticar no Drive: {e}")
             # Do not re-raise to avoid crashing the app on property access, 
             # effectively disabling Drive features.
             # raise e 
-            self._service = None # Ensure it stays None so we might retry or fail gracefully
+            self._pool = None # Ensure it stays None so we might retry or fail gracefully
 
     def create_folder(self, folder_name, parent_id=None):
         """Cria uma pasta no Drive e retorna ID e Link."""
@@ -105,25 +347,25 @@ class DriveService:
             
             # [IMPROVEMENT] Verificar se pasta já existe antes de criar
             if parent_id:
-                existing_folders = self.list_files(parent_id, mime_type='application/vnd.google-apps.folder')
-                for folder in existing_folders:
-                    if folder.get('name') == folder_name:
-                        logger.warning(f"⚠️ Pasta '{folder_name}' já existe no parent {parent_id}, reutilizando")
-                        return folder.get('id'), folder.get('webViewLink')
+                existing = self.find_file(parent_id, folder_name, mime_type=FOLDER_MIME_TYPE)
+                if existing:
+                    logger.warning(f"⚠️ Pasta '{folder_name}' já existe no parent {parent_id}, reutilizando")
+                    return existing.get('id'), existing.get('webViewLink')
             
             file_metadata = {
                 'name': folder_name,
-                'mimeType': 'application/vnd.google-apps.folder'
+                'mimeType': FOLDER_MIME_TYPE
             }
             if parent_id:
                 file_metadata['parents'] = [parent_id]
                 
-            with self.lock:
-                file = self.service.files().create(
+            with self._drive() as service:
+                file = service.files().create(
                     body=file_metadata,
-                    fields='id, webViewLink',
+                    fields=METADATA_FIELDS,
                     supportsAllDrives=True
                 ).execute()
+            self.metadata_cache.put(file)
                 
             logger.info(f"✅ Pasta Criada: {file.get('id')}")
             return file.get('id'), file.get('webViewLink')
@@ -145,42 +387,90 @@ class DriveService:
         if mime_type:
             query += f" and mimeType='{mime_type}'"
         
-        import time
+        files = []
+        page_token = None
+        while True:
+            results = self._list_files_page(query, page_token)
+            if results is None:
+                return []
+            files.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+        self.metadata_cache.put_many(files)
+        if extension:
+            files = [f for f in files if f['name'].lower().endswith(extension.lower())]
+
+        return files
+
+    def _list_files_page(self, query, page_token=None):
+        """Uma página de files().list (com retry de conexão). None em caso de erro."""
         for attempt in range(3):
             try:
-                with self.lock:
-                    results = self.service.files().list(
+                with self._drive() as service:
+                    return service.files().list(
                         q=query,
-                        fields="files(id, name, mimeType, webViewLink, createdTime, modifiedTime)",
+                        fields="nextPageToken, files(id, name, mimeType, parents, webViewLink, createdTime, modifiedTime)",
                         orderBy="modifiedTime desc",
-                        pageSize=100,
+                        pageSize=1000,
+                        pageToken=page_token,
                         supportsAllDrives=True,
                         includeItemsFromAllDrives=True
                     ).execute()
-
-                files = results.get('files', [])
-
-                if extension:
-                    files = [f for f in files if f['name'].lower().endswith(extension.lower())]
-
-                return files
             except (BrokenPipeError, ConnectionResetError, OSError) as e:
                 if attempt < 2:
                     logger.warning(f"Erro de conexão ao listar arquivos (tentativa {attempt+1}/3): {e}")
                     time.sleep(2 ** attempt)
                     continue
                 logger.error(f"Erro ao listar arquivos após 3 tentativas: {e}")
-                return []
+                return None
             except Exception as e:
                 logger.error(f"Erro ao listar arquivos: {e}")
-                return []
+                return None
+
+    def get_file(self, file_id, fresh=False):
+        """
+        Metadados (METADATA_FIELDS) de um arquivo, do cache quando possível. None se não existir ou em erro.
+        `fresh=True` ignora o cache (e o atualiza): para escritas que dependem do estado atual.
+        """
+        meta = None if fresh else self.metadata_cache.get(file_id)
+        if meta is not None:
+            return meta
+        if not self.service: return None
+        try:
+            with self._drive() as service:
+                meta = service.files().get(fileId=file_id, fields=METADATA_FIELDS, supportsAllDrives=True).execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Metadados do arquivo {file_id} indisponíveis: {e}")
+            return None
+        self.metadata_cache.put(meta)
+        return meta
+
+    def find_file(self, parent_id, name, mime_type=None):
+        """Arquivo `name` dentro de `parent_id` (cache, depois busca exata por nome). None se não achar."""
+        meta = self.metadata_cache.find(parent_id, name, mime_type)
+        if meta is not None:
+            return meta
+        if not self.service or not parent_id: return None
+        escaped = name.replace('\\', '\\\\').replace("'", "\\'")
+        query = f"'{parent_id}' in parents and name = '{escaped}' and trashed=false"
+        if mime_type:
+            query += f" and mimeType='{mime_type}'"
+        with self._drive() as service:
+            files = service.files().list(
+                q=query, fields=f"files({METADATA_FIELDS})", pageSize=10,
+                supportsAllDrives=True, includeItemsFromAllDrives=True
+            ).execute().get('files', [])
+        self.metadata_cache.put_many(files)
+        return files[0] if files else None
 
     def download_file(self, file_id):
         """Baixa arquivo e retorna bytes."""
         if not self.service: return b""
-        with self.lock:
+        with self._drive() as service:
             # Note: get_media doesn't strictly need supportsAllDrives but it's good practice for consistency
-            request = self.service.files().get_media(fileId=file_id)
+            request = service.files().get_media(fileId=file_id)
             file_io = io.BytesIO()
             downloader = MediaIoBaseDownload(file_io, request)
             done = False
@@ -222,13 +512,14 @@ class DriveService:
                 # Re-create MediaFileUpload for each attempt to reset stream position
                 media = MediaFileUpload(file_path, resumable=True)
                 
-                with self.lock:
-                    file = self.service.files().create(
+                with self._drive() as service:
+                    file = service.files().create(
                         body=file_metadata,
                         media_body=media,
-                        fields='id, webViewLink',
+                        fields=METADATA_FIELDS,
                         supportsAllDrives=True
                     ).execute()
+                self.metadata_cache.put(file)
                 
                 # Success
                 return file.get('id'), file.get('webViewLink')
@@ -253,8 +544,8 @@ class DriveService:
         """Atualiza o conteúdo de um arquivo existente (ex: JSON)."""
         if not self.service: return None
         media = MediaIoBaseUpload(io.BytesIO(new_content_str.encode('utf-8')), mimetype='application/json', resumable=True)
-        with self.lock:
-            updated = self.service.files().update(
+        with self._drive() as service:
+            updated = service.files().update(
                 fileId=file_id,
                 media_body=media,
                 fields='id',
@@ -271,36 +562,140 @@ class DriveService:
                 logger.error("❌ Erro: target_folder_id está vazio!")
                 return
 
-            with self.lock:
-                file = self.service.files().get(
-                    fileId=file_id, 
-                    fields='parents',
-                    supportsAllDrives=True
-                ).execute()
-                previous_parents = ",".join(file.get('parents'))
-                
-                self.service.files().update(
+            # Pais lidos da API: no cache podem estar velhos (movido por outro processo ou pela UI)
+            file = self.get_file(file_id, fresh=True)
+            if file is None:
+                raise Exception(f"arquivo {file_id} não encontrado")
+            previous_parents = ",".join(file.get('parents') or [])
+
+            with self._drive() as service:
+                updated = service.files().update(
                     fileId=file_id,
                     addParents=target_folder_id,
                     removeParents=previous_parents,
                     fields='id, parents',
                     supportsAllDrives=True
                 ).execute()
+            self.metadata_cache.update(file_id, parents=updated.get('parents', [target_folder_id]))
             logger.info(f"Arquivo {file_id} movido para {target_folder_id}")
         except Exception as e:
             logger.error(f"Erro ao mover arquivo: {e}")
 
+    def batch_execute(self, requests, max_retries=3):
+        """
+        Executa vários requests do Drive em batches HTTP de até 100 (uma ida ao
+        servidor por batch). `requests` mapeia chave -> função que recebe o
+        client e devolve o request sem `.execute()`.
+        Retorna (resultados, erros) por chave; só os sub-requests que falharam
+        com erro temporário (429/5xx/rate limit) são reenviados, com backoff.
+        """
+        results, errors = {}, {}
+        if not requests:
+            return results, errors
+        if not self.service:
+            return results, {key: Exception("Drive Service Unavailable") for key in requests}
+
+        pending = dict(requests)
+        for attempt in range(max_retries + 1):
+            failed = {}
+            keys = list(pending)
+            for start in range(0, len(keys), BATCH_MAX_REQUESTS):
+                chunk = keys[start:start + BATCH_MAX_REQUESTS]
+
+                def callback(request_id, response, exception, chunk=chunk):
+                    key = chunk[int(request_id)]
+                    if exception is None:
+                        results[key] = response
+                    else:
+                        failed[key] = exception
+
+                try:
+                    with self._drive() as service:
+                        batch = service.new_batch_http_request(callback=callback)
+                        for index, key in enumerate(chunk):
+                            batch.add(pending[key](service), request_id=str(index))
+                        batch.execute()
+                except Exception as e:
+                    # Falha do batch inteiro (conexão): todos os sub-requests sem resposta voltam
+                    for key in chunk:
+                        if key not in results:
+                            failed.setdefault(key, e)
+
+            pending = {key: pending[key] for key, error in failed.items() if _is_retryable(error)}
+            errors.update({key: error for key, error in failed.items() if key not in pending})
+            if not pending:
+                break
+            if attempt == max_retries:
+                errors.update({key: failed[key] for key in pending})
+                break
+            wait_time = (2 ** attempt) + random.uniform(0, 1)
+            logger.warning(f"⚠️ Batch do Drive: {len(pending)} sub-requests com erro temporário, nova tentativa em {wait_time:.1f}s")
+            time.sleep(wait_time)
+
+        if errors:
+            logger.warning(f"⚠️ Batch do Drive: {len(results)} ok, {len(errors)} com erro")
+        return results, errors
+
+    def get_files(self, file_ids, fields='id, name, mimeType, parents, webViewLink'):
+        """Metadados de vários arquivos em batch. Retorna (metadados por id, erros por id)."""
+        return self.batch_execute({
+            file_id: (lambda service, file_id=file_id: service.files().get(
+                fileId=file_id, fields=fields, supportsAllDrives=True
+            ))
+            for file_id in dict.fromkeys(file_ids)
+        })
+
+    def move_files(self, file_ids, target_folder_id, parents=None):
+        """
+        Move vários arquivos para `target_folder_id` em batch.
+        `parents` (id -> pais atuais, ex.: vindos de list_files) evita o get;
+        os que faltarem são lidos antes, também em um batch.
+        Retorna (ids movidos, erros por id).
+        """
+        file_ids = list(dict.fromkeys(file_ids))
+        parents = {file_id: p for file_id, p in (parents or {}).items() if p}
+        errors = {}
+        missing = [file_id for file_id in file_ids if file_id not in parents]
+        if missing:
+            metadata, errors = self.get_files(missing, fields='id, parents')
+            parents.update({file_id: meta.get('parents', []) for file_id, meta in metadata.items()})
+
+        moved, updates = [], {}
+        for file_id in file_ids:
+            if file_id in errors:
+                continue
+            previous = [p for p in parents.get(file_id, []) if p != target_folder_id]
+            if not previous and target_folder_id in parents.get(file_id, []):
+                moved.append(file_id)  # já está na pasta de destino
+                continue
+            updates[file_id] = lambda service, file_id=file_id, previous=','.join(previous): service.files().update(
+                fileId=file_id,
+                addParents=target_folder_id,
+                removeParents=previous,
+                fields='id, parents',
+                supportsAllDrives=True
+            )
+
+        results, update_errors = self.batch_execute(updates)
+        errors.update(update_errors)
+        moved.extend(results)
+        for file_id, response in results.items():
+            self.metadata_cache.update(file_id, parents=response.get('parents', [target_folder_id]))
+        logger.info(f"🔄 {len(moved)} arquivos movidos para {target_folder_id} em batch ({len(errors)} falhas)")
+        return moved, errors
+
     def delete_folder(self, folder_id):
         """Deleta uma pasta (e todo seu conteúdo) do Google Drive."""
         if not self.service or not folder_id:
             return False
         try:
             logger.info(f"🗑️ Deletando pasta do Drive: {folder_id}")
-            with self.lock:
-                self.service.files().delete(
+            with self._drive() as service:
+                service.files().delete(
                     fileId=folder_id,
                     supportsAllDrives=True
                 ).execute()
+            self.metadata_cache.invalidate(folder_id)
             logger.info(f"✅ Pasta {folder_id} deletada do Drive")
             return True
         except Exception as e:
@@ -310,8 +705,8 @@ class DriveService:
     def _share_file(self, file_id):
         if not self.service: return
         try:
-            with self.lock:
-                self.service.permissions().create(
+            with self._drive() as service:
+                service.permissions().create(
                     fileId=file_id,
                     body={'role': 'reader', 'type': 'anyone'}
                 ).execute()
@@ -334,9 +729,9 @@ class DriveService:
             body["expiration"] = expiration
 
         try:
-            with self.lock:
+            with self._drive() as service:
                 # Legacy method strictly for folder watch if needed
-                return self.service.files().watch(
+                return service.files().watch(
                     fileId=folder_id,
                     body=body,
                     supportsAllDrives=True
@@ -349,29 +744,36 @@ class DriveService:
         """Obtém o token inicial para monitorar mudanças globais."""
         if not self.service: return None
         try:
-            with self.lock:
-                response = self.service.changes().getStartPageToken(supportsAllDrives=True).execute()
+            with self._drive() as service:
+                response = service.changes().getStartPageToken(supportsAllDrives=True).execute()
             return response.get('startPageToken')
         except Exception as e:
             logger.error(f"Error getting start page token: {e}")
             return None
 
     def list_changes(self, page_token):
-        """Lista mudanças ocorridas desde o page_token fornecido."""
-        if not self.service: return [], None
+        """
+        Uma página do feed de mudanças desde `page_token`.
+        Retorna (changes, nextPageToken, newStartPageToken): há mais páginas
+        enquanto nextPageToken vier; a última traz newStartPageToken.
+        Em caso de erro, ([], None, None).
+        """
+        if not self.service: return [], None, None
         try:
-            with self.lock:
-                response = self.service.changes().list(
+            with self._drive() as service:
+                response = service.changes().list(
                     pageToken=page_token,
-                    fields='nextPageToken, newStartPageToken, changes(fileId, file(name, parents, mimeType, webViewLink, createdTime), time, removed)',
+                    fields='nextPageToken, newStartPageToken, changes(fileId, file(id, name, parents, mimeType, webViewLink, createdTime, trashed), time, removed)',
                     supportsAllDrives=True,
                     includeItemsFromAllDrives=True,
-                    pageSize=100
+                    pageSize=1000
                 ).execute()
-            return response.get('changes', []), response.get('newStartPageToken') or response.get('nextPageToken')
+            # O feed é a fonte de invalidação do cache de metadados
+            self.metadata_cache.apply_changes(response.get('changes', []))
+            return response.get('changes', []), response.get('nextPageToken'), response.get('newStartPageToken')
         except Exception as e:
             logger.error(f"Error listing changes: {e}")
-            return [], None
+            return [], None, None
 
     def watch_global_changes(self, callback_url, channel_id, token, page_token=None, expiration=None):
         """
@@ -390,7 +792,7 @@ class DriveService:
             body["expiration"] = expiration
 
         try:
-            with self.lock:
+            with self._drive() as service:
                 kwargs = {
                     "body": body,
                     "supportsAllDrives": True,
@@ -399,7 +801,7 @@ class DriveService:
                 if page_token:
                     kwargs["pageToken"] = page_token
                     
-                return self.service.changes().watch(**kwargs).execute()
+                return service.changes().watch(**kwargs).execute()
         except Exception as e:
             logger.error(f"Error watching global changes: {e}")
             raise e
@@ -408,8 +810,8 @@ class DriveService:
         """Para de receber notificações."""
         if not self.service: return
         try:
-            with self.lock:
-                self.service.channels().stop(
+            with self._drive() as service:
+                service.channels().stop(
                     body={
                         "id": channel_id,
                         "resourceId": resource_id
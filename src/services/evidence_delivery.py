@@ -0,0 +1,189 @@
+"""
+Entrega das fotos de evidência guardadas no GCS (rota /evidence/<arquivo>).
+
+Dois modos (EVIDENCE_DELIVERY):
+- `stream` (default): o blob é enviado em blocos de CHUNK_SIZE, sem carregar a
+  foto inteira na memória, com suporte a `Range` (206/416) e ETag/Last-Modified
+  fortes do próprio objeto (`If-None-Match`/`If-Modified-Since` recebem 304);
+- `signed`: responde 302 para uma URL assinada de curta duração
+  (EVIDENCE_SIGNED_URL_TTL_SECONDS) e o navegador baixa direto do GCS, sem
+  ocupar uma thread do app por foto. A assinatura é feita por um `signer`
+  trocável: GcsUrlSigner em produção, LocalUrlSigner (HMAC, URL de volta para
+  /evidence) em dev/testes.
+
+Os nomes das evidências têm uuid e nunca são sobrescritos, então as respostas
+levam Cache-Control imutável.
+"""
+import hashlib
+import hmac
+import logging
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from flask import Response, redirect, request
+from werkzeug.datastructures import ContentRange
+from werkzeug.http import is_resource_modified
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# Original servido no lugar de um derivado que ainda não existe: cache curto
+FALLBACK_CACHE = 'public, max-age=300'
+KNOWN_BLOBS_MAX = 4096
+
+
+def _is_not_found(e):
+    return getattr(e, 'code', None) == 404
+
+
+class GcsUrlSigner:
+    """URLs assinadas V4 do GCS (leitura, GET)."""
+
+    def sign(self, blob, ttl):
+        from google.auth.credentials import Signing
+
+        kwargs = {}
+        credentials = getattr(blob.client, '_credentials', None)
+        if credentials is not None and not isinstance(credentials, Signing):
+            # Cloud Run: sem chave privada; a assinatura vai pelo IAM signBlob da service account
+            if not credentials.valid:
+                from google.auth.transport.requests import Request
+                credentials.refresh(Request())
+            kwargs = {'service_account_email': credentials.service_account_email, 'access_token': credentials.token}
+        return blob.generate_signed_url(version='v4', expiration=timedelta(seconds=ttl), method='GET', **kwargs)
+
+
+class LocalUrlSigner:
+    """Stand-in do GcsUrlSigner: assina com HMAC uma URL que volta para /evidence."""
+
+    def __init__(self, secret=None, clock=time.time):
+        self._secret = (secret or os.getenv('SECRET_KEY') or 'dev').encode('utf-8')
+        self._clock = clock
+
+    def _digest(self, filename, expires):
+        return hmac.new(self._secret, f"{filename}:{expires}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def sign(self, blob, ttl):
+        filename = blob.name[len('evidence/'):]
+        expires = int(self._clock()) + ttl
+        return f"/evidence/{filename}?expires={expires}&sig={self._digest(filename, expires)}"
+
+    def verify(self, filename, expires, sig):
+        try:
+            expires = int(expires)
+        except (TypeError, ValueError):
+            return False
+        return expires >= self._clock() and hmac.compare_digest(str(sig), self._digest(filename, expires))
+
+
+class EvidenceDelivery:
+    """Monta a resposta de uma evidência do bucket (stream com Range ou redirect assinado)."""
+
+    def __init__(self, mode=None, signed_url_ttl=None, signer=None):
+        self.mode = mode or os.getenv('EVIDENCE_DELIVERY', 'stream').lower()
+        self.signed_url_ttl = signed_url_ttl or int(os.getenv('EVIDENCE_SIGNED_URL_TTL_SECONDS', '900'))
+        self.signer = signer or GcsUrlSigner()
+        # Blobs já confirmados no bucket: nomes imutáveis, não precisa perguntar de novo
+        self._known = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, filename, args):
+        """Confere `expires`/`sig` de uma URL emitida por um signer local."""
+        verify = getattr(self.signer, 'verify', None)
+        return bool(verify) and verify(filename, args.get('expires'), args.get('sig'))
+
+    def gcs_response(self, bucket, filename, cache_control, allow_redirect=True):
+        """Resposta para `evidence/<filename>` no bucket, ou None se o blob não existir."""
+        blob = bucket.blob(f"evidence/{filename}")
+        if self.mode == 'signed' and allow_redirect:
+            if not self._exists(blob):
+                return None
+            try:
+                return self._redirect(blob)
+            except Exception as e:
+                logger.warning(f"⚠️ URL assinada indisponível para {filename} ({e}); enviando pelo app")
+        try:
+            blob.reload()  # metadados (tamanho, etag, data) em uma chamada
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+        self._remember(blob.name)
+        return self._stream(blob, cache_control)
+
+    def _exists(self, blob):
+        with self._lock:
+            if blob.name in self._known:
+                self._known.move_to_end(blob.name)
+                return True
+        if not blob.exists():
+            return False
+        self._remember(blob.name)
+        return True
+
+    def _remember(self, name):
+        with self._lock:
+            self._known[name] = True
+            self._known.move_to_end(name)
+            while len(self._known) > KNOWN_BLOBS_MAX:
+                self._known.popitem(last=False)
+
+    def _redirect(self, blob):
+        response = redirect(self.signer.sign(blob, self.signed_url_ttl), code=302)
+        # O redirect pode ser reaproveitado pelo navegador só enquanto a URL ainda vale
+        response.headers['Cache-Control'] = f'private, max-age={self.signed_url_ttl // 2}'
+        return response
+
+    def _stream(self, blob, cache_control):
+        size = blob.size or 0
+        etag = (blob.etag or str(blob.generation)).strip('"')
+        mimetype = blob.content_type or mimetypes.guess_type(blob.name)[0] or 'image/png'
+
+        response = Response(mimetype=mimetype, headers={'Cache-Control': cache_control, 'Accept-Ranges': 'bytes'})
+        response.set_etag(etag)
+        response.last_modified = blob.updated
+        if not is_resource_modified(request.environ, etag=etag, last_modified=blob.updated):
+            response.status_code = 304
+            return response
+
+        start, end = 0, size
+        if request.range is not None and self._if_range_matches(etag, blob.updated):
+            bounds = request.range.range_for_length(size)
+            if bounds is None:
+                response.status_code = 416
+                response.headers['Content-Range'] = f'bytes */{size}'
+                return response
+            start, end = bounds
+            response.status_code = 206
+            response.content_range = ContentRange('bytes', start, end, size)
+
+        response.content_length = end - start
+        response.response = self._iter_chunks(blob, start, end)
+        return response
+
+    @staticmethod
+    def _if_range_matches(etag, last_modified):
+        if_range = request.if_range
+        if if_range.etag:
+            return if_range.etag == etag
+        if if_range.date:
+            return last_modified is not None and if_range.date == last_modified.replace(microsecond=0)
+        return True
+
+    @staticmethod
+    def _iter_chunks(blob, start, end):
+        position = start
+        while position < end:
+            stop = min(position + CHUNK_SIZE, end)
+            # `end` inclusivo na API do GCS
+            yield blob.download_as_bytes(start=position, end=stop - 1)
+            position = stop
+
+
+# Singleton
+evidence_delivery = EvidenceDelivery()
@@ -0,0 +1,135 @@
+"""
+Derivados das fotos de evidência.
+
+O upload guarda a foto original (até 10MB). Em background são gerados, ao
+lado dela no storage_service:
+- `evidence/pdf/<nome>.jpg`: JPEG de no máximo 1600px, usado pelo
+  PDFService.resolve_path (PDF menor e render mais rápido);
+- `evidence/thumb/<nome>.webp`: miniatura de 480px para as telas de revisão
+  (`/evidence/<arquivo>?v=thumb`).
+
+Os derivados saem com a orientação do EXIF aplicada e sem metadados (GPS,
+modelo da câmera). Enquanto não existirem, ou se a imagem não puder ser
+decodificada, todos os consumidores caem para o original.
+
+Cada job em espera segura os bytes do upload: no máximo
+EVIDENCE_DERIVATIVES_MAX_PENDING jobs (rodando + na fila); acima disso o
+upload segue sem derivados (log de aviso) e a foto é servida pelo original.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'pdf': {'max_px': 1600, 'format': 'JPEG', 'ext': 'jpg', 'quality': 82},
+    'thumb': {'max_px': 480, 'format': 'WEBP', 'ext': 'webp', 'quality': 75},
+}
+
+# Poucas threads: Pillow libera o GIL no decode/resize, mas não deve competir com as requisições
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='evidence-derivatives')
+# Limita a memória da fila (até 10MB por upload em espera)
+_pending = threading.BoundedSemaphore(max(1, int(os.getenv('EVIDENCE_DERIVATIVES_MAX_PENDING', '8'))))
+
+
+def variant_filename(filename, variant):
+    """Caminho do derivado relativo à pasta evidence (ex.: 'pdf/abc_foto.jpg')."""
+    stem = os.path.splitext(filename)[0]
+    return f"{variant}/{stem}.{VARIANTS[variant]['ext']}"
+
+
+def evidence_candidates(filename):
+    """Nomes a tentar para uma evidência no PDF: derivado reduzido primeiro, depois o original."""
+    return [variant_filename(filename, 'pdf'), filename]
+
+
+def evidence_filename(url):
+    """
+    Nome da evidência (relativo à pasta evidence) a partir da URL gravada no item:
+    /evidence/<f>, /static/uploads/evidence/<f> (formato antigo) ou URL do GCS.
+    """
+    if not url:
+        return None
+    if url.startswith('/evidence/'):
+        return url[len('/evidence/'):]
+    if '/static/uploads/evidence/' in url:
+        return url.split('/static/uploads/evidence/')[-1]
+    if 'storage.googleapis.com' in url and '/evidence/' in url:
+        return url.split('/evidence/', 1)[-1]
+    return None
+
+
+def _to_rgb(img):
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB') if img.mode != 'RGB' else img
+
+
+def build_derivatives(image_bytes):
+    """Gera {variante: bytes}. Levanta exceção se a imagem não puder ser lida."""
+    largest = max(spec['max_px'] for spec in VARIANTS.values())
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.draft('RGB', (largest, largest))  # JPEG: decodifica já reduzido
+        img = _to_rgb(ImageOps.exif_transpose(img))
+
+        derivatives = {}
+        for variant, spec in VARIANTS.items():
+            resized = img.copy()
+            resized.thumbnail((spec['max_px'], spec['max_px']), Image.LANCZOS)
+            out = io.BytesIO()
+            # Sem `exif=`: o Pillow não copia metadados para o arquivo novo
+            resized.save(out, format=spec['format'], quality=spec['quality'], optimize=True)
+            derivatives[variant] = out.getvalue()
+    return derivatives
+
+
+def store_derivatives(filename, image_bytes, storage):
+    """Gera e grava os derivados ao lado do original. Retorna {variante: url}."""
+    try:
+        derivatives = build_derivatives(image_bytes)
+    except Exception as e:
+        logger.warning(f"⚠️ Evidência {filename}: derivados não gerados ({e}); usando o original")
+        return {}
+
+    urls = {}
+    for variant, data in derivatives.items():
+        folder, name = variant_filename(filename, variant).split('/', 1)
+        try:
+            urls[variant] = storage.upload_file(
+                io.BytesIO(data), destination_folder=f"evidence/{folder}", filename=name
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Evidência {filename}: falha ao gravar derivado {variant}: {e}")
+    sizes = ', '.join(f"{v}={len(d) // 1024}KB" for v, d in derivatives.items())
+    logger.info(f"🖼️ Derivados de {filename}: original={len(image_bytes) // 1024}KB, {sizes}")
+    return urls
+
+
+def schedule_derivatives(filename, image_bytes, storage):
+    """
+    Agenda `store_derivatives` em background (o upload responde sem esperar).
+    Com a fila cheia não agenda e devolve None (a evidência fica só com o original).
+    """
+    if not _pending.acquire(blocking=False):
+        logger.warning(f"⚠️ Fila de derivados cheia: {filename} fica só com o original")
+        return None
+    try:
+        return _executor.submit(_store_and_release, filename, image_bytes, storage)
+    except Exception:
+        _pending.release()
+        raise
+
+
+def _store_and_release(filename, image_bytes, storage):
+    try:
+        return store_derivatives(filename, image_bytes, storage)
+    finally:
+        _pending.release()
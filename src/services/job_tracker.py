@@ -0,0 +1,219 @@
+"""
+Ciclo de vida dos jobs: PENDING → PROCESSING → COMPLETED / FAILED / SKIPPED
+(PROCESSING → PENDING quando uma execução interrompida volta para a fila).
+
+Ponto único de escrita de status, métricas e erros de um Job. Cada transição
+é validada e grava status, timestamps, métricas de custo, resultado e erro em
+um único UPDATE condicional ao status atual (compare-and-set):
+
+    UPDATE jobs SET status=..., finished_at=..., cost_...=...,
+                    errors = COALESCE(errors, '[]') || :erro
+    WHERE id = :id AND status IN (<origens válidas>)
+
+Os erros estruturados ficam na coluna JSONB `errors` (append atômico, sem
+ler/reescrever o texto de `error_log`). `error_log` guarda apenas o último
+erro serializado, para as telas que já o exibem.
+
+Fora do Postgres (SQLite nos testes) a transição é feita via ORM
+(leitura + escrita na mesma sessão) com as mesmas regras.
+"""
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import cast, func, literal, update
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.domain.exceptions import InvalidStatusTransitionError
+from src.models_db import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+TRANSITIONS = {
+    JobStatus.PENDING: {JobStatus.PROCESSING, JobStatus.FAILED, JobStatus.SKIPPED, JobStatus.CANCELED},
+    JobStatus.QUEUED: {JobStatus.PROCESSING, JobStatus.FAILED, JobStatus.SKIPPED, JobStatus.CANCELED},
+    # PENDING: execução interrompida devolvida à fila pelo Zombie Killer
+    JobStatus.PROCESSING: {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.SKIPPED, JobStatus.CANCELED, JobStatus.PENDING},
+    JobStatus.FAILED: {JobStatus.PENDING},  # Reprocessamento
+    JobStatus.COMPLETED: set(),
+    JobStatus.SKIPPED: set(),
+    JobStatus.CANCELED: set(),
+}
+TERMINAL_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.SKIPPED, JobStatus.CANCELED}
+
+# gpt-4o-mini (USD por 1M tokens). Tokens servidos do cache de prompt custam 50% do input.
+PRICE_INPUT_PER_M = 0.15
+PRICE_CACHED_INPUT_PER_M = 0.075
+PRICE_OUTPUT_PER_M = 0.60
+USD_TO_BRL = 6.0
+
+
+def allowed_sources(status):
+    """Status a partir dos quais `status` pode ser alcançado."""
+    return [source for source, targets in TRANSITIONS.items() if status in targets]
+
+
+def new_job(job_type, input_payload=None, company_id=None, **kwargs):
+    """Cria um Job PENDING (o chamador adiciona à sessão/UoW e faz commit)."""
+    return Job(
+        type=job_type,
+        status=JobStatus.PENDING,
+        input_payload=input_payload,
+        company_id=company_id,
+        **kwargs
+    )
+
+
+def usage_metrics(usage, compaction=None):
+    """Converte o usage da IA (e a compactação do prompt) nos valores das colunas de custo do Job."""
+    tokens_in = usage.get('prompt_tokens', 0)
+    tokens_out = usage.get('completion_tokens', 0)
+    tokens_cached = usage.get('cached_tokens', 0)
+    uncached = max(tokens_in - tokens_cached, 0)
+    cost_in = (uncached / 1_000_000) * PRICE_INPUT_PER_M + (tokens_cached / 1_000_000) * PRICE_CACHED_INPUT_PER_M
+    cost_out = (tokens_out / 1_000_000) * PRICE_OUTPUT_PER_M
+    metrics = {
+        'cost_tokens_input': tokens_in,
+        'cost_tokens_output': tokens_out,
+        'cost_tokens_cached': tokens_cached,
+        'cost_input_usd': cost_in,
+        'cost_output_usd': cost_out,
+        'cost_input_brl': cost_in * USD_TO_BRL,
+        'cost_output_brl': cost_out * USD_TO_BRL,
+    }
+    if compaction:
+        metrics.update({
+            'prompt_chars_raw': compaction.chars_before,
+            'prompt_chars_sent': compaction.chars_after,
+            'prompt_tokens_est_raw': compaction.tokens_before,
+            'prompt_tokens_est_sent': compaction.tokens_after,
+        })
+    return metrics
+
+
+def _error_entry(error):
+    if not isinstance(error, dict):
+        error = {"code": "ERR_9001", "admin_msg": str(error), "user_msg": "Erro desconhecido"}
+    entry = {"timestamp": datetime.utcnow().isoformat(), **error}
+    # Normaliza valores não serializáveis
+    return json.loads(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+class JobTracker:
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+
+    def _session(self):
+        if self._session_factory:
+            return self._session_factory()
+        from src.database import new_session
+        return new_session()
+
+    def transition(self, job_id, status, error=None, metrics=None, result=None, session=None):
+        """
+        Move o job para `status`, gravando métricas, resultado e erro no mesmo UPDATE.
+
+        Retorna True se o job mudou de status e False se ele já estava em `status`
+        (ex: worker finalizando um job que o processor já marcou como FAILED).
+        Levanta InvalidStatusTransitionError para transições inválidas.
+
+        Com `session`, usa a sessão do chamador (que faz o commit); sem ela,
+        abre uma sessão dedicada e faz commit.
+        """
+        status = JobStatus(status)
+        own_session = session is None
+        session = session or self._session()
+        try:
+            if session.get_bind().dialect.name == 'postgresql':
+                changed = self._transition_sql(session, job_id, status, error, metrics, result)
+            else:
+                changed = self._transition_orm(session, job_id, status, error, metrics, result)
+            if own_session:
+                session.commit()
+            if changed:
+                logger.info(f"Job {job_id} status updated to {status.value}.")
+            return changed
+        except Exception:
+            if own_session:
+                session.rollback()
+            raise
+        finally:
+            if own_session and not self._session_factory:
+                session.close()
+
+    def _check_noop(self, job_id, current, status):
+        if current is None:
+            logger.warning(f"Job {job_id} not found during status update.")
+            return False
+        if current == status:
+            return False
+        raise InvalidStatusTransitionError(current.value, status.value, "Job")
+
+    def _transition_sql(self, session, job_id, status, error, metrics, result):
+        now = datetime.utcnow()
+        values = {'status': status}
+        if status == JobStatus.PROCESSING:
+            values['started_at'] = now
+            values['attempts'] = func.coalesce(Job.attempts, 0) + 1
+        if status in TERMINAL_STATUSES:
+            values['finished_at'] = now
+            values['execution_time_seconds'] = func.extract(
+                'epoch', literal(now) - func.coalesce(Job.started_at, Job.created_at)
+            )
+        if metrics:
+            values.update(metrics)
+            values['api_calls_count'] = func.coalesce(Job.api_calls_count, 0) + 1
+        if result:
+            values['result_payload'] = func.coalesce(Job.result_payload, cast(literal('{}'), JSONB)).op('||')(
+                cast(literal(json.dumps(result, default=str)), JSONB)
+            )
+        if error is not None:
+            entry = _error_entry(error)
+            values['errors'] = func.coalesce(Job.errors, cast(literal('[]'), JSONB)).op('||')(
+                cast(literal(json.dumps([entry])), JSONB)
+            )
+            values['error_log'] = json.dumps(entry, ensure_ascii=False)
+
+        updated = session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status.in_(allowed_sources(status)))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if updated:
+            return True
+        current = session.query(Job.status).filter(Job.id == job_id).scalar()
+        return self._check_noop(job_id, current, status)
+
+    def _transition_orm(self, session, job_id, status, error, metrics, result):
+        job = session.get(Job, job_id)
+        current = job.status if job else None
+        if current not in allowed_sources(status):
+            return self._check_noop(job_id, current, status)
+
+        now = datetime.utcnow()
+        job.status = status
+        if status == JobStatus.PROCESSING:
+            job.started_at = now
+            job.attempts = (job.attempts or 0) + 1
+        if status in TERMINAL_STATUSES:
+            job.finished_at = now
+            start = job.started_at or job.created_at
+            if start:
+                job.execution_time_seconds = (now - start.replace(tzinfo=None)).total_seconds()
+        if metrics:
+            for key, value in metrics.items():
+                setattr(job, key, value)
+            job.api_calls_count = (job.api_calls_count or 0) + 1
+        if result:
+            job.result_payload = {**(job.result_payload or {}), **json.loads(json.dumps(result, default=str))}
+        if error is not None:
+            entry = _error_entry(error)
+            job.errors = list(job.errors or []) + [entry]
+            job.error_log = json.dumps(entry, ensure_ascii=False)
+        session.flush()
+        return True
+
+
+# Singleton
+job_tracker = JobTracker()
@@ -1,23 +1,107 @@
 import os
+import tempfile
+import threading
 from datetime import datetime, timezone, timedelta
 from weasyprint import HTML, CSS
-from jinja2 import Environment, FileSystemLoader
+from weasyprint.text.fonts import FontConfiguration
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 import logging
 
+from src.services.evidence_images import evidence_candidates, evidence_filename
+from src.services.storage_service import evidence_cache
+
 # from src import models # Legacy import removed to avoid circular dependency
 # import models
 
 logger = logging.getLogger(__name__)
 
+PRECOMPILED_TEMPLATES = ('pdf_template.html',)
+
+
+class RenderContext:
+    """
+    Recursos de renderização criados uma vez por processo (por template_dir).
+
+    - Ambiente Jinja com bytecode cache em disco: workers novos do pool de
+      renderização não recompilam os templates.
+    - style.css parseado uma vez junto com uma FontConfiguration reaproveitada,
+      então o @import do Google Fonts não é baixado e parseado a cada PDF.
+      Fica por thread, porque a FontConfiguration do WeasyPrint não é
+      thread-safe. Nos workers do pool há uma thread só. Se o arquivo mudar
+      (mtime), é parseado de novo.
+    """
+
+    def __init__(self, template_dir):
+        self.template_dir = template_dir
+        cache_dir = os.path.join(tempfile.gettempdir(), 'inspetorai_jinja_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        self.jinja_env = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=True,
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+        )
+        self._local = threading.local()
+
+    def stylesheets(self):
+        """(FontConfiguration, [CSS]) desta thread, parseando style.css só na primeira vez."""
+        local = self._local
+        if getattr(local, 'font_config', None) is None:
+            local.font_config = FontConfiguration()
+            local.stylesheets, local.mtime = [], None
+
+        style_path = os.path.join(self.template_dir, 'style.css')
+        if not os.path.exists(style_path):
+            return local.font_config, []
+        mtime = os.path.getmtime(style_path)
+        if local.mtime != mtime:
+            local.stylesheets = [CSS(filename=style_path, font_config=local.font_config)]
+            local.mtime = mtime
+        return local.font_config, local.stylesheets
+
+    def warm_up(self):
+        """Compila os templates do PDF e parseia o CSS antes da primeira requisição."""
+        for name in PRECOMPILED_TEMPLATES:
+            self.jinja_env.get_template(name)
+        self.stylesheets()
+
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+def get_render_context(template_dir):
+    """RenderContext compartilhado do processo para `template_dir`."""
+    template_dir = os.path.abspath(template_dir)
+    with _contexts_lock:
+        if template_dir not in _contexts:
+            _contexts[template_dir] = RenderContext(template_dir)
+        return _contexts[template_dir]
+
+
 class PDFService:
     def __init__(self, template_dir='src/templates'):
         self.template_dir = template_dir
         # Garante caminho absoluto para robustez em diferentes contextos de execução
         if not os.path.isabs(template_dir):
             self.template_dir = os.path.join(os.getcwd(), template_dir)
-            
-        self.jinja_env = Environment(loader=FileSystemLoader(self.template_dir), autoescape=True)
-        self.jinja_env.filters['resolve_path'] = self.resolve_path
+
+        self.evidence_cache = evidence_cache
+        self.render_context = get_render_context(self.template_dir)
+        self.jinja_env = self.render_context.jinja_env
+        self.jinja_env.filters.setdefault('resolve_path', self.resolve_path)
+
+    def warm_up(self, render_sample=False):
+        """
+        Prepara o contexto compartilhado (templates compilados + CSS).
+        `render_sample` também gera um PDF vazio para carregar fontes/Pango.
+        """
+        try:
+            self.render_context.warm_up()
+            if render_sample:
+                self.generate_pdf_bytes({})
+            logger.info("🔥 PDF warm-up concluído")
+        except Exception as e:
+            logger.warning(f"⚠️ Falha no warm-up do PDF: {e}")
 
     def generate_pdf_bytes(self, data: dict, original_filename: str = "relatorio", template_name: str = "pdf_template.html") -> bytes:
         """
@@ -31,22 +115,22 @@ class PDFService:
             
             # Enriquecer dados (Cálculo de pontuações e tradução de status)
             self.enrich_data(data)
+            self.prefetch_evidence(data)
 
             html_out = template.render(
                 relatorio=data,
                 data_geracao=datetime.now(tz=timezone(timedelta(hours=-3))).strftime("%d/%m/%Y")
             )
             
-            stylesheets = []
-            style_path = os.path.join(self.template_dir, 'style.css')
-            if os.path.exists(style_path):
-                stylesheets.append(CSS(style_path))
-                
+            font_config, stylesheets = self.render_context.stylesheets()
+
             # Base URL é crítica para links relativos (imagens, css)
             # Define o base_url como o diretório src do projeto para resolver /static corretamente
             project_root = os.path.abspath(os.path.join(self.template_dir, '..'))
-            
-            return HTML(string=html_out, base_url=project_root).write_pdf(stylesheets=stylesheets)
+
+            return HTML(string=html_out, base_url=project_root).write_pdf(
+                stylesheets=stylesheets, font_config=font_config
+            )
         except Exception as e:
             logger.error(f"Erro gerando PDF: {e}")
             raise
@@ -171,27 +255,22 @@ class PDFService:
     def resolve_path(self, url):
         """
         Filtro Jinja para resolver caminhos relativos de URL para caminhos absolutos de arquivo.
-        Para /evidence/ URLs, busca do GCS e salva em temp para WeasyPrint.
+        URLs de evidência (/evidence/, /static/uploads/evidence/, GCS) viram arquivos locais.
         """
         if not url:
             return ""
 
+        # Evidências: sempre arquivo local (baixadas antes do render por prefetch_evidence)
+        filename = evidence_filename(url)
+        if filename:
+            return self._resolve_evidence(filename)
+
         # Se já for absoluto, retorna
         if url.startswith('http') or url.startswith('file://'):
             return url
 
-        # Tratamento especial para /evidence/ URLs (proxy route)
-        if url.startswith('/evidence/'):
-            filename = url.replace('/evidence/', '')
-            return self._resolve_evidence_from_gcs(filename)
-
         # Se começar com /, assume que é relativo à raiz do projeto (src)
         if url.startswith('/'):
-            # Checar se é /static/uploads/evidence/ (formato antigo)
-            if '/static/uploads/evidence/' in url:
-                filename = url.split('/static/uploads/evidence/')[-1]
-                return self._resolve_evidence_from_gcs(filename)
-
             relative_path = url.lstrip('/')
             project_root = os.path.abspath(os.path.join(self.template_dir, '..'))
             absolute_path = os.path.join(project_root, relative_path)
@@ -199,39 +278,44 @@ class PDFService:
 
         return url
 
-    def _resolve_evidence_from_gcs(self, filename):
-        """Busca evidencia do GCS, salva em temp, retorna path para WeasyPrint."""
-        import tempfile
-
-        # 1. Tentar local primeiro (mais rapido)
+    def _local_upload(self, filename):
+        """Evidência salva em static/uploads (storage local), derivado 'pdf' de preferência."""
         project_root = os.path.abspath(os.path.join(self.template_dir, '..'))
-        local_paths = [
-            os.path.join(project_root, 'static', 'uploads', 'evidence', filename),
-            os.path.join(os.getcwd(), 'src', 'static', 'uploads', 'evidence', filename),
-        ]
-        for local_path in local_paths:
-            if os.path.exists(local_path):
-                return f"file://{local_path}"
-
-        # 2. Tentar GCS
-        try:
-            bucket_name = os.getenv('GCP_STORAGE_BUCKET')
-            if bucket_name:
-                from google.cloud import storage
-                client = storage.Client()
-                bucket = client.bucket(bucket_name)
-                blob = bucket.blob(f"evidence/{filename}")
-                if blob.exists():
-                    # Baixar para temp
-                    temp_dir = os.path.join(tempfile.gettempdir(), 'evidence_cache')
-                    os.makedirs(temp_dir, exist_ok=True)
-                    temp_path = os.path.join(temp_dir, filename)
-                    if not os.path.exists(temp_path):
-                        blob.download_to_filename(temp_path)
-                        logger.info(f"Evidencia baixada do GCS para PDF: {filename}")
-                    return f"file://{temp_path}"
-        except Exception as e:
-            logger.warning(f"Falha ao buscar evidencia do GCS: {filename} - {e}")
+        for name in evidence_candidates(filename):
+            local_paths = [
+                os.path.join(project_root, 'static', 'uploads', 'evidence', name),
+                os.path.join(os.getcwd(), 'src', 'static', 'uploads', 'evidence', name),
+            ]
+            for local_path in local_paths:
+                if os.path.exists(local_path):
+                    return local_path
+        return None
+
+    def prefetch_evidence(self, data):
+        """
+        Antes do render: baixa em um lote paralelo (client GCS compartilhado)
+        todas as evidências do plano que ainda não estão em disco.
+        """
+        filenames = []
+        for area in (data or {}).get('areas_inspecionadas', []):
+            for item in area.get('itens', []):
+                filename = evidence_filename(item.get('evidence_image_url'))
+                if filename and not self._local_upload(filename):
+                    filenames.append(filename)
+        if filenames:
+            try:
+                self.evidence_cache.prefetch(filenames)
+            except Exception as e:
+                logger.warning(f"Falha no prefetch de evidencias: {e}")
+
+    def _resolve_evidence(self, filename):
+        """
+        Caminho local da evidência para o WeasyPrint: uploads locais ou evidence_cache.
+        Só baixa aqui (uma foto) se o prefetch não rodou para este plano.
+        """
+        local_path = self._local_upload(filename) or self.evidence_cache.fetch(filename)
+        if local_path:
+            return f"file://{local_path}"
 
         logger.warning(f"Evidencia nao encontrada para PDF: {filename}")
         return ""
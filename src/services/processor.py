@@ -3,12 +3,14 @@ import os
 import json
 import logging
 import io
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
 BRAZIL_TZ = timezone(timedelta(hours=-3))
 import uuid
 import structlog
 import pypdf
-from weasyprint import HTML, CSS
+from weasyprint import HTML
 from sqlalchemy.orm import Session
 
 # Local Imports
@@ -17,18 +19,104 @@ from src.config_helper import get_config
 from src.database import get_db, SessionLocal
 from src import database # access to db_session
 from src.services.drive_service import drive_service
-from src.services.storage_service import storage_service
+from src.services.storage_service import storage_service, pdf_cache
+from src.services.checkpoint_store import checkpoint_store, STAGE_TEXT, STAGE_AI_RESULT
+from src.services.prompt_compactor import compact_report_text
+from src.services.trace_writer import trace_writer
+from src.services.job_tracker import job_tracker, usage_metrics
 from src.models_db import Inspection, ActionPlan, ActionPlanItem, ActionPlanItemStatus, SeverityLevel, InspectionStatus, Company, Establishment, Job, JobStatus
 from src.error_codes import ErrorCode
+from src.repositories.action_plan_repository import ActionPlanRepository
+from src.repositories.inspection_repository import InspectionRepository
 
 # ... (rest of imports)
 
 
 # Updated Model Import
-from src.models import ChecklistSanitario
+from src.models import ChecklistSanitario, EnriquecimentoRelatorio
 
 logger = structlog.get_logger()
 
+# Versão do prompt de análise. Incrementar ao alterar prompts/schema:
+# invalida os checkpoints de resultado da IA gravados com a versão anterior.
+PROMPT_VERSION = "2026.01-v2"
+
+# Schemas serializados uma única vez (usados em todos os prompts)
+CHECKLIST_SCHEMA_JSON = json.dumps(ChecklistSanitario.model_json_schema(), indent=2)
+ENRICHMENT_SCHEMA_JSON = json.dumps(EnriquecimentoRelatorio.model_json_schema(), indent=2)
+
+# Prompt estático do modo single. Instruções e schema ficam no início e são
+# idênticos em todas as chamadas (prefixo cacheável pelo provedor); os dados de
+# cada relatório (áreas obrigatórias e texto) vão no fim, na mensagem do usuário.
+ANALYSIS_SYSTEM_PROMPT = f"""Você é um Auditor Sanitário Sênior, especialista na legislação brasileira (RDC 216/2004, CVS-5/2013).
+Sua tarefa é analisar o texto COMPLETO do relatório de auditoria e transformá-lo em um CHECKLIST DE PLANO DE AÇÃO ESTRUTURADO, cobrindo TODAS as áreas do relatório.
+
+FORMATO DO RELATÓRIO DE ENTRADA:
+O relatório possui uma tabela resumo "Notas por tópico" no início, com cada área e seu aproveitamento.
+Em seguida, os itens de cada área seguem este padrão:
+- Número e pergunta do item, seguido de "(X.XX% - X.XX pontos)" que indica a pontuação OBTIDA naquele item
+- "Resposta: Sim/Não/Parcial/N.A./Não Aplicável/Não aplicável"
+- Opcionalmente: "Fotos da questão X.X" (indica evidência fotográfica de problema)
+- Opcionalmente: "Comentário: ..." (observação do auditor in-loco)
+
+REGRAS DE CLASSIFICAÇÃO DOS ITENS:
+1. "Resposta: Parcial" = SEMPRE "Parcialmente Conforme" → INCLUIR OBRIGATORIAMENTE
+2. "Resposta: Não" com pontuação "(0.00% - 0.00 pontos)" em pergunta POSITIVA = "Não Conforme" → INCLUIR
+3. "Resposta: Não" em perguntas NEGATIVAS (ex: "Foram encontrados produtos vencidos?", "Há outras inconformidades?", "Percepção de inconformidade?") onde "Não" = ausência de problema E pontuação > 0 = Conforme → NÃO INCLUIR
+4. "Resposta: Sim" com pontuação > 0 em pergunta POSITIVA (ex: "Está limpo?", "Está adequado?") = Conforme → NÃO INCLUIR
+5. "Resposta: Sim" com pontuação "(0.00% - 0.00 pontos)" em pergunta NEGATIVA (ex: "Foram encontrados produtos vencidos?", "Percepção de inconformidade?") = O "Sim" confirma a existência do PROBLEMA → "Não Conforme" → INCLUIR OBRIGATORIAMENTE
+6. "Resposta: Sim" em qualquer pergunta com Fotos ou Comentário de problema = "Não Conforme" → INCLUIR OBRIGATORIAMENTE
+7. "Resposta: N.A." ou "Não Aplicável" ou "Não aplicável" = Não se aplica → NÃO INCLUIR
+8. Se o item possui "Fotos da questão" ou "Comentário:" com evidência de problema = INCLUIR OBRIGATORIAMENTE como "Não Conforme" ou "Parcialmente Conforme"
+
+REGRA DE COMPLETUDE (CRÍTICA - MÁXIMA PRIORIDADE):
+- Você DEVE processar o relatório INTEIRO do início ao fim, seção por seção.
+- Você DEVE capturar ABSOLUTAMENTE TODOS os itens não conformes e parcialmente conformes de TODAS as áreas.
+- NÃO pare após processar a primeira área. Continue até a última área do relatório.
+- NÃO resuma. NÃO agrupe itens similares. NÃO pule nenhum item.
+- Cada item com problema deve aparecer como um ChecklistItem individual na área correspondente.
+- MESMO que uma área tenha apenas 1 item com problema, ela DEVE ser incluída.
+
+DIRETRIZES:
+1. Identifique o Estabelecimento e a DATA DA INSPEÇÃO (Checklist Base).
+2. Crie um Resumo Geral robusto indicando as principais áreas críticas.
+3. Calcule ou extraia a PONTUAÇÃO GERAL e o APROVEITAMENTO GERAL do relatório.
+4. Para cada ÁREA FÍSICA com aproveitamento < 100%:
+   - Use o nome da área EXATAMENTE como aparece no relatório (ex: 'Cozinha / Área de Manipulação', 'Estoque / Depósito', 'Sanitário / Vestiário de Funcionários').
+   - Extraia 'pontuacao_obtida', 'pontuacao_maxima' e 'aproveitamento' da tabela resumo.
+   - Liste TODOS os itens não conformes e parcialmente conformes desta área.
+5. Para cada item com problema:
+   - item_verificado: Use o número e texto da pergunta original (ex: "2.1 - HIGIENIZAÇÃO: A área de manipulação...").
+   - Status: 'Não Conforme' ou 'Parcialmente Conforme'.
+   - Observação: Descreva a evidência. Se houver "Comentário:" do auditor, INCLUA-o na observação.
+   - Fundamento Legal: Cite a legislação específica (RDC 216/2004, CVS-5/2013, etc.).
+   - Ação Corretiva: Sugira a correção técnica IMEDIATA.
+   - Prazo Sugerido: Baseado no risco (Imediato, 24 horas, 7 dias, 15 dias, 30 dias).
+
+REGRA CRÍTICA - O QUE NÃO É ÁREA:
+NÃO inclua como área seções que são metadados:
+- "Inconformidades resolvidas", "Acompanhante de visita", "Comentários gerais e observações"
+- Qualquer seção sem pontuação numérica real
+
+Sua resposta deve ser APENAS o objeto JSON compatível com o schema abaixo.
+IMPORTANTE: Os valores dentro do JSON devem ser texto puro (sem markdown).
+
+JSON Schema:
+{CHECKLIST_SCHEMA_JSON}"""
+
+
+def completion_usage(completion) -> dict:
+    """Extrai o usage de uma completion, incluindo os tokens servidos do cache de prompt."""
+    details = getattr(completion.usage, 'prompt_tokens_details', None)
+    cached = getattr(details, 'cached_tokens', None) if details is not None else None
+    return {
+        'prompt_tokens': completion.usage.prompt_tokens,
+        'completion_tokens': completion.usage.completion_tokens,
+        'total_tokens': completion.usage.total_tokens,
+        'cached_tokens': cached if isinstance(cached, int) else 0,
+    }
+
+
 class ProcessorService:
     def __init__(self):
         # Configuracoes GCP
@@ -40,6 +128,7 @@ class ProcessorService:
         self.folder_out = get_config("FOLDER_ID_02_PLANOS_GERADOS", "")
         self.folder_backup = get_config("FOLDER_ID_03_PROCESSADOS_BACKUP", "")
         self.folder_error = get_config("FOLDER_ID_99_ERROS", "")
+        self._local = threading.local()
         
         logger.info("Initializing ProcessorService (OpenAI Mode)", 
                     folder_in=self.folder_in, 
@@ -66,9 +155,11 @@ class ProcessorService:
             logger.error("Falha ao inicializar OpenAI", error=str(e))
             self.client = None
 
-        # Inicializa Jinja
-        from jinja2 import Environment, FileSystemLoader
-        self.jinja_env = Environment(loader=FileSystemLoader('src/templates'), autoescape=True)
+        # Jinja/CSS compartilhados com o PDFService (um contexto de renderização por processo,
+        # já com o filtro resolve_path que o pdf_template.html usa)
+        from src.services.pdf_service import PDFService
+        self.render_context = PDFService('src/templates').render_context
+        self.jinja_env = self.render_context.jinja_env
 
     def process_pending_files(self):
         """
@@ -85,10 +176,12 @@ class ProcessorService:
             
             logger.info(f"📁 Encontrados {len(files)} arquivos.")
             count = 0
-            for file_meta in files:
-                # For basic processing we just need file meta
-                self.process_single_file(file_meta)
-                count += 1
+            # Moves para o backup saem em um batch só, ao final (pais já vêm do list_files)
+            with self.batched_backup_moves(parents={f['id']: f.get('parents') for f in files}):
+                for file_meta in files:
+                    # For basic processing we just need file meta
+                    self.process_single_file(file_meta)
+                    count += 1
             return count
 
         except Exception as e:
@@ -98,51 +191,11 @@ class ProcessorService:
     def _log_trace(self, file_id, stage, status, message, details=None):
         """
         Appends a log entry to the Inspection's processing_logs.
-        Creates Inspection if it doesn't exist yet (for initial steps).
+        Entries are buffered per file and written in a single append at stage
+        boundaries (STARTED/RUNNING/FAILED) or when processing ends (see trace_writer).
         """
-        # [FIX] Use a dedicated session for logging to avoid closing the main shared session
-        # This prevents 'Instance not bound to Session' errors in the main flow
-        from src.database import engine
-        from sqlalchemy.orm import sessionmaker
-        
-        # Create a new session factory just for this operation if needed, or use raw engine
-        SessionLog = sessionmaker(bind=engine)
-        session = SessionLog()
-        
-        try:
-            # Avoid circular imports if possible, but localized import is safe here
-            from src.models_db import Inspection, InspectionStatus
-            
-            inspection = session.query(Inspection).filter_by(drive_file_id=file_id).first()
-            if not inspection:
-                inspection = Inspection(drive_file_id=file_id, status=InspectionStatus.PROCESSING)
-                session.add(inspection)
-                session.flush() # Get ID
-            
-            entry = {
-                "timestamp": datetime.now().isoformat(),
-                "stage": stage,
-                "status": status,
-                "message": message,
-                "details": details or {}
-            }
-            
-            # Append to list (Postgres JSONB needs re-assignment to detect change usually, or mutable flag)
-            current_logs = list(inspection.processing_logs) if inspection.processing_logs else []
-            current_logs.append(entry)
-            inspection.processing_logs = current_logs 
-            
-            # Update overall status if Error
-            if status == "FAILED":
-                inspection.status = InspectionStatus.REJECTED # Or specialized 'FAILED' status if enum allows
-            
-            session.commit()
-            logger.info(f"📝 Trace [{stage}]: {message}", file_id=file_id)
-        except Exception as e:
-            logger.error(f"Failed to write trace log: {e}")
-            session.rollback()
-        finally:
-            session.close() # Safe to close this private session
+        trace_writer.append(file_id, stage, status, message, details)
+        logger.info(f"📝 Trace [{stage}]: {message}", file_id=file_id)
 
     def process_single_file(self, file_meta, company_id=None, establishment_id=None, job_id=None, job=None, file_content=None):
         file_id = file_meta['id']
@@ -150,6 +203,7 @@ class ProcessorService:
 
         # 0. Start Trace
         self._log_trace(file_id, "INIT", "STARTED", f"Iniciando processamento de {filename}")
+        job_metrics = None
 
         try:
             # 1. Download & Hash Check (Idempotency)
@@ -196,29 +250,61 @@ class ProcessorService:
                 self._update_job_status(job_id, JobStatus.PROCESSING)
                 self._log_trace(file_id, "JOB_STATUS", "UPDATED", "Job marcado como PROCESSING")
 
-            # 3. Extract text (OCR)
+            # 3. Extract text (OCR) - reaproveita checkpoint de tentativas anteriores
             self._log_trace(file_id, "OCR", "RUNNING", "Extraindo texto do PDF...")
             try:
-                pdf_text = self.extract_text_from_pdf_bytes(file_content)
+                cached_text = checkpoint_store.get(file_hash, STAGE_TEXT)
+                if cached_text:
+                    pdf_text = cached_text.get('text', '')
+                else:
+                    pdf_text = self.extract_text_from_pdf_bytes(file_content)
                 char_count = len(pdf_text.strip())
 
                 if char_count == 0:
                     raise ValueError("PDF vazio (sem texto extraível)")
 
-                self._log_trace(file_id, "OCR", "SUCCESS", f"Texto extraído com sucesso ({char_count} caracteres)")
+                if not cached_text:
+                    checkpoint_store.put(file_hash, STAGE_TEXT, {'text': pdf_text})
+                origin = " (checkpoint)" if cached_text else ""
+                self._log_trace(file_id, "OCR", "SUCCESS", f"Texto extraído com sucesso ({char_count} caracteres){origin}")
             except Exception as ocr_error:
                 error_obj = ErrorCode.get_error(ocr_error)
                 self._log_trace(file_id, "OCR", "FAILED", error_obj['user_msg'], details=error_obj)
-                if job_id:
-                    self._update_job_status(job_id, JobStatus.FAILED, error_data=error_obj)
                 raise
 
+            # 3.1 Compactação: remove itens conformes e boilerplate antes de enviar à IA
+            compaction = None
+            prompt_text = pdf_text
+            if self._compaction_enabled():
+                try:
+                    compaction = compact_report_text(pdf_text)
+                    prompt_text = compaction.text
+                    self._log_trace(file_id, "COMPACTION", "SUCCESS",
+                                  f"Texto compactado: {compaction.chars_before} → {compaction.chars_after} caracteres (-{compaction.reduction_pct}%)",
+                                  details=compaction.to_dict())
+                except Exception as compaction_error:
+                    # Compactação é otimização: em caso de erro envia o texto completo
+                    logger.warning("Falha na compactação do texto, enviando texto completo", error=str(compaction_error))
+                    compaction = None
+                    prompt_text = pdf_text
+
             # 4. Analyze with OpenAI
             self._log_trace(file_id, "AI_ANALYSIS", "RUNNING", f"Enviando para análise da IA ({self.model_name})...")
             try:
-                result = self.analyze_with_openai(file_content)
-                data: ChecklistSanitario = result['data']
-                usage = result['usage']
+                prompt_version = self._prompt_version()
+                cached_ai = checkpoint_store.get(file_hash, STAGE_AI_RESULT, prompt_version, self.model_name)
+                if cached_ai:
+                    # Conteúdo idêntico com mesmo prompt/modelo: zero tokens gastos
+                    data: ChecklistSanitario = ChecklistSanitario.model_validate(cached_ai['data'])
+                    usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0, 'checkpoint': True}
+                else:
+                    result = self.analyze_with_openai(file_content, pdf_text=prompt_text)
+                    data: ChecklistSanitario = result['data']
+                    usage = result['usage']
+                    checkpoint_store.put(file_hash, STAGE_AI_RESULT, {
+                        'data': data.model_dump(mode='json'),
+                        'usage': usage,
+                    }, prompt_version, self.model_name)
 
                 areas_count = len(data.areas_inspecionadas) if hasattr(data, 'areas_inspecionadas') else 0
                 items_count = sum(len(area.itens) for area in data.areas_inspecionadas) if hasattr(data, 'areas_inspecionadas') else 0
@@ -229,17 +315,11 @@ class ProcessorService:
             except Exception as ai_error:
                 error_obj = ErrorCode.get_error(ai_error)
                 self._log_trace(file_id, "AI_ANALYSIS", "FAILED", error_obj['user_msg'], details=error_obj)
-                if job_id:
-                    self._update_job_status(job_id, JobStatus.FAILED, error_data=error_obj)
                 raise
             
-            # Update Job Metrics immediately (Persisted)
-            if job_id:
-                self._update_job_metrics(job_id, usage)
+            # Métricas de custo vão no mesmo UPDATE da transição final do Job
+            job_metrics = usage_metrics(usage, compaction)
 
-            # 3. Hash
-            file_hash = self.calculate_hash(file_content)
-            
             # 4. Generate & Upload PDF (REMOVED as per V17 Flow - On Demand Only)
             output_link = None
 
@@ -257,7 +337,7 @@ class ProcessorService:
                     'title': getattr(data, 'titulo', None),
                     'summary': getattr(data, 'summary', None) or getattr(data, 'summary_text', None)
                 }
-                self._update_job_status(job_id, JobStatus.COMPLETED, result=final_result)
+                self._update_job_status(job_id, JobStatus.COMPLETED, result=final_result, metrics=job_metrics)
 
             # Move successfully processed file to backup
             self._move_to_backup_if_drive_file(file_id, filename, reason="processed")
@@ -280,7 +360,7 @@ class ProcessorService:
             self._log_trace(file_id, "ERROR", "FAILED", error_obj['user_msg'], details=error_obj)
 
             if job_id:
-                self._update_job_status(job_id, JobStatus.FAILED, error_data=error_obj)
+                self._update_job_status(job_id, JobStatus.FAILED, error_data=error_obj, metrics=job_metrics)
 
             try:
                 if not file_id.startswith('gcs:') and not file_id.startswith('upload:'):
@@ -291,6 +371,10 @@ class ProcessorService:
 
             raise # Re-raise to let caller (app.py) know it failed
 
+        finally:
+            # Grava as entradas de trace ainda no buffer (ex: COMPLETED, BACKUP)
+            trace_writer.flush(file_id)
+
     def _move_to_backup_if_drive_file(self, file_id, filename, reason="processed"):
         """Move Drive file to backup folder if it's a real Drive file (not upload: or gcs:)"""
         # Skip if not a Drive file
@@ -302,6 +386,11 @@ class ProcessorService:
             logger.warning(f"Backup folder not configured, skipping move for {filename}")
             return
 
+        pending = getattr(self._local, 'backup_moves', None)
+        if pending is not None:
+            pending[file_id] = (filename, reason)
+            return
+
         try:
             self.drive_service.move_file(file_id, self.folder_backup)
             logger.info(f"📦 Arquivo {reason} movido para backup: {filename}")
@@ -310,114 +399,50 @@ class ProcessorService:
             logger.warning(f"⚠️ Falha ao mover {filename} para backup: {move_error}")
             self._log_trace(file_id, "BACKUP", "WARNING", f"Falha ao mover para backup: {str(move_error)}")
 
-    def _update_job_metrics(self, job_id, usage):
-        """Update job metrics independently of main session"""
-        from src.models_db import Job
-        session = database.db_session()
+    @contextmanager
+    def batched_backup_moves(self, parents=None):
+        """
+        Durante o bloco, os moves para a pasta de backup (nesta thread) são
+        acumulados e feitos ao final com drive_service.move_files, em batch.
+        `parents` (id -> pais atuais) evita a leitura dos metadados.
+        """
+        if getattr(self._local, 'backup_moves', None) is not None:
+            yield  # bloco externo já acumula
+            return
+        pending = self._local.backup_moves = {}
         try:
-            job = session.query(Job).get(job_id)
-            if job:
-                job.cost_tokens_input = usage.get('prompt_tokens', 0)
-                job.cost_tokens_output = usage.get('completion_tokens', 0)
-                job.api_calls_count = (job.api_calls_count or 0) + 1
-                
-                # Costs
-                cost_in = (job.cost_tokens_input / 1_000_000) * 0.15
-                cost_out = (job.cost_tokens_output / 1_000_000) * 0.60
-                job.cost_input_usd = cost_in
-                job.cost_output_usd = cost_out
-                job.cost_input_brl = cost_in * 6.0
-                job.cost_output_brl = cost_out * 6.0
-                
-                job.result_payload = {'usage': usage}
-                session.commit()
-                logger.info(f"Job {job_id} metrics updated.")
-            else:
-                logger.warning(f"Job {job_id} not found in DB during metric update.")
-        except Exception as e:
-            logger.error(f"Failed to update job metrics {job_id}: {e}")
-            session.rollback()
+            yield
         finally:
-            session.close()
+            self._local.backup_moves = None
+            self._flush_backup_moves(pending, parents or {})
 
-    def _update_job_status(self, job_id, status, error_data=None, result=None):
-        """Update job status independently"""
-        from src.models_db import Job, JobStatus # Re-import locally to be safe
-        session = database.db_session()
+    def _flush_backup_moves(self, pending, parents):
+        if not pending:
+            return
         try:
-            job = session.query(Job).get(job_id)
-            if job:
-                # Handle String vs Enum
-                if isinstance(status, str):
-                    try:
-                        status = JobStatus(status)
-                    except:
-                        # Fallback try mapping
-                        status = JobStatus[status] if status in JobStatus.__members__ else status
-
-                job.status = status
-                if status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.SKIPPED]:
-                    job.finished_at = datetime.utcnow()
-
-                # [FIX] Robust error logging
-                if error_data:
-                    try:
-                        # Ensure error_data is a dict
-                        if not isinstance(error_data, dict):
-                            error_data = {"code": "ERR_9001", "admin_msg": str(error_data), "user_msg": "Erro desconhecido"}
-
-                        # Get existing errors (parse if JSON string, or start empty list)
-                        existing_errors = []
-                        if job.error_log:
-                            try:
-                                # Try to parse as JSON array first
-                                existing_errors = json.loads(job.error_log)
-                                if not isinstance(existing_errors, list):
-                                    # If it's a string or other type, convert to list
-                                    existing_errors = [existing_errors]
-                            except json.JSONDecodeError:
-                                # If parsing fails, treat as legacy string format
-                                existing_errors = [{"legacy_error": job.error_log}]
-
-                        # Append new error with timestamp
-                        error_entry = {
-                            "timestamp": datetime.utcnow().isoformat(),
-                            **error_data
-                        }
-                        existing_errors.append(error_entry)
-
-                        # Save as JSON array
-                        job.error_log = json.dumps(existing_errors, ensure_ascii=False)
-
-                        logger.info(f"Error logged for job {job_id}: {error_data.get('code', 'UNKNOWN')}")
-                    except Exception as error_log_exception:
-                        # If error logging fails, at least save something
-                        logger.error(f"Failed to log structured error for job {job_id}: {error_log_exception}")
-                        job.error_log = json.dumps([{
-                            "timestamp": datetime.utcnow().isoformat(),
-                            "code": "ERR_9001",
-                            "admin_msg": f"Error logging failed: {str(error_log_exception)}",
-                            "user_msg": "Erro ao registrar erro (sistema instável)",
-                            "original_error": str(error_data)
-                        }], ensure_ascii=False)
-
-                if result:
-                    # Merge with existing payload
-                    current_payload = job.result_payload or {}
-                    # If current is not dict (rare), force it
-                    if not isinstance(current_payload, dict): current_payload = {}
-                    current_payload.update(result)
-                    job.result_payload = current_payload
-
-                session.commit()
-                logger.info(f"Job {job_id} status updated to {status}.")
-            else:
-                logger.warning(f"Job {job_id} not found for status update.")
+            moved, errors = self.drive_service.move_files(
+                list(pending), self.folder_backup, parents={k: parents.get(k) for k in pending}
+            )
         except Exception as e:
-            logger.error(f"Failed to update job status {job_id}: {e}")
-            session.rollback()
-        finally:
-            session.close()
+            moved, errors = [], {file_id: e for file_id in pending}
+
+        for file_id in moved:
+            filename, reason = pending[file_id]
+            logger.info(f"📦 Arquivo {reason} movido para backup: {filename}")
+            self._log_trace(file_id, "BACKUP", "SUCCESS", f"Arquivo movido para pasta de backup ({reason})")
+        for file_id, move_error in errors.items():
+            filename, _ = pending[file_id]
+            logger.warning(f"⚠️ Falha ao mover {filename} para backup: {move_error}")
+            self._log_trace(file_id, "BACKUP", "WARNING", f"Falha ao mover para backup: {str(move_error)}")
+        for file_id in pending:
+            trace_writer.flush(file_id)
+
+    def _update_job_status(self, job_id, status, error_data=None, result=None, metrics=None):
+        """Update job status, metrics and errors in a single transition (see JobTracker)."""
+        try:
+            job_tracker.transition(job_id, status, error=error_data, metrics=metrics, result=result)
+        except Exception as e:
+            logger.error(f"Failed to update job {job_id} to {status}: {e}")
 
     def extract_text_from_pdf_bytes(self, file_content: bytes) -> str:
         try:
@@ -482,6 +507,136 @@ class ProcessorService:
             end = len(pdf_text)
         return pdf_text[start:end]
 
+    def _section_analysis_prompt(self) -> str:
+        """Prompt para análise focada em seções (retry de áreas faltantes e modo por seção)."""
+        return f"""Você é um Auditor Sanitário. Analise SOMENTE as seções abaixo e extraia os itens NÃO CONFORMES e PARCIALMENTE CONFORMES.
+
+REGRAS:
+- "Resposta: Parcial" = "Parcialmente Conforme" → INCLUIR
+- "Resposta: Não" com "(0.00% - 0.00 pontos)" em pergunta POSITIVA = "Não Conforme" → INCLUIR
+- "Resposta: Não" em pergunta NEGATIVA (ex: "Foram encontrados produtos vencidos?") com pontuação > 0 = Conforme → NÃO INCLUIR
+- "Resposta: Sim" com "(0.00% - 0.00 pontos)" em pergunta NEGATIVA = "Não Conforme" → INCLUIR
+- Item com "Fotos da questão" ou "Comentário:" com evidência de problema = INCLUIR
+- Para cada item: inclua item_verificado, status, observacao, fundamento_legal, acao_corretiva_sugerida, prazo_sugerido
+
+Retorne um JSON com areas_inspecionadas contendo SOMENTE as áreas analisadas. Use o nome EXATO de cada área.
+Os campos nome_estabelecimento, resumo_geral, pontuacao_geral, pontuacao_maxima_geral, aproveitamento_geral podem ser preenchidos com valores placeholder.
+
+JSON Schema:
+{CHECKLIST_SCHEMA_JSON}"""
+
+    def _analyze_with_local_parser(self, pdf_text: str):
+        """
+        Extrai áreas e itens NC/parciais localmente (report_parser) e usa a IA apenas
+        para enriquecer cada item com fundamento legal, ação corretiva e prazo.
+        A completude é exata: todo item extraído aparece no resultado.
+        Retorna None quando o texto não segue o formato esperado (caller usa o modo single).
+        """
+        from src.models import AreaInspecao, ChecklistItem
+        from src.services.report_parser import ParsedArea, parse_report_text
+
+        report = parse_report_text(pdf_text)
+        if not report.is_usable():
+            logger.warning("Local parser could not recognize report structure, falling back to single mode")
+            return None
+
+        areas = [a for a in report.areas if a.items]
+        logger.info(f"Local parser: {len(areas)} areas, {len(report.items)} candidate items")
+
+        prompt = f"""Você é um Auditor Sanitário Sênior, especialista na legislação brasileira (RDC 216/2004, CVS-5/2013).
+Os itens NÃO CONFORMES e PARCIALMENTE CONFORMES já foram extraídos do relatório. Para CADA item recebido, retorne:
+- id: exatamente o identificador recebido entre colchetes
+- status: mantenha o status recebido. Apenas itens marcados [VERIFICAR] podem ser 'Conforme' se a foto/comentário não indicar problema.
+- observacao: evidência objetiva (inclua o comentário do auditor quando houver)
+- fundamento_legal, acao_corretiva_sugerida e prazo_sugerido (Imediato, 24 horas, 7 dias, 15 dias, 30 dias)
+Também preencha nome_estabelecimento, data_inspecao, resumo_geral, pontos_fortes e um resumo por área.
+Os valores devem ser texto puro (sem markdown).
+
+JSON Schema:
+{ENRICHMENT_SCHEMA_JSON}"""
+
+        def _items_listing(target_areas):
+            lines = []
+            for area in target_areas:
+                lines.append(f"\nÁREA: {area.name} ({area.score}/{area.max_score} = {area.pct}%)")
+                for item in area.items:
+                    extra = f" | Comentário: {item.comment}" if item.comment else ""
+                    extra += " | Possui fotos" if item.has_photos else ""
+                    review = " [VERIFICAR]" if item.needs_review else ""
+                    lines.append(f"[{item.number}] {item.status}{review} | {item.question} | Resposta: {item.answer}{extra}")
+            return "\n".join(lines)
+
+        header = pdf_text[:1500]
+        enrichment, usage = self._parse_completion(
+            prompt,
+            f"Cabeçalho do relatório:\n{header}\n\nItens extraídos:{_items_listing(areas)}",
+            response_format=EnriquecimentoRelatorio,
+        )
+        enriched = {e.id.strip().strip('[]'): e for e in enrichment.itens}
+
+        # Itens sem enriquecimento: uma nova chamada só com eles
+        missing_areas = []
+        for area in areas:
+            missing = [i for i in area.items if i.number not in enriched]
+            if missing:
+                missing_areas.append(ParsedArea(name=area.name, score=area.score, max_score=area.max_score, pct=area.pct, items=missing))
+        if missing_areas:
+            logger.warning(f"Enrichment missing {sum(len(a.items) for a in missing_areas)} items. Retrying...")
+            try:
+                retry, retry_usage = self._parse_completion(
+                    prompt, f"Itens extraídos:{_items_listing(missing_areas)}",
+                    response_format=EnriquecimentoRelatorio,
+                )
+                for key, value in retry_usage.items():
+                    usage[key] = usage.get(key, 0) + value
+                for e in retry.itens:
+                    enriched.setdefault(e.id.strip().strip('[]'), e)
+            except Exception as e:
+                logger.error(f"Enrichment retry failed: {e}")
+
+        area_summaries = {a.nome_area.strip().lower(): a.resumo_area for a in enrichment.resumos_areas}
+        result_areas = []
+        for area in areas:
+            itens = []
+            for item in area.items:
+                e = enriched.get(item.number)
+                status = e.status if (e and item.needs_review) else item.status
+                if status == 'Conforme':
+                    continue
+                itens.append(ChecklistItem(
+                    item_verificado=item.item_verificado,
+                    status=status,
+                    pontuacao=item.score_points,
+                    observacao=(e.observacao if e else '') or item.comment or item.question,
+                    fundamento_legal=e.fundamento_legal if e else '',
+                    acao_corretiva_sugerida=e.acao_corretiva_sugerida if e else '',
+                    prazo_sugerido=e.prazo_sugerido if e else '',
+                ))
+            if itens:
+                result_areas.append(AreaInspecao(
+                    nome_area=area.name,
+                    resumo_area=area_summaries.get(area.name.strip().lower(), ''),
+                    pontuacao_obtida=area.score,
+                    pontuacao_maxima=area.max_score,
+                    aproveitamento=area.pct,
+                    itens=itens,
+                ))
+
+        data = ChecklistSanitario(
+            nome_estabelecimento=enrichment.nome_estabelecimento,
+            resumo_geral=enrichment.resumo_geral,
+            pontuacao_geral=report.total_score,
+            pontuacao_maxima_geral=report.total_max,
+            aproveitamento_geral=report.total_pct,
+            data_inspecao=enrichment.data_inspecao,
+            pontos_fortes=enrichment.pontos_fortes,
+            areas_inspecionadas=result_areas,
+        )
+        return {
+            'data': data,
+            'usage': usage
+        }
+
     def _validate_and_retry_missing_areas(self, data, areas_below_100, pdf_text, total_usage):
         """Check if AI response covers all expected areas; retry for missing ones."""
         if not areas_below_100:
@@ -520,22 +675,7 @@ class ProcessorService:
             return data, total_usage
 
         # Focused retry for missing areas
-        from src.models import AreaInspecao
-        retry_prompt = f"""Você é um Auditor Sanitário. Analise SOMENTE as seções abaixo e extraia os itens NÃO CONFORMES e PARCIALMENTE CONFORMES.
-
-REGRAS:
-- "Resposta: Parcial" = "Parcialmente Conforme" → INCLUIR
-- "Resposta: Não" com "(0.00% - 0.00 pontos)" em pergunta POSITIVA = "Não Conforme" → INCLUIR
-- "Resposta: Não" em pergunta NEGATIVA (ex: "Foram encontrados produtos vencidos?") com pontuação > 0 = Conforme → NÃO INCLUIR
-- "Resposta: Sim" com "(0.00% - 0.00 pontos)" em pergunta NEGATIVA = "Não Conforme" → INCLUIR
-- Item com "Fotos da questão" ou "Comentário:" com evidência de problema = INCLUIR
-- Para cada item: inclua item_verificado, status, observacao, fundamento_legal, acao_corretiva_sugerida, prazo_sugerido
-
-Retorne um JSON com areas_inspecionadas contendo SOMENTE as áreas analisadas. Use o nome EXATO de cada área.
-Os campos nome_estabelecimento, resumo_geral, pontuacao_geral, pontuacao_maxima_geral, aproveitamento_geral podem ser preenchidos com valores placeholder.
-
-JSON Schema:
-{json.dumps(ChecklistSanitario.model_json_schema(), indent=2)}"""
+        retry_prompt = self._section_analysis_prompt()
 
         try:
             retry_completion = self.client.beta.chat.completions.parse(
@@ -548,16 +688,11 @@ JSON Schema:
             )
 
             retry_data = retry_completion.choices[0].message.parsed
-            retry_usage = {
-                'prompt_tokens': retry_completion.usage.prompt_tokens,
-                'completion_tokens': retry_completion.usage.completion_tokens,
-                'total_tokens': retry_completion.usage.total_tokens
-            }
+            retry_usage = completion_usage(retry_completion)
 
             # Merge usage
-            total_usage['prompt_tokens'] += retry_usage['prompt_tokens']
-            total_usage['completion_tokens'] += retry_usage['completion_tokens']
-            total_usage['total_tokens'] += retry_usage['total_tokens']
+            for key, value in retry_usage.items():
+                total_usage[key] = total_usage.get(key, 0) + value
 
             # Merge areas that have actual items
             added = 0
@@ -577,99 +712,164 @@ JSON Schema:
 
         return data, total_usage
 
-    def analyze_with_openai(self, file_content: bytes):
-        pdf_text = self.extract_text_from_pdf_bytes(file_content)
+    def _prompt_version(self) -> str:
+        """Versão usada na chave dos checkpoints de IA (cada modo de análise tem seu resultado)."""
+        suffix = "-compact" if self._compaction_enabled() else ""
+        return f"{PROMPT_VERSION}-{self._analysis_mode()}{suffix}"
+
+    def _compaction_enabled(self) -> bool:
+        """AI_PROMPT_COMPACTION: remove itens conformes/boilerplate do texto enviado (default: ligado)."""
+        return str(get_config("AI_PROMPT_COMPACTION", "true")).strip().lower() in ('true', '1', 'yes')
+
+    def _analysis_mode(self) -> str:
+        """
+        'single' (uma chamada com o relatório inteiro), 'sections' (paralelo por área)
+        ou 'local' (pré-parser determinístico + IA só para enriquecer os itens).
+        """
+        mode = (get_config("AI_ANALYSIS_MODE", "single") or "single").strip().lower()
+        return mode if mode in ('single', 'sections', 'local') else 'single'
+
+    def _parse_completion(self, system_prompt, user_content, timeout=None, response_format=ChecklistSanitario):
+        """Executa uma chamada de Structured Output e retorna (data, usage)."""
+        kwargs = {'timeout': timeout} if timeout else {}
+        completion = self.client.beta.chat.completions.parse(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            response_format=response_format,
+            **kwargs
+        )
+        return completion.choices[0].message.parsed, completion_usage(completion)
+
+    def _analyze_by_sections(self, pdf_text: str, areas_below_100: list):
+        """
+        Analisa cada área < 100% em uma chamada separada, em paralelo.
+        Uma chamada extra (cabeçalho + tabela resumo) preenche os campos gerais.
+        Latência ~ seção mais lenta; usage é a soma de todas as chamadas.
+        Áreas cuja chamada falhar são tratadas por _validate_and_retry_missing_areas.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        concurrency = max(1, int(get_config("AI_SECTION_CONCURRENCY", "4")))
+        timeout = float(get_config("AI_SECTION_TIMEOUT", "90"))
+
+        section_prompt = self._section_analysis_prompt()
+        header_prompt = f"""Você é um Auditor Sanitário Sênior, especialista na legislação brasileira (RDC 216/2004, CVS-5/2013).
+Extraia do cabeçalho e da tabela resumo "Notas por tópico" do relatório:
+- nome_estabelecimento e data_inspecao (DD/MM/AAAA)
+- pontuacao_geral, pontuacao_maxima_geral e aproveitamento_geral
+- resumo_geral: parágrafo robusto indicando as principais áreas críticas
+- pontos_fortes: boas práticas observadas
+Retorne areas_inspecionadas como lista VAZIA. Os valores devem ser texto puro (sem markdown).
+
+JSON Schema:
+{CHECKLIST_SCHEMA_JSON}"""
+
+        areas_list = "\n".join([f"- {a['name']} ({a['score']}/{a['max']} = {a['pct']}%)" for a in areas_below_100])
+        header_input = f"Áreas com aproveitamento < 100%:\n{areas_list}\n\nInício do relatório:\n{pdf_text[:4000]}"
+
+        # Agrupa áreas: com seção localizada (1 chamada cada) e sem seção (1 chamada com o texto completo)
+        section_inputs = []
+        unlocated = []
+        for area in areas_below_100:
+            section = self._extract_section_text(pdf_text, area['name'])
+            if section:
+                section_inputs.append((area, f"--- SEÇÃO: {area['name']} ({area['score']}/{area['max']} = {area['pct']}%) ---\n{section}"))
+            else:
+                unlocated.append(area)
+
+        logger.info(f"Section analysis: {len(section_inputs)} sections, {len(unlocated)} unlocated, concurrency={concurrency}")
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            header_future = executor.submit(self._parse_completion, header_prompt, header_input, timeout)
+            section_futures = [
+                (area, executor.submit(
+                    self._parse_completion, section_prompt,
+                    f"Analise esta seção e extraia todos os itens com problema:\n{text}", timeout
+                ))
+                for area, text in section_inputs
+            ]
+            if unlocated:
+                names = ", ".join(a['name'] for a in unlocated)
+                section_futures.append((None, executor.submit(
+                    self._parse_completion, section_prompt,
+                    f"Analise SOMENTE as áreas: {names}. Extraia todos os itens com problema:\n{pdf_text}", timeout
+                )))
+
+        total_usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0, 'cached_tokens': 0}
+
+        def _add_usage(usage):
+            for key in total_usage:
+                total_usage[key] += usage.get(key, 0)
+
+        # Campos gerais são obrigatórios: sem eles não há relatório
+        data, header_usage = header_future.result()
+        _add_usage(header_usage)
+        data.areas_inspecionadas = []
+
+        for area, future in section_futures:
+            try:
+                section_data, usage = future.result()
+            except Exception as e:
+                label = area['name'] if area else 'áreas sem seção'
+                logger.warning(f"Section analysis failed for {label}: {e}")
+                continue
+            _add_usage(usage)
+            for parsed_area in section_data.areas_inspecionadas:
+                if parsed_area.itens:
+                    data.areas_inspecionadas.append(parsed_area)
+
+        # Completa áreas que falharam/timeout com o retry focado existente
+        return_data, total_usage = self._validate_and_retry_missing_areas(data, areas_below_100, pdf_text, total_usage)
+        return {
+            'data': return_data,
+            'usage': total_usage
+        }
+
+    def analyze_with_openai(self, file_content: bytes, pdf_text: str = None):
+        if pdf_text is None:
+            pdf_text = self.extract_text_from_pdf_bytes(file_content)
         if not pdf_text.strip():
             raise ValueError("PDF vazio ou sem texto detectável.")
 
-        # Updated Prompt: Uses user's trusted approach (Areas) + our requirements (Action/Deadline)
-        schema_json = ChecklistSanitario.model_json_schema()
+        mode = self._analysis_mode()
+
+        # [A/B] Pré-parser local: IA só enriquece os itens já extraídos (AI_ANALYSIS_MODE=local)
+        if mode == 'local':
+            local_result = self._analyze_with_local_parser(pdf_text)
+            if local_result:
+                return local_result
 
         # Pre-process: extract areas with < 100% from summary table to enforce completeness
         areas_below_100 = self._extract_areas_below_100(pdf_text)
+
+        # [A/B] Modo por seção: uma chamada por área em paralelo (AI_ANALYSIS_MODE=sections)
+        if areas_below_100 and mode == 'sections':
+            return self._analyze_by_sections(pdf_text, areas_below_100)
+
         areas_instruction = ""
         if areas_below_100:
-            areas_list = "\n".join([f"        - {a['name']} ({a['score']}/{a['max']} = {a['pct']}%)" for a in areas_below_100])
-            areas_instruction = f"""
-        ÁREAS OBRIGATÓRIAS (extraídas da tabela resumo do relatório):
-        As seguintes {len(areas_below_100)} áreas possuem aproveitamento < 100% e DEVEM OBRIGATORIAMENTE aparecer em areas_inspecionadas com seus itens não conformes:
+            areas_list = "\n".join([f"- {a['name']} ({a['score']}/{a['max']} = {a['pct']}%)" for a in areas_below_100])
+            areas_instruction = f"""ÁREAS OBRIGATÓRIAS (extraídas da tabela resumo do relatório):
+As seguintes {len(areas_below_100)} áreas possuem aproveitamento < 100% e DEVEM OBRIGATORIAMENTE aparecer em areas_inspecionadas com seus itens não conformes:
 {areas_list}
-        Se alguma dessas áreas estiver faltando na sua resposta, sua análise está INCOMPLETA e INCORRETA.
-"""
+Se alguma dessas áreas estiver faltando na sua resposta, sua análise está INCOMPLETA e INCORRETA.
 
-        prompt = f"""
-        Você é um Auditor Sanitário Sênior, especialista na legislação brasileira (RDC 216/2004, CVS-5/2013).
-        Sua tarefa é analisar o texto COMPLETO do relatório de auditoria e transformá-lo em um CHECKLIST DE PLANO DE AÇÃO ESTRUTURADO, cobrindo TODAS as áreas do relatório.
-
-        FORMATO DO RELATÓRIO DE ENTRADA:
-        O relatório possui uma tabela resumo "Notas por tópico" no início, com cada área e seu aproveitamento.
-        Em seguida, os itens de cada área seguem este padrão:
-        - Número e pergunta do item, seguido de "(X.XX% - X.XX pontos)" que indica a pontuação OBTIDA naquele item
-        - "Resposta: Sim/Não/Parcial/N.A./Não Aplicável/Não aplicável"
-        - Opcionalmente: "Fotos da questão X.X" (indica evidência fotográfica de problema)
-        - Opcionalmente: "Comentário: ..." (observação do auditor in-loco)
-
-        REGRAS DE CLASSIFICAÇÃO DOS ITENS:
-        1. "Resposta: Parcial" = SEMPRE "Parcialmente Conforme" → INCLUIR OBRIGATORIAMENTE
-        2. "Resposta: Não" com pontuação "(0.00% - 0.00 pontos)" em pergunta POSITIVA = "Não Conforme" → INCLUIR
-        3. "Resposta: Não" em perguntas NEGATIVAS (ex: "Foram encontrados produtos vencidos?", "Há outras inconformidades?", "Percepção de inconformidade?") onde "Não" = ausência de problema E pontuação > 0 = Conforme → NÃO INCLUIR
-        4. "Resposta: Sim" com pontuação > 0 em pergunta POSITIVA (ex: "Está limpo?", "Está adequado?") = Conforme → NÃO INCLUIR
-        5. "Resposta: Sim" com pontuação "(0.00% - 0.00 pontos)" em pergunta NEGATIVA (ex: "Foram encontrados produtos vencidos?", "Percepção de inconformidade?") = O "Sim" confirma a existência do PROBLEMA → "Não Conforme" → INCLUIR OBRIGATORIAMENTE
-        6. "Resposta: Sim" em qualquer pergunta com Fotos ou Comentário de problema = "Não Conforme" → INCLUIR OBRIGATORIAMENTE
-        7. "Resposta: N.A." ou "Não Aplicável" ou "Não aplicável" = Não se aplica → NÃO INCLUIR
-        8. Se o item possui "Fotos da questão" ou "Comentário:" com evidência de problema = INCLUIR OBRIGATORIAMENTE como "Não Conforme" ou "Parcialmente Conforme"
-{areas_instruction}
-        REGRA DE COMPLETUDE (CRÍTICA - MÁXIMA PRIORIDADE):
-        - Você DEVE processar o relatório INTEIRO do início ao fim, seção por seção.
-        - Você DEVE capturar ABSOLUTAMENTE TODOS os itens não conformes e parcialmente conformes de TODAS as áreas.
-        - NÃO pare após processar a primeira área. Continue até a última área do relatório.
-        - NÃO resuma. NÃO agrupe itens similares. NÃO pule nenhum item.
-        - Cada item com problema deve aparecer como um ChecklistItem individual na área correspondente.
-        - MESMO que uma área tenha apenas 1 item com problema, ela DEVE ser incluída.
-
-        DIRETRIZES:
-        1. Identifique o Estabelecimento e a DATA DA INSPEÇÃO (Checklist Base).
-        2. Crie um Resumo Geral robusto indicando as principais áreas críticas.
-        3. Calcule ou extraia a PONTUAÇÃO GERAL e o APROVEITAMENTO GERAL do relatório.
-        4. Para cada ÁREA FÍSICA com aproveitamento < 100%:
-           - Use o nome da área EXATAMENTE como aparece no relatório (ex: 'Cozinha / Área de Manipulação', 'Estoque / Depósito', 'Sanitário / Vestiário de Funcionários').
-           - Extraia 'pontuacao_obtida', 'pontuacao_maxima' e 'aproveitamento' da tabela resumo.
-           - Liste TODOS os itens não conformes e parcialmente conformes desta área.
-        5. Para cada item com problema:
-           - item_verificado: Use o número e texto da pergunta original (ex: "2.1 - HIGIENIZAÇÃO: A área de manipulação...").
-           - Status: 'Não Conforme' ou 'Parcialmente Conforme'.
-           - Observação: Descreva a evidência. Se houver "Comentário:" do auditor, INCLUA-o na observação.
-           - Fundamento Legal: Cite a legislação específica (RDC 216/2004, CVS-5/2013, etc.).
-           - Ação Corretiva: Sugira a correção técnica IMEDIATA.
-           - Prazo Sugerido: Baseado no risco (Imediato, 24 horas, 7 dias, 15 dias, 30 dias).
-
-        REGRA CRÍTICA - O QUE NÃO É ÁREA:
-        NÃO inclua como área seções que são metadados:
-        - "Inconformidades resolvidas", "Acompanhante de visita", "Comentários gerais e observações"
-        - Qualquer seção sem pontuação numérica real
-
-        Sua resposta deve ser APENAS o objeto JSON compatível com o schema abaixo.
-        IMPORTANTE: Os valores dentro do JSON devem ser texto puro (sem markdown).
-
-        JSON Schema:
-        {json.dumps(schema_json, indent=2)}
-        """
+"""
 
         try:
             completion = self.client.beta.chat.completions.parse(
                 model=self.model_name,
                 messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": f"Analise o relatório COMPLETO abaixo. Processe TODAS as {len(areas_below_100)} áreas com problemas identificadas na tabela resumo.\n\n{pdf_text}"}
+                    {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"{areas_instruction}Analise o relatório COMPLETO abaixo. Processe TODAS as {len(areas_below_100)} áreas com problemas identificadas na tabela resumo.\n\n{pdf_text}"}
                 ],
                 response_format=ChecklistSanitario,
             )
 
-            usage = {
-                'prompt_tokens': completion.usage.prompt_tokens,
-                'completion_tokens': completion.usage.completion_tokens,
-                'total_tokens': completion.usage.total_tokens
-            }
+            usage = completion_usage(completion)
 
             data = completion.choices[0].message.parsed
 
@@ -700,11 +900,8 @@ JSON Schema:
             # Pass data as 'relatorio' to match template
             html_out = template.render(relatorio=data, data_geracao=datetime.now(tz=BRAZIL_TZ).strftime("%d/%m/%Y"))
             
-            css = []
-            if os.path.exists('src/templates/style.css'):
-                css.append(CSS('src/templates/style.css'))
-                
-            HTML(string=html_out, base_url="src/templates").write_pdf(temp_pdf, stylesheets=css)
+            font_config, css = self.render_context.stylesheets()
+            HTML(string=html_out, base_url="src/templates").write_pdf(temp_pdf, stylesheets=css, font_config=font_config)
             
             # Local Backup for Verification (Run BEFORE upload to ensure capture even if upload fails)
             local_output_dir = "data/output"
@@ -773,6 +970,53 @@ JSON Schema:
         clean = re.sub(r'[^a-zA-Z0-9\s]', ' ', only_ascii)
         return re.sub(r'\s+', ' ', clean).strip().upper()
 
+    def _build_action_plan_item_rows(self, action_plan_id, areas):
+        """
+        Monta os itens do plano como mapeamentos simples para insert em lote
+        e calcula as estatísticas por setor na mesma passada.
+        Retorna (rows, total_items, total_nc, sector_stats).
+        """
+        rows = []
+        total_items = 0
+        total_nc = 0
+        sector_stats = {}
+        for area in areas:
+            area_nc_count = 0
+            logger.info(f"  📂 Area: {area.nome_area} ({len(area.itens)} items)")
+            for idx, item in enumerate(area.itens):
+                total_items += 1
+
+                is_nc = "não conforme" in item.status.lower() or "parcialmente" in item.status.lower()
+                if is_nc:
+                    total_nc += 1
+                    area_nc_count += 1
+
+                rows.append({
+                    'id': uuid.uuid4(),
+                    'action_plan_id': action_plan_id,
+                    'problem_description': item.observacao,
+                    'sector': area.nome_area,  # VITAL: Use Area Name as Sector
+                    # Determine Severity (Default based on logic or Prompt could give it)
+                    'severity': SeverityLevel.HIGH if is_nc else SeverityLevel.LOW,
+                    'status': ActionPlanItemStatus.OPEN if is_nc else ActionPlanItemStatus.RESOLVED,
+                    # [V16] Persist AI Metadata
+                    'original_status': item.status,
+                    'original_score': getattr(item, 'pontuacao', 0) or 0.0,  # Force 0.0 if None
+                    'legal_basis': item.fundamento_legal,
+                    'corrective_action': item.acao_corretiva_sugerida,
+                    'ai_suggested_deadline': item.prazo_sugerido,
+                    'order_index': idx,  # Persist sorting order
+                })
+
+            sector_stats[area.nome_area] = {
+                "nc_count": area_nc_count,
+                "resumo_area": area.resumo_area,
+                "pontuacao": area.pontuacao_obtida,
+                "maximo": area.pontuacao_maxima,
+                "aproveitamento": area.aproveitamento
+            }
+        return rows, total_items, total_nc, sector_stats
+
     def _save_to_db_logic(self, report_data: ChecklistSanitario, file_id, filename, output_link, file_hash, company_id=None, override_est_id=None):
         """Save structured ChecklistSanitario (Nested) to Flat DB Models"""
         session = database.db_session()
@@ -892,61 +1136,23 @@ JSON Schema:
             action_plan.summary_text = report_data.resumo_geral
             action_plan.strengths_text = report_data.pontos_fortes or ""
             
-            # Calculate Stats (Total Items, NCs, By Sector)
-            total_items = 0
-            total_nc = 0
-            sector_stats = {}
-            
             # Clear old items (if re-processing)
-            deleted_count = session.query(ActionPlanItem).filter_by(action_plan_id=action_plan.id).delete()
+            if action_plan.id is None:
+                session.flush()  # ActionPlan novo: precisa do id para os itens
+            plan_repo = ActionPlanRepository(session)
+            deleted_count = plan_repo.delete_items_for_plan(action_plan.id)
             logger.info(f"🗑️ Deleted {deleted_count} old items")
-            
-            # ITERATE AREAS (The User's Nested Structure)
+
+            # ITERATE AREAS (The User's Nested Structure): linhas + stats na mesma passada
             logger.info(f"🔍 Iterating {len(report_data.areas_inspecionadas)} areas")
-            for area in report_data.areas_inspecionadas:
-                area_nc_count = 0
-                logger.info(f"  📂 Area: {area.nome_area} ({len(area.itens)} items)")
-                for idx, item in enumerate(area.itens):
-                    total_items += 1
-                    
-                    is_nc = "não conforme" in item.status.lower() or "parcialmente" in item.status.lower()
-                    status_db = ActionPlanItemStatus.OPEN if is_nc else ActionPlanItemStatus.RESOLVED
-                    
-                    if is_nc:
-                        total_nc += 1
-                        area_nc_count += 1
-                    
-                    # Determine Severity (Default based on logic or Prompt could give it)
-                    severity = SeverityLevel.HIGH if is_nc else SeverityLevel.LOW
-                    
-                    db_item = ActionPlanItem(
-                        id=uuid.uuid4(),
-                        action_plan=action_plan,
-                        problem_description=item.observacao,
-                        sector=area.nome_area, # VITAL: Use Area Name as Sector
-                        severity=severity,
-                        status=status_db,
-                        
-                        # [V16] Persist AI Metadata
-                        # [V16] Persist AI Metadata
-                        original_status=item.status,
-                        original_score=getattr(item, 'pontuacao', 0) or 0.0, # Force 0.0 if None
-
-                        legal_basis=item.fundamento_legal,
-                        corrective_action=item.acao_corretiva_sugerida,
-                        ai_suggested_deadline=item.prazo_sugerido,
-                        order_index=idx # Persist sorting order
-                    )
-                    session.add(db_item)
-                
-                sector_stats[area.nome_area] = {
-                    "nc_count": area_nc_count,
-                    "resumo_area": area.resumo_area,
-                    "pontuacao": area.pontuacao_obtida,
-                    "maximo": area.pontuacao_maxima,
-                    "aproveitamento": area.aproveitamento
-                }
-            
+            item_rows, total_items, total_nc, sector_stats = self._build_action_plan_item_rows(
+                action_plan.id, report_data.areas_inspecionadas
+            )
+            plan_repo.bulk_insert_items(
+                item_rows, copy_threshold=int(get_config("ACTION_PLAN_COPY_THRESHOLD", "500"))
+            )
+            logger.info(f"💾 Inserted {len(item_rows)} items (bulk)")
+
             # Save Stats to JSON (recalculate percentage from actual scores)
             score = report_data.pontuacao_geral
             max_score = report_data.pontuacao_maxima_geral
@@ -961,8 +1167,10 @@ JSON Schema:
                 "by_sector": sector_stats
             }
             logger.info(f"📊 Stats generated: {total_items} items, {total_nc} NCs")
-            
+            InspectionRepository(session).refresh_summary(inspection, action_plan)
+
             session.commit()
+            pdf_cache.invalidate(file_id)  # reprocessamento: descarta PDFs renderizados do plano anterior
             logger.info("✅ DB Save Success (ChecklistSanitario Structure)")
             
         except Exception as e:
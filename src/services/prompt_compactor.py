@@ -0,0 +1,165 @@
+"""
+Compactação do texto do relatório antes do envio para a IA.
+
+A maior parte do texto extraído de um relatório típico é irrelevante para o
+plano de ação: itens conformes ("Resposta: Sim" com 100% dos pontos), itens
+não aplicáveis, cabeçalhos/rodapés repetidos em cada página e legendas de
+fotos. O prompt já manda a IA ignorar esse conteúdo, então removê-lo antes
+reduz tokens, latência e custo sem alterar o resultado.
+
+Regras (conservadoras: na dúvida a linha é mantida):
+- A tabela "Notas por tópico" e os cabeçalhos de seção são sempre mantidos
+  (inclusive os que caíram dentro de um bloco de item removido).
+- Um bloco de item só é removido quando o report_parser o classifica como
+  conforme/não aplicável. Blocos sem "Resposta:" reconhecível são mantidos.
+- Numeração de página e legendas de foto são removidas; demais linhas que se
+  repetem em várias páginas (cabeçalho/rodapé) ficam apenas na 1ª ocorrência.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List
+
+from src.services.report_parser import (
+    ANSWER_RE,
+    COMMENT_RE,
+    ITEM_RE,
+    PHOTOS_RE,
+    SECTION_RE,
+    SUMMARY_ROW_RE,
+    _match_area,
+    parse_item_block,
+    parse_summary_table,
+)
+
+# "Página 3 de 40", "Pág. 3/40", "3 / 40"
+PAGE_NUMBER_RE = re.compile(r'^\s*(?:(?:p[áa]gina|p[áa]g\.?)\s*\d+(?:\s*(?:de|/)\s*\d+)?|\d+\s*/\s*\d+)\s*$', re.IGNORECASE)
+# "Foto 1", "Imagem 2 - Cozinha", "IMG_1234.jpg"
+PHOTO_CAPTION_RE = re.compile(r'^\s*(?:(?:foto|imagem|img)[\s_-]*\d+\b.*|\S+\.(?:jpe?g|png|heic))\s*$', re.IGNORECASE)
+
+# Linha repetida a partir de N ocorrências é tratada como cabeçalho/rodapé de página
+REPEATED_LINE_THRESHOLD = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens (~4 caracteres por token para texto em português)."""
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class CompactionResult:
+    text: str
+    chars_before: int
+    chars_after: int
+    tokens_before: int
+    tokens_after: int
+    removed_items: int = 0
+    removed_lines: int = 0
+
+    @property
+    def reduction_pct(self) -> float:
+        if not self.chars_before:
+            return 0.0
+        return round((1 - self.chars_after / self.chars_before) * 100, 1)
+
+    def to_dict(self) -> dict:
+        return {
+            'chars_before': self.chars_before,
+            'chars_after': self.chars_after,
+            'tokens_before': self.tokens_before,
+            'tokens_after': self.tokens_after,
+            'removed_items': self.removed_items,
+            'removed_lines': self.removed_lines,
+            'reduction_pct': self.reduction_pct,
+        }
+
+
+def _is_structural(line: str) -> bool:
+    return bool(
+        ITEM_RE.match(line) or SECTION_RE.match(line) or SUMMARY_ROW_RE.match(line)
+        or ANSWER_RE.match(line) or PHOTOS_RE.match(line) or COMMENT_RE.match(line)
+    )
+
+
+def _is_irrelevant_item(block: List[str]) -> bool:
+    """True somente quando o bloco é comprovadamente conforme ou não aplicável."""
+    item = parse_item_block(block)
+    return item is not None and item.status is None
+
+
+def compact_report_text(pdf_text: str) -> CompactionResult:
+    """Remove itens conformes e boilerplate mantendo a tabela resumo e todo bloco candidato a NC."""
+    lines = pdf_text.splitlines()
+    counts = Counter(line.strip() for line in lines if line.strip())
+    repeated = {
+        text for text, n in counts.items()
+        if n >= REPEATED_LINE_THRESHOLD and not _is_structural(text)
+    }
+
+    # 1. Boilerplate de página
+    kept: List[str] = []
+    seen_repeated = set()
+    removed_lines = 0
+    for line in lines:
+        stripped = line.strip()
+        if PAGE_NUMBER_RE.match(stripped) or PHOTO_CAPTION_RE.match(stripped):
+            removed_lines += 1
+            continue
+        if stripped in repeated:
+            if stripped in seen_repeated:
+                removed_lines += 1
+                continue
+            seen_repeated.add(stripped)
+        kept.append(line)
+
+    # 2. Blocos de itens conformes / não aplicáveis
+    areas = parse_summary_table(pdf_text)
+    output: List[str] = []
+    block: List[str] = []
+    removed_items = 0
+    in_comment = False
+
+    def flush():
+        nonlocal removed_items
+        if not block:
+            return
+        if _is_irrelevant_item(block):
+            removed_items += 1
+            output.extend(line for line in block if SECTION_RE.match(line))
+        else:
+            output.extend(block)
+        block.clear()
+
+    for line in kept:
+        if ITEM_RE.match(line):
+            flush()
+            block.append(line)
+            in_comment = False
+            continue
+        section_match = SECTION_RE.match(line)
+        if block and section_match and (
+            not in_comment or _match_area(section_match.group(2), areas)
+        ):
+            # Cabeçalho de uma área da tabela resumo encerra o comentário em aberto
+            flush()
+            in_comment = False
+        if block:
+            block.append(line)
+            if COMMENT_RE.match(line):
+                in_comment = True
+            elif ANSWER_RE.match(line) or PHOTOS_RE.match(line):
+                in_comment = False
+        elif line.strip() or (output and output[-1].strip()):
+            output.append(line)
+    flush()
+
+    text = re.sub(r'\n{3,}', '\n\n', '\n'.join(output)).strip() + '\n'
+    return CompactionResult(
+        text=text,
+        chars_before=len(pdf_text),
+        chars_after=len(text),
+        tokens_before=estimate_tokens(pdf_text),
+        tokens_after=estimate_tokens(text),
+        removed_items=removed_items,
+        removed_lines=removed_lines,
+    )
@@ -0,0 +1,353 @@
+"""
+Executor de renderização de PDF (WeasyPrint) em processos separados.
+
+O WeasyPrint é CPU-bound e segura o GIL: rodando na thread da requisição, um
+plano grande com fotos trava as outras threads do gunicorn, e com
+`--timeout 0` um documento patológico prende o worker para sempre. Aqui cada
+render vai para um processo dedicado (até PDF_RENDER_WORKERS), com:
+- fila limitada (PDF_RENDER_QUEUE): saturado, `render()` levanta
+  RenderQueueFull e a rota responde 503 + Retry-After;
+- timeout por job (PDF_RENDER_TIMEOUT_SECONDS), contado a partir do momento em
+  que o job chega a um worker pronto (a espera na fila e o warm-up não contam):
+  estourou, só o processo daquele job é encerrado;
+- reciclagem de um worker a cada N renders (PDF_RENDER_MAX_TASKS_PER_CHILD) ou
+  quando o pico de memória dele passa de PDF_RENDER_MAX_RSS_MB.
+
+PDF_RENDER_WORKERS=0 desliga os processos e renderiza na própria thread (dev/testes).
+Métricas em `stats()` (exportadas em /admin/api/render-metrics).
+"""
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+RENDER_SAMPLES = 200
+STOP_JOIN_SECONDS = 5
+
+
+class RenderQueueFull(Exception):
+    """Todos os workers e a fila de renderização estão ocupados."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Fila de renderização cheia (tente em {retry_after}s)")
+        self.retry_after = retry_after
+
+
+class RenderTimeout(Exception):
+    """A renderização passou do tempo limite e o worker foi encerrado."""
+
+
+class RenderWorkerDied(Exception):
+    """O processo de renderização morreu no meio de um job (OOM, crash nativo)."""
+
+
+# --- Lado do worker (processo filho) ---
+
+_worker_pdf_service = None
+
+
+def _init_worker(template_dir):
+    global _worker_pdf_service
+    from src.services.pdf_service import PDFService
+    _worker_pdf_service = PDFService(template_dir=template_dir)
+    _worker_pdf_service.warm_up(render_sample=True)
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+    except Exception:
+        return 0.0
+
+
+def _render_in_worker(data, template_name):
+    from src.services.storage_service import evidence_cache
+    before = evidence_cache.counters()
+    started = time.perf_counter()
+    pdf_bytes = _worker_pdf_service.generate_pdf_bytes(data, template_name=template_name)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    # Hits/downloads do cache de evidências acontecem aqui; o processo web soma o delta
+    cache_delta = {name: value - before[name] for name, value in evidence_cache.counters().items()}
+    return pdf_bytes, elapsed_ms, _peak_rss_mb(), cache_delta
+
+
+def _serve(conn, render):
+    """Loop do worker: avisa que está pronto e atende um job por vez até receber None/EOF."""
+    conn.send(('ready', os.getpid()))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        data, template_name = job
+        try:
+            result = ('ok', render(data, template_name))
+        except Exception as e:
+            result = ('error', e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # Exceção que não serializa: manda só o texto
+            conn.send(('error', RuntimeError(f"{type(result[1]).__name__}: {e}")))
+
+
+def _worker_main(conn, template_dir):
+    _init_worker(template_dir)
+    _serve(conn, _render_in_worker)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+# --- Lado do servidor ---
+
+class _RenderProcess:
+    """Um processo de renderização com pipe próprio (um job por vez)."""
+
+    def __init__(self, ctx, target, template_dir, generation):
+        self.template_dir = template_dir
+        self.generation = generation
+        self.tasks = 0
+        self.ready = False
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=target, args=(child_conn, template_dir), name='pdf-render', daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    @property
+    def alive(self):
+        return self._process.is_alive()
+
+    def _receive(self, timeout):
+        if not self._conn.poll(timeout):
+            return None
+        try:
+            return self._conn.recv()
+        except (EOFError, OSError):
+            raise RenderWorkerDied(f"Worker de PDF (pid {self._process.pid}) encerrou inesperadamente")
+
+    def wait_ready(self, timeout):
+        if self.ready:
+            return
+        if self._receive(timeout) is None:
+            raise RenderTimeout(f"Worker de PDF não inicializou em {timeout}s")
+        self.ready = True
+
+    def run(self, data, template_name, timeout):
+        """Manda o job e espera a resposta; o relógio começa aqui, com o worker já livre."""
+        try:
+            self._conn.send((data, template_name))
+        except (BrokenPipeError, OSError):
+            raise RenderWorkerDied(f"Worker de PDF (pid {self._process.pid}) encerrou inesperadamente")
+        message = self._receive(timeout)
+        if message is None:
+            raise RenderTimeout(f"Renderização do PDF excedeu {timeout}s")
+        self.tasks += 1
+        return message
+
+    def stop(self, kill=False):
+        if kill:
+            self._process.kill()
+        else:
+            try:
+                self._conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self._process.join(STOP_JOIN_SECONDS)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join(STOP_JOIN_SECONDS)
+        self._conn.close()
+
+
+class RenderExecutor:
+    """Processos dedicados para PDFService.generate_pdf_bytes com backpressure e timeout."""
+
+    def __init__(self, workers=None, queue_size=None, timeout=None, max_tasks_per_child=None, max_rss_mb=None):
+        self.workers = workers if workers is not None else _env_int('PDF_RENDER_WORKERS', 2)
+        self.queue_size = queue_size if queue_size is not None else _env_int('PDF_RENDER_QUEUE', 4)
+        self.timeout = timeout if timeout is not None else _env_int('PDF_RENDER_TIMEOUT_SECONDS', 120)
+        self.max_tasks_per_child = (
+            max_tasks_per_child if max_tasks_per_child is not None
+            else _env_int('PDF_RENDER_MAX_TASKS_PER_CHILD', 50)
+        )
+        # Container de 1Gi com gunicorn + worker de jobs + 2 renders: ~256 MB por render
+        self.max_rss_mb = max_rss_mb if max_rss_mb is not None else _env_int('PDF_RENDER_MAX_RSS_MB', 256)
+
+        # spawn: fork de um processo com várias threads (gunicorn --threads) não é seguro
+        self._ctx = multiprocessing.get_context('spawn')
+        self._worker_target = _worker_main
+        self._lock = threading.Lock()
+        # Workers livres; quem não acha um espera aqui (a fila), fora do timeout do render
+        self._available = threading.Condition(self._lock)
+        self._idle = []
+        self._process_count = 0
+        self._generation = 0
+        # Slots = workers ocupados + jobs esperando na fila
+        self._slots = threading.BoundedSemaphore(max(1, self.workers) + max(0, self.queue_size))
+        self._in_flight = 0
+        self._durations = deque(maxlen=RENDER_SAMPLES)
+        self._counters = {'completed': 0, 'failed': 0, 'timeouts': 0, 'rejected': 0, 'recycles': 0}
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def render(self, pdf_service, data, template_name="pdf_template.html", wait_for_slot=0):
+        """
+        Renderiza `data` e devolve os bytes do PDF.
+
+        `pdf_service` define o template_dir dos workers (e é usado direto quando
+        os processos estão desligados). `wait_for_slot` > 0 espera por uma vaga
+        (jobs em background) em vez de levantar RenderQueueFull na hora.
+        """
+        acquired = self._slots.acquire(timeout=wait_for_slot) if wait_for_slot else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._counters['rejected'] += 1
+            raise RenderQueueFull(self.retry_after())
+
+        with self._lock:
+            self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            if not self.enabled:
+                pdf_bytes = pdf_service.generate_pdf_bytes(data, template_name=template_name)
+            else:
+                pdf_bytes = self._render_in_process(pdf_service.template_dir, data, template_name)
+        except RenderTimeout:
+            raise
+        except Exception:
+            with self._lock:
+                self._counters['failed'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._counters['completed'] += 1
+            self._durations.append(elapsed_ms)
+        logger.info(f"🖨️ PDF renderizado em {elapsed_ms:.0f}ms ({len(pdf_bytes) // 1024}KB)")
+        return pdf_bytes
+
+    def _render_in_process(self, template_dir, data, template_name):
+        process = self._checkout(template_dir)
+        outcome = 'kill'  # estado do pipe desconhecido: não reaproveita
+        try:
+            process.wait_ready(self.timeout)
+            status, payload = process.run(data, template_name, self.timeout)
+            if status == 'error':
+                outcome = 'keep'  # erro do template/dados: o worker continua saudável
+                raise payload
+            pdf_bytes, _, rss_mb, cache_delta = payload
+            from src.services.storage_service import evidence_cache
+            evidence_cache.add_counters(cache_delta)
+            outcome = 'keep' if self._should_keep(process, rss_mb) else 'retire'
+            return pdf_bytes
+        except RenderTimeout:
+            with self._lock:
+                self._counters['timeouts'] += 1
+            logger.error(f"⏱️ Render de PDF passou de {self.timeout}s: encerrando o worker do job")
+            raise
+        finally:
+            self._checkin(process, outcome)
+
+    def _should_keep(self, process, rss_mb):
+        if self.max_rss_mb and rss_mb > self.max_rss_mb:
+            logger.warning(f"♻️ Worker de PDF com {rss_mb:.0f}MB de pico: reciclando")
+            return False
+        if self.max_tasks_per_child and process.tasks >= self.max_tasks_per_child:
+            return False
+        return True
+
+    def _checkout(self, template_dir):
+        """Pega um worker livre (ou sobe um novo até `workers`); espera se todos estão ocupados."""
+        while True:
+            stale = None
+            with self._available:
+                while not self._idle and self._process_count >= self.workers:
+                    self._available.wait()
+                if self._idle:
+                    process = self._idle.pop()
+                    if process.template_dir == template_dir and process.alive:
+                        return process
+                    stale = process
+                    self._process_count -= 1
+                else:
+                    self._process_count += 1
+                    generation = self._generation
+                    break
+            stale.stop()
+
+        try:
+            return _RenderProcess(self._ctx, self._worker_target, template_dir, generation)
+        except Exception:
+            with self._available:
+                self._process_count -= 1
+                self._available.notify()
+            raise
+
+    def _checkin(self, process, outcome):
+        """Devolve o worker à lista de livres, ou encerra: 'retire' pede a saída, 'kill' mata."""
+        with self._available:
+            current = process.generation == self._generation
+            keep = outcome == 'keep' and current and process.alive
+            if keep:
+                self._idle.append(process)
+            else:
+                self._process_count -= 1
+                if current:
+                    self._counters['recycles'] += 1
+            self._available.notify()
+        if not keep:
+            process.stop(kill=outcome == 'kill')
+
+    def retry_after(self):
+        """Segundos sugeridos no Retry-After: ~ tempo médio de um render."""
+        with self._lock:
+            avg_ms = sum(self._durations) / len(self._durations) if self._durations else 5000
+        return max(1, math.ceil(avg_ms / 1000))
+
+    def stats(self):
+        with self._lock:
+            durations = sorted(self._durations)
+            return {
+                **self._counters,
+                'in_flight': self._in_flight,
+                'workers': self.workers,
+                'processes': self._process_count,
+                'queue_size': self.queue_size,
+                'timeout_seconds': self.timeout,
+                'render_ms_avg': round(sum(durations) / len(durations), 1) if durations else 0.0,
+                'render_ms_p95': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 1)
+                if durations else 0.0,
+                'render_ms_max': round(durations[-1], 1) if durations else 0.0,
+            }
+
+    def shutdown(self):
+        """Encerra os workers livres; os ocupados saem ao terminar o job atual."""
+        with self._available:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            self._process_count -= len(idle)
+        for process in idle:
+            process.stop()
+
+
+# Singleton
+render_executor = RenderExecutor()
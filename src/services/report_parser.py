@@ -0,0 +1,318 @@
+"""
+Pré-parser determinístico do texto dos relatórios de inspeção.
+
+O formato do relatório é regular:
+    Notas por tópico                                  (tabela resumo)
+    Cozinha / Área de Manipulação 15.52 27.27 56.90%
+    ...
+    1 - Cozinha / Área de Manipulação                 (cabeçalho da seção)
+    1.1 - HIGIENIZAÇÃO: A área está limpa? (0.00% - 0.00 pontos)
+    Resposta: Não
+    Fotos da questão 1.1
+    Comentário: Piso com acúmulo de gordura.
+
+Este módulo transforma o texto em áreas e itens não conformes/parciais com
+suas pontuações e comentários do auditor, aplicando localmente as mesmas
+regras de classificação do prompt. A IA só precisa enriquecer os itens com
+fundamento legal, ação corretiva e prazo.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+STATUS_NAO_CONFORME = "Não Conforme"
+STATUS_PARCIAL = "Parcialmente Conforme"
+
+# "Cozinha / Área de Manipulação 15.52 27.27 56.90%"
+SUMMARY_ROW_RE = re.compile(r'^\s*([A-ZÀ-Ú][^\n\d]{3,80}?)\s+(\d+[.,]\d+)\s+(\d+[.,]\d+)\s+(\d+[.,]\d+)%\s*$')
+# "1 - Cozinha / Área de Manipulação"
+SECTION_RE = re.compile(r'^\s*(\d+)\s*-\s*(\S.*?)\s*$')
+# "1.1 - HIGIENIZAÇÃO: ..."
+ITEM_RE = re.compile(r'^\s*(\d+\.\d+)\s*-\s*(.*)$')
+# "(0.00% - 0.00 pontos)"
+ITEM_SCORE_RE = re.compile(r'\((\d+[.,]\d+)%\s*-\s*(\d+[.,]\d+)\s*pontos?\)', re.IGNORECASE)
+ANSWER_RE = re.compile(r'^\s*Resposta:\s*(.+?)\s*$', re.IGNORECASE)
+PHOTOS_RE = re.compile(r'^\s*Fotos? da quest', re.IGNORECASE)
+COMMENT_RE = re.compile(r'^\s*Coment[áa]rio:\s*(.*)$', re.IGNORECASE)
+
+# Linhas da tabela resumo que não são áreas (metadados)
+SKIP_AREA_WORDS = ['não se aplica', 'acompanhante', 'inconformidade', 'comentário', 'observaç']
+NOT_APPLICABLE_ANSWERS = ('n.a', 'n/a', 'não aplicável', 'nao aplicavel', 'não se aplica')
+
+
+def _to_float(value: str) -> float:
+    return float(value.replace(',', '.'))
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r'\s+', ' ', name).strip().lower()
+
+
+@dataclass
+class ParsedItem:
+    number: str
+    question: str
+    answer: str
+    score_pct: Optional[float]
+    score_points: Optional[float]
+    # None: conforme ou não aplicável (fica fora do ParsedReport)
+    status: Optional[str]
+    has_photos: bool = False
+    comment: str = ""
+    # Item com 100% dos pontos, mas com foto/comentário: a IA decide se há problema
+    needs_review: bool = False
+
+    @property
+    def item_verificado(self) -> str:
+        return f"{self.number} - {self.question}"
+
+
+@dataclass
+class ParsedArea:
+    name: str
+    score: float
+    max_score: float
+    pct: float
+    section_number: Optional[str] = None
+    items: List[ParsedItem] = field(default_factory=list)
+
+
+@dataclass
+class ParsedReport:
+    areas: List[ParsedArea] = field(default_factory=list)
+
+    @property
+    def total_score(self) -> float:
+        return round(sum(a.score for a in self.areas), 2)
+
+    @property
+    def total_max(self) -> float:
+        return round(sum(a.max_score for a in self.areas), 2)
+
+    @property
+    def total_pct(self) -> float:
+        return round(self.total_score / self.total_max * 100, 2) if self.total_max else 0.0
+
+    @property
+    def areas_below_100(self) -> List[ParsedArea]:
+        return [a for a in self.areas if a.pct < 100.0]
+
+    @property
+    def items(self) -> List[ParsedItem]:
+        return [item for area in self.areas for item in area.items]
+
+    def is_usable(self) -> bool:
+        """Parser reconheceu a estrutura: toda área < 100% tem seção e ao menos um item candidato."""
+        below = self.areas_below_100
+        return bool(below) and all(a.section_number and a.items for a in below)
+
+
+def parse_summary_table(pdf_text: str, limit: int = 4000) -> List[ParsedArea]:
+    """Extrai todas as linhas da tabela 'Notas por tópico' (inclusive áreas com 100%)."""
+    areas = []
+    seen = set()
+    for line in pdf_text[:limit].splitlines():
+        match = SUMMARY_ROW_RE.match(line)
+        if not match:
+            continue
+        name = match.group(1).strip()
+        if any(w in name.lower() for w in SKIP_AREA_WORDS):
+            continue
+        key = _normalize(name)
+        if key in seen:
+            continue
+        seen.add(key)
+        areas.append(ParsedArea(
+            name=name,
+            score=_to_float(match.group(2)),
+            max_score=_to_float(match.group(3)),
+            pct=_to_float(match.group(4)),
+        ))
+    return areas
+
+
+def _match_area(header_name: str, areas: List[ParsedArea]) -> Optional[ParsedArea]:
+    header = _normalize(header_name)
+    for area in areas:
+        name = _normalize(area.name)
+        first_part = name.split('/')[0].strip()
+        if header == name or header.startswith(name) or header.startswith(first_part):
+            return area
+    return None
+
+
+def _classify(answer: str, score_pct: Optional[float], has_photos: bool, comment: str):
+    """
+    Retorna (status, needs_review) ou (None, False) quando o item é conforme/não aplicável.
+    A pontuação obtida é a fonte de verdade: ela já considera se a pergunta é
+    positiva ou negativa ("Sim" em "Foram encontrados produtos vencidos?" vale 0 pontos).
+    """
+    answer_norm = answer.strip().lower().rstrip('.')
+    if answer_norm.startswith(NOT_APPLICABLE_ANSWERS) or answer_norm in ('na', 'n.a'):
+        return None, False
+    if answer_norm.startswith('parcial'):
+        return STATUS_PARCIAL, False
+    if score_pct is not None:
+        if score_pct == 0.0:
+            return STATUS_NAO_CONFORME, False
+        if score_pct < 100.0:
+            return STATUS_PARCIAL, False
+    if has_photos or comment:
+        return STATUS_NAO_CONFORME, True
+    return None, False
+
+
+def _start_item(item_match) -> dict:
+    return {
+        'number': item_match.group(1),
+        'question_lines': [item_match.group(2)],
+        'answer': None,
+        'has_photos': False,
+        'comment_lines': [],
+    }
+
+
+def _feed_item_line(raw: dict, line: str, in_comment: bool) -> bool:
+    """Acrescenta uma linha do corpo do item (resposta, fotos, comentário ou pergunta quebrada). Retorna in_comment."""
+    answer_match = ANSWER_RE.match(line)
+    if answer_match and raw['answer'] is None:
+        raw['answer'] = answer_match.group(1)
+        return False
+
+    if PHOTOS_RE.match(line):
+        raw['has_photos'] = True
+        return False
+
+    comment_match = COMMENT_RE.match(line)
+    if comment_match:
+        raw['comment_lines'].append(comment_match.group(1))
+        return True
+
+    if in_comment:
+        raw['comment_lines'].append(line)
+    elif raw['answer'] is None:
+        # Pergunta quebrada em várias linhas
+        raw['question_lines'].append(line)
+    return in_comment
+
+
+def _finalize_item(raw: dict) -> Optional[ParsedItem]:
+    if raw is None or raw.get('answer') is None:
+        return None
+    question = re.sub(r'\s+', ' ', ' '.join(raw['question_lines'])).strip()
+    score_match = ITEM_SCORE_RE.search(question)
+    score_pct = score_points = None
+    if score_match:
+        score_pct = _to_float(score_match.group(1))
+        score_points = _to_float(score_match.group(2))
+        question = (question[:score_match.start()] + question[score_match.end():]).strip()
+
+    comment = re.sub(r'\s+', ' ', ' '.join(raw['comment_lines'])).strip()
+    status, needs_review = _classify(raw['answer'], score_pct, raw['has_photos'], comment)
+    return ParsedItem(
+        number=raw['number'],
+        question=question,
+        answer=raw['answer'],
+        score_pct=score_pct,
+        score_points=score_points,
+        status=status,
+        has_photos=raw['has_photos'],
+        comment=comment,
+        needs_review=needs_review,
+    )
+
+
+def parse_item_block(lines: List[str]) -> Optional[ParsedItem]:
+    """
+    Interpreta o bloco de um item ("1.1 - ..." seguido de resposta, fotos e comentário).
+    Retorna None quando o bloco não tem estrutura reconhecível (sem "Resposta:");
+    itens conformes/não aplicáveis voltam com `status` None.
+    """
+    item_match = ITEM_RE.match(lines[0]) if lines else None
+    if not item_match:
+        return None
+    raw = _start_item(item_match)
+    in_comment = False
+    for line in lines[1:]:
+        if line.strip():
+            in_comment = _feed_item_line(raw, line, in_comment)
+    return _finalize_item(raw)
+
+
+def parse_report_text(pdf_text: str) -> ParsedReport:
+    """Converte o texto extraído do PDF em áreas e itens não conformes/parciais."""
+    report = ParsedReport(areas=parse_summary_table(pdf_text))
+    if not report.areas:
+        return report
+
+    current_area: Optional[ParsedArea] = None
+    raw_item: Optional[dict] = None
+    in_comment = False
+
+    def flush():
+        item = _finalize_item(raw_item)
+        if item and item.status and current_area is not None:
+            current_area.items.append(item)
+
+    for line in pdf_text.splitlines():
+        if not line.strip():
+            continue
+
+        item_match = ITEM_RE.match(line)
+        if item_match:
+            flush()
+            raw_item = _start_item(item_match)
+            in_comment = False
+            continue
+
+        section_match = SECTION_RE.match(line)
+        if section_match and not in_comment:
+            area = _match_area(section_match.group(2), report.areas)
+            if area and not area.section_number:
+                flush()
+                raw_item = None
+                area.section_number = section_match.group(1)
+                current_area = area
+                continue
+            if not area and current_area and int(section_match.group(1)) > int(current_area.section_number):
+                # Seção seguinte que não é área (ex: "Comentários gerais"): encerra a área atual
+                flush()
+                raw_item = None
+                current_area = None
+                continue
+
+        if raw_item is None:
+            continue
+
+        in_comment = _feed_item_line(raw_item, line, in_comment)
+
+    flush()
+    return report
+
+
+def to_checklist_dict(report: ParsedReport) -> dict:
+    """Representação no formato do ChecklistSanitario (sem os campos preenchidos pela IA)."""
+    return {
+        'pontuacao_geral': report.total_score,
+        'pontuacao_maxima_geral': report.total_max,
+        'aproveitamento_geral': report.total_pct,
+        'areas_inspecionadas': [
+            {
+                'nome_area': area.name,
+                'pontuacao_obtida': area.score,
+                'pontuacao_maxima': area.max_score,
+                'aproveitamento': area.pct,
+                'itens': [
+                    {
+                        'item_verificado': item.item_verificado,
+                        'status': item.status,
+                        'pontuacao': item.score_points,
+                        'observacao': item.comment,
+                        'verificar': item.needs_review,
+                    }
+                    for item in area.items
+                ],
+            }
+            for area in report.areas if area.items
+        ],
+    }
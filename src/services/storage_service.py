@@ -1,8 +1,20 @@
 import os
+import hashlib
+import json
 import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from werkzeug.utils import secure_filename
 from src.config import config
 
+try:
+    import fcntl
+except ImportError:  # Windows (dev): só o lock entre threads
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 class StorageService:
@@ -128,5 +140,341 @@ class StorageService:
                 logger.error(f"❌ Erro Download Local: {e}")
                 return None
 
+    def delete_file(self, file_path_or_url):
+        """
+        Remove arquivo do GCS ou Local (best-effort).
+        Retorna True se removido.
+        """
+        clean_path = file_path_or_url.replace(f"https://storage.googleapis.com/{self.bucket_name}/", "")
+        if clean_path.startswith("gcs:"):
+            clean_path = clean_path.replace("gcs:", "")
+
+        try:
+            if self.client and self.bucket_name:
+                bucket = self.client.bucket(self.bucket_name)
+                bucket.blob(clean_path).delete()
+                return True
+
+            if clean_path.startswith("/static/"):
+                clean_path = clean_path.replace("/static/", "src/static/")
+            elif clean_path.startswith("static/"):
+                clean_path = "src/" + clean_path
+            if os.path.exists(clean_path):
+                os.remove(clean_path)
+                return True
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao remover arquivo {clean_path}: {e}")
+        return False
+
+def _env_max_bytes(name, default_mb):
+    try:
+        return int(float(os.getenv(name, str(default_mb))) * 1024 * 1024)
+    except ValueError:
+        return int(default_mb * 1024 * 1024)
+
+
+class DiskLRUCache:
+    """
+    Arquivos em um diretório local com limite de tamanho total (LRU).
+
+    O diretório é a fonte da verdade: tamanho, entradas e ordem de uso (mtime;
+    cada hit faz touch) saem de uma varredura do disco. Assim o gunicorn, os
+    workers de render e o worker de jobs, que dividem o mesmo diretório,
+    enxergam os arquivos uns dos outros e respeitam um único limite. A eviction
+    roda sob um lock de arquivo (`.lock`). Escritas são atômicas (tmp + rename).
+    """
+
+    LOCK_NAME = '.lock'
+    STALE_TMP_SECONDS = 3600
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # contadores deste processo
+        self._evict_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _file_path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    @staticmethod
+    def _touch(file_path):
+        # Hora explícita: o relógio de arquivo do kernel é grosso (~ms) e empataria a ordem LRU
+        now = time.time_ns()
+        os.utime(file_path, ns=(now, now))
+
+    def _scan(self):
+        """Arquivos do cache como [(mtime_ns, nome, tamanho)]; remove .tmp abandonados."""
+        found = []
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return found
+        stale_before = time.time() - self.STALE_TMP_SECONDS
+        for entry in entries:
+            if entry.name == self.LOCK_NAME:
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith('.tmp'):
+                if stat.st_mtime < stale_before:  # escrita de um processo que morreu no meio
+                    self._remove(entry.name)
+                continue
+            found.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        return found
+
+    def _remove(self, name):
+        try:
+            os.remove(self._file_path(name))
+        except OSError:
+            pass
+
+    @contextmanager
+    def _dir_lock(self):
+        """Exclusão mútua da eviction entre threads e entre processos (flock no `.lock`)."""
+        with self._evict_lock:
+            with open(self._file_path(self.LOCK_NAME), 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _evict(self):
+        with self._dir_lock():
+            files = sorted(self._scan())
+            size = sum(file_size for _, _, file_size in files)
+            for _, name, file_size in files:
+                if size <= self.max_bytes:
+                    break
+                self._remove(name)
+                size -= file_size
+
+    def path(self, name, record=True):
+        """Caminho local do arquivo em cache, ou None (`record` conta hit/miss)."""
+        if not self.enabled:
+            return None
+        file_path = self._file_path(name)
+        try:
+            self._touch(file_path)  # marca como usado para a LRU de todos os processos
+        except OSError:
+            file_path = None
+        if record:
+            self._record(file_path is not None)
+        return file_path
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put_bytes(self, name, data):
+        """Grava `data` no cache e devolve o caminho local (None se não couber/falhar)."""
+        if not self.enabled or not data or len(data) > self.max_bytes:
+            return None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Escrita atômica: leitores concorrentes nunca veem um arquivo pela metade
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._file_path(name))
+            self._touch(self._file_path(name))
+            self._evict()
+        except OSError as e:
+            logger.warning(f"⚠️ Falha ao gravar {name} no cache {self.cache_dir}: {e}")
+            return None
+        return self._file_path(name)
+
+    def remove_prefix(self, prefix):
+        for _, name, _ in self._scan():
+            if name.startswith(prefix):
+                self._remove(name)
+
+    def stats(self):
+        files = self._scan() if self.enabled else []
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'entries': len(files),
+                'size_bytes': sum(file_size for _, _, file_size in files),
+                'max_bytes': self.max_bytes,
+            }
+
+
+class PdfCache(DiskLRUCache):
+    """
+    Cache em disco local (LRU por tamanho) dos PDFs renderizados pelo WeasyPrint.
+
+    A chave é (file_id, versão), onde a versão é um hash do conteúdo que vai
+    para o template (`content_version`): qualquer mudança na inspeção, no plano
+    ou nos itens gera outra versão, então uma entrada nunca fica desatualizada.
+    `invalidate(file_id)` descarta as versões antigas logo após cada alteração
+    para liberar espaço; o restante sai por LRU quando passa de PDF_CACHE_MAX_MB.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        super().__init__(
+            cache_dir or os.getenv('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'inspetorai_pdf_cache')),
+            max_bytes if max_bytes is not None else _env_max_bytes('PDF_CACHE_MAX_MB', 200),
+        )
+
+    @staticmethod
+    def content_version(data, template_name="pdf_template.html"):
+        """Hash estável dos dados do template (mesmo conteúdo -> mesma versão/ETag)."""
+        payload = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(f"{template_name}\n{payload}".encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def _file_key(file_id):
+        # file_id pode ter ':' ou '/' (upload:..., ids do Drive): nome de arquivo seguro
+        return hashlib.sha1(str(file_id).encode('utf-8')).hexdigest()[:20]
+
+    def _name(self, file_id, version):
+        return f"{self._file_key(file_id)}-{version}.pdf"
+
+    def get(self, file_id, version):
+        file_path = self.path(self._name(file_id, version))
+        if file_path is None:
+            return None
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, file_id, version, pdf_bytes):
+        self.put_bytes(self._name(file_id, version), pdf_bytes)
+
+    def invalidate(self, file_id):
+        """Remove todas as versões em cache de um file_id."""
+        self.remove_prefix(f"{self._file_key(file_id)}-")
+
+
+class EvidenceCache(DiskLRUCache):
+    """
+    Cópias locais (LRU por tamanho) das fotos de evidência usadas no PDF.
+
+    Antes de renderizar, `prefetch()` baixa em paralelo, com o client GCS
+    compartilhado do storage_service, todas as evidências que ainda não estão
+    em disco. Durante o render, o resolve_path só consulta arquivos locais.
+    De cada foto, preferimos o derivado reduzido 'pdf' e caímos para o
+    original quando ele não existe.
+    """
+
+    COUNTERS = ('hits', 'misses', 'downloads', 'download_errors')
+
+    def __init__(self, storage=None, cache_dir=None, max_bytes=None, max_workers=None):
+        super().__init__(
+            cache_dir or os.getenv(
+                'EVIDENCE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'inspetorai_evidence_cache')
+            ),
+            max_bytes if max_bytes is not None else _env_max_bytes('EVIDENCE_CACHE_MAX_MB', 300),
+        )
+        self._storage = storage
+        self.max_workers = max_workers or int(os.getenv('EVIDENCE_PREFETCH_WORKERS', '8'))
+        self.downloads = 0
+        self.download_errors = 0
+
+    @staticmethod
+    def _cache_name(name):
+        # 'pdf/abc_foto.jpg' -> hash + extensão (o diretório do cache é plano)
+        return hashlib.sha1(name.encode('utf-8')).hexdigest()[:24] + os.path.splitext(name)[1].lower()
+
+    def lookup(self, filename):
+        """Caminho local da evidência (derivado 'pdf' ou original) já em cache, ou None."""
+        from src.services.evidence_images import evidence_candidates
+        for name in evidence_candidates(filename):
+            file_path = self.path(self._cache_name(name), record=False)
+            if file_path:
+                return file_path
+        return None
+
+    def fetch(self, filename, bucket=None):
+        """Garante a evidência em disco (baixando se preciso) e devolve o caminho local."""
+        from src.services.evidence_images import evidence_candidates
+
+        cached = self.lookup(filename)
+        if cached or not self.enabled:
+            return cached
+        self._record(hit=False)
+        bucket = bucket or self._bucket()
+        if bucket is None:
+            return None
+        for name in evidence_candidates(filename):
+            try:
+                # Download direto (sem blob.exists()): um round trip por foto, 404 cai para o original
+                data = bucket.blob(f"evidence/{name}").download_as_bytes()
+            except Exception as e:
+                if getattr(e, 'code', None) == 404:
+                    continue
+                with self._lock:
+                    self.download_errors += 1
+                logger.warning(f"Falha ao buscar evidencia do GCS: {name} - {e}")
+                return None
+            with self._lock:
+                self.downloads += 1
+            return self.put_bytes(self._cache_name(name), data)
+        return None
+
+    def prefetch(self, filenames):
+        """Baixa em paralelo as evidências que faltam. Retorna quantas foram buscadas no GCS."""
+        missing = []
+        for filename in dict.fromkeys(filenames):
+            if self.lookup(filename):
+                self._record(hit=True)
+            else:
+                missing.append(filename)
+        bucket = self._bucket() if missing else None
+        if not missing or bucket is None:
+            return 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+            list(pool.map(lambda f: self.fetch(f, bucket), missing))
+        logger.info(
+            f"📥 Evidências: {len(missing)} baixadas em paralelo em {(time.perf_counter() - started) * 1000:.0f}ms "
+            f"(cache: {self.stats()['hit_rate']:.0%} de hits)"
+        )
+        return len(missing)
+
+    def _bucket(self):
+        storage = self._storage
+        if storage is None or not storage.client or not storage.bucket_name:
+            return None
+        return storage.client.bucket(storage.bucket_name)
+
+    def counters(self):
+        """Contadores deste processo (os workers de render devolvem o delta de cada job)."""
+        with self._lock:
+            return {name: getattr(self, name) for name in self.COUNTERS}
+
+    def add_counters(self, delta):
+        with self._lock:
+            for name in self.COUNTERS:
+                setattr(self, name, getattr(self, name) + delta.get(name, 0))
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update({'downloads': self.downloads, 'download_errors': self.download_errors})
+        return stats
+
+
 # Singleton
 storage_service = StorageService()
+pdf_cache = PdfCache()
+evidence_cache = EvidenceCache(storage=storage_service)
@@ -0,0 +1,124 @@
+"""
+Trace de processamento (Inspection.processing_logs) com buffer em memória.
+
+Antes cada `_log_trace` abria uma sessão, buscava a Inspection, copiava a
+lista JSONB inteira, adicionava uma entrada e reescrevia tudo (~10 vezes por
+arquivo). Agora as entradas ficam em um buffer por arquivo e são gravadas em
+lote nas fronteiras de estágio (início de etapa, falha e fim do
+processamento) com um único UPDATE:
+
+    Postgres: processing_logs = COALESCE(processing_logs, '[]') || :entries
+    Outros (SQLite nos testes): leitura + append + escrita via ORM
+
+O formato das entradas não mudou: TrackerService e o monitor continuam lendo
+`processing_logs`.
+"""
+import json
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import cast, func, literal, update
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.models_db import Inspection, InspectionStatus
+
+logger = logging.getLogger(__name__)
+
+# Status que marcam fronteira de estágio: grava o buffer imediatamente
+FLUSH_STATUSES = ('STARTED', 'RUNNING', 'FAILED')
+
+
+class TraceWriter:
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def _session(self):
+        if self._session_factory:
+            return self._session_factory()
+        from src.database import new_session
+        return new_session()
+
+    def _close(self, session):
+        if not self._session_factory:
+            session.close()
+
+    def append(self, file_id, stage, status, message, details=None):
+        """Adiciona uma entrada ao buffer do arquivo; grava se for fronteira de estágio."""
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "stage": stage,
+            "status": status,
+            "message": message,
+            "details": details or {}
+        }
+        with self._lock:
+            self._buffers.setdefault(file_id, []).append(entry)
+        if status in FLUSH_STATUSES:
+            self.flush(file_id)
+
+    def pending(self, file_id):
+        with self._lock:
+            return list(self._buffers.get(file_id, []))
+
+    def flush(self, file_id):
+        """Grava as entradas pendentes do arquivo em um único append. Retorna quantas foram gravadas."""
+        with self._lock:
+            entries = self._buffers.pop(file_id, [])
+        if not entries:
+            return 0
+
+        # Normaliza valores não serializáveis (UUID, datetime) nos details
+        entries = json.loads(json.dumps(entries, default=str))
+        failed = any(e['status'] == 'FAILED' for e in entries)
+        session = self._session()
+        try:
+            if session.get_bind().dialect.name == 'postgresql':
+                self._append_jsonb(session, file_id, entries, failed)
+            else:
+                self._append_orm(session, file_id, entries, failed)
+            session.commit()
+            return len(entries)
+        except Exception as e:
+            logger.error(f"Failed to write trace log: {e}")
+            session.rollback()
+            return 0
+        finally:
+            self._close(session)
+
+    def _append_jsonb(self, session, file_id, entries, failed):
+        values = {
+            'processing_logs': func.coalesce(Inspection.processing_logs, cast(literal('[]'), JSONB)).op('||')(
+                cast(literal(json.dumps(entries)), JSONB)
+            )
+        }
+        if failed:
+            values['status'] = InspectionStatus.REJECTED
+        result = session.execute(
+            update(Inspection).where(Inspection.drive_file_id == file_id).values(**values)
+        )
+        if result.rowcount == 0:
+            self._create_inspection(session, file_id, entries, failed)
+
+    def _append_orm(self, session, file_id, entries, failed):
+        inspection = session.query(Inspection).filter_by(drive_file_id=file_id).first()
+        if not inspection:
+            self._create_inspection(session, file_id, entries, failed)
+            return
+        inspection.processing_logs = list(inspection.processing_logs or []) + entries
+        if failed:
+            inspection.status = InspectionStatus.REJECTED
+
+    def _create_inspection(self, session, file_id, entries, failed):
+        # Primeiras etapas (INIT) podem ocorrer antes da Inspection existir
+        session.add(Inspection(
+            drive_file_id=file_id,
+            status=InspectionStatus.REJECTED if failed else InspectionStatus.PROCESSING,
+            processing_logs=entries,
+        ))
+
+
+# Singleton
+trace_writer = TraceWriter()
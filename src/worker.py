@@ -0,0 +1,318 @@
+"""
+Worker de processamento de relatórios (fila durável na tabela `jobs`).
+
+Uso:
+    python -m src.worker                # roda continuamente com WORKER_CONCURRENCY threads
+    python -m src.worker --once         # processa os jobs pendentes e sai
+
+O upload (src/app.py e UploadService) apenas grava o PDF no storage e
+enfileira um Job PENDING. Cada thread deste worker reivindica um job via
+JobRepository.claim_next (SELECT ... FOR UPDATE SKIP LOCKED no Postgres) e
+executa o processor_service fora do ciclo de requisição web.
+"""
+import argparse
+import io
+import logging
+import os
+import signal
+import threading
+import uuid
+from contextlib import contextmanager
+
+from src import database
+from src.database import get_db
+from src.models_db import Inspection, InspectionStatus, JobStatus, User
+from src.repositories.unit_of_work import UnitOfWork
+from src.services.job_tracker import job_tracker
+
+logger = logging.getLogger('report_worker')
+
+JOB_TYPE_PROCESS_REPORT = 'PROCESS_REPORT'
+UPLOAD_STAGING_FOLDER = 'uploads/pending'
+# Execuções interrompidas (deploy/scale-in) que o Zombie Killer devolve à fila antes de falhar o job
+MAX_ATTEMPTS = int(os.getenv('WORKER_MAX_ATTEMPTS', '3'))
+
+
+def stage_upload(file_bytes, upload_id, storage=None):
+    """
+    Grava os bytes do upload no storage para o worker consumir depois.
+    Retorna o caminho/URL a ser salvo em `input_payload['staged_path']`.
+    """
+    if storage is None:
+        from src.services.storage_service import storage_service as storage
+    filename = f"{upload_id.replace('upload:', '')}.pdf"
+    return storage.upload_file(io.BytesIO(file_bytes), UPLOAD_STAGING_FOLDER, filename)
+
+
+class ReportWorker:
+    """Consome jobs PROCESS_REPORT pendentes com N threads concorrentes."""
+
+    def __init__(self, concurrency=None, poll_interval=None, processor=None,
+                 storage=None, email_service=None, session_factory=None):
+        self.concurrency = concurrency or int(os.getenv('WORKER_CONCURRENCY', '2'))
+        self.poll_interval = poll_interval or float(os.getenv('WORKER_POLL_INTERVAL', '5'))
+        self._processor = processor
+        self._storage = storage
+        self._email_service = email_service
+        self._session_factory = session_factory
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Dependências (lazy para não carregar OpenAI/WeasyPrint no import)
+    # ------------------------------------------------------------------
+    @property
+    def processor(self):
+        if self._processor is None:
+            from src.services.processor import processor_service
+            self._processor = processor_service
+        return self._processor
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            from src.services.storage_service import storage_service
+            self._storage = storage_service
+        return self._storage
+
+    @property
+    def email_service(self):
+        if self._email_service is None:
+            try:
+                from src.services.email_service import EmailService
+                self._email_service = EmailService()
+            except Exception as e:
+                logger.error(f"⚠️ Falha ao inicializar Serviço de Email no worker: {e}")
+        return self._email_service
+
+    @contextmanager
+    def _session(self):
+        if self._session_factory:
+            yield self._session_factory()
+            return
+        db = next(get_db())
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+    def run_once(self):
+        """Reivindica e processa um job. Retorna False se a fila estiver vazia."""
+        with self._session() as db:
+            uow = UnitOfWork(db)
+            job = uow.jobs.claim_next(job_type=JOB_TYPE_PROCESS_REPORT)
+            if not job:
+                uow.rollback()
+                return False
+            job_id = job.id
+            company_id = job.company_id
+            payload = dict(job.input_payload or {})
+            uow.commit()
+
+        self._execute(job_id, company_id, payload)
+        return True
+
+    def drain(self):
+        """Processa jobs até a fila esvaziar. Retorna quantos foram processados."""
+        processed = 0
+        while not self._stop.is_set() and self.run_once():
+            processed += 1
+        return processed
+
+    def stop(self):
+        self._stop.set()
+
+    def _thread_loop(self, index):
+        logger.info(f"🧵 Worker thread {index} iniciada")
+        while not self._stop.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Worker thread {index}: erro inesperado no loop: {e}")
+                claimed = False
+            finally:
+                if self._session_factory is None and database.db_session is not None:
+                    database.db_session.remove()
+            if not claimed:
+                self._stop.wait(self.poll_interval)
+        logger.info(f"🧵 Worker thread {index} finalizada")
+
+    def run_forever(self):
+        logger.info(f"🚀 Worker iniciado (concorrência: {self.concurrency}, poll: {self.poll_interval}s)")
+        threads = [
+            threading.Thread(target=self._thread_loop, args=(i,), name=f"report-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for t in threads:
+            t.start()
+        try:
+            while any(t.is_alive() for t in threads):
+                for t in threads:
+                    t.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stop()
+        for t in threads:
+            t.join()
+        logger.info("🏁 Worker encerrado")
+
+    # ------------------------------------------------------------------
+    # Execução de um job
+    # ------------------------------------------------------------------
+    def _execute(self, job_id, company_id, payload):
+        file_id = payload.get('file_id')
+        filename = payload.get('filename') or file_id
+        est_id = payload.get('establishment_id')
+        staged_path = payload.get('staged_path')
+
+        logger.info(f"⏳ [WORKER] Iniciando processamento de {filename} (Job: {job_id})")
+        try:
+            file_content = None
+            if staged_path:
+                file_content = self.storage.download_file(staged_path)
+                if not file_content:
+                    raise FileNotFoundError(f"Arquivo enviado não encontrado no storage: {staged_path}")
+
+            result = self.processor.process_single_file(
+                {'id': file_id, 'name': filename},
+                company_id=company_id,
+                establishment_id=uuid.UUID(est_id) if est_id else None,
+                job_id=job_id,
+                file_content=file_content,
+            )
+
+            if result and result.get('status') == 'skipped' and result.get('reason') == 'duplicate':
+                logger.info(f"♻️ Arquivo duplicado: {filename} (já existe como {result.get('existing_id')})")
+                self._finish_job(job_id, JobStatus.SKIPPED, "Arquivo duplicado - já processado anteriormente")
+                self._remove_orphan_inspection(file_id)
+            else:
+                self._finish_job(job_id, JobStatus.COMPLETED)
+                logger.info(f"✅ [WORKER] Processamento concluído: {filename}")
+
+        except Exception as e:
+            logger.error(f"Erro no processamento do job {job_id} ({filename}): {e}")
+            self._finish_job(job_id, JobStatus.FAILED, str(e))
+            self._remove_orphan_inspection(file_id)
+            self._notify_failure(payload, filename, e)
+
+        if staged_path:
+            self.storage.delete_file(staged_path)
+
+    def _finish_job(self, job_id, status, error=None):
+        """
+        Transição final do job. Se o processor já finalizou o job (ex: FAILED com
+        erro estruturado), a transição é no-op e o erro gravado é preservado.
+        """
+        try:
+            with self._session() as db:
+                job_tracker.transition(job_id, status, error=error, session=db)
+                db.commit()
+        except Exception as e:
+            logger.error(f"Falha ao finalizar job {job_id}: {e}")
+
+    def _remove_orphan_inspection(self, file_id):
+        """Remove a Inspection pré-criada no upload quando o job não gerou relatório."""
+        if not file_id:
+            return
+        try:
+            with self._session() as db:
+                orphan = db.query(Inspection).filter_by(
+                    drive_file_id=file_id,
+                    status=InspectionStatus.PROCESSING
+                ).first()
+                if orphan:
+                    db.delete(orphan)
+                    db.commit()
+                    logger.info(f"🧹 Removida Inspection órfã: {file_id}")
+        except Exception as e:
+            logger.error(f"Failed to cleanup orphan inspection {file_id}: {e}")
+
+    def _notify_failure(self, payload, filename, error):
+        """Avisa o consultor que enviou o arquivo sobre o erro crítico."""
+        user_id = payload.get('uploaded_by_id')
+        if not user_id:
+            return
+        try:
+            with self._session() as db:
+                user = db.get(User, uuid.UUID(user_id))
+                user_email = user.email if user else None
+                user_name = user.name if user else payload.get('uploaded_by_name', '')
+            email_service = self.email_service
+            if not (email_service and user_email):
+                return
+
+            subj = f"Erro no Processamento: {filename}"
+            body_html = f"""
+            <html>
+            <head></head>
+            <body style="font-family: sans-serif; color: #333;">
+                <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #fecaca; border-radius: 10px; background: #fef2f2;">
+                    <h2 style="color: #dc2626;"><span style="font-size: 1.5rem;">⚠️</span> Erro no Processamento</h2>
+                    <p>Olá, <strong>{user_name}</strong>.</p>
+                    <p>Ocorreu um erro ao processar o relatório:</p>
+                    <div style="background: #fff; padding: 15px; border-radius: 5px; margin: 20px 0; border-left: 4px solid #dc2626;">
+                        <p style="margin: 0; font-weight: bold; color: #333;">{filename}</p>
+                    </div>
+                    <p style="font-size: 0.9rem; color: #666;">O arquivo pode estar corrompido, em formato inválido, ou houve uma falha temporária no sistema.</p>
+                    <p><strong>O que fazer:</strong></p>
+                    <ul style="color: #666;">
+                        <li>Verifique se o arquivo é um PDF válido</li>
+                        <li>Tente enviar novamente</li>
+                        <li>Se o erro persistir, contate o suporte</li>
+                    </ul>
+                    <hr style="border: none; border-top: 1px solid #fecaca; margin: 20px 0;">
+                    <p style="font-size: 0.75rem; color: #999;">Erro técnico: {str(error)[:200]}</p>
+                </div>
+            </body>
+            </html>
+            """
+
+            body_text = f"""
+Olá {user_name},
+
+Ocorreu um erro ao processar o relatório "{filename}".
+
+O que fazer:
+- Verifique se o arquivo é um PDF válido
+- Tente enviar novamente
+- Se o erro persistir, contate o suporte
+
+Erro técnico: {str(error)[:200]}
+            """
+
+            email_service.send_email(user_email, subj, body_html, body_text)
+        except Exception as mail_e:
+            logger.error(f"Falha ao enviar email de erro: {mail_e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Worker de processamento de relatórios')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='Número de threads (default: WORKER_CONCURRENCY ou 2)')
+    parser.add_argument('--poll-interval', type=float, default=None,
+                        help='Intervalo de polling em segundos quando a fila está vazia (default: WORKER_POLL_INTERVAL ou 5)')
+    parser.add_argument('--once', action='store_true',
+                        help='Processa os jobs pendentes e encerra')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+
+    worker = ReportWorker(concurrency=args.concurrency, poll_interval=args.poll_interval)
+
+    if args.once:
+        processed = worker.drain()
+        logger.info(f"🏁 {processed} job(s) processado(s)")
+        return
+
+    def _handle_signal(signum, frame):
+        logger.info(f"🛑 Sinal {signum} recebido. Finalizando jobs em andamento...")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+    worker.run_forever()
+
+
+if __name__ == '__main__':
+    main()
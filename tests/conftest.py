@@ -17,6 +17,7 @@ sys.path.insert(0, str(project_root))
 
 import pytest
 import os
+import tempfile
 import uuid
 from datetime import datetime
 from werkzeug.security import generate_password_hash
@@ -27,6 +28,9 @@ os.environ['TESTING'] = 'true'
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'  # Use in-memory SQLite for tests
 os.environ['SECRET_KEY'] = 'test-secret-key-for-testing-only'
 os.environ['FLASK_DEBUG'] = 'false'
+os.environ['PDF_RENDER_WORKERS'] = '0'  # renderiza na própria thread (mocks de pdf_service continuam valendo)
+os.environ['PDF_CACHE_DIR'] = tempfile.mkdtemp(prefix='pdf_cache_test_')  # não reaproveita PDFs entre execuções
+os.environ['EVIDENCE_CACHE_DIR'] = tempfile.mkdtemp(prefix='evidence_cache_test_')  # fotos baixadas ficam isoladas por execução
 
 
 @pytest.fixture(scope='session')
@@ -102,6 +106,38 @@ def db_session(app):
     Session.remove()
 
 
+@pytest.fixture
+def max_queries(db_session):
+    """
+    Query budget for a block of code (typically one client request).
+
+    Usage:
+        with max_queries(2):
+            client.get('/admin/api/monitor')
+
+    Fails listing the executed statements when the block exceeds the budget.
+    The yielded recorder exposes `.count` and `.statements` for finer asserts.
+    """
+    from contextlib import contextmanager
+    from src import database
+    from src.infrastructure.query_metrics import instrument_engine, track_queries
+
+    instrument_engine(db_session.get_bind())
+    if database.engine is not None:
+        instrument_engine(database.engine)
+
+    @contextmanager
+    def _budget(limit):
+        with track_queries() as recorder:
+            yield recorder
+        executed = '\n'.join(f'  {sql}' for sql, _ in recorder.statements)
+        assert recorder.count <= limit, (
+            f'Expected at most {limit} queries, got {recorder.count}:\n{executed}'
+        )
+
+    return _budget
+
+
 @pytest.fixture
 def auth_client(client, db_session):
     """
@@ -141,3 +141,28 @@ class TestDashboardService:
         DashboardService._merge_jobs_into_inspections(inspections, jobs, existing_ids)
         assert len(inspections) == 1
         assert inspections[0]['id'] == 'file-new'
+
+
+class TestFailedJobAlertsQueries:
+
+    @pytest.mark.parametrize('job_count', [2, 10])
+    def test_query_count_is_constant(self, job_count, db_session, company_factory, inspection_factory,
+                                     max_queries):
+        from src.services.job_tracker import new_job
+        from src.models_db import JobStatus
+
+        company = company_factory.create(db_session)
+        for i in range(job_count):
+            file_id = f'upload:failed-{i}'
+            inspection_factory.create(db_session, drive_file_id=file_id, status=InspectionStatus.PROCESSING)
+            job = new_job('PROCESS_REPORT', company_id=company.id,
+                          input_payload={'file_id': file_id, 'filename': f'{i}.pdf'})
+            job.status = JobStatus.FAILED
+            db_session.add(job)
+        db_session.commit()
+        company_id = company.id
+
+        with max_queries(1):
+            alerts = DashboardService(UnitOfWork(db_session))._get_failed_job_alerts(company_id)
+
+        assert len(alerts) == job_count
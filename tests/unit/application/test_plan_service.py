@@ -87,6 +87,20 @@ class TestPlanService:
         items = plan_env['uow'].action_plans.get_items_by_plan_id(plan_env['plan'].id)
         assert len(items) >= 2
 
+    def test_save_plan_refreshes_inspection_summary(self, plan_env):
+        svc = plan_env['service']
+
+        svc.save_plan('test-plan-file', {
+            'items': [{'problem': 'Novo problema', 'action': 'Nova ação'}],
+        }, plan_env['user'])
+
+        inspection = plan_env['inspection']
+        assert inspection.total_items == 2
+        assert inspection.nc_count == 1  # item novo não tem original_status
+        assert inspection.score == 7.0
+        assert inspection.max_score == 10.0
+        assert inspection.percentage == 70.0
+
     def test_save_plan_not_found(self, db_session):
         uow = UnitOfWork(db_session)
         svc = PlanService(uow)
@@ -166,3 +180,36 @@ class TestPlanService:
     def test_parse_date_none(self):
         result = PlanService._parse_date(None)
         assert result is None
+
+    def test_save_review_refreshes_resolved_count(self, plan_env, db_session):
+        plan_env['item'].status = ActionPlanItemStatus.RESOLVED
+        db_session.flush()
+
+        plan_env['service'].save_review('test-plan-file', {'items': []})
+
+        assert plan_env['inspection'].resolved_count == 1
+
+    def test_approve_populates_pdf_cache_with_download_version(self, plan_env, tmp_path):
+        from src.application.inspection_data_service import InspectionDataService
+        from src.services.storage_service import PdfCache
+
+        cache = PdfCache(cache_dir=str(tmp_path), max_bytes=10 * 1024 * 1024)
+        pdf_service = MagicMock()
+        pdf_service.generate_pdf_bytes.return_value = b'%PDF-1.4 aprovado'
+        storage = MagicMock()
+        storage.upload_file.return_value = '/static/uploads/approved_pdfs/x.pdf'
+        svc = PlanService(plan_env['uow'], pdf_service=pdf_service, storage_service=storage, pdf_cache=cache)
+
+        svc.approve_plan('test-plan-file', plan_env['user'])
+
+        # O download logo após a aprovação calcula a mesma versão e acerta o cache
+        data = InspectionDataService(plan_env['uow']).get_pdf_data('test-plan-file')
+        assert cache.get('test-plan-file', cache.content_version(data)) == b'%PDF-1.4 aprovado'
+
+    def test_save_review_invalidates_pdf_cache(self, plan_env):
+        cache = MagicMock()
+        svc = PlanService(plan_env['uow'], pdf_cache=cache)
+
+        svc.save_review('test-plan-file', {'items': []})
+
+        cache.invalidate.assert_called_once_with('test-plan-file')
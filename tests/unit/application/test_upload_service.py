@@ -15,21 +15,19 @@ class TestUploadService:
         est = establishment_factory.create(db_session)
         uow = UnitOfWork(db_session)
 
-        mock_processor = MagicMock()
-        mock_processor.process_single_file.return_value = {
-            'status': 'success',
-            'file_id': 'mock-out-id',
-        }
+        mock_storage = MagicMock()
+        mock_storage.upload_file.return_value = '/static/uploads/uploads/pending/mock.pdf'
 
         mock_validator = MagicMock()
         valid_result = MagicMock()
         valid_result.is_valid = True
         mock_validator.validate.return_value = valid_result
 
-        svc = UploadService(uow, mock_processor, mock_validator)
+        svc = UploadService(uow, mock_storage, mock_validator)
 
         mock_user = MagicMock()
         mock_user.id = uuid.uuid4()
+        mock_user.name = 'Consultor Teste'
         mock_user.company_id = est.company_id
         mock_user.establishments = [est]
 
@@ -37,12 +35,12 @@ class TestUploadService:
             'service': svc,
             'uow': uow,
             'establishment': est,
-            'processor': mock_processor,
+            'storage': mock_storage,
             'validator': mock_validator,
             'user': mock_user,
         }
 
-    def test_successful_upload(self, upload_env):
+    def test_successful_upload_enqueues_pending_job(self, upload_env):
         svc = upload_env['service']
         est = upload_env['establishment']
 
@@ -57,7 +55,15 @@ class TestUploadService:
         assert result.success is True
         assert result.file_id is not None
         assert result.job_id is not None
-        upload_env['processor'].process_single_file.assert_called_once()
+        upload_env['storage'].upload_file.assert_called_once()
+
+        job = upload_env['uow'].jobs.get_by_id(uuid.UUID(result.job_id))
+        assert job.status == JobStatus.PENDING
+        assert job.input_payload['staged_path'] == '/static/uploads/uploads/pending/mock.pdf'
+        assert job.input_payload['file_id'] == result.file_id
+
+        insp = upload_env['uow'].inspections.get_by_drive_file_id(result.file_id)
+        assert insp.status == InspectionStatus.PROCESSING
 
     def test_validation_failure(self, upload_env):
         invalid_result = MagicMock()
@@ -76,26 +82,25 @@ class TestUploadService:
         assert result.success is False
         assert result.error == 'VALIDATION_FAILED'
 
-    def test_duplicate_detection(self, upload_env):
-        upload_env['processor'].process_single_file.return_value = {
-            'status': 'skipped',
-            'reason': 'duplicate',
-        }
+    def test_storage_error(self, upload_env):
+        upload_env['storage'].upload_file.side_effect = Exception('GCS error')
 
         svc = upload_env['service']
         result = svc.process_upload(
-            file_content=b'%PDF-1.4 dup',
-            filename='dup.pdf',
+            file_content=b'%PDF-1.4 error',
+            filename='error.pdf',
             establishment_id=upload_env['establishment'].id,
             user=upload_env['user'],
             company_id=upload_env['establishment'].company_id,
         )
 
-        assert result.success is True
-        assert result.skipped is True
+        assert result.success is False
+        assert 'GCS error' in result.error
+        assert upload_env['uow'].jobs.claim_next() is None
 
-    def test_processing_error(self, upload_env):
-        upload_env['processor'].process_single_file.side_effect = Exception('AI error')
+    def test_enqueue_error_removes_staged_file(self, upload_env):
+        uow = upload_env['uow']
+        uow.jobs.add = MagicMock(side_effect=Exception('DB error'))
 
         svc = upload_env['service']
         result = svc.process_upload(
@@ -107,7 +112,8 @@ class TestUploadService:
         )
 
         assert result.success is False
-        assert 'AI error' in result.error
+        assert 'DB error' in result.error
+        upload_env['storage'].delete_file.assert_called_once_with('/static/uploads/uploads/pending/mock.pdf')
 
     def test_smart_match_establishment_by_name(self, upload_env):
         est = upload_env['establishment']
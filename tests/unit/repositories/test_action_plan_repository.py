@@ -114,3 +114,44 @@ class TestActionPlanRepository:
         db_session.flush()
 
         assert repo.get_by_id(plan.id) is None
+
+    def _rows(self, plan_id, count):
+        return [{
+            'id': uuid.uuid4(),
+            'action_plan_id': plan_id,
+            'problem_description': f'Item {i}',
+            'corrective_action': 'Corrigir',
+            'severity': SeverityLevel.HIGH,
+            'status': ActionPlanItemStatus.OPEN,
+            'order_index': i,
+        } for i in range(count)]
+
+    def test_bulk_insert_items(self, db_session, action_plan_factory):
+        plan = action_plan_factory.create(db_session)
+        repo = ActionPlanRepository(db_session)
+
+        assert repo.bulk_insert_items(self._rows(plan.id, 3)) == 3
+        db_session.flush()
+
+        items = repo.get_items_by_plan_id(plan.id)
+        assert [i.problem_description for i in items] == ['Item 0', 'Item 1', 'Item 2']
+        assert items[0].severity == SeverityLevel.HIGH
+
+    def test_bulk_insert_empty(self, db_session):
+        assert ActionPlanRepository(db_session).bulk_insert_items([]) == 0
+
+    def test_bulk_insert_uses_copy_on_postgres(self):
+        from unittest.mock import MagicMock
+        session = MagicMock()
+        session.get_bind.return_value.dialect.name = 'postgresql'
+        cursor = session.connection.return_value.connection.cursor.return_value
+        repo = ActionPlanRepository(session)
+
+        repo.bulk_insert_items(self._rows(uuid.uuid4(), 5), copy_threshold=5)
+
+        sql, buffer = cursor.copy_expert.call_args.args
+        assert sql.startswith('COPY action_plan_items (id, action_plan_id, problem_description')
+        lines = buffer.getvalue().splitlines()
+        assert len(lines) == 5
+        assert lines[0].endswith(',HIGH,OPEN,0')
+        session.execute.assert_not_called()
@@ -2,8 +2,10 @@
 import pytest
 import uuid
 
-from src.repositories.inspection_repository import InspectionRepository
-from src.models_db import Inspection, InspectionStatus
+from src.repositories.inspection_repository import InspectionRepository, summarize_items
+from sqlalchemy.orm import sessionmaker
+
+from src.models_db import Inspection, InspectionStatus, ActionPlan, ActionPlanItem, ActionPlanItemStatus
 
 
 class TestInspectionRepository:
@@ -161,3 +163,75 @@ class TestInspectionRepository:
         db_session.flush()
 
         assert repo.get_by_id(inspection.id) is None
+
+
+class TestInspectionSummary:
+
+    def test_summarize_items(self):
+        summary = summarize_items([
+            ('Não Conforme', ActionPlanItemStatus.OPEN),
+            ('NÃO CONFORME', ActionPlanItemStatus.RESOLVED),
+            ('Parcialmente Conforme', ActionPlanItemStatus.OPEN),
+            ('Conforme', ActionPlanItemStatus.RESOLVED),
+            (None, ActionPlanItemStatus.OPEN),
+        ])
+
+        assert summary == {'total_items': 5, 'nc_count': 2, 'pc_count': 1, 'resolved_count': 2}
+
+    def test_refresh_summary(self, db_session, inspection_factory, action_plan_factory, action_plan_item_factory):
+        inspection = inspection_factory.create(db_session)
+        plan = action_plan_factory.create(db_session, inspection=inspection)
+        action_plan_item_factory.create(db_session, action_plan=plan, original_status='Não Conforme')
+        action_plan_item_factory.create(
+            db_session, action_plan=plan, original_status='Parcialmente Conforme',
+            status=ActionPlanItemStatus.RESOLVED,
+        )
+
+        InspectionRepository(db_session).refresh_summary(inspection)
+
+        assert (inspection.total_items, inspection.nc_count, inspection.pc_count, inspection.resolved_count) == (2, 1, 1, 1)
+        assert (inspection.score, inspection.max_score, inspection.percentage) == (7.0, 10.0, 70.0)
+
+    def test_refresh_summary_counts_unflushed_items(
+        self, db_session, inspection_factory, action_plan_factory, action_plan_item_factory
+    ):
+        inspection = inspection_factory.create(db_session)
+        plan = action_plan_factory.create(db_session, inspection=inspection)
+        existing = action_plan_item_factory.create(db_session, action_plan=plan, original_status='Não Conforme')
+
+        # Mesma configuração da sessão de produção (src/database.py)
+        session = sessionmaker(bind=db_session.get_bind(), autocommit=False, autoflush=False)()
+        try:
+            inspection = session.get(Inspection, inspection.id)
+            plan = session.get(ActionPlan, plan.id)
+            session.get(ActionPlanItem, existing.id).status = ActionPlanItemStatus.RESOLVED
+            session.add(ActionPlanItem(
+                id=uuid.uuid4(), action_plan_id=plan.id, problem_description='Novo item',
+                corrective_action='Corrigir', original_status='Parcialmente Conforme', order_index=1,
+            ))
+
+            InspectionRepository(session).refresh_summary(inspection, plan)
+
+            assert (inspection.total_items, inspection.nc_count, inspection.pc_count, inspection.resolved_count) == (2, 1, 1, 1)
+        finally:
+            session.rollback()
+            session.close()
+
+    def test_refresh_summary_without_plan_uses_ai_response(self, db_session, inspection_factory):
+        inspection = inspection_factory.create(
+            db_session, ai_raw_response={'pontuacao_geral': 8, 'pontuacao_maxima_geral': 10},
+        )
+
+        InspectionRepository(db_session).refresh_summary(inspection)
+
+        assert inspection.total_items == 0
+        assert (inspection.score, inspection.max_score, inspection.percentage) == (8.0, 10.0, 80.0)
+
+    def test_get_score_rows(self, db_session, establishment_factory, inspection_factory):
+        est = establishment_factory.create(db_session)
+        inspection_factory.create(db_session, establishment=est, status=InspectionStatus.COMPLETED, score=8, max_score=10)
+        inspection_factory.create(db_session, establishment=est, status=InspectionStatus.PENDING_MANAGER_REVIEW, score=1, max_score=10)
+
+        rows = InspectionRepository(db_session).get_score_rows([est.id], [InspectionStatus.COMPLETED])
+
+        assert [tuple(r) for r in rows] == [(8.0, 10.0)]
@@ -0,0 +1,105 @@
+"""Tests for JobRepository."""
+import uuid
+from datetime import datetime, timedelta
+
+from src.models_db import Job, JobStatus
+from src.repositories.job_repository import JobRepository
+from src.services.job_tracker import new_job
+
+
+def _make_job(db_session, status=JobStatus.PENDING, job_type='PROCESS_REPORT', minutes_ago=0):
+    job = Job(
+        type=job_type,
+        status=status,
+        created_at=datetime.utcnow() - timedelta(minutes=minutes_ago),
+        input_payload={'file_id': f'upload:{job_type}-{minutes_ago}'},
+    )
+    db_session.add(job)
+    db_session.flush()
+    return job
+
+
+class TestClaimNext:
+
+    def test_claims_oldest_pending_job(self, db_session):
+        repo = JobRepository(db_session)
+        _make_job(db_session, minutes_ago=1)
+        oldest = _make_job(db_session, minutes_ago=10)
+
+        claimed = repo.claim_next()
+
+        assert claimed.id == oldest.id
+        assert claimed.status == JobStatus.PROCESSING
+        assert claimed.started_at is not None
+        assert claimed.attempts == 1
+
+    def test_does_not_claim_same_job_twice(self, db_session):
+        repo = JobRepository(db_session)
+        _make_job(db_session)
+
+        first = repo.claim_next()
+        second = repo.claim_next()
+
+        assert first is not None
+        assert second is None
+
+    def test_ignores_non_pending_and_other_types(self, db_session):
+        repo = JobRepository(db_session)
+        _make_job(db_session, status=JobStatus.PROCESSING)
+        _make_job(db_session, status=JobStatus.COMPLETED)
+        _make_job(db_session, job_type='OCR')
+
+        assert repo.claim_next(job_type='PROCESS_REPORT') is None
+
+    def test_empty_queue(self, db_session):
+        repo = JobRepository(db_session)
+        assert repo.claim_next() is None
+
+
+class TestGetJobInfoMap:
+
+    def _add(self, db_session, file_id, filename, uploaded_by_name='Ana', minutes_ago=0):
+        job = new_job('PROCESS_REPORT', input_payload={
+            'file_id': file_id, 'filename': filename, 'uploaded_by_name': uploaded_by_name,
+        })
+        job.created_at = datetime.utcnow() - timedelta(minutes=minutes_ago)
+        db_session.add(job)
+        db_session.flush()
+        return job
+
+    def test_returns_only_requested_files(self, db_session):
+        self._add(db_session, 'upload:a', 'a.pdf')
+        self._add(db_session, 'upload:b', 'b.pdf', uploaded_by_name='Bruno')
+        self._add(db_session, 'upload:c', 'c.pdf')
+
+        result = JobRepository(db_session).get_job_info_map(['upload:a', 'upload:b', 'upload:x'])
+
+        assert result == {
+            'upload:a': {'filename': 'a.pdf', 'uploaded_by_name': 'Ana'},
+            'upload:b': {'filename': 'b.pdf', 'uploaded_by_name': 'Bruno'},
+        }
+
+    def test_latest_job_wins_for_reprocessed_file(self, db_session):
+        self._add(db_session, 'upload:a', 'antigo.pdf', minutes_ago=10)
+        self._add(db_session, 'upload:a', 'novo.pdf', minutes_ago=1)
+
+        result = JobRepository(db_session).get_job_info_map(['upload:a'])
+
+        assert result['upload:a']['filename'] == 'novo.pdf'
+
+    def test_empty_input(self, db_session):
+        assert JobRepository(db_session).get_job_info_map([]) == {}
+
+
+class TestGetPendingForCompany:
+
+    def test_filters_by_establishment_column(self, db_session):
+        est_id = uuid.uuid4()
+        mine = new_job('PROCESS_REPORT', input_payload={'file_id': 'upload:1', 'establishment_id': str(est_id)})
+        other = new_job('PROCESS_REPORT', input_payload={'file_id': 'upload:2', 'establishment_id': str(uuid.uuid4())})
+        db_session.add_all([mine, other])
+        db_session.flush()
+
+        jobs = JobRepository(db_session).get_pending_for_company(establishment_ids=[est_id])
+
+        assert [j.id for j in jobs] == [mine.id]
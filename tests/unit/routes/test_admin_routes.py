@@ -659,7 +659,7 @@ class TestApiMonitorStats:
         _setup_admin_session(client, admin, mock_auth_uow)
 
         mock_uow = MagicMock()
-        mock_uow.jobs.get_for_monitor.return_value = []
+        mock_uow.jobs.get_for_monitor_with_inspection.return_value = []
         mock_container_uow.return_value = mock_uow
 
         response = client.get('/admin/api/monitor', headers=JSON_HEADERS)
@@ -701,7 +701,7 @@ class TestApiMonitorStats:
         mock_job.attempts = 1
 
         mock_uow = MagicMock()
-        mock_uow.jobs.get_for_monitor.return_value = [mock_job]
+        mock_uow.jobs.get_for_monitor_with_inspection.return_value = [(mock_job, None, None)]
         mock_container_uow.return_value = mock_uow
 
         response = client.get('/admin/api/monitor', headers=JSON_HEADERS)
@@ -716,6 +716,38 @@ class TestApiMonitorStats:
         assert item['cost_usd'] == 0.03
         assert item['attempts'] == 1
 
+    @pytest.mark.parametrize('job_count', [3, 30])
+    @patch('src.container.get_uow')
+    @patch('src.auth.get_uow')
+    def test_monitor_query_count_is_constant(self, mock_auth_uow, mock_container_uow, job_count,
+                                             client, db_session, inspection_factory, max_queries):
+        """Monitor issues the same number of statements regardless of how many jobs exist."""
+        from src.models_db import InspectionStatus
+        from src.repositories.unit_of_work import UnitOfWork
+        from src.services.job_tracker import new_job
+
+        admin = MockUser(role='ADMIN')
+        _setup_admin_session(client, admin, mock_auth_uow)
+        mock_container_uow.return_value = UnitOfWork(db_session)
+
+        for i in range(job_count):
+            file_id = f'upload:monitor-{i}'
+            inspection_factory.create(
+                db_session, drive_file_id=file_id, status=InspectionStatus.PROCESSING,
+                processing_logs=[{'message': 'Extraindo texto'}, {'message': f'Etapa final {i}'}],
+            )
+            db_session.add(new_job('PROCESS_REPORT', input_payload={'file_id': file_id, 'filename': f'{i}.pdf'}))
+        db_session.commit()
+
+        with max_queries(1):
+            response = client.get('/admin/api/monitor', headers=JSON_HEADERS)
+
+        assert response.status_code == 200
+        items = response.get_json()['items']
+        assert len(items) == job_count
+        assert all(item['current_stage'] == 'Processando IA' for item in items)
+        assert {item['last_log_message'] for item in items} == {f'Etapa final {i}' for i in range(job_count)}
+
     @patch('src.container.get_uow')
     @patch('src.auth.get_uow')
     def test_monitor_exception_returns_500(self, mock_auth_uow, mock_container_uow, client):
@@ -724,7 +756,7 @@ class TestApiMonitorStats:
         _setup_admin_session(client, admin, mock_auth_uow)
 
         mock_uow = MagicMock()
-        mock_uow.jobs.get_for_monitor.side_effect = Exception("DB timeout")
+        mock_uow.jobs.get_for_monitor_with_inspection.side_effect = Exception("DB timeout")
         mock_container_uow.return_value = mock_uow
 
         response = client.get('/admin/api/monitor', headers=JSON_HEADERS)
@@ -733,6 +765,106 @@ class TestApiMonitorStats:
         assert 'error' in data
 
 
+class TestApiRecentErrors:
+    """Tests for GET /admin/api/recent-errors."""
+
+    @pytest.mark.parametrize('job_count', [2, 12])
+    @patch('src.container.get_uow')
+    @patch('src.auth.get_uow')
+    def test_recent_errors_loads_companies_in_one_query(self, mock_auth_uow, mock_container_uow, job_count,
+                                                        client, db_session, company_factory, max_queries):
+        """Company names come from the same query regardless of how many jobs failed."""
+        from src.models_db import JobStatus
+        from src.repositories.unit_of_work import UnitOfWork
+        from src.services.job_tracker import new_job
+
+        admin = MockUser(role='ADMIN')
+        _setup_admin_session(client, admin, mock_auth_uow)
+        mock_container_uow.return_value = UnitOfWork(db_session)
+
+        for i in range(job_count):
+            company = company_factory.create(db_session, name=f'Empresa {i}')
+            job = new_job('PROCESS_REPORT', company_id=company.id, input_payload={'filename': f'{i}.pdf'})
+            job.status = JobStatus.FAILED
+            job.error_log = json.dumps({'message': f'falha {i}'})
+            db_session.add(job)
+        db_session.commit()
+        db_session.expire_all()
+
+        with max_queries(1):
+            response = client.get('/admin/api/recent-errors', headers=JSON_HEADERS)
+
+        assert response.status_code == 200
+        errors = response.get_json()['errors']
+        assert {e['company'] for e in errors} == {f'Empresa {i}' for i in range(job_count)}
+
+
+class TestRenderMetrics:
+    """Tests for GET /admin/api/render-metrics."""
+
+    @patch('src.auth.get_uow')
+    def test_render_metrics(self, mock_auth_uow, client):
+        admin = MockUser(role='ADMIN')
+        _setup_admin_session(client, admin, mock_auth_uow)
+
+        response = client.get('/admin/api/render-metrics', headers=JSON_HEADERS)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert {'completed', 'rejected', 'timeouts', 'render_ms_p95', 'in_flight'} <= set(data)
+        assert {'hits', 'downloads', 'size_bytes', 'max_bytes'} <= set(data['evidence_cache'])
+        assert 'size_bytes' in data['pdf_cache']
+
+
+class TestDriveMetrics:
+    """Tests for GET /admin/api/drive-metrics."""
+
+    @patch('src.auth.get_uow')
+    def test_drive_metrics(self, mock_auth_uow, client):
+        admin = MockUser(role='ADMIN')
+        _setup_admin_session(client, admin, mock_auth_uow)
+
+        response = client.get('/admin/api/drive-metrics', headers=JSON_HEADERS)
+
+        assert response.status_code == 200
+        assert {'size', 'clients_created'} <= set(response.get_json())
+
+
+class TestQueryMetrics:
+    """Tests for GET/DELETE /admin/api/query-metrics."""
+
+    @patch('src.auth.get_uow')
+    def test_query_metrics_snapshot(self, mock_auth_uow, client):
+        from src.infrastructure.query_metrics import QueryRecorder, registry
+
+        admin = MockUser(role='ADMIN')
+        _setup_admin_session(client, admin, mock_auth_uow)
+        registry.reset()
+        recorder = QueryRecorder()
+        recorder.record('SELECT 1', 2.0)
+        registry.add('admin.index', recorder)
+
+        response = client.get('/admin/api/query-metrics', headers=JSON_HEADERS)
+
+        assert response.status_code == 200
+        stats = response.get_json()['admin.index']
+        assert stats['requests'] == 1
+        assert stats['queries_max'] == 1
+
+    @patch('src.auth.get_uow')
+    def test_query_metrics_reset(self, mock_auth_uow, client):
+        from src.infrastructure.query_metrics import QueryRecorder, registry
+
+        admin = MockUser(role='ADMIN')
+        _setup_admin_session(client, admin, mock_auth_uow)
+        registry.add('admin.index', QueryRecorder())
+
+        response = client.delete('/admin/api/query-metrics', headers=JSON_HEADERS)
+
+        assert response.status_code == 200
+        assert 'admin.index' not in registry.snapshot()
+
+
 # ===================================================================
 #  TRACKER DETAILS
 # ===================================================================
@@ -886,6 +1018,32 @@ class TestSaveSettings:
         assert '2' in data['message']  # "2 configuracao(oes) salva(s)."
         mock_uow.commit.assert_called_once()
 
+    @patch('src.admin_routes.invalidate_config_cache')
+    @patch('src.container.get_uow')
+    @patch('src.auth.get_uow')
+    def test_save_settings_invalidates_config_cache(self, mock_auth_uow, mock_container_uow, mock_invalidate, client):
+        """Saving settings drops the get_config cache so new values apply immediately."""
+        admin = MockUser(role='ADMIN')
+        _setup_admin_session(client, admin, mock_auth_uow)
+        mock_container_uow.return_value = MagicMock()
+
+        response = client.post('/admin/api/settings', json={'SMTP_EMAIL': 'new@gmail.com'}, headers=JSON_HEADERS)
+
+        assert response.status_code == 200
+        mock_invalidate.assert_called_once()
+
+    @patch('src.auth.get_uow')
+    def test_settings_cache_stats(self, mock_auth_uow, client):
+        """GET /admin/api/settings/cache returns hit/miss counters."""
+        admin = MockUser(role='ADMIN')
+        _setup_admin_session(client, admin, mock_auth_uow)
+
+        response = client.get('/admin/api/settings/cache', headers=JSON_HEADERS)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert {'hits', 'misses', 'hit_rate', 'keys', 'ttl_seconds'} <= set(data)
+
     @patch('src.container.get_uow')
     @patch('src.auth.get_uow')
     def test_save_settings_skips_masked_values(self, mock_auth_uow, mock_container_uow, client):
@@ -247,6 +247,43 @@ class TestDashboardConsultant:
         response = client.get('/dashboard/consultant')
         assert response.status_code == 200
 
+    @pytest.mark.parametrize('failed_count', [2, 10])
+    @patch('src.container.get_dashboard_service')
+    @patch('src.auth.get_uow')
+    def test_dashboard_consultant_query_count_is_constant(self, mock_auth_uow, mock_get_svc, failed_count, client,
+                                                          db_session, establishment_factory, inspection_factory,
+                                                          max_queries):
+        """Failed-job alerts and the rest of the dashboard don't issue one query per job."""
+        from src.application.dashboard_service import DashboardService
+        from src.models_db import InspectionStatus, JobStatus
+        from src.repositories.unit_of_work import UnitOfWork
+        from src.services.job_tracker import new_job
+
+        est = establishment_factory.create(db_session)
+        for i in range(failed_count):
+            file_id = f'upload:failed-{i}'
+            inspection_factory.create(db_session, establishment=est, drive_file_id=file_id,
+                                      status=InspectionStatus.PROCESSING)
+            job = new_job('PROCESS_REPORT', company_id=est.company_id, input_payload={
+                'file_id': file_id, 'filename': f'{i}.pdf', 'establishment_id': str(est.id),
+            })
+            job.status = JobStatus.FAILED
+            job.error_log = json.dumps({'code': 'ERR_1001', 'user_msg': f'falha {i}'})
+            db_session.add(job)
+        db_session.commit()
+        db_session.expire_all()
+
+        user = MockUser(role='CONSULTANT', company_id=est.company_id, establishments=[est])
+        _setup_auth(client, user, mock_auth_uow)
+        mock_get_svc.return_value = DashboardService(UnitOfWork(db_session))
+
+        # inspeções, jobs pendentes, lojas pendentes, alertas de falha (1 query), hierarquia
+        with max_queries(6):
+            response = client.get('/dashboard/consultant')
+
+        assert response.status_code == 200
+        assert f'{failed_count - 1}.pdf'.encode() in response.data
+
     @patch('src.auth.get_uow')
     def test_dashboard_consultant_manager_redirected(self, mock_auth_uow, client):
         """MANAGER user is redirected away from consultant dashboard."""
@@ -594,6 +631,95 @@ class TestDownloadRevisedPdf:
         assert 'Plano_Revisado_Restaurante_Bom_Gosto' in response.headers.get('Content-Disposition', '')
 
 
+    @patch('src.app.pdf_service')
+    @patch('src.container.get_inspection_data_service')
+    def test_download_revised_pdf_served_from_cache(self, mock_get_data_svc, mock_pdf_svc, client):
+        """Second download of unchanged content does not re-render the PDF."""
+        mock_data_svc = MagicMock()
+        mock_data_svc.get_pdf_data.side_effect = lambda _: {'nome_estabelecimento': 'Cache', 'detalhe_pontuacao': {}}
+        mock_get_data_svc.return_value = mock_data_svc
+        mock_pdf_svc.generate_pdf_bytes.return_value = b'%PDF-1.4 cached'
+
+        first = client.get('/download_revised_pdf/cache-file-id')
+        second = client.get('/download_revised_pdf/cache-file-id')
+
+        assert first.status_code == second.status_code == 200
+        assert second.data == b'%PDF-1.4 cached'
+        assert first.headers['ETag'] == second.headers['ETag']
+        mock_pdf_svc.generate_pdf_bytes.assert_called_once()
+
+    @patch('src.app.pdf_service')
+    @patch('src.container.get_inspection_data_service')
+    def test_download_revised_pdf_not_modified(self, mock_get_data_svc, mock_pdf_svc, client):
+        """If-None-Match with the current ETag returns 304 without rendering."""
+        mock_data_svc = MagicMock()
+        mock_data_svc.get_pdf_data.side_effect = lambda _: {'nome_estabelecimento': 'ETag', 'detalhe_pontuacao': {}}
+        mock_get_data_svc.return_value = mock_data_svc
+        mock_pdf_svc.generate_pdf_bytes.return_value = b'%PDF-1.4'
+
+        etag = client.get('/download_revised_pdf/etag-file-id').headers['ETag']
+        response = client.get('/download_revised_pdf/etag-file-id', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.data == b''
+        mock_pdf_svc.generate_pdf_bytes.assert_called_once()
+
+    @patch('src.app.pdf_service')
+    @patch('src.container.get_inspection_data_service')
+    def test_download_revised_pdf_rerenders_after_change(self, mock_get_data_svc, mock_pdf_svc, client):
+        """Changed plan content yields a new ETag and a fresh render."""
+        mock_data_svc = MagicMock()
+        mock_data_svc.get_pdf_data.side_effect = [
+            {'nome_estabelecimento': 'Loja', 'summary_text': 'v1'},
+            {'nome_estabelecimento': 'Loja', 'summary_text': 'v2'},
+        ]
+        mock_get_data_svc.return_value = mock_data_svc
+        mock_pdf_svc.generate_pdf_bytes.side_effect = [b'%PDF v1', b'%PDF v2']
+
+        first = client.get('/download_revised_pdf/changed-file-id')
+        second = client.get('/download_revised_pdf/changed-file-id', headers={'If-None-Match': first.headers['ETag']})
+
+        assert second.status_code == 200
+        assert second.data == b'%PDF v2'
+        assert first.headers['ETag'] != second.headers['ETag']
+
+
+    @patch('src.app.render_executor')
+    @patch('src.app.pdf_service')
+    @patch('src.container.get_inspection_data_service')
+    def test_download_revised_pdf_saturated_returns_503(self, mock_get_data_svc, mock_pdf_svc,
+                                                         mock_executor, client):
+        """Full render queue answers 503 with Retry-After instead of piling up threads."""
+        from src.services.render_executor import RenderQueueFull
+
+        mock_data_svc = MagicMock()
+        mock_data_svc.get_pdf_data.return_value = {'nome_estabelecimento': 'Fila', 'summary_text': '503'}
+        mock_get_data_svc.return_value = mock_data_svc
+        mock_executor.render.side_effect = RenderQueueFull(retry_after=7)
+
+        response = client.get('/download_revised_pdf/busy-file-id')
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '7'
+
+    @patch('src.app.render_executor')
+    @patch('src.app.pdf_service')
+    @patch('src.container.get_inspection_data_service')
+    def test_download_revised_pdf_render_timeout_returns_504(self, mock_get_data_svc, mock_pdf_svc,
+                                                              mock_executor, client):
+        """A render that exceeds the timeout answers 504."""
+        from src.services.render_executor import RenderTimeout
+
+        mock_data_svc = MagicMock()
+        mock_data_svc.get_pdf_data.return_value = {'nome_estabelecimento': 'Lento', 'summary_text': '504'}
+        mock_get_data_svc.return_value = mock_data_svc
+        mock_executor.render.side_effect = RenderTimeout('excedeu')
+
+        response = client.get('/download_revised_pdf/slow-file-id')
+
+        assert response.status_code == 504
+
+
 # ===================================================================
 #  POST /api/finalize_verification/<file_id>
 # ===================================================================
@@ -456,7 +456,7 @@ class TestUploadRoute:
     @patch('src.infrastructure.security.FileValidator')
     @patch('src.auth.get_uow')
     def test_upload_success_redirects(self, mock_auth_uow, mock_validator_class, mock_get_db, client):
-        """Successful file upload processes and redirects to dashboard."""
+        """Successful file upload stages the PDF, enqueues a job and redirects to dashboard."""
         user = MockUser()
         user.establishments = []
         _setup_auth(client, user, mock_auth_uow)
@@ -475,25 +475,29 @@ class TestUploadRoute:
         mock_db = MagicMock()
         mock_get_db.return_value = iter([mock_db])
 
-        # Mock the processor
-        with patch('src.services.processor.processor_service') as mock_proc, \
-             patch('src.app.processor_service', mock_proc, create=True):
-            mock_proc.process_single_file.return_value = {
-                'status': 'success',
-                'file_id': 'output-123',
-            }
-
-            data = {
-                'file': (BytesIO(pdf_content), 'test_report.pdf'),
-            }
+        data = {
+            'file': (BytesIO(pdf_content), 'test_report.pdf'),
+        }
+        with patch('src.worker.stage_upload', return_value='/static/uploads/uploads/pending/mock.pdf') as mock_stage:
             response = client.post(
                 '/upload',
                 data=data,
                 content_type='multipart/form-data',
             )
-            # Should redirect to dashboard after processing
-            assert response.status_code == 302
-            assert '/dashboard/consultant' in response.location
+        # Should redirect to dashboard after enqueueing
+        assert response.status_code == 302
+        assert '/dashboard/consultant' in response.location
+
+        # PDF staged for the worker and a PENDING PROCESS_REPORT job enqueued
+        from src.models_db import Job, JobStatus
+        from src.worker import JOB_TYPE_PROCESS_REPORT
+        mock_stage.assert_called_once()
+        jobs = [c.args[0] for c in mock_db.add.call_args_list if isinstance(c.args[0], Job)]
+        assert len(jobs) == 1
+        assert jobs[0].type == JOB_TYPE_PROCESS_REPORT
+        assert jobs[0].status == JobStatus.PENDING
+        assert jobs[0].input_payload['staged_path'] == '/static/uploads/uploads/pending/mock.pdf'
+        mock_db.commit.assert_called_once()
 
     @patch('src.auth.get_uow')
     def test_upload_ajax_no_file_returns_error(self, mock_auth_uow, client):
@@ -15,6 +15,7 @@ Tests cover:
 import pytest
 import uuid
 import json
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 from werkzeug.security import generate_password_hash
 
@@ -420,6 +421,29 @@ class TestUploadEvidence:
         assert 'url' in resp_data
         assert '/evidence/' in resp_data['url']
 
+    @patch('src.services.evidence_images.schedule_derivatives')
+    @patch('src.services.storage_service.storage_service')
+    @patch('src.auth.get_uow')
+    def test_upload_evidence_schedules_derivatives(self, mock_auth_uow, mock_storage, mock_schedule, client, app):
+        """Should hand the uploaded bytes to the background derivative step."""
+        user = MockUser(role='CONSULTANT')
+        _setup_auth(client, user, mock_auth_uow)
+        mock_storage.upload_file.return_value = '/static/uploads/evidence/x.jpg'
+
+        from io import BytesIO
+        jpeg_content = b'\xff\xd8\xff\xe0' + b'\x00' * 100
+        response = client.post(
+            '/api/upload_evidence',
+            data={'file': (BytesIO(jpeg_content), 'foto.jpg')},
+            content_type='multipart/form-data',
+        )
+
+        assert response.status_code == 200
+        filename, content, storage = mock_schedule.call_args[0]
+        assert filename.endswith('_foto.jpg')
+        assert content == jpeg_content
+        assert storage is mock_storage
+
     @patch('src.app.storage_service')
     @patch('src.auth.get_uow')
     def test_upload_evidence_gcs_url_normalized(self, mock_auth_uow, mock_storage, client, app):
@@ -464,9 +488,13 @@ class TestServeEvidence:
 
     @patch('src.services.storage_service.storage_service')
     def test_serve_evidence_gcs(self, mock_storage, client, app):
-        """Should serve from GCS when available."""
+        """Should stream from GCS with strong validators and immutable cache."""
         mock_blob = MagicMock()
-        mock_blob.exists.return_value = True
+        mock_blob.name = 'evidence/gcs_image.png'
+        mock_blob.size = 18
+        mock_blob.etag = 'CJ3x'
+        mock_blob.content_type = 'image/png'
+        mock_blob.updated = datetime(2026, 1, 1, tzinfo=timezone.utc)
         mock_blob.download_as_bytes.return_value = b'\x89PNG\r\n\x1a\n' + b'\x00' * 10
 
         mock_bucket = MagicMock()
@@ -480,6 +508,68 @@ class TestServeEvidence:
 
         assert response.status_code == 200
         assert response.content_type.startswith('image/')
+        assert response.headers['ETag'] == '"CJ3x"'
+        assert 'immutable' in response.headers['Cache-Control']
+        mock_blob.exists.assert_not_called()
+        mock_blob.download_as_bytes.assert_called_once_with(start=0, end=17)
+
+    @patch('src.services.storage_service.storage_service')
+    def test_serve_evidence_signed_redirect(self, mock_storage, client, app):
+        """EVIDENCE_DELIVERY=signed redirects to a short-lived URL; the signed URL is then served."""
+        from src.services.evidence_delivery import LocalUrlSigner, evidence_delivery
+
+        mock_blob = MagicMock()
+        mock_blob.name = 'evidence/abc_foto.png'
+        mock_blob.size = 3
+        mock_blob.etag = 'e1'
+        mock_blob.content_type = 'image/png'
+        mock_blob.updated = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        mock_blob.download_as_bytes.return_value = b'png'
+        mock_storage.client = MagicMock()
+        mock_storage.bucket_name = 'test-bucket'
+        mock_storage.client.bucket.return_value.blob.return_value = mock_blob
+
+        with patch.object(evidence_delivery, 'mode', 'signed'), \
+             patch.object(evidence_delivery, 'signer', LocalUrlSigner('test-secret')):
+            redirect_response = client.get('/evidence/abc_foto.png')
+            signed_url = redirect_response.headers['Location']
+            response = client.get(signed_url)
+            tampered = client.get(signed_url.replace('sig=', 'sig=0'))
+
+        assert redirect_response.status_code == 302
+        assert '/evidence/abc_foto.png?expires=' in signed_url
+        mock_blob.download_as_bytes.assert_called_once()
+        assert response.status_code == 200
+        assert response.data == b'png'
+        assert tampered.status_code == 403
+
+    @patch('src.services.storage_service.storage_service')
+    def test_serve_evidence_thumb_variant(self, mock_storage, client, app):
+        """?v=thumb should serve the reduced derivative with a long cache."""
+        mock_storage.client = None
+        mock_storage.bucket_name = None
+
+        with patch('os.path.exists', side_effect=lambda p: p.endswith('thumb/abc_foto.webp')), \
+             patch('src.app.send_from_directory', return_value=app.response_class(b'webp')) as mock_send:
+            response = client.get('/evidence/abc_foto.png?v=thumb')
+
+        assert response.status_code == 200
+        assert mock_send.call_args[0][1] == 'thumb/abc_foto.webp'
+        assert 'immutable' in response.headers['Cache-Control']
+
+    @patch('src.services.storage_service.storage_service')
+    def test_serve_evidence_thumb_falls_back_to_original(self, mock_storage, client, app):
+        """Missing derivative (legacy upload) falls back to the original file."""
+        mock_storage.client = None
+        mock_storage.bucket_name = None
+
+        with patch('os.path.exists', side_effect=lambda p: p.endswith('evidence/legacy.png')), \
+             patch('src.app.send_from_directory', return_value=app.response_class(b'png')) as mock_send:
+            response = client.get('/evidence/legacy.png?v=thumb')
+
+        assert response.status_code == 200
+        assert mock_send.call_args[0][1] == 'legacy.png'
+        assert 'immutable' not in response.headers['Cache-Control']
 
 
 # ===================================================================
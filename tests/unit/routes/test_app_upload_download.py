@@ -2,7 +2,7 @@
 
 Tests cover:
 - POST /upload: establishment selection validation, file validation flow,
-  upload service processing (success, skipped/duplicate, failure),
+  job enqueueing (success, enqueue/staging failure),
   AJAX vs regular responses (200/207/500), outer exception handling
 - GET /download_pdf/<json_id>: GCS path download, GCS error, Drive
   unavailable, Drive error
@@ -54,6 +54,13 @@ class MockEstablishment:
 # Helpers
 # ---------------------------------------------------------------------------
 
+@pytest.fixture(autouse=True)
+def mock_stage_upload():
+    """Avoid writing staged uploads to local storage during route tests."""
+    with patch('src.worker.stage_upload', return_value='uploads/pending/staged.pdf') as mock_stage:
+        yield mock_stage
+
+
 def _setup_auth(client, user, mock_auth_uow):
     """Configure mock auth UoW and set the user in the session."""
     auth_uow = MagicMock()
@@ -299,15 +306,17 @@ class TestUploadFileValidation:
 # ===================================================================
 
 class TestUploadProcessing:
-    """Tests for processor_service interaction in the upload route."""
+    """Tests for job enqueueing in the upload route (processing runs in src.worker)."""
 
     @patch('src.app.get_db')
     @patch('src.app.FileValidator')
     @patch('src.auth.get_uow')
-    def test_upload_processing_success(
-        self, mock_auth_uow, mock_validator_class, mock_get_db, client
+    def test_upload_enqueues_pending_job(
+        self, mock_auth_uow, mock_validator_class, mock_get_db, client, mock_stage_upload
     ):
-        """Successful processing increments sucesso and redirects."""
+        """Valid upload stages the file and enqueues a PENDING job without processing."""
+        from src.models_db import Job, JobStatus
+
         user = MockUser(role='CONSULTANT')
         _setup_auth(client, user, mock_auth_uow)
 
@@ -323,11 +332,6 @@ class TestUploadProcessing:
         pdf_content = _make_pdf_content()
 
         with patch('src.services.processor.processor_service') as mock_proc:
-            mock_proc.process_single_file.return_value = {
-                'status': 'success',
-                'file_id': 'output-123',
-            }
-
             response = client.post(
                 '/upload',
                 data={
@@ -338,15 +342,23 @@ class TestUploadProcessing:
             )
             assert response.status_code == 302
             assert '/dashboard/consultant' in response.location
+            mock_proc.process_single_file.assert_not_called()
+
+        jobs = [c.args[0] for c in mock_db.add.call_args_list if isinstance(c.args[0], Job)]
+        assert len(jobs) == 1
+        assert jobs[0].status == JobStatus.PENDING
+        assert jobs[0].input_payload['staged_path'] == 'uploads/pending/staged.pdf'
+        assert jobs[0].input_payload['filename'] == 'report.pdf'
+        mock_stage_upload.assert_called_once()
+        mock_db.commit.assert_called_once()
 
     @patch('src.app.get_db')
     @patch('src.app.FileValidator')
     @patch('src.auth.get_uow')
-    def test_upload_duplicate_file_skipped(
-        self, mock_auth_uow, mock_validator_class, mock_get_db, client
+    def test_upload_enqueue_failure_increments_falha(
+        self, mock_auth_uow, mock_validator_class, mock_get_db, client, mock_stage_upload
     ):
-        """Duplicate file (status=skipped, reason=duplicate) is handled
-        gracefully: job updated, orphan inspection removed, flash warning."""
+        """DB failure while enqueueing rolls back and counts as failure."""
         user = MockUser(role='CONSULTANT')
         _setup_auth(client, user, mock_auth_uow)
 
@@ -356,53 +368,31 @@ class TestUploadProcessing:
         mock_validator_instance.validate.return_value = mock_validation_result
         mock_validator_class.create_pdf_validator.return_value = mock_validator_instance
 
-        # get_db is called multiple times: once for main, once for skip, once for cleanup
-        mock_db_main = MagicMock()
-        mock_db_skip = MagicMock()
-        mock_db_cleanup = MagicMock()
-
-        call_count = [0]
-        def db_gen():
-            dbs = [mock_db_main, mock_db_skip, mock_db_cleanup]
-            idx = call_count[0]
-            call_count[0] += 1
-            if idx < len(dbs):
-                return iter([dbs[idx]])
-            return iter([MagicMock()])
-
-        mock_get_db.side_effect = lambda: db_gen()
-
-        # Mock the query chain for orphan cleanup
-        mock_db_cleanup.query.return_value.filter_by.return_value.first.return_value = MagicMock()
+        mock_db = MagicMock()
+        mock_db.commit.side_effect = Exception("DB down")
+        mock_get_db.return_value = iter([mock_db])
 
         pdf_content = _make_pdf_content()
 
-        with patch('src.services.processor.processor_service') as mock_proc:
-            mock_proc.process_single_file.return_value = {
-                'status': 'skipped',
-                'reason': 'duplicate',
-                'existing_id': 'existing-123',
-            }
-
-            response = client.post(
-                '/upload',
-                data={
-                    'file': (BytesIO(pdf_content), 'duplicate.pdf'),
-                },
-                content_type='multipart/form-data',
-                follow_redirects=False,
-            )
-            assert response.status_code == 302
-            assert '/dashboard/consultant' in response.location
+        response = client.post(
+            '/upload',
+            data={
+                'file': (BytesIO(pdf_content), 'failing.pdf'),
+            },
+            content_type='multipart/form-data',
+            headers={'X-Requested-With': 'XMLHttpRequest'},
+            follow_redirects=False,
+        )
+        assert response.status_code == 500
+        mock_db.rollback.assert_called_once()
+        mock_db.close.assert_called_once()
 
-    @patch('src.app.get_db')
     @patch('src.app.FileValidator')
     @patch('src.auth.get_uow')
-    def test_upload_processing_failure_increments_falha(
-        self, mock_auth_uow, mock_validator_class, mock_get_db, client
+    def test_upload_staging_failure_increments_falha(
+        self, mock_auth_uow, mock_validator_class, client, mock_stage_upload
     ):
-        """Processing failure (exception in process_single_file) increments
-        falha, cleans up job/inspection, and redirects."""
+        """Storage failure while staging the file counts as failure."""
         user = MockUser(role='CONSULTANT')
         _setup_auth(client, user, mock_auth_uow)
 
@@ -412,37 +402,18 @@ class TestUploadProcessing:
         mock_validator_instance.validate.return_value = mock_validation_result
         mock_validator_class.create_pdf_validator.return_value = mock_validator_instance
 
-        # get_db: main session, error cleanup session
-        mock_db_main = MagicMock()
-        mock_db_err = MagicMock()
-        mock_db_err.query.return_value.filter_by.return_value.first.return_value = MagicMock()
-
-        call_count = [0]
-        def db_gen():
-            dbs = [mock_db_main, mock_db_err]
-            idx = call_count[0]
-            call_count[0] += 1
-            if idx < len(dbs):
-                return iter([dbs[idx]])
-            return iter([MagicMock()])
-
-        mock_get_db.side_effect = lambda: db_gen()
-
-        pdf_content = _make_pdf_content()
-
-        with patch('src.services.processor.processor_service') as mock_proc:
-            mock_proc.process_single_file.side_effect = Exception("AI processing failed")
+        mock_stage_upload.side_effect = Exception("GCS unavailable")
 
-            response = client.post(
-                '/upload',
-                data={
-                    'file': (BytesIO(pdf_content), 'failing.pdf'),
-                },
-                content_type='multipart/form-data',
-                follow_redirects=False,
-            )
-            assert response.status_code == 302
-            assert '/dashboard/consultant' in response.location
+        response = client.post(
+            '/upload',
+            data={
+                'file': (BytesIO(_make_pdf_content()), 'failing.pdf'),
+            },
+            content_type='multipart/form-data',
+            headers={'X-Requested-With': 'XMLHttpRequest'},
+            follow_redirects=False,
+        )
+        assert response.status_code == 500
 
 
 # ===================================================================
@@ -736,71 +707,6 @@ class TestUploadExceptionHandling:
             assert '/dashboard/consultant' in response.location
 
 
-# ===================================================================
-#  POST /upload - Processing with Email Notification on Failure
-# ===================================================================
-
-class TestUploadEmailNotification:
-    """Tests for email notification on processing failure."""
-
-    @patch('src.app.get_db')
-    @patch('src.app.FileValidator')
-    @patch('src.auth.get_uow')
-    def test_upload_failure_sends_email_notification(
-        self, mock_auth_uow, mock_validator_class, mock_get_db, client, app
-    ):
-        """Processing failure triggers email notification to user."""
-        user = MockUser(role='CONSULTANT', email='user@example.com', name='Test User')
-        _setup_auth(client, user, mock_auth_uow)
-
-        mock_validation_result = MagicMock()
-        mock_validation_result.is_valid = True
-        mock_validator_instance = MagicMock()
-        mock_validator_instance.validate.return_value = mock_validation_result
-        mock_validator_class.create_pdf_validator.return_value = mock_validator_instance
-
-        mock_db_main = MagicMock()
-        mock_db_err = MagicMock()
-        mock_db_err.query.return_value.filter_by.return_value.first.return_value = MagicMock()
-
-        call_count = [0]
-        def db_gen():
-            dbs = [mock_db_main, mock_db_err]
-            idx = call_count[0]
-            call_count[0] += 1
-            if idx < len(dbs):
-                return iter([dbs[idx]])
-            return iter([MagicMock()])
-        mock_get_db.side_effect = lambda: db_gen()
-
-        mock_email = MagicMock()
-        original_email = getattr(app, 'email_service', None)
-        app.email_service = mock_email
-
-        pdf_content = _make_pdf_content()
-
-        try:
-            with patch('src.services.processor.processor_service') as mock_proc:
-                mock_proc.process_single_file.side_effect = Exception("AI crash")
-
-                response = client.post(
-                    '/upload',
-                    data={
-                        'file': (BytesIO(pdf_content), 'email_test.pdf'),
-                    },
-                    content_type='multipart/form-data',
-                    follow_redirects=False,
-                )
-                assert response.status_code == 302
-                # Email service should have been called
-                mock_email.send_email.assert_called_once()
-                call_args = mock_email.send_email.call_args
-                assert call_args[0][0] == 'user@example.com'
-                assert 'email_test.pdf' in call_args[0][1]
-        finally:
-            app.email_service = original_email
-
-
 # ===================================================================
 #  GET /download_pdf/<json_id> - GCS Path
 # ===================================================================
@@ -895,9 +801,8 @@ class TestDownloadPdfDriveError:
         user = MockUser(role='CONSULTANT')
         _setup_auth(client, user, mock_auth_uow)
 
-        mock_drive.service.files.return_value.get.return_value.execute.side_effect = (
-            Exception("Drive API error")
-        )
+        mock_drive.get_file.return_value = None
+        mock_drive.find_file.side_effect = Exception("Drive API error")
 
         response = client.get('/download_pdf/drive-file-id')
         assert response.status_code == 500
@@ -912,7 +817,7 @@ class TestDownloadPdfDriveError:
         user = MockUser(role='CONSULTANT')
         _setup_auth(client, user, mock_auth_uow)
 
-        mock_drive.service.files.return_value.get.return_value.execute.return_value = {
+        mock_drive.get_file.return_value = {
             'name': 'report.pdf',
             'mimeType': 'application/pdf',
         }
@@ -933,15 +838,13 @@ class TestDownloadPdfDriveError:
         user = MockUser(role='CONSULTANT')
         _setup_auth(client, user, mock_auth_uow)
 
-        # First call: get file metadata (JSON)
-        mock_drive.service.files.return_value.get.return_value.execute.return_value = {
+        # Metadata of the JSON file
+        mock_drive.get_file.return_value = {
             'name': 'report.json',
             'mimeType': 'application/json',
         }
-        # Second call: list files to find PDF
-        mock_drive.service.files.return_value.list.return_value.execute.return_value = {
-            'files': [{'id': 'found-pdf-id'}]
-        }
+        # Exact name lookup finds the PDF
+        mock_drive.find_file.return_value = {'id': 'found-pdf-id', 'name': 'report.pdf'}
         mock_drive.download_file.return_value = b'%PDF-1.4 from json lookup'
 
         response = client.get('/download_pdf/json-file-id')
@@ -959,11 +862,12 @@ class TestDownloadPdfDriveError:
         user = MockUser(role='CONSULTANT')
         _setup_auth(client, user, mock_auth_uow)
 
-        mock_drive.service.files.return_value.get.return_value.execute.return_value = {
+        mock_drive.get_file.return_value = {
             'name': 'report.json',
             'mimeType': 'application/json',
         }
         # No files found in exact or fuzzy search
+        mock_drive.find_file.return_value = None
         mock_drive.service.files.return_value.list.return_value.execute.return_value = {
             'files': []
         }
@@ -983,17 +887,16 @@ class TestDownloadPdfDriveError:
         user = MockUser(role='CONSULTANT')
         _setup_auth(client, user, mock_auth_uow)
 
-        mock_drive.service.files.return_value.get.return_value.execute.return_value = {
+        mock_drive.get_file.return_value = {
             'name': 'report.json',
             'mimeType': 'application/json',
         }
 
-        # First list call (exact match): no files
-        # Second list call (fuzzy match): has a PDF
-        mock_drive.service.files.return_value.list.return_value.execute.side_effect = [
-            {'files': []},
-            {'files': [{'id': 'fuzzy-pdf-id', 'name': 'report_v2.pdf'}]},
-        ]
+        # Exact match: no file; fuzzy match: has a PDF
+        mock_drive.find_file.return_value = None
+        mock_drive.service.files.return_value.list.return_value.execute.return_value = {
+            'files': [{'id': 'fuzzy-pdf-id', 'name': 'report_v2.pdf'}]
+        }
         mock_drive.download_file.return_value = b'%PDF-1.4 fuzzy pdf'
 
         response = client.get('/download_pdf/json-fuzzy-id')
@@ -1011,15 +914,15 @@ class TestDownloadPdfDriveError:
         user = MockUser(role='CONSULTANT')
         _setup_auth(client, user, mock_auth_uow)
 
-        mock_drive.service.files.return_value.get.return_value.execute.return_value = {
+        mock_drive.get_file.return_value = {
             'name': 'report.json',
             'mimeType': 'application/json',
         }
 
-        mock_drive.service.files.return_value.list.return_value.execute.side_effect = [
-            {'files': []},
-            {'files': [{'id': 'non-pdf-id', 'name': 'report.docx'}]},
-        ]
+        mock_drive.find_file.return_value = None
+        mock_drive.service.files.return_value.list.return_value.execute.return_value = {
+            'files': [{'id': 'non-pdf-id', 'name': 'report.docx'}]
+        }
 
         response = client.get('/download_pdf/json-no-pdf-ext')
         assert response.status_code == 404
@@ -1383,6 +1383,9 @@ class TestApiStatus:
         mock_insp.status.value = 'PENDING_MANAGER_REVIEW'
         mock_insp.status.__eq__ = lambda self, other: self.value == (other.value if hasattr(other, 'value') else other)
         mock_insp.drive_file_id = 'file-123'
+        mock_insp.nc_count = 3
+        mock_insp.pc_count = 1
+        mock_insp.total_items = 10
 
         mock_uow = MagicMock()
         mock_uow.inspections.get_for_manager.return_value = [mock_insp]
@@ -1398,6 +1401,9 @@ class TestApiStatus:
         assert data['processed_raw'][0]['establishment'] == 'Rest A'
         assert data['processed_raw'][0]['filename'] == 'report.pdf'
         assert data['processed_raw'][0]['consultant'] == 'Ana Consultora'
+        assert data['processed_raw'][0]['nc_count'] == 3
+        assert data['processed_raw'][0]['pc_count'] == 1
+        assert data['processed_raw'][0]['total_items'] == 10
 
     @patch('src.manager_routes.get_uow')
     @patch('src.auth.get_uow')
@@ -1424,6 +1430,42 @@ class TestApiStatus:
         data = response.get_json()
         assert len(data['processed_raw']) == 0
 
+    @pytest.mark.parametrize('inspection_count', [2, 8])
+    @patch('src.manager_routes.get_uow')
+    @patch('src.auth.get_uow')
+    def test_api_status_query_count_is_constant(self, mock_auth_uow, mock_mgr_uow, inspection_count, client,
+                                                db_session, company_factory, establishment_factory,
+                                                inspection_factory, user_factory, max_queries):
+        """Consultant fallback and job info don't issue one query per inspection."""
+        from src.models_db import JobStatus
+        from src.repositories.unit_of_work import UnitOfWork
+        from src.services.job_tracker import new_job
+
+        company = company_factory.create(db_session)
+        for i in range(inspection_count):
+            est = establishment_factory.create(db_session, company=company, name=f'Loja {i}')
+            est.users.append(user_factory.create(db_session, name=f'Consultor {i}'))
+            inspection_factory.create(db_session, establishment=est)
+            job = new_job('PROCESS_REPORT', company_id=company.id,
+                          input_payload={'filename': f'pendente-{i}.pdf', 'establishment_id': str(est.id)})
+            job.status = JobStatus.PENDING
+            db_session.add(job)
+        db_session.commit()
+        db_session.expire_all()
+
+        manager = MockUser(role='MANAGER', company_id=company.id)
+        _setup_manager_session(client, manager, mock_auth_uow)
+        mock_mgr_uow.return_value = UnitOfWork(db_session)
+
+        # inspeções, consultores (selectin), job info, estabelecimentos, jobs pendentes
+        with max_queries(5):
+            response = client.get('/api/status', headers=JSON_HEADERS)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert {p['consultant'] for p in data['processed_raw']} == {f'Consultor {i}' for i in range(inspection_count)}
+        assert len(data['pending']) == inspection_count
+
     @patch('src.manager_routes.get_uow')
     @patch('src.auth.get_uow')
     def test_api_status_exception(self, mock_auth_uow, mock_mgr_uow, client):
@@ -646,6 +646,10 @@ class TestTryMigrateFromDrive:
         mock_uow.commit.assert_called_once()
         # Two items should have been added
         assert mock_uow.action_plans.add_item.call_count == 2
+        # Dashboard summary counters recalculated before the commit
+        inspection = mock_uow.inspections.add.call_args.args[0]
+        mock_uow.inspections.refresh_summary.assert_called_once()
+        assert mock_uow.inspections.refresh_summary.call_args.args[0] is inspection
 
     @patch('src.container.get_inspection_data_service')
     @patch('src.manager_routes.get_uow')
@@ -882,6 +886,7 @@ class TestApiStatusExtra:
         mock_insp.status.value = 'APPROVED'
         mock_insp.status.__eq__ = lambda s, o: False
         mock_insp.drive_file_id = None
+        mock_insp.nc_count = mock_insp.pc_count = mock_insp.total_items = None  # Sem resumo calculado
 
         mock_uow = MagicMock()
         mock_uow.inspections.get_for_manager.return_value = [mock_insp]
@@ -894,6 +899,7 @@ class TestApiStatusExtra:
         assert response.status_code == 200
         data = response.get_json()
         assert data['processed_raw'][0]['review_link'] == '#'
+        assert data['processed_raw'][0]['nc_count'] == 0
 
 
 # ===================================================================
@@ -0,0 +1,136 @@
+"""Unit tests for the debounced, single-flight Drive change scan (src/services/change_scan_scheduler)."""
+import threading
+import time
+from unittest.mock import patch
+
+from src.models_db import AppConfig
+from src.services.change_scan_scheduler import PENDING_MARKER_KEY, ChangeScanScheduler
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestChangeScanScheduler:
+
+    def test_burst_of_notifications_runs_one_scan(self):
+        scans = []
+        scheduler = ChangeScanScheduler(scan=lambda: scans.append(1) or {'status': 'ok'},
+                                        debounce_seconds=0.1, persist_marker=False)
+
+        started = time.perf_counter()
+        for _ in range(20):
+            scheduler.notify()
+        notify_ms = (time.perf_counter() - started) * 1000
+
+        assert notify_ms < 100  # o webhook não espera a varredura
+        assert _wait_for(lambda: scheduler.stats()['scans'] == 1)
+        time.sleep(0.2)
+        stats = scheduler.stats()
+        assert len(scans) == 1
+        assert stats['notifications'] == 20
+        assert stats['coalesced'] == 19
+        assert stats['pending'] is False
+
+    def test_notification_during_scan_opens_next_window(self):
+        release = threading.Event()
+        calls = []
+
+        def scan():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(timeout=2)
+            return {'status': 'ok'}
+
+        scheduler = ChangeScanScheduler(scan=scan, debounce_seconds=0.05, persist_marker=False)
+        scheduler.notify()
+        assert _wait_for(lambda: len(calls) == 1)
+
+        scheduler.notify()
+        scheduler.notify()
+        release.set()
+
+        assert _wait_for(lambda: scheduler.stats()['scans'] == 2)
+        time.sleep(0.15)
+        assert len(calls) == 2
+
+    def test_scans_never_overlap(self):
+        active, overlap = [0], []
+        lock = threading.Lock()
+
+        def scan():
+            with lock:
+                active[0] += 1
+                overlap.append(active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return {}
+
+        scheduler = ChangeScanScheduler(scan=scan, debounce_seconds=0.0, persist_marker=False)
+        threads = [threading.Thread(target=scheduler.run_now) for _ in range(3)]
+        scheduler.notify()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert _wait_for(lambda: scheduler.stats()['scans'] == 4)
+        assert max(overlap) == 1
+
+    def test_error_result_counts_as_scan_error(self):
+        results = iter([{'error': 'Drive Service unavailable'}, {'status': 'ok'}])
+        scheduler = ChangeScanScheduler(scan=lambda: next(results), debounce_seconds=60, persist_marker=False)
+
+        scheduler.run_now()
+        assert scheduler.stats()['scan_errors'] == 1
+        scheduler.run_now()
+
+        stats = scheduler.stats()
+        assert stats['scans'] == 2
+        assert stats['scan_errors'] == 1
+
+    def test_marker_is_persisted_and_cleared_by_run_now(self, db_session):
+        scans = []
+        # Janela longa: quem consome é o run_now (caminho do cron), na mesma thread da sessão SQLite
+        scheduler = ChangeScanScheduler(scan=lambda: scans.append(1) or {'status': 'ok'}, debounce_seconds=60)
+
+        with patch('src.database.get_db', side_effect=lambda: iter([db_session])):
+            scheduler.notify()
+            assert scheduler.has_persisted_marker()
+
+            scheduler.run_now()
+            assert not scheduler.has_persisted_marker()
+        assert db_session.get(AppConfig, PENDING_MARKER_KEY) is None
+        assert scans == [1]
+        assert scheduler.stats()['pending'] is False
+
+
+class TestWebhookRoute:
+
+    def test_webhook_acknowledges_without_scanning(self, client):
+        with patch('src.services.change_scan_scheduler.change_scan_scheduler') as mock_scheduler, \
+             patch('src.services.sync_service.process_global_changes') as mock_scan:
+            response = client.post('/api/webhook/drive', headers={'X-Goog-Resource-State': 'change'})
+
+        assert response.status_code == 200
+        mock_scheduler.notify.assert_called_once()
+        mock_scan.assert_not_called()
+
+    def test_cron_scans_only_with_pending_marker(self, client):
+        with patch('src.services.change_scan_scheduler.change_scan_scheduler') as mock_scheduler, \
+             patch('src.cron_routes._check_cron_auth', return_value=True):
+            mock_scheduler.has_persisted_marker.return_value = False
+            skipped = client.post('/api/cron/drive_changes')
+            mock_scheduler.has_persisted_marker.return_value = True
+            mock_scheduler.run_now.return_value = {'status': 'ok', 'processed': 2, 'pages': 1}
+            scanned = client.post('/api/cron/drive_changes')
+
+        assert skipped.get_json()['action'] == 'skipped'
+        assert scanned.get_json()['result']['processed'] == 2
+        mock_scheduler.run_now.assert_called_once()
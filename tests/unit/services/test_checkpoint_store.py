@@ -0,0 +1,74 @@
+"""Tests for CheckpointStore (processing stage checkpoints)."""
+import pytest
+from datetime import datetime, timedelta
+
+from src.models_db import ProcessingCheckpoint
+from src.services.checkpoint_store import CheckpointStore, STAGE_TEXT, STAGE_AI_RESULT
+
+
+@pytest.fixture
+def store(db_session):
+    return CheckpointStore(session_factory=lambda: db_session, max_age_days=30, max_size_mb=1)
+
+
+class TestCheckpointStore:
+
+    def test_put_and_get(self, store):
+        store.put('abc123', STAGE_TEXT, {'text': 'conteudo'})
+
+        assert store.get('abc123', STAGE_TEXT) == {'text': 'conteudo'}
+
+    def test_get_miss(self, store):
+        assert store.get('missing', STAGE_TEXT) is None
+
+    def test_key_includes_prompt_version_and_model(self, store):
+        store.put('abc123', STAGE_AI_RESULT, {'data': {}}, 'v1', 'gpt-4o-mini')
+
+        assert store.get('abc123', STAGE_AI_RESULT, 'v1', 'gpt-4o-mini') == {'data': {}}
+        assert store.get('abc123', STAGE_AI_RESULT, 'v2', 'gpt-4o-mini') is None
+        assert store.get('abc123', STAGE_AI_RESULT, 'v1', 'gpt-4o') is None
+
+    def test_put_replaces_existing(self, store, db_session):
+        store.put('abc123', STAGE_TEXT, {'text': 'old'})
+        store.put('abc123', STAGE_TEXT, {'text': 'new'})
+
+        assert store.get('abc123', STAGE_TEXT) == {'text': 'new'}
+        assert db_session.query(ProcessingCheckpoint).count() == 1
+
+    def test_get_updates_hits(self, store, db_session):
+        store.put('abc123', STAGE_TEXT, {'text': 'x'})
+        store.get('abc123', STAGE_TEXT)
+        store.get('abc123', STAGE_TEXT)
+
+        assert db_session.query(ProcessingCheckpoint).first().hits == 2
+
+    def test_evicts_expired_entries(self, store, db_session):
+        store.put('old', STAGE_TEXT, {'text': 'x'})
+        entry = db_session.query(ProcessingCheckpoint).filter_by(file_hash='old').first()
+        entry.last_used_at = datetime.utcnow() - timedelta(days=31)
+        db_session.commit()
+
+        store.put('new', STAGE_TEXT, {'text': 'y'})
+
+        assert store.get('old', STAGE_TEXT) is None
+        assert store.get('new', STAGE_TEXT) is not None
+
+    def test_evicts_least_recently_used_over_size_limit(self, db_session):
+        store = CheckpointStore(session_factory=lambda: db_session, max_age_days=30, max_size_mb=0.001)
+        big = 'x' * 600
+        store.put('first', STAGE_TEXT, {'text': big})
+        entry = db_session.query(ProcessingCheckpoint).filter_by(file_hash='first').first()
+        entry.last_used_at = datetime.utcnow() - timedelta(minutes=5)
+        db_session.commit()
+
+        store.put('second', STAGE_TEXT, {'text': big})
+
+        assert store.get('first', STAGE_TEXT) is None
+        assert store.get('second', STAGE_TEXT) == {'text': big}
+
+    def test_invalidate(self, store):
+        store.put('abc123', STAGE_TEXT, {'text': 'x'})
+        store.put('abc123', STAGE_AI_RESULT, {'data': {}}, 'v1', 'm')
+
+        assert store.invalidate('abc123') == 2
+        assert store.get('abc123', STAGE_TEXT) is None
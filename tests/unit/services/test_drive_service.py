@@ -0,0 +1,352 @@
+"""Unit tests for the per-thread Drive client pool (src/services/drive_service)."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+
+from src.services.drive_service import FOLDER_MIME_TYPE, DriveClientPool, DriveMetadataCache, DriveService
+
+DOWNLOAD_DELAY = 0.2
+
+
+class FakeDriveHandler(BaseHTTPRequestHandler):
+    """`files.get_media` lento: conta quantos downloads estão em andamento ao mesmo tempo."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(DOWNLOAD_DELAY)
+            body = self.path.split('?')[0].rsplit('/', 1)[-1].encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_drive():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeDriveHandler)
+    server.lock = threading.Lock()
+    server.active = 0
+    server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _service(server, pool_size):
+    svc = DriveService(credentials_file='/nonexistent.json', pool_size=pool_size)
+    svc._pool = DriveClientPool(
+        AnonymousCredentials(), pool_size,
+        client_options={'api_endpoint': f'http://127.0.0.1:{server.server_address[1]}/'},
+    )
+    return svc
+
+
+class TestDriveClientPool:
+
+    def test_concurrent_downloads_overlap(self, fake_drive):
+        svc = _service(fake_drive, pool_size=4)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(svc.download_file, ['a', 'b', 'c', 'd']))
+        elapsed = time.perf_counter() - started
+
+        assert results == [b'a', b'b', b'c', b'd']
+        assert fake_drive.max_active == 4
+        assert elapsed < 4 * DOWNLOAD_DELAY
+        assert svc.stats()['clients_created'] == 4
+
+    def test_pool_size_bounds_concurrency_and_records_wait(self, fake_drive):
+        svc = _service(fake_drive, pool_size=2)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(svc.download_file, ['a', 'b', 'c', 'd']))
+
+        stats = svc.stats()
+        assert fake_drive.max_active == 2
+        assert stats['acquired'] == 4
+        assert stats['waited'] >= 1
+        assert stats['wait_ms_max'] >= DOWNLOAD_DELAY * 1000 * 0.5
+        assert stats['in_use'] == 0
+
+    def test_client_is_reused_per_thread(self):
+        pool = DriveClientPool(AnonymousCredentials(), 2)
+
+        first = pool.client()
+        with pool.acquire() as service:
+            assert service is first
+        other = []
+        thread = threading.Thread(target=lambda: other.append(pool.client()))
+        thread.start()
+        thread.join()
+
+        assert other[0] is not first
+        assert pool.stats()['clients_created'] == 2
+
+
+class TestDriveServiceAuth:
+
+    def test_service_is_none_when_authentication_fails(self, monkeypatch):
+        def no_adc(scopes):
+            raise Exception('no ADC')
+
+        monkeypatch.setattr('src.services.drive_service.get_config', lambda key: None)
+        monkeypatch.setattr('src.services.drive_service.google.auth.default', no_adc)
+        svc = DriveService(credentials_file='/nonexistent.json')
+
+        assert svc.service is None
+        assert svc.download_file('x') == b''
+        assert svc.stats()['clients_created'] == 0
+
+
+class HttpError(Exception):
+    def __init__(self, status, message=''):
+        super().__init__(message or f'HTTP {status}')
+        self.resp = MagicMock(status=status)
+
+
+class FakeBatch:
+    """Batch HTTP falso: `outcomes[fileId]` é uma lista de respostas/erros, uma por tentativa."""
+
+    def __init__(self, drive, callback):
+        self.drive = drive
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.drive.batches.append([request['fileId'] for _, request in self.requests])
+        for request_id, request in self.requests:
+            queue = self.drive.outcomes.get(request['fileId'])
+            outcome = queue.pop(0) if queue else {'id': request['fileId'], 'parents': ['in']}
+            if isinstance(outcome, Exception):
+                self.callback(request_id, None, outcome)
+            else:
+                self.callback(request_id, outcome, None)
+
+
+def _batch_service(outcomes=None):
+    drive = MagicMock()
+    drive.batches = []
+    drive.outcomes = outcomes or {}
+    drive.new_batch_http_request.side_effect = lambda callback: FakeBatch(drive, callback)
+    drive.files.return_value.get.side_effect = lambda **kw: {'op': 'get', **kw}
+    drive.files.return_value.update.side_effect = lambda **kw: {'op': 'update', **kw}
+
+    svc = DriveService(credentials_file='/nonexistent.json')
+    pool = MagicMock()
+    pool.client.return_value = drive
+    pool.acquire.return_value.__enter__.return_value = drive
+    svc._pool = pool
+    return svc, drive
+
+
+class TestBatchOperations:
+
+    def test_groups_up_to_100_requests_per_round_trip(self):
+        svc, drive = _batch_service()
+
+        metadata, errors = svc.get_files([f'f{i}' for i in range(250)])
+
+        assert [len(b) for b in drive.batches] == [100, 100, 50]
+        assert len(metadata) == 250
+        assert errors == {}
+
+    @patch('src.services.drive_service.time.sleep')
+    def test_retries_only_failed_retryable_subrequests(self, mock_sleep):
+        svc, drive = _batch_service({
+            'rate': [HttpError(429), {'id': 'rate'}],
+            'gone': [HttpError(404)],
+        })
+
+        results, errors = svc.batch_execute({
+            key: (lambda service, key=key: service.files().get(fileId=key))
+            for key in ['ok', 'rate', 'gone']
+        })
+
+        assert drive.batches == [['ok', 'rate', 'gone'], ['rate']]
+        assert set(results) == {'ok', 'rate'}
+        assert list(errors) == ['gone']
+        mock_sleep.assert_called_once()
+
+    @patch('src.services.drive_service.time.sleep')
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        svc, drive = _batch_service({'busy': [HttpError(503)] * 3})
+
+        results, errors = svc.batch_execute(
+            {'busy': lambda service: service.files().get(fileId='busy')}, max_retries=2
+        )
+
+        assert len(drive.batches) == 3
+        assert results == {}
+        assert errors['busy'].resp.status == 503
+
+    def test_move_files_uses_known_parents_and_skips_get(self):
+        svc, drive = _batch_service()
+
+        moved, errors = svc.move_files(['a', 'b', 'c'], 'backup', parents={'a': ['in'], 'b': ['in'], 'c': ['backup']})
+
+        assert sorted(moved) == ['a', 'b', 'c']
+        assert errors == {}
+        assert drive.batches == [['a', 'b']]  # 'c' já está no backup; nenhum get
+        drive.files.return_value.update.assert_any_call(
+            fileId='a', addParents='backup', removeParents='in', fields='id, parents', supportsAllDrives=True
+        )
+
+    def test_move_files_reads_missing_parents_in_one_batch(self):
+        svc, drive = _batch_service({'x': [HttpError(404)]})
+
+        moved, errors = svc.move_files(['a', 'b', 'x'], 'backup')
+
+        assert drive.batches == [['a', 'b', 'x'], ['a', 'b']]  # 1 batch de get + 1 de update
+        assert sorted(moved) == ['a', 'b']
+        assert list(errors) == ['x']
+
+
+class TestPagination:
+
+    def test_list_files_follows_next_page_token(self):
+        svc, drive = _batch_service()
+        drive.files.return_value.list.return_value.execute.side_effect = [
+            {'files': [{'id': '1', 'name': 'a.pdf'}], 'nextPageToken': 'p2'},
+            {'files': [{'id': '2', 'name': 'b.pdf'}, {'id': '3', 'name': 'c.json'}]},
+        ]
+
+        files = svc.list_files('folder', extension='.pdf')
+
+        assert [f['id'] for f in files] == ['1', '2']
+        page_tokens = [c.kwargs['pageToken'] for c in drive.files.return_value.list.call_args_list]
+        assert page_tokens == [None, 'p2']
+
+    def test_list_changes_returns_both_tokens(self):
+        svc, drive = _batch_service()
+        drive.changes.return_value.list.return_value.execute.return_value = {
+            'changes': [{'fileId': 'a'}], 'nextPageToken': 'p2',
+        }
+
+        assert svc.list_changes('p1') == ([{'fileId': 'a'}], 'p2', None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cached_service(ttl=300):
+    svc, drive = _batch_service()
+    clock = FakeClock()
+    svc.metadata_cache = DriveMetadataCache(ttl=ttl, clock=clock)
+    return svc, drive, clock
+
+
+class TestMetadataCache:
+
+    def test_create_folder_reuses_cached_folder_without_listing(self):
+        svc, drive, _ = _cached_service()
+        drive.files.return_value.list.return_value.execute.return_value = {'files': []}
+        drive.files.return_value.create.return_value.execute.return_value = {
+            'id': 'new', 'name': 'Loja 1', 'mimeType': FOLDER_MIME_TYPE, 'parents': ['root'], 'webViewLink': 'link',
+        }
+
+        assert svc.create_folder('Loja 1', parent_id='root') == ('new', 'link')
+        assert svc.create_folder('Loja 1', parent_id='root') == ('new', 'link')
+
+        assert drive.files.return_value.list.call_count == 1  # só a primeira busca vai à API
+        assert drive.files.return_value.create.call_count == 1
+        query = drive.files.return_value.list.call_args.kwargs['q']
+        assert "name = 'Loja 1'" in query and FOLDER_MIME_TYPE in query
+
+    def test_find_file_escapes_quotes_and_caches_hit(self):
+        svc, drive, _ = _cached_service()
+        drive.files.return_value.list.return_value.execute.return_value = {
+            'files': [{'id': 'pdf', 'name': "D'Ávila.pdf", 'mimeType': 'application/pdf', 'parents': ['out']}],
+        }
+
+        assert svc.find_file('out', "D'Ávila.pdf")['id'] == 'pdf'
+        assert svc.find_file('out', "D'Ávila.pdf")['id'] == 'pdf'
+        assert svc.get_file('pdf')['name'] == "D'Ávila.pdf"
+
+        assert drive.files.return_value.list.call_count == 1
+        assert "name = 'D\\'Ávila.pdf'" in drive.files.return_value.list.call_args.kwargs['q']
+        drive.files.return_value.get.assert_not_called()
+        assert svc.metadata_cache.stats()['hits'] == 2
+
+    def test_entries_expire_after_ttl(self):
+        svc, drive, clock = _cached_service(ttl=60)
+        drive.files.return_value.get.side_effect = None
+        drive.files.return_value.get.return_value.execute.return_value = {
+            'id': 'a', 'name': 'a.json', 'mimeType': 'application/json', 'parents': ['p'],
+        }
+
+        svc.get_file('a')
+        clock.now = 59
+        svc.get_file('a')
+        clock.now = 120
+        svc.get_file('a')
+
+        assert drive.files.return_value.get.call_count == 2
+
+    def test_change_feed_replaces_stale_metadata(self):
+        svc, drive, _ = _cached_service()
+        svc.metadata_cache.put_many([
+            {'id': 'a', 'name': 'a.pdf', 'mimeType': 'application/pdf', 'parents': ['out']},
+            {'id': 'b', 'name': 'b.pdf', 'mimeType': 'application/pdf', 'parents': ['out']},
+        ])
+        drive.changes.return_value.list.return_value.execute.return_value = {
+            'changes': [
+                {'fileId': 'a', 'file': {'id': 'a', 'name': 'a.pdf', 'mimeType': 'application/pdf', 'parents': ['backup']}},
+                {'fileId': 'b', 'removed': True},
+            ],
+            'newStartPageToken': 't2',
+        }
+
+        svc.list_changes('t1')
+
+        cache = svc.metadata_cache
+        assert cache.find('out', 'a.pdf') is None
+        assert cache.find('backup', 'a.pdf')['id'] == 'a'
+        assert cache.get('b') is None
+        assert cache.stats()['invalidations'] == 2
+
+    def test_move_file_reads_current_parents_instead_of_cache(self):
+        svc, drive, _ = _cached_service()
+        # Cache velho: o arquivo já saiu de 'stale' (movido por outro processo)
+        svc.metadata_cache.put({'id': 'a', 'name': 'a.json', 'mimeType': 'application/json', 'parents': ['stale']})
+        drive.files.return_value.get.side_effect = None
+        drive.files.return_value.get.return_value.execute.return_value = {
+            'id': 'a', 'name': 'a.json', 'mimeType': 'application/json', 'parents': ['wrong'],
+        }
+        drive.files.return_value.update.side_effect = None
+        drive.files.return_value.update.return_value.execute.return_value = {'id': 'a', 'parents': ['right']}
+
+        svc.move_file('a', 'right')
+
+        drive.files.return_value.get.assert_called_once()
+        drive.files.return_value.update.assert_called_once_with(
+            fileId='a', addParents='right', removeParents='wrong', fields='id, parents', supportsAllDrives=True
+        )
+        assert svc.metadata_cache.get('a')['parents'] == ['right']
+        assert svc.metadata_cache.find('stale', 'a.json') is None
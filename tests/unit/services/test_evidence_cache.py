@@ -0,0 +1,97 @@
+"""Unit tests for the evidence disk cache used by PDF rendering (storage_service.EvidenceCache)."""
+import threading
+import time
+from unittest.mock import MagicMock
+
+from src.services.storage_service import EvidenceCache
+
+
+class NotFound(Exception):
+    code = 404
+
+
+def _storage(blobs, latency=0.0):
+    """Storage fake: `blobs` mapeia caminho no bucket -> bytes; registra a concorrência máxima."""
+    downloaded = []
+    lock = threading.Lock()
+    state = {'active': 0, 'max_active': 0}
+
+    def blob(path):
+        mock = MagicMock()
+
+        def download():
+            with lock:
+                state['active'] += 1
+                state['max_active'] = max(state['max_active'], state['active'])
+            try:
+                time.sleep(latency)
+                if path not in blobs:
+                    raise NotFound(path)
+                with lock:
+                    downloaded.append(path)
+                return blobs[path]
+            finally:
+                with lock:
+                    state['active'] -= 1
+        mock.download_as_bytes.side_effect = download
+        return mock
+
+    storage = MagicMock(bucket_name='bucket')
+    storage.client.bucket.return_value.blob.side_effect = blob
+    return storage, downloaded, state
+
+
+class TestEvidenceCache:
+
+    def test_prefetch_downloads_in_parallel_and_serves_from_disk(self, tmp_path):
+        blobs = {f'evidence/pdf/f{i}.jpg': b'x' * 10 for i in range(30)}
+        storage, downloaded, state = _storage(blobs, latency=0.02)
+        cache = EvidenceCache(storage=storage, cache_dir=str(tmp_path), max_bytes=10_000, max_workers=8)
+        names = [f'f{i}.jpg' for i in range(30)]
+
+        assert cache.prefetch(names) == 30
+        assert len(downloaded) == 30
+        assert state['max_active'] > 1
+        assert cache.lookup('f7.jpg').startswith(str(tmp_path))
+
+        # Segundo render do mesmo plano: nada vai ao GCS
+        assert cache.prefetch(names) == 0
+        assert cache.stats()['hits'] == 30
+        assert cache.stats()['downloads'] == 30
+
+    def test_falls_back_to_original_when_derivative_missing(self, tmp_path):
+        storage, downloaded, _ = _storage({'evidence/legacy.png': b'png'})
+        cache = EvidenceCache(storage=storage, cache_dir=str(tmp_path), max_bytes=1024)
+
+        file_path = cache.fetch('legacy.png')
+
+        assert downloaded == ['evidence/legacy.png']
+        with open(file_path, 'rb') as f:
+            assert f.read() == b'png'
+        assert cache.stats()['download_errors'] == 0
+
+    def test_missing_everywhere_returns_none(self, tmp_path):
+        storage, _, _ = _storage({})
+        cache = EvidenceCache(storage=storage, cache_dir=str(tmp_path), max_bytes=1024)
+
+        assert cache.fetch('missing.png') is None
+        assert cache.stats()['misses'] == 1
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        storage, _, _ = _storage({f'evidence/pdf/{n}.jpg': b'x' * 10 for n in 'abc'})
+        cache = EvidenceCache(storage=storage, cache_dir=str(tmp_path), max_bytes=25)
+
+        cache.prefetch(['a.jpg', 'b.jpg'])
+        cache.prefetch(['a.jpg'])  # 'a' passa a ser o mais recente
+        cache.prefetch(['c.jpg'])
+
+        assert cache.lookup('b.jpg') is None
+        assert cache.lookup('a.jpg') is not None
+        assert cache.stats()['size_bytes'] == 20
+
+    def test_without_gcs_client_is_noop(self, tmp_path):
+        storage = MagicMock(client=None, bucket_name=None)
+        cache = EvidenceCache(storage=storage, cache_dir=str(tmp_path), max_bytes=1024)
+
+        assert cache.prefetch(['a.jpg']) == 0
+        assert cache.fetch('a.jpg') is None
@@ -0,0 +1,146 @@
+"""Unit tests for evidence delivery (src/services/evidence_delivery)."""
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from src.services.evidence_delivery import EvidenceDelivery, LocalUrlSigner
+
+PAYLOAD = bytes(range(256)) * 10  # 2560 bytes
+UPDATED = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class NotFound(Exception):
+    code = 404
+
+
+def _bucket(exists=True):
+    blob = MagicMock()
+    blob.name = 'evidence/abc_foto.jpg'
+    blob.size = len(PAYLOAD)
+    blob.etag = 'CJ3xZ'
+    blob.content_type = 'image/jpeg'
+    blob.updated = UPDATED
+    blob.exists.return_value = exists
+    if not exists:
+        blob.reload.side_effect = NotFound()
+    blob.download_as_bytes.side_effect = lambda start, end: PAYLOAD[start:end + 1]
+    bucket = MagicMock()
+    bucket.blob.return_value = blob
+    return bucket, blob
+
+
+def _get(delivery, bucket, headers=None, allow_redirect=True):
+    app = Flask(__name__)
+    with app.test_request_context('/evidence/abc_foto.jpg', headers=headers or {}):
+        response = delivery.gcs_response(bucket, 'abc_foto.jpg', 'public, immutable', allow_redirect)
+        if response is None:
+            return None, b''
+        response.direct_passthrough = False
+        return response, response.get_data() if response.status_code in (200, 206) else b''
+
+
+class TestStreamMode:
+
+    def test_streams_in_chunks_without_exists_call(self):
+        bucket, blob = _bucket()
+        with patch('src.services.evidence_delivery.CHUNK_SIZE', 1000):
+            response, body = _get(EvidenceDelivery(mode='stream'), bucket)
+
+        assert response.status_code == 200
+        assert body == PAYLOAD
+        assert response.headers['ETag'] == '"CJ3xZ"'
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        assert response.last_modified == UPDATED
+        assert blob.download_as_bytes.call_count == 3
+        blob.exists.assert_not_called()
+
+    def test_range_request_returns_partial_content(self):
+        bucket, blob = _bucket()
+        response, body = _get(EvidenceDelivery(mode='stream'), bucket, {'Range': 'bytes=100-199'})
+
+        assert response.status_code == 206
+        assert body == PAYLOAD[100:200]
+        assert response.headers['Content-Range'] == f'bytes 100-199/{len(PAYLOAD)}'
+        blob.download_as_bytes.assert_called_once_with(start=100, end=199)
+
+    def test_unsatisfiable_range(self):
+        bucket, blob = _bucket()
+        response, _ = _get(EvidenceDelivery(mode='stream'), bucket, {'Range': 'bytes=9000-9100'})
+
+        assert response.status_code == 416
+        blob.download_as_bytes.assert_not_called()
+
+    def test_if_range_mismatch_sends_full_body(self):
+        bucket, _ = _bucket()
+        response, body = _get(
+            EvidenceDelivery(mode='stream'), bucket, {'Range': 'bytes=0-9', 'If-Range': '"outra"'}
+        )
+
+        assert response.status_code == 200
+        assert body == PAYLOAD
+
+    def test_conditional_requests_return_304(self):
+        bucket, blob = _bucket()
+        delivery = EvidenceDelivery(mode='stream')
+
+        by_etag, _ = _get(delivery, bucket, {'If-None-Match': '"CJ3xZ"'})
+        by_date, _ = _get(delivery, bucket, {'If-Modified-Since': 'Thu, 01 Jan 2026 12:00:00 GMT'})
+
+        assert by_etag.status_code == 304
+        assert by_date.status_code == 304
+        blob.download_as_bytes.assert_not_called()
+
+    def test_missing_blob_returns_none(self):
+        bucket, _ = _bucket(exists=False)
+        response, _ = _get(EvidenceDelivery(mode='stream'), bucket)
+        assert response is None
+
+
+class TestSignedMode:
+
+    def test_redirects_to_signed_url_and_memoizes_existence(self):
+        bucket, blob = _bucket()
+        delivery = EvidenceDelivery(mode='signed', signed_url_ttl=600, signer=LocalUrlSigner('s3cret'))
+
+        first, _ = _get(delivery, bucket)
+        second, _ = _get(delivery, bucket)
+
+        assert first.status_code == 302
+        assert first.headers['Location'].startswith('/evidence/abc_foto.jpg?expires=')
+        assert first.headers['Cache-Control'] == 'private, max-age=300'
+        assert second.status_code == 302
+        blob.exists.assert_called_once()
+        blob.download_as_bytes.assert_not_called()
+
+    def test_missing_blob_is_not_redirected(self):
+        bucket, _ = _bucket(exists=False)
+        delivery = EvidenceDelivery(mode='signed', signer=LocalUrlSigner('s3cret'))
+        assert _get(delivery, bucket)[0] is None
+
+    def test_signing_failure_falls_back_to_stream(self):
+        bucket, _ = _bucket()
+        signer = MagicMock()
+        signer.sign.side_effect = Exception('sem permissão iam.serviceAccounts.signBlob')
+        response, body = _get(EvidenceDelivery(mode='signed', signer=signer), bucket)
+
+        assert response.status_code == 200
+        assert body == PAYLOAD
+
+
+class TestLocalUrlSigner:
+
+    def test_verify_checks_signature_and_expiry(self):
+        now = [1_000_000]
+        signer = LocalUrlSigner('s3cret', clock=lambda: now[0])
+        blob = MagicMock()
+        blob.name = 'evidence/thumb/abc.webp'
+
+        url = signer.sign(blob, 60)
+        query = dict(part.split('=') for part in url.split('?', 1)[1].split('&'))
+
+        assert url.startswith('/evidence/thumb/abc.webp?')
+        assert signer.verify('thumb/abc.webp', query['expires'], query['sig'])
+        assert not signer.verify('thumb/outra.webp', query['expires'], query['sig'])
+        now[0] += 61
+        assert not signer.verify('thumb/abc.webp', query['expires'], query['sig'])
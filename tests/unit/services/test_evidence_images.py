@@ -0,0 +1,97 @@
+"""Unit tests for evidence image derivatives (src/services/evidence_images)."""
+import io
+import threading
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+from src.services import evidence_images
+from src.services.evidence_images import VARIANTS, build_derivatives, store_derivatives, variant_filename
+
+
+def _jpeg_with_exif(size=(4000, 3000), orientation=None):
+    img = Image.new('RGB', size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera Teste'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    out = io.BytesIO()
+    img.save(out, format='JPEG', exif=exif.tobytes(), quality=95)
+    return out.getvalue()
+
+
+class TestBuildDerivatives:
+
+    def test_bounded_size_format_and_no_exif(self):
+        derivatives = build_derivatives(_jpeg_with_exif())
+
+        for variant, spec in VARIANTS.items():
+            with Image.open(io.BytesIO(derivatives[variant])) as img:
+                assert max(img.size) == spec['max_px']
+                assert img.format == spec['format']
+                assert not img.getexif()
+
+    def test_applies_exif_orientation(self):
+        # Orientation 6 = foto em retrato gravada deitada
+        derivatives = build_derivatives(_jpeg_with_exif(size=(4000, 3000), orientation=6))
+
+        with Image.open(io.BytesIO(derivatives['pdf'])) as img:
+            width, height = img.size
+        assert height > width
+
+    def test_transparent_png_gets_white_background(self):
+        img = Image.new('RGBA', (100, 100), (0, 0, 0, 0))
+        out = io.BytesIO()
+        img.save(out, format='PNG')
+
+        derivatives = build_derivatives(out.getvalue())
+
+        with Image.open(io.BytesIO(derivatives['pdf'])) as pdf_img:
+            assert pdf_img.mode == 'RGB'
+            assert pdf_img.getpixel((50, 50))[0] > 240
+
+
+class TestStoreDerivatives:
+
+    def test_uploads_each_variant_next_to_original(self):
+        storage = MagicMock()
+        storage.upload_file.side_effect = lambda f, destination_folder, filename: f'/{destination_folder}/{filename}'
+
+        urls = store_derivatives('abc_foto.png', _jpeg_with_exif(size=(800, 600)), storage)
+
+        assert urls == {
+            'pdf': '/evidence/pdf/abc_foto.jpg',
+            'thumb': '/evidence/thumb/abc_foto.webp',
+        }
+        assert variant_filename('abc_foto.png', 'thumb') == 'thumb/abc_foto.webp'
+
+    def test_invalid_image_keeps_original_only(self):
+        storage = MagicMock()
+
+        assert store_derivatives('broken.jpg', b'\xff\xd8\xff\xe0' + b'\x00' * 50, storage) == {}
+        storage.upload_file.assert_not_called()
+
+
+class TestScheduleDerivatives:
+
+    def test_drops_jobs_when_queue_is_full(self):
+        release = threading.Event()
+
+        def blocked_store(filename, image_bytes, storage):
+            release.wait(5)
+            return {}
+
+        with patch.object(evidence_images, '_pending', threading.BoundedSemaphore(2)), \
+             patch.object(evidence_images, 'store_derivatives', side_effect=blocked_store):
+            first = evidence_images.schedule_derivatives('a.jpg', b'x', MagicMock())
+            second = evidence_images.schedule_derivatives('b.jpg', b'x', MagicMock())
+            dropped = evidence_images.schedule_derivatives('c.jpg', b'x', MagicMock())
+
+            release.set()
+            first.result(5)
+            second.result(5)
+            again = evidence_images.schedule_derivatives('d.jpg', b'x', MagicMock())  # vaga liberada
+            again.result(5)
+
+        assert dropped is None
+        assert again is not None
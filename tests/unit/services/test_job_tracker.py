@@ -0,0 +1,117 @@
+"""Tests for JobTracker (job lifecycle state machine)."""
+import json
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.domain.exceptions import InvalidStatusTransitionError
+from src.models_db import JobStatus
+from src.services.job_tracker import JobTracker, new_job, usage_metrics
+
+
+@pytest.fixture
+def tracker(db_session):
+    return JobTracker(session_factory=lambda: db_session)
+
+
+@pytest.fixture
+def job(db_session):
+    job = new_job('PROCESS_REPORT', input_payload={'file_id': 'upload:1'})
+    db_session.add(job)
+    db_session.commit()
+    return job
+
+
+class TestTransitions:
+
+    def test_new_job_is_pending(self):
+        assert new_job('PROCESS_REPORT').status == JobStatus.PENDING
+
+    def test_new_job_promotes_payload_fields_to_columns(self):
+        est_id = uuid.uuid4()
+        job = new_job('PROCESS_REPORT', input_payload={
+            'file_id': 'upload:1', 'filename': 'r.pdf', 'uploaded_by_id': 'não-é-uuid',
+            'uploaded_by_name': 'Ana', 'establishment_id': str(est_id),
+        })
+
+        assert job.file_id == 'upload:1'
+        assert job.filename == 'r.pdf'
+        assert job.uploaded_by_id is None
+        assert job.uploaded_by_name == 'Ana'
+        assert job.establishment_id == est_id
+
+    def test_processing_sets_started_at_and_attempts(self, tracker, job):
+        assert tracker.transition(job.id, JobStatus.PROCESSING) is True
+
+        assert job.status == JobStatus.PROCESSING
+        assert job.started_at is not None
+        assert job.attempts == 1
+
+    def test_completed_writes_metrics_and_result_together(self, tracker, job, db_session):
+        tracker.transition(job.id, JobStatus.PROCESSING)
+        job.started_at = datetime.utcnow() - timedelta(seconds=30)
+        db_session.commit()
+
+        tracker.transition(
+            job.id, JobStatus.COMPLETED,
+            metrics=usage_metrics({'prompt_tokens': 1000, 'completion_tokens': 200, 'cached_tokens': 0}),
+            result={'output_link': None},
+        )
+
+        assert job.status == JobStatus.COMPLETED
+        assert job.finished_at is not None
+        assert job.execution_time_seconds >= 30
+        assert job.cost_tokens_input == 1000
+        assert job.api_calls_count == 1
+        assert job.result_payload == {'output_link': None}
+
+    def test_failure_appends_structured_error(self, tracker, job):
+        tracker.transition(job.id, JobStatus.PROCESSING)
+        tracker.transition(job.id, JobStatus.FAILED, error={'code': 'ERR_1002', 'user_msg': 'PDF vazio'})
+
+        assert job.errors[0]['code'] == 'ERR_1002'
+        assert 'timestamp' in job.errors[0]
+        assert json.loads(job.error_log)['code'] == 'ERR_1002'
+
+    def test_same_status_is_noop_and_preserves_error(self, tracker, job):
+        tracker.transition(job.id, JobStatus.PROCESSING)
+        tracker.transition(job.id, JobStatus.FAILED, error={'code': 'ERR_2001'})
+
+        assert tracker.transition(job.id, JobStatus.FAILED, error='generic') is False
+        assert len(job.errors) == 1
+        assert json.loads(job.error_log)['code'] == 'ERR_2001'
+
+    def test_invalid_transition_raises(self, tracker, job):
+        tracker.transition(job.id, JobStatus.PROCESSING)
+        tracker.transition(job.id, JobStatus.COMPLETED)
+
+        with pytest.raises(InvalidStatusTransitionError):
+            tracker.transition(job.id, JobStatus.PROCESSING)
+
+    def test_missing_job_returns_false(self, tracker):
+        import uuid
+        assert tracker.transition(uuid.uuid4(), JobStatus.PROCESSING) is False
+
+
+class TestPostgresPath:
+
+    def test_transition_is_single_conditional_update(self):
+        session = MagicMock()
+        session.get_bind.return_value.dialect.name = 'postgresql'
+        session.execute.return_value.rowcount = 1
+        tracker = JobTracker(session_factory=lambda: session)
+
+        tracker.transition('job-1', JobStatus.FAILED, error={'code': 'ERR_9001'},
+                           metrics={'cost_tokens_input': 10}, result={'usage': {}})
+
+        session.execute.assert_called_once()
+        sql = str(session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert sql.startswith('UPDATE jobs SET')
+        assert 'jobs.status IN' in sql
+        assert 'errors=(coalesce(jobs.errors' in sql
+        assert 'result_payload=(coalesce(jobs.result_payload' in sql
+        session.query.assert_not_called()
+        session.commit.assert_called_once()
@@ -0,0 +1,79 @@
+"""Unit tests for the rendered-PDF disk cache (src/services/storage_service.PdfCache)."""
+import os
+
+from src.services.storage_service import PdfCache
+
+
+class TestPdfCache:
+
+    def test_content_version_is_stable_and_content_sensitive(self):
+        a = PdfCache.content_version({'b': 1, 'a': [1, 2]})
+        b = PdfCache.content_version({'a': [1, 2], 'b': 1})
+        c = PdfCache.content_version({'a': [1, 2], 'b': 2})
+
+        assert a == b
+        assert a != c
+        assert a != PdfCache.content_version({'b': 1, 'a': [1, 2]}, template_name='outro.html')
+
+    def test_put_get_and_miss(self, tmp_path):
+        cache = PdfCache(cache_dir=str(tmp_path), max_bytes=1024)
+
+        assert cache.get('upload:abc', 'v1') is None
+        cache.put('upload:abc', 'v1', b'%PDF-1')
+
+        assert cache.get('upload:abc', 'v1') == b'%PDF-1'
+        assert cache.get('upload:abc', 'v2') is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 2
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = PdfCache(cache_dir=str(tmp_path), max_bytes=25)
+        cache.put('a', 'v', b'x' * 10)
+        cache.put('b', 'v', b'x' * 10)
+        cache.get('a', 'v')           # 'a' passa a ser o mais recente
+        cache.put('c', 'v', b'x' * 10)
+
+        assert cache.get('b', 'v') is None
+        assert cache.get('a', 'v') is not None
+        assert cache.get('c', 'v') is not None
+        assert cache.stats()['size_bytes'] == 20
+        assert len([name for name in os.listdir(tmp_path) if name.endswith('.pdf')]) == 2
+
+    def test_invalidate_removes_all_versions_of_file(self, tmp_path):
+        cache = PdfCache(cache_dir=str(tmp_path), max_bytes=1024)
+        cache.put('file-1', 'v1', b'1')
+        cache.put('file-1', 'v2', b'2')
+        cache.put('file-2', 'v1', b'3')
+
+        cache.invalidate('file-1')
+
+        assert cache.get('file-1', 'v1') is None
+        assert cache.get('file-1', 'v2') is None
+        assert cache.get('file-2', 'v1') == b'3'
+        assert cache.stats()['entries'] == 1
+
+    def test_index_survives_restart(self, tmp_path):
+        PdfCache(cache_dir=str(tmp_path), max_bytes=1024).put('file-1', 'v1', b'%PDF')
+
+        assert PdfCache(cache_dir=str(tmp_path), max_bytes=1024).get('file-1', 'v1') == b'%PDF'
+
+    def test_disabled_with_zero_budget(self, tmp_path):
+        cache = PdfCache(cache_dir=str(tmp_path), max_bytes=0)
+        cache.put('file-1', 'v1', b'%PDF')
+
+        assert cache.get('file-1', 'v1') is None
+        assert os.listdir(tmp_path) == []
+
+    def test_instances_sharing_directory_share_limit_and_entries(self, tmp_path):
+        # Dois processos (web e worker de render) apontando para o mesmo diretório
+        web = PdfCache(cache_dir=str(tmp_path), max_bytes=25)
+        worker = PdfCache(cache_dir=str(tmp_path), max_bytes=25)
+
+        web.put('a', 'v', b'x' * 10)
+        worker.put('b', 'v', b'x' * 10)
+        assert worker.get('a', 'v') == b'x' * 10  # arquivo gravado pelo outro processo
+        web.put('c', 'v', b'x' * 10)
+
+        assert web.get('b', 'v') is None  # 'b' era o menos usado entre os dois
+        assert web.stats()['size_bytes'] == worker.stats()['size_bytes'] == 20
+        assert worker.stats()['entries'] == 2
@@ -4,7 +4,7 @@ from unittest.mock import patch, MagicMock
 
 import pytest
 
-from src.services.pdf_service import PDFService
+from src.services.pdf_service import PDFService, RenderContext
 
 
 class TestEnrichData:
@@ -323,22 +323,30 @@ class TestResolvePath:
         url = 'file:///tmp/image.png'
         assert svc.resolve_path(url) == url
 
-    def test_evidence_url_resolves_to_gcs(self):
-        """Should resolve /evidence/ URLs via GCS resolver."""
+    def test_evidence_url_resolves_locally(self):
+        """Should resolve /evidence/ URLs via the local evidence resolver."""
         svc = PDFService()
-        with patch.object(svc, '_resolve_evidence_from_gcs', return_value='file:///tmp/evidence/img.png') as mock_gcs:
+        with patch.object(svc, '_resolve_evidence', return_value='file:///tmp/evidence/img.png') as mock_gcs:
             result = svc.resolve_path('/evidence/img.png')
             assert result == 'file:///tmp/evidence/img.png'
             mock_gcs.assert_called_once_with('img.png')
 
-    def test_static_uploads_evidence_resolves_to_gcs(self):
-        """Should resolve /static/uploads/evidence/ URLs via GCS resolver."""
+    def test_static_uploads_evidence_resolves_locally(self):
+        """Should resolve /static/uploads/evidence/ URLs via the local evidence resolver."""
         svc = PDFService()
-        with patch.object(svc, '_resolve_evidence_from_gcs', return_value='file:///tmp/ev.png') as mock_gcs:
+        with patch.object(svc, '_resolve_evidence', return_value='file:///tmp/ev.png') as mock_gcs:
             result = svc.resolve_path('/static/uploads/evidence/ev.png')
             assert result == 'file:///tmp/ev.png'
             mock_gcs.assert_called_once_with('ev.png')
 
+    def test_gcs_evidence_url_resolves_locally(self):
+        """Should not let WeasyPrint fetch GCS evidence URLs over HTTP."""
+        svc = PDFService()
+        with patch.object(svc, '_resolve_evidence', return_value='file:///tmp/g.jpg') as mock_resolve:
+            result = svc.resolve_path('https://storage.googleapis.com/bucket/evidence/g.jpg')
+            assert result == 'file:///tmp/g.jpg'
+            mock_resolve.assert_called_once_with('g.jpg')
+
     def test_absolute_path_resolved_to_file_uri(self):
         """Should convert /static/logo.png to file:// URI."""
         svc = PDFService()
@@ -352,58 +360,67 @@ class TestResolvePath:
         assert svc.resolve_path('images/photo.jpg') == 'images/photo.jpg'
 
 
-class TestResolveEvidenceFromGcs:
-    """Tests for _resolve_evidence_from_gcs."""
+class TestResolveEvidence:
+    """Tests for _resolve_evidence and prefetch_evidence."""
 
     def test_returns_local_path_if_exists(self):
         """Should return local file path if evidence exists locally."""
         svc = PDFService()
         with patch('os.path.exists', side_effect=lambda p: 'evidence' in p and 'test.png' in p):
-            result = svc._resolve_evidence_from_gcs('test.png')
+            result = svc._resolve_evidence('test.png')
             assert result.startswith('file://')
             assert 'test.png' in result
 
-    @patch('os.path.exists', return_value=False)
-    @patch.dict(os.environ, {'GCP_STORAGE_BUCKET': 'test-bucket'})
-    def test_fetches_from_gcs_when_local_missing(self, mock_exists):
-        """Should fetch from GCS when local file not found."""
+    def test_prefers_local_pdf_derivative(self):
+        """Should use the reduced 'pdf' derivative when it exists locally."""
         svc = PDFService()
+        with patch('os.path.exists', side_effect=lambda p: p.endswith('pdf/photo.jpg')):
+            result = svc._resolve_evidence('photo.png')
+        assert result.endswith('pdf/photo.jpg')
 
-        mock_blob = MagicMock()
-        mock_blob.exists.return_value = True
-        mock_blob.download_to_filename = MagicMock()
-
-        mock_bucket = MagicMock()
-        mock_bucket.blob.return_value = mock_blob
-
-        mock_client = MagicMock()
-        mock_client.bucket.return_value = mock_bucket
+    @patch('os.path.exists', return_value=False)
+    def test_uses_evidence_cache_when_local_missing(self, mock_exists):
+        """Should resolve via the evidence cache (filled by prefetch) when not in static uploads."""
+        svc = PDFService()
+        svc.evidence_cache = MagicMock()
+        svc.evidence_cache.fetch.return_value = '/cache/abc.jpg'
 
-        with patch('src.services.pdf_service.os.path.exists', return_value=False), \
-             patch('google.cloud.storage.Client', return_value=mock_client):
-            result = svc._resolve_evidence_from_gcs('remote.png')
-            assert result.startswith('file://')
-            assert 'remote.png' in result
+        assert svc._resolve_evidence('remote.png') == 'file:///cache/abc.jpg'
+        svc.evidence_cache.fetch.assert_called_once_with('remote.png')
 
     @patch('os.path.exists', return_value=False)
     def test_returns_empty_when_not_found(self, mock_exists):
         """Should return empty string when evidence not found anywhere."""
         svc = PDFService()
-        with patch.dict(os.environ, {}, clear=False):
-            # Ensure GCP_STORAGE_BUCKET is not set
-            os.environ.pop('GCP_STORAGE_BUCKET', None)
-            result = svc._resolve_evidence_from_gcs('missing.png')
-            assert result == ''
+        svc.evidence_cache = MagicMock()
+        svc.evidence_cache.fetch.return_value = None
+
+        assert svc._resolve_evidence('missing.png') == ''
 
     @patch('os.path.exists', return_value=False)
-    @patch.dict(os.environ, {'GCP_STORAGE_BUCKET': 'test-bucket'})
-    def test_gcs_error_returns_empty(self, mock_exists):
-        """Should return empty string on GCS error."""
+    def test_prefetch_collects_all_plan_evidence(self, mock_exists):
+        """Should prefetch every evidence of the plan in a single batch."""
         svc = PDFService()
-        with patch('src.services.pdf_service.os.path.exists', return_value=False), \
-             patch('google.cloud.storage.Client', side_effect=Exception("GCS unavailable")):
-            result = svc._resolve_evidence_from_gcs('error.png')
-            assert result == ''
+        svc.evidence_cache = MagicMock()
+        data = {'areas_inspecionadas': [
+            {'itens': [{'evidence_image_url': '/evidence/a.jpg'}, {'evidence_image_url': None}]},
+            {'itens': [{'evidence_image_url': 'https://storage.googleapis.com/b/evidence/c.jpg'},
+                       {'evidence_image_url': 'https://example.com/logo.png'}]},
+        ]}
+
+        svc.prefetch_evidence(data)
+
+        svc.evidence_cache.prefetch.assert_called_once_with(['a.jpg', 'c.jpg'])
+
+    def test_prefetch_error_does_not_break_render(self):
+        """Should log and continue when the prefetch fails."""
+        svc = PDFService()
+        svc.evidence_cache = MagicMock()
+        svc.evidence_cache.prefetch.side_effect = Exception("GCS unavailable")
+        data = {'areas_inspecionadas': [{'itens': [{'evidence_image_url': '/evidence/x.jpg'}]}]}
+
+        with patch('os.path.exists', return_value=False):
+            svc.prefetch_evidence(data)
 
 
 class TestPDFServiceInit:
@@ -468,9 +485,10 @@ class TestGeneratePdfBytes:
 
     @patch('src.services.pdf_service.HTML')
     @patch('src.services.pdf_service.CSS')
-    def test_includes_stylesheet_when_exists(self, mock_css_cls, mock_html_cls):
-        """Should include style.css if it exists."""
-        svc = PDFService()
+    def test_includes_stylesheet_when_exists(self, mock_css_cls, mock_html_cls, tmp_path):
+        """Should include style.css, parsed once and reused with the same font config."""
+        (tmp_path / 'style.css').write_text('body { color: black; }')
+        svc = PDFService(template_dir=str(tmp_path))
 
         mock_template = MagicMock()
         mock_template.render.return_value = '<html>test</html>'
@@ -481,10 +499,44 @@ class TestGeneratePdfBytes:
         mock_html_instance.write_pdf.return_value = b'%PDF-fake'
         mock_html_cls.return_value = mock_html_instance
 
-        with patch.object(svc, 'enrich_data'), \
-             patch('os.path.exists', return_value=True):
+        with patch.object(svc, 'enrich_data'):
+            svc.generate_pdf_bytes({})
             svc.generate_pdf_bytes({})
 
         mock_css_cls.assert_called_once()
-        write_pdf_call = mock_html_instance.write_pdf.call_args
-        assert len(write_pdf_call[1]['stylesheets']) == 1
+        first, second = mock_html_instance.write_pdf.call_args_list
+        assert len(first[1]['stylesheets']) == 1
+        assert second[1]['stylesheets'] == first[1]['stylesheets']
+        assert second[1]['font_config'] is first[1]['font_config']
+
+
+class TestRenderContext:
+    """Tests for the per-process shared rendering context."""
+
+    def test_services_share_context_per_template_dir(self, tmp_path):
+        a = PDFService(template_dir=str(tmp_path))
+        b = PDFService(template_dir=str(tmp_path))
+
+        assert a.render_context is b.render_context
+        assert a.jinja_env is b.jinja_env
+        assert a.jinja_env.bytecode_cache is not None
+
+    @patch('src.services.pdf_service.CSS')
+    def test_stylesheet_reparsed_when_file_changes(self, mock_css_cls, tmp_path):
+        style = tmp_path / 'style.css'
+        style.write_text('body { color: black; }')
+        ctx = RenderContext(str(tmp_path))
+
+        ctx.stylesheets()
+        ctx.stylesheets()
+        os.utime(style, (1, 1))
+        ctx.stylesheets()
+
+        assert mock_css_cls.call_count == 2
+
+    def test_warm_up_compiles_pdf_template(self):
+        svc = PDFService()
+        with patch.object(svc.jinja_env, 'get_template', wraps=svc.jinja_env.get_template) as get_template:
+            svc.warm_up()
+
+        get_template.assert_any_call('pdf_template.html')
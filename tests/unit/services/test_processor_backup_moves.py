@@ -0,0 +1,51 @@
+"""Tests for ProcessorService batched moves of processed files to the Drive backup folder."""
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+@pytest.fixture
+def processor():
+    from src.services.processor import ProcessorService
+    svc = ProcessorService.__new__(ProcessorService)
+    svc._local = threading.local()
+    svc.folder_backup = 'backup-folder'
+    svc.drive_service = MagicMock()
+    with patch('src.services.processor.trace_writer') as mock_trace:
+        svc.trace = mock_trace
+        yield svc
+
+
+class TestBatchedBackupMoves:
+
+    def test_moves_are_sent_in_one_batch_at_the_end(self, processor):
+        processor.drive_service.move_files.return_value = (['a', 'b'], {'c': Exception('404')})
+
+        with processor.batched_backup_moves(parents={'a': ['in']}):
+            for file_id in ('a', 'b', 'c', 'upload:x'):
+                processor._move_to_backup_if_drive_file(file_id, f'{file_id}.pdf')
+            processor.drive_service.move_files.assert_not_called()
+
+        processor.drive_service.move_files.assert_called_once_with(
+            ['a', 'b', 'c'], 'backup-folder', parents={'a': ['in'], 'b': None, 'c': None}
+        )
+        processor.drive_service.move_file.assert_not_called()
+        statuses = {c.args[0]: c.args[2] for c in processor.trace.append.call_args_list}
+        assert statuses == {'a': 'SUCCESS', 'b': 'SUCCESS', 'c': 'WARNING'}
+
+    def test_nested_blocks_flush_once(self, processor):
+        processor.drive_service.move_files.return_value = (['a', 'b'], {})
+
+        with processor.batched_backup_moves():
+            processor._move_to_backup_if_drive_file('a', 'a.pdf')
+            with processor.batched_backup_moves():
+                processor._move_to_backup_if_drive_file('b', 'b.pdf')
+
+        processor.drive_service.move_files.assert_called_once()
+
+    def test_without_block_moves_immediately(self, processor):
+        processor._move_to_backup_if_drive_file('a', 'a.pdf')
+
+        processor.drive_service.move_file.assert_called_once_with('a', 'backup-folder')
+        processor.drive_service.move_files.assert_not_called()
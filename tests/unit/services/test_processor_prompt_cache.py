@@ -0,0 +1,89 @@
+"""Tests for the cache-friendly prompt layout and cached-token cost accounting of ProcessorService."""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.models import ChecklistSanitario
+
+
+PDF_TEXT = """Notas por tópico
+Cozinha / Área de Manipulação 15.52 27.27 56.90%
+
+1 - Cozinha / Área de Manipulação
+1.1 - HIGIENIZAÇÃO: A área está limpa? (0.00% - 0.00 pontos)
+Resposta: Não
+"""
+
+
+def _completion(cached_tokens=None):
+    completion = MagicMock()
+    completion.choices[0].message.parsed = ChecklistSanitario(
+        nome_estabelecimento='Restaurante Teste', resumo_geral='Resumo', pontuacao_geral=15.52,
+        pontuacao_maxima_geral=27.27, aproveitamento_geral=56.9, areas_inspecionadas=[],
+    )
+    completion.usage = SimpleNamespace(
+        prompt_tokens=2000, completion_tokens=100, total_tokens=2100,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+    )
+    return completion
+
+
+@pytest.fixture
+def processor():
+    from src.services.processor import ProcessorService
+    svc = ProcessorService.__new__(ProcessorService)
+    svc.model_name = 'gpt-4o-mini'
+    svc.client = MagicMock()
+    # Sem retry de áreas faltantes: isola a chamada principal
+    svc._validate_and_retry_missing_areas = lambda data, areas, text, usage: (data, usage)
+    return svc
+
+
+class TestPromptLayout:
+
+    def test_system_prompt_is_static_and_report_data_goes_last(self, processor):
+        from src.services.processor import ANALYSIS_SYSTEM_PROMPT, CHECKLIST_SCHEMA_JSON
+
+        processor.client.beta.chat.completions.parse.return_value = _completion()
+        other_text = PDF_TEXT.replace('Cozinha / Área de Manipulação', 'Estoque / Depósito')
+
+        with patch('src.services.processor.get_config', side_effect=lambda k, d=None: d):
+            processor.analyze_with_openai(b'', pdf_text=PDF_TEXT)
+            processor.analyze_with_openai(b'', pdf_text=other_text)
+
+        first, second = [c.kwargs['messages'] for c in processor.client.beta.chat.completions.parse.call_args_list]
+        assert first[0]['content'] == second[0]['content'] == ANALYSIS_SYSTEM_PROMPT
+        assert ANALYSIS_SYSTEM_PROMPT.endswith(CHECKLIST_SCHEMA_JSON)
+        assert '- Cozinha / Área de Manipulação (' in first[1]['content']
+        assert first[1]['content'].endswith(PDF_TEXT)
+
+    def test_usage_includes_cached_tokens(self, processor):
+        processor.client.beta.chat.completions.parse.return_value = _completion(cached_tokens=1536)
+
+        with patch('src.services.processor.get_config', side_effect=lambda k, d=None: d):
+            result = processor.analyze_with_openai(b'', pdf_text=PDF_TEXT)
+
+        assert result['usage']['cached_tokens'] == 1536
+
+    def test_missing_cached_details_defaults_to_zero(self):
+        from src.services.processor import completion_usage
+
+        completion = MagicMock()
+        completion.usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        assert completion_usage(completion)['cached_tokens'] == 0
+
+
+class TestJobMetrics:
+
+    def test_cached_tokens_are_persisted_and_discounted(self):
+        from src.services.job_tracker import usage_metrics
+
+        metrics = usage_metrics({
+            'prompt_tokens': 1_000_000, 'completion_tokens': 0, 'total_tokens': 1_000_000,
+            'cached_tokens': 400_000,
+        })
+
+        assert metrics['cost_tokens_cached'] == 400_000
+        # 600k a 0.15/M + 400k a 0.075/M
+        assert metrics['cost_input_usd'] == pytest.approx(0.09 + 0.03)
@@ -0,0 +1,68 @@
+"""Tests for ProcessorService._save_to_db_logic (bulk persistence of action plan items)."""
+from unittest.mock import patch
+
+import pytest
+
+from src.models import AreaInspecao, ChecklistItem, ChecklistSanitario
+from src.models_db import ActionPlan, ActionPlanItem, ActionPlanItemStatus, SeverityLevel
+
+
+def _report(items_per_area=3):
+    def item(i, status):
+        return ChecklistItem(
+            item_verificado=f'{i} - Pergunta', status=status, pontuacao=0, observacao=f'Obs {i}',
+            fundamento_legal='RDC 216', acao_corretiva_sugerida='Corrigir', prazo_sugerido='7 dias',
+        )
+
+    areas = [
+        AreaInspecao(
+            nome_area=name, resumo_area='r', pontuacao_obtida=5, pontuacao_maxima=10, aproveitamento=50,
+            itens=[item(i, 'Não Conforme' if i % 2 == 0 else 'Conforme') for i in range(items_per_area)],
+        )
+        for name in ('Cozinha', 'Estoque')
+    ]
+    return ChecklistSanitario(
+        nome_estabelecimento='Restaurante Teste', resumo_geral='Resumo', pontuacao_geral=10,
+        pontuacao_maxima_geral=20, aproveitamento_geral=50, areas_inspecionadas=areas,
+    )
+
+
+@pytest.fixture
+def processor(db_session):
+    from src.services.processor import ProcessorService
+    svc = ProcessorService.__new__(ProcessorService)
+    with patch('src.services.processor.database.db_session', return_value=db_session), \
+         patch('src.services.processor.get_config', side_effect=lambda k, d=None: d):
+        yield svc
+
+
+class TestSaveToDb:
+
+    def test_items_and_stats_are_saved(self, processor, db_session, establishment_factory):
+        est = establishment_factory.create(db_session)
+
+        processor._save_to_db_logic(_report(), 'upload:1', 'r.pdf', None, 'hash1', override_est_id=est.id)
+
+        plan = db_session.query(ActionPlan).one()
+        items = db_session.query(ActionPlanItem).filter_by(action_plan_id=plan.id).order_by(
+            ActionPlanItem.sector, ActionPlanItem.order_index).all()
+        assert len(items) == 6
+        assert items[0].sector == 'Cozinha' and items[0].order_index == 0
+        assert items[0].status == ActionPlanItemStatus.OPEN and items[0].severity == SeverityLevel.HIGH
+        assert items[1].status == ActionPlanItemStatus.RESOLVED
+        assert plan.stats_json['total_items'] == 6
+        assert plan.stats_json['total_nc'] == 4
+        assert plan.stats_json['by_sector']['Estoque']['nc_count'] == 2
+
+        inspection = plan.inspection
+        assert (inspection.total_items, inspection.nc_count, inspection.resolved_count) == (6, 4, 2)
+        assert (inspection.score, inspection.max_score, inspection.percentage) == (10.0, 20.0, 50.0)
+
+    def test_reprocessing_replaces_items(self, processor, db_session, establishment_factory):
+        est = establishment_factory.create(db_session)
+
+        processor._save_to_db_logic(_report(3), 'upload:1', 'r.pdf', None, 'hash1', override_est_id=est.id)
+        processor._save_to_db_logic(_report(1), 'upload:1', 'r.pdf', None, 'hash1', override_est_id=est.id)
+
+        assert db_session.query(ActionPlan).count() == 1
+        assert db_session.query(ActionPlanItem).count() == 2
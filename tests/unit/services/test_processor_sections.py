@@ -0,0 +1,198 @@
+"""Tests for the alternative analysis modes (sections and local) of ProcessorService."""
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.models import ChecklistSanitario, AreaInspecao, ChecklistItem
+
+
+PDF_TEXT = """Notas por tópico
+Cozinha / Área de Manipulação 15.52 27.27 56.90%
+Estoque / Depósito 8.00 10.00 80.00%
+Recepção de Mercadorias 5.00 5.00 100.00%
+
+1 - Cozinha / Área de Manipulação
+1.1 - HIGIENIZAÇÃO: A área está limpa? (0.00% - 0.00 pontos)
+Resposta: Não
+2 - Estoque / Depósito
+2.1 - Produtos identificados? (0.00% - 0.00 pontos)
+Resposta: Parcial
+3 - Recepção de Mercadorias
+3.1 - Temperatura aferida? (100.00% - 5.00 pontos)
+Resposta: Sim
+"""
+
+
+def _checklist(areas=None, **kwargs):
+    defaults = dict(
+        nome_estabelecimento='Restaurante Teste',
+        resumo_geral='Resumo',
+        pontuacao_geral=28.5,
+        pontuacao_maxima_geral=42.27,
+        aproveitamento_geral=67.4,
+        areas_inspecionadas=areas or [],
+    )
+    defaults.update(kwargs)
+    return ChecklistSanitario(**defaults)
+
+
+def _area(name):
+    return AreaInspecao(
+        nome_area=name, resumo_area='r', pontuacao_obtida=1, pontuacao_maxima=2, aproveitamento=50,
+        itens=[ChecklistItem(
+            item_verificado='1.1', status='Não Conforme', pontuacao=0, observacao='o',
+            fundamento_legal='RDC 216', acao_corretiva_sugerida='a', prazo_sugerido='7 dias',
+        )],
+    )
+
+
+def _completion(parsed, tokens=10):
+    completion = MagicMock()
+    completion.choices[0].message.parsed = parsed
+    completion.usage.prompt_tokens = tokens
+    completion.usage.completion_tokens = tokens
+    completion.usage.total_tokens = tokens * 2
+    return completion
+
+
+@pytest.fixture
+def processor():
+    from src.services.processor import ProcessorService
+    svc = ProcessorService.__new__(ProcessorService)
+    svc.model_name = 'gpt-4o-mini'
+    svc.client = MagicMock()
+    return svc
+
+
+def _fake_parse(messages):
+    user = messages[1]['content']
+    if 'SEÇÃO: Cozinha' in user:
+        return _completion(_checklist([_area('Cozinha / Área de Manipulação')]))
+    if 'SEÇÃO: Estoque' in user:
+        return _completion(_checklist([_area('Estoque / Depósito')]))
+    return _completion(_checklist())
+
+
+class TestSectionAnalysis:
+
+    def test_sections_mode_merges_areas_and_usage(self, processor):
+        processor.client.beta.chat.completions.parse.side_effect = lambda **kw: _fake_parse(kw['messages'])
+
+        with patch('src.services.processor.get_config', side_effect=lambda k, d=None: {'AI_ANALYSIS_MODE': 'sections'}.get(k, d)):
+            result = processor.analyze_with_openai(b'', pdf_text=PDF_TEXT)
+
+        names = [a.nome_area for a in result['data'].areas_inspecionadas]
+        assert names == ['Cozinha / Área de Manipulação', 'Estoque / Depósito']
+        assert result['data'].nome_estabelecimento == 'Restaurante Teste'
+        # header + 2 sections
+        assert processor.client.beta.chat.completions.parse.call_count == 3
+        assert result['usage']['total_tokens'] == 60
+
+    def test_sections_run_concurrently(self, processor):
+        active = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def slow_parse(**kw):
+            with lock:
+                active['now'] += 1
+                active['max'] = max(active['max'], active['now'])
+            time.sleep(0.05)
+            with lock:
+                active['now'] -= 1
+            return _fake_parse(kw['messages'])
+
+        processor.client.beta.chat.completions.parse.side_effect = slow_parse
+
+        with patch('src.services.processor.get_config', side_effect=lambda k, d=None: {
+            'AI_ANALYSIS_MODE': 'sections', 'AI_SECTION_CONCURRENCY': '2',
+        }.get(k, d)):
+            processor.analyze_with_openai(b'', pdf_text=PDF_TEXT)
+
+        assert active['max'] == 2
+
+    def test_failed_section_is_retried(self, processor):
+        calls = {'n': 0}
+
+        def flaky_parse(**kw):
+            user = kw['messages'][1]['content']
+            if user.startswith('Analise esta seção') and 'SEÇÃO: Estoque' in user:
+                raise TimeoutError('section timeout')
+            if user.startswith('Analise estas'):
+                calls['n'] += 1
+                return _completion(_checklist([_area('Estoque / Depósito')]))
+            return _fake_parse(kw['messages'])
+
+        processor.client.beta.chat.completions.parse.side_effect = flaky_parse
+
+        with patch('src.services.processor.get_config', side_effect=lambda k, d=None: {'AI_ANALYSIS_MODE': 'sections'}.get(k, d)):
+            result = processor.analyze_with_openai(b'', pdf_text=PDF_TEXT)
+
+        assert calls['n'] == 1
+        names = [a.nome_area for a in result['data'].areas_inspecionadas]
+        assert 'Estoque / Depósito' in names
+
+    def test_single_mode_is_default(self, processor):
+        processor.client.beta.chat.completions.parse.return_value = _completion(_checklist([
+            _area('Cozinha / Área de Manipulação'), _area('Estoque / Depósito'),
+        ]))
+
+        with patch('src.services.processor.get_config', side_effect=lambda k, d=None: d):
+            result = processor.analyze_with_openai(b'', pdf_text=PDF_TEXT)
+
+        assert processor.client.beta.chat.completions.parse.call_count == 1
+        assert len(result['data'].areas_inspecionadas) == 2
+
+
+class TestLocalParserMode:
+
+    def _enrichment(self, ids, status='Não Conforme'):
+        from src.models import EnriquecimentoRelatorio, ItemEnriquecido, ResumoArea
+        return EnriquecimentoRelatorio(
+            nome_estabelecimento='Restaurante Teste',
+            resumo_geral='Resumo',
+            resumos_areas=[ResumoArea(nome_area='Estoque / Depósito', resumo_area='Estoque ok')],
+            itens=[ItemEnriquecido(
+                id=f'[{i}]', status=status, observacao=f'obs {i}', fundamento_legal='RDC 216',
+                acao_corretiva_sugerida='corrigir', prazo_sugerido='7 dias',
+            ) for i in ids],
+        )
+
+    def _local(self, k, d=None):
+        return {'AI_ANALYSIS_MODE': 'local'}.get(k, d)
+
+    def test_local_mode_uses_parsed_items_and_deterministic_totals(self, processor):
+        processor.client.beta.chat.completions.parse.return_value = _completion(self._enrichment(['1.1', '2.1']))
+
+        with patch('src.services.processor.get_config', side_effect=self._local):
+            result = processor.analyze_with_openai(b'', pdf_text=PDF_TEXT)
+
+        data = result['data']
+        assert processor.client.beta.chat.completions.parse.call_count == 1
+        assert [a.nome_area for a in data.areas_inspecionadas] == ['Cozinha / Área de Manipulação', 'Estoque / Depósito']
+        assert data.pontuacao_geral == 28.52
+        assert data.areas_inspecionadas[1].itens[0].status == 'Parcialmente Conforme'
+        assert data.areas_inspecionadas[1].resumo_area == 'Estoque ok'
+
+    def test_missing_items_are_requested_again(self, processor):
+        processor.client.beta.chat.completions.parse.side_effect = [
+            _completion(self._enrichment(['1.1'])),
+            _completion(self._enrichment(['2.1'])),
+        ]
+
+        with patch('src.services.processor.get_config', side_effect=self._local):
+            result = processor.analyze_with_openai(b'', pdf_text=PDF_TEXT)
+
+        retry_user = processor.client.beta.chat.completions.parse.call_args_list[1].kwargs['messages'][1]['content']
+        assert '[2.1]' in retry_user and '[1.1]' not in retry_user
+        assert result['data'].areas_inspecionadas[1].itens[0].fundamento_legal == 'RDC 216'
+        assert result['usage']['total_tokens'] == 40
+
+    def test_unrecognized_text_falls_back_to_single_mode(self, processor):
+        processor.client.beta.chat.completions.parse.return_value = _completion(_checklist([_area('Cozinha')]))
+
+        with patch('src.services.processor.get_config', side_effect=self._local):
+            result = processor.analyze_with_openai(b'', pdf_text='Texto sem tabela de notas')
+
+        assert isinstance(result['data'], ChecklistSanitario)
+        assert result['data'].areas_inspecionadas[0].nome_area == 'Cozinha'
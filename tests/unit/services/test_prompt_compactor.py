@@ -0,0 +1,97 @@
+"""Tests for the prompt compaction stage (removes conforming items and page boilerplate)."""
+from pathlib import Path
+
+from src.services.prompt_compactor import compact_report_text, estimate_tokens
+from src.services.report_parser import parse_report_text, to_checklist_dict
+
+FIXTURES = Path(__file__).resolve().parents[2] / 'fixtures' / 'report_parser'
+
+
+def _long_report(pages=40, items_per_page=6):
+    """Relatório sintético no formato real: maioria de itens conformes + cabeçalho/rodapé por página."""
+    lines = [
+        "Relatório de Auditoria Sanitária",
+        "Notas por tópico",
+        "Cozinha 95.00 100.00 95.00%",
+        "Estoque 100.00 100.00 100.00%",
+        "1 - Cozinha",
+    ]
+    number = 0
+    for page in range(1, pages + 1):
+        lines.append("Padaria Sabor & Arte - Auditoria Sanitária Jan/2024")
+        if page == pages // 2:
+            lines.append("2 - Estoque")
+        for _ in range(items_per_page):
+            number += 1
+            section = 1 if page < pages // 2 else 2
+            lines.append(f"{section}.{number} - O procedimento operacional padronizado está implementado e registrado? (100.00% - 1.00 pontos)")
+            lines.append("Resposta: Sim")
+        if page == 3:
+            lines += ["1.999 - A área está limpa? (0.00% - 0.00 pontos)", "Resposta: Não",
+                      "Fotos da questão 1.999", "Foto 1", "Comentário: Gordura no piso."]
+        lines.append(f"Página {page} de {pages}")
+    return "\n".join(lines)
+
+
+class TestCompaction:
+
+    def test_long_report_is_reduced_by_more_than_half(self):
+        text = _long_report()
+        result = compact_report_text(text)
+
+        assert result.chars_before == len(text)
+        assert result.reduction_pct > 50
+        assert result.tokens_after < result.tokens_before / 2
+        assert result.removed_items == 240
+
+    def test_keeps_summary_table_sections_and_candidate_items(self):
+        result = compact_report_text(_long_report())
+
+        assert "Cozinha 95.00 100.00 95.00%" in result.text
+        assert "1 - Cozinha" in result.text and "2 - Estoque" in result.text
+        assert "1.999 - A área está limpa?" in result.text
+        assert "Comentário: Gordura no piso." in result.text
+        assert "Fotos da questão 1.999" in result.text
+
+    def test_removes_page_numbers_captions_and_dedupes_headers(self):
+        result = compact_report_text(_long_report())
+
+        assert "Página 1 de 40" not in result.text
+        assert "Foto 1" not in result.text.splitlines()
+        assert result.text.count("Padaria Sabor & Arte - Auditoria Sanitária Jan/2024") == 1
+
+    def test_parser_output_is_unchanged(self):
+        for path in FIXTURES.glob('*.txt'):
+            text = path.read_text(encoding='utf-8')
+            compacted = compact_report_text(text).text
+            assert to_checklist_dict(parse_report_text(compacted)) == to_checklist_dict(parse_report_text(text))
+
+    def test_item_without_answer_is_kept(self):
+        text = "1 - Cozinha\n1.1 - Pergunta sem resposta reconhecível (100.00% - 1.00 pontos)\n"
+        assert "1.1 - Pergunta sem resposta" in compact_report_text(text).text
+
+    def test_section_header_after_commented_not_applicable_item_is_kept(self):
+        text = "\n".join([
+            "Notas por tópico",
+            "Cozinha 100.00 100.00 100.00%",
+            "Estoque 0.00 1.00 0.00%",
+            "1 - Cozinha",
+            "1.1 - Possui exaustor? (100.00% - 1.00 pontos)",
+            "Resposta: Não se aplica",
+            "Comentário: Cozinha sem fogão a gás.",
+            "2 - Estoque",
+            "2.1 - Alimentos armazenados afastados do piso? (0.00% - 0.00 pontos)",
+            "Resposta: Não",
+        ])
+        result = compact_report_text(text)
+
+        assert result.removed_items == 1
+        lines = result.text.splitlines()
+        assert "2 - Estoque" in lines
+        assert lines.index("2 - Estoque") < lines.index(
+            "2.1 - Alimentos armazenados afastados do piso? (0.00% - 0.00 pontos)")
+
+    def test_to_dict_exposes_before_and_after(self):
+        stats = compact_report_text(_long_report(pages=2)).to_dict()
+        assert set(stats) >= {'chars_before', 'chars_after', 'tokens_before', 'tokens_after'}
+        assert estimate_tokens('abcd' * 10) == 10
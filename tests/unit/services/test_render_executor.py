@@ -0,0 +1,165 @@
+"""Unit tests for the PDF render executor (src/services/render_executor)."""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services.render_executor import RenderExecutor, RenderQueueFull, RenderTimeout, _serve
+
+
+def _fake_render(data, template_name):
+    time.sleep(data.get('sleep', 0))
+    if data.get('fail'):
+        raise ValueError('template quebrado')
+    return b'%PDF-' + template_name.encode(), 1.0, data.get('rss', 10.0), {'hits': 2, 'downloads': 1}
+
+
+def _fake_worker_main(conn, template_dir):
+    # Worker real (processo spawn + pipe), sem WeasyPrint
+    _serve(conn, _fake_render)
+
+
+@pytest.fixture
+def process_executor():
+    executors = []
+
+    def make(**kwargs):
+        executor = RenderExecutor(**{'queue_size': 0, 'timeout': 10, **kwargs})
+        executor._worker_target = _fake_worker_main
+        executors.append(executor)
+        return executor
+
+    yield make
+    for executor in executors:
+        executor.shutdown()
+
+
+def _render_in_thread(executor, data, results):
+    def run():
+        try:
+            results.append(executor.render(MagicMock(template_dir='/tmp/templates'), data))
+        except Exception as e:
+            results.append(e)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+class TestRenderExecutor:
+
+    def test_inline_mode_uses_service_and_records_metrics(self):
+        executor = RenderExecutor(workers=0, queue_size=0)
+        service = MagicMock()
+        service.generate_pdf_bytes.return_value = b'%PDF'
+
+        assert executor.render(service, {'a': 1}) == b'%PDF'
+
+        service.generate_pdf_bytes.assert_called_once_with({'a': 1}, template_name='pdf_template.html')
+        stats = executor.stats()
+        assert stats['completed'] == 1
+        assert stats['in_flight'] == 0
+
+    def test_rejects_when_saturated(self):
+        executor = RenderExecutor(workers=0, queue_size=0)  # uma vaga
+        started, release = threading.Event(), threading.Event()
+
+        def slow_render(data, template_name):
+            started.set()
+            release.wait(5)
+            return b'%PDF'
+
+        service = MagicMock()
+        service.generate_pdf_bytes.side_effect = slow_render
+        worker = threading.Thread(target=executor.render, args=(service, {}))
+        worker.start()
+        started.wait(5)
+
+        with pytest.raises(RenderQueueFull) as exc:
+            executor.render(service, {})
+
+        release.set()
+        worker.join(5)
+        assert exc.value.retry_after >= 1
+        assert executor.stats()['rejected'] == 1
+        assert executor.render(service, {}) == b'%PDF'  # vaga liberada
+
+
+class TestRenderProcesses:
+
+    def test_renders_in_worker_process_and_reuses_it(self, process_executor):
+        executor = process_executor(workers=1)
+        service = MagicMock(template_dir='/tmp/templates')
+
+        with patch('src.services.storage_service.evidence_cache') as evidence_cache:
+            assert executor.render(service, {}) == b'%PDF-pdf_template.html'
+            assert executor.render(service, {}, template_name='outro.html') == b'%PDF-outro.html'
+
+        service.generate_pdf_bytes.assert_not_called()
+        # Contadores do cache de evidências dos workers chegam ao processo web
+        evidence_cache.add_counters.assert_called_with({'hits': 2, 'downloads': 1})
+        stats = executor.stats()
+        assert stats['completed'] == 2
+        assert stats['processes'] == 1
+        assert stats['recycles'] == 0
+
+    def test_time_waiting_in_queue_does_not_count_toward_timeout(self, process_executor):
+        executor = process_executor(workers=1, queue_size=1, timeout=2)
+        executor.render(MagicMock(template_dir='/tmp/templates'), {})  # worker já pronto
+        results = []
+
+        threads = [_render_in_thread(executor, {'sleep': 1.2}, results) for _ in range(2)]
+        for thread in threads:
+            thread.join(15)
+
+        # O segundo job esperou ~1.2s pelo worker; só os 1.2s de render contam
+        assert results == [b'%PDF-pdf_template.html'] * 2
+        assert executor.stats()['timeouts'] == 0
+
+    def test_timeout_kills_only_the_stuck_worker(self, process_executor):
+        executor = process_executor(workers=2, timeout=1)
+        stuck, healthy = [], []
+
+        stuck_thread = _render_in_thread(executor, {'sleep': 60}, stuck)
+        healthy_thread = _render_in_thread(executor, {'sleep': 0.3}, healthy)
+        stuck_thread.join(20)
+        healthy_thread.join(20)
+
+        assert isinstance(stuck[0], RenderTimeout)
+        assert healthy == [b'%PDF-pdf_template.html']
+        stats = executor.stats()
+        assert stats['timeouts'] == 1
+        assert stats['processes'] == 1  # o saudável continua livre
+        assert stats['in_flight'] == 0
+        assert executor.render(MagicMock(template_dir='/tmp/templates'), {}) == b'%PDF-pdf_template.html'
+
+    def test_render_error_keeps_worker(self, process_executor):
+        executor = process_executor(workers=1)
+
+        with pytest.raises(ValueError, match='template quebrado'):
+            executor.render(MagicMock(template_dir='/tmp/templates'), {'fail': True})
+
+        stats = executor.stats()
+        assert stats['failed'] == 1
+        assert stats['processes'] == 1
+        assert stats['recycles'] == 0
+
+    def test_recycles_worker_when_memory_exceeds_limit(self, process_executor):
+        executor = process_executor(workers=1, max_rss_mb=100)
+
+        assert executor.render(MagicMock(template_dir='/tmp/templates'), {'rss': 512.0}) == b'%PDF-pdf_template.html'
+
+        stats = executor.stats()
+        assert stats['recycles'] == 1
+        assert stats['processes'] == 0
+
+    def test_recycles_worker_after_max_tasks(self, process_executor):
+        executor = process_executor(workers=1, max_tasks_per_child=2)
+        service = MagicMock(template_dir='/tmp/templates')
+
+        executor.render(service, {})
+        assert executor.stats()['processes'] == 1
+        executor.render(service, {})
+
+        assert executor.stats()['recycles'] == 1
+        assert executor.stats()['processes'] == 0
@@ -0,0 +1,111 @@
+"""Tests for the deterministic report pre-parser (golden files in tests/fixtures/report_parser)."""
+import json
+from pathlib import Path
+
+import pytest
+
+from src.services.report_parser import (
+    STATUS_NAO_CONFORME,
+    STATUS_PARCIAL,
+    parse_item_block,
+    parse_report_text,
+    parse_summary_table,
+    to_checklist_dict,
+)
+
+FIXTURES = Path(__file__).resolve().parents[2] / 'fixtures' / 'report_parser'
+GOLDEN_CASES = sorted(p.name[:-len('.txt')] for p in FIXTURES.glob('*.txt'))
+
+
+@pytest.mark.parametrize('name', GOLDEN_CASES)
+def test_matches_golden_file(name):
+    text = (FIXTURES / f'{name}.txt').read_text(encoding='utf-8')
+    expected = json.loads((FIXTURES / f'{name}.expected.json').read_text(encoding='utf-8'))
+
+    assert to_checklist_dict(parse_report_text(text)) == expected
+
+
+class TestSummaryTable:
+
+    def test_skips_metadata_rows_and_accepts_comma_decimals(self):
+        areas = parse_summary_table(
+            "Cozinha 10,50 20,00 52,50%\n"
+            "Acompanhante de visita 0.00 0.00 0.00%\n"
+            "Cozinha 10,50 20,00 52,50%\n"
+        )
+        assert [(a.name, a.score, a.max_score, a.pct) for a in areas] == [('Cozinha', 10.5, 20.0, 52.5)]
+
+
+class TestClassification:
+
+    def _items(self, body):
+        text = "Cozinha 1.00 2.00 50.00%\n1 - Cozinha\n" + body
+        return parse_report_text(text).items
+
+    def test_partial_answer_is_always_partial(self):
+        items = self._items("1.1 - Bancadas conservadas? (100.00% - 2.00 pontos)\nResposta: Parcial\n")
+        assert items[0].status == STATUS_PARCIAL
+
+    def test_negative_question_uses_score(self):
+        # "Sim" em pergunta negativa vale 0 pontos → não conforme; "Não" com pontuação → conforme
+        items = self._items(
+            "1.1 - Foram encontrados produtos vencidos? (0.00% - 0.00 pontos)\nResposta: Sim\n"
+            "1.2 - Há pragas visíveis? (100.00% - 2.00 pontos)\nResposta: Não\n"
+        )
+        assert [(i.number, i.status) for i in items] == [('1.1', STATUS_NAO_CONFORME)]
+
+    def test_not_applicable_is_ignored(self):
+        assert self._items("1.1 - Há termômetro? (0.00% - 0.00 pontos)\nResposta: N.A.\n") == []
+
+    def test_full_score_with_photos_needs_review(self):
+        items = self._items(
+            "1.1 - A área está limpa? (100.00% - 2.00 pontos)\nResposta: Sim\nFotos da questão 1.1\n"
+        )
+        assert items[0].status == STATUS_NAO_CONFORME
+        assert items[0].needs_review is True
+
+    def test_multiline_question_and_comment(self):
+        items = self._items(
+            "1.1 - A área de manipulação está limpa\ne organizada? (0.00% - 0.00 pontos)\n"
+            "Resposta: Não\nComentário: Gordura no piso\nsob a fritadeira.\n"
+        )
+        assert items[0].question == 'A área de manipulação está limpa e organizada?'
+        assert items[0].comment == 'Gordura no piso sob a fritadeira.'
+
+
+class TestItemBlock:
+
+    def test_parses_block_with_score_photos_and_comment(self):
+        item = parse_item_block([
+            '1.1 - HIGIENIZAÇÃO: A área está limpa? (0.00% - 0.00 pontos)',
+            'Resposta: Não',
+            'Fotos da questão 1.1',
+            'Comentário: Piso com',
+            'acúmulo de gordura.',
+        ])
+
+        assert item.status == STATUS_NAO_CONFORME
+        assert item.question == 'HIGIENIZAÇÃO: A área está limpa?'
+        assert item.score_points == 0.0
+        assert item.has_photos
+        assert item.comment == 'Piso com acúmulo de gordura.'
+
+    def test_conforming_item_has_no_status(self):
+        item = parse_item_block(['1.2 - Lixeiras tampadas? (100.00% - 2.00 pontos)', 'Resposta: Sim'])
+
+        assert item is not None
+        assert item.status is None
+
+    def test_block_without_answer_is_not_recognized(self):
+        assert parse_item_block(['1.3 - Pergunta sem resposta']) is None
+        assert parse_item_block(['texto solto']) is None
+
+
+class TestUsability:
+
+    def test_unknown_format_is_not_usable(self):
+        assert not parse_report_text("Relatório livre sem tabela de notas").is_usable()
+
+    def test_area_below_100_without_items_is_not_usable(self):
+        text = "Cozinha 1.00 2.00 50.00%\nEstoque 1.00 2.00 50.00%\n1 - Cozinha\n1.1 - Limpa? (0.00% - 0.00 pontos)\nResposta: Não\n"
+        assert not parse_report_text(text).is_usable()
@@ -0,0 +1,125 @@
+"""Tests for paginated Drive change processing (src/services/sync_service.process_global_changes)."""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.models_db import AppConfig, Inspection, Job, JobStatus
+from src.services.sync_service import process_global_changes
+from src.worker import JOB_TYPE_PROCESS_REPORT
+
+
+def _change(file_id, parent, mime='application/pdf'):
+    return {'fileId': file_id, 'file': {'id': file_id, 'name': f'{file_id}.pdf', 'parents': [parent], 'mimeType': mime}}
+
+
+@pytest.fixture
+def sync_db(db_session):
+    db_session.add(AppConfig(key='drive_page_token', value='t0'))
+    db_session.commit()
+    with patch('src.services.sync_service.get_db', side_effect=lambda: iter([db_session])):
+        yield db_session
+
+
+@pytest.fixture
+def store(sync_db, establishment_factory):
+    return establishment_factory.create(sync_db, drive_folder_id='store-folder')
+
+
+class TestProcessGlobalChanges:
+
+    def test_consumes_all_pages_and_enqueues_new_files(self, sync_db, store):
+        drive = MagicMock()
+        drive.list_changes.side_effect = [
+            ([_change('a', 'store-folder'), _change('b', 'store-folder')], 't1', None),
+            ([_change('c', 'store-folder'), _change('a', 'store-folder'), _change('x', 'other-folder')], 't2', None),
+            ([_change('d', 'store-folder', mime='application/vnd.google-apps.folder')], None, 'start-3'),
+        ]
+
+        with patch('src.services.processor.processor_service') as mock_processor:
+            result = process_global_changes(drive)
+
+        assert result == {'status': 'ok', 'processed': 3, 'pages': 3}
+        assert [c.args[0] for c in drive.list_changes.call_args_list] == ['t0', 't1', 't2']
+        jobs = sync_db.query(Job).all()
+        assert sorted(j.input_payload['file_id'] for j in jobs) == ['a', 'b', 'c']
+        assert {j.type for j in jobs} == {JOB_TYPE_PROCESS_REPORT}
+        assert {j.status for j in jobs} == {JobStatus.PENDING}
+        assert sync_db.query(Inspection).count() == 3
+        assert sync_db.get(AppConfig, 'drive_page_token').value == 'start-3'
+        mock_processor.process_single_file.assert_not_called()
+
+    def test_failed_page_keeps_last_checkpoint(self, sync_db, store):
+        drive = MagicMock()
+        drive.list_changes.side_effect = [
+            ([_change('a', 'store-folder')], 't1', None),
+            ([], None, None),  # erro ao ler a página 2
+        ]
+
+        result = process_global_changes(drive)
+
+        assert result['pages'] == 1
+        assert sync_db.get(AppConfig, 'drive_page_token').value == 't1'
+        assert [j.input_payload['file_id'] for j in sync_db.query(Job).all()] == ['a']
+
+    def test_already_known_files_are_not_enqueued(self, sync_db, store, inspection_factory):
+        inspection_factory.create(sync_db, establishment=store, drive_file_id='a')
+        drive = MagicMock()
+        drive.list_changes.return_value = ([_change('a', 'store-folder')], None, 'start-1')
+
+        result = process_global_changes(drive)
+
+        assert result['processed'] == 0
+        assert sync_db.query(Job).count() == 0
+        assert sync_db.get(AppConfig, 'drive_page_token').value == 'start-1'
+
+
+class TestZombieKiller:
+
+    @pytest.fixture
+    def stuck_upload(self, sync_db, store, inspection_factory):
+        from datetime import datetime, timedelta
+        from src.models_db import InspectionStatus
+
+        def _create(attempts):
+            long_ago = datetime.utcnow() - timedelta(hours=2)
+            insp = inspection_factory.create(
+                sync_db, establishment=store, status=InspectionStatus.PROCESSING, created_at=long_ago)
+            job = Job(
+                type=JOB_TYPE_PROCESS_REPORT,
+                status=JobStatus.PROCESSING,
+                attempts=attempts,
+                started_at=long_ago,
+                input_payload={'file_id': insp.drive_file_id, 'staged_path': '/static/uploads/uploads/pending/x.pdf'},
+            )
+            sync_db.add(job)
+            sync_db.commit()
+            return job.id, insp.id
+        return _create
+
+    def _run(self):
+        drive = MagicMock()
+        drive.list_changes.return_value = ([], None, 'start-1')
+        with patch('src.services.storage_service.storage_service') as storage:
+            process_global_changes(drive)
+        return storage
+
+    def test_interrupted_job_returns_to_queue(self, sync_db, stuck_upload):
+        from src.models_db import InspectionStatus
+        job_id, insp_id = stuck_upload(attempts=1)
+
+        storage = self._run()
+
+        assert sync_db.get(Job, job_id).status == JobStatus.PENDING
+        assert sync_db.get(Inspection, insp_id).status == InspectionStatus.PROCESSING
+        storage.delete_file.assert_not_called()
+
+    def test_job_fails_after_max_attempts(self, sync_db, stuck_upload):
+        from src.models_db import InspectionStatus
+        from src.worker import MAX_ATTEMPTS
+        job_id, insp_id = stuck_upload(attempts=MAX_ATTEMPTS)
+
+        storage = self._run()
+
+        assert sync_db.get(Job, job_id).status == JobStatus.FAILED
+        assert sync_db.get(Inspection, insp_id).status == InspectionStatus.REJECTED
+        storage.delete_file.assert_called_once_with('/static/uploads/uploads/pending/x.pdf')
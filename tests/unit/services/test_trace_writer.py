@@ -0,0 +1,95 @@
+"""Tests for the buffered processing trace writer."""
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.models_db import Inspection, InspectionStatus
+from src.services.trace_writer import TraceWriter
+
+
+@pytest.fixture
+def writer(db_session):
+    return TraceWriter(session_factory=lambda: db_session)
+
+
+def _logs(db_session, file_id):
+    db_session.expire_all()
+    return db_session.query(Inspection).filter_by(drive_file_id=file_id).one().processing_logs
+
+
+class TestTraceWriter:
+
+    def test_running_entry_flushes_and_creates_inspection(self, writer, db_session):
+        writer.append('f1', 'INIT', 'STARTED', 'Iniciando')
+
+        logs = _logs(db_session, 'f1')
+        assert [(e['stage'], e['status']) for e in logs] == [('INIT', 'STARTED')]
+
+    def test_success_entries_are_buffered_until_boundary(self, writer, db_session):
+        writer.append('f1', 'INIT', 'STARTED', 'Iniciando')
+        writer.append('f1', 'OCR', 'SUCCESS', 'Texto extraído')
+        writer.append('f1', 'JOB_STATUS', 'UPDATED', 'Job PROCESSING')
+
+        assert len(_logs(db_session, 'f1')) == 1
+        assert len(writer.pending('f1')) == 2
+
+        writer.append('f1', 'AI_ANALYSIS', 'RUNNING', 'Enviando')
+
+        assert [e['stage'] for e in _logs(db_session, 'f1')] == ['INIT', 'OCR', 'JOB_STATUS', 'AI_ANALYSIS']
+        assert writer.pending('f1') == []
+
+    def test_flush_appends_without_touching_existing_entries(self, writer, db_session):
+        db_session.add(Inspection(drive_file_id='f1', status=InspectionStatus.PROCESSING,
+                                  processing_logs=[{'stage': 'OLD', 'status': 'SUCCESS'}]))
+        db_session.commit()
+
+        writer.append('f1', 'COMPLETED', 'SUCCESS', 'Fim')
+        assert writer.flush('f1') == 1
+        assert writer.flush('f1') == 0
+
+        assert [e['stage'] for e in _logs(db_session, 'f1')] == ['OLD', 'COMPLETED']
+
+    def test_failure_flushes_and_rejects_inspection(self, writer, db_session):
+        writer.append('f1', 'INIT', 'STARTED', 'Iniciando')
+        writer.append('f1', 'OCR', 'FAILED', 'PDF vazio', details={'code': 'ERR_OCR'})
+
+        db_session.expire_all()
+        inspection = db_session.query(Inspection).filter_by(drive_file_id='f1').one()
+        assert inspection.status == InspectionStatus.REJECTED
+        assert inspection.processing_logs[-1]['details'] == {'code': 'ERR_OCR'}
+
+    def test_buffers_are_isolated_per_file(self, writer, db_session):
+        writer.append('f1', 'OCR', 'SUCCESS', 'a')
+        writer.append('f2', 'OCR', 'SUCCESS', 'b')
+        writer.flush('f1')
+
+        assert len(writer.pending('f2')) == 1
+
+    def test_postgres_uses_single_jsonb_append(self):
+        session = MagicMock()
+        session.get_bind.return_value.dialect.name = 'postgresql'
+        session.execute.return_value.rowcount = 1
+        writer = TraceWriter(session_factory=lambda: session)
+
+        writer.append('f1', 'OCR', 'SUCCESS', 'a')
+        writer.append('f1', 'AI_ANALYSIS', 'RUNNING', 'b')
+
+        session.execute.assert_called_once()
+        sql = str(session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert 'processing_logs=(coalesce(inspections.processing_logs' in sql
+        assert '||' in sql
+        session.query.assert_not_called()
+        session.commit.assert_called_once()
+
+
+def test_default_session_comes_from_shared_factory(monkeypatch):
+    from src import database
+    factory = MagicMock()
+    monkeypatch.setattr(database, 'DedicatedSession', factory)
+
+    writer = TraceWriter()
+    assert writer._session() is factory.return_value
+    writer._session()
+
+    assert factory.call_count == 2
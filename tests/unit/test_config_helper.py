@@ -0,0 +1,74 @@
+"""Unit tests for the TTL-cached configuration layer (src/config_helper)."""
+from unittest.mock import MagicMock, patch
+
+from src.config_helper import ConfigCache, get_config
+
+
+class TestConfigCache:
+
+    def test_loads_all_keys_once_within_ttl(self):
+        loader = MagicMock(return_value={'A': '1', 'B': '2'})
+        cache = ConfigCache(loader=loader, ttl=60)
+
+        assert cache.get('A') == '1'
+        assert cache.get('B') == '2'
+        assert cache.get('MISSING') is None
+
+        loader.assert_called_once()
+        assert cache.stats()['hits'] == 2
+        assert cache.stats()['misses'] == 1
+        assert cache.stats()['keys'] == 2
+
+    def test_reloads_after_ttl(self):
+        loader = MagicMock(side_effect=[{'A': '1'}, {'A': '2'}])
+        cache = ConfigCache(loader=loader, ttl=10)
+
+        with patch('src.config_helper.time.monotonic', side_effect=[100.0, 105.0, 111.0, 200.0]):
+            assert cache.get('A') == '1'   # load em t=100
+            assert cache.get('A') == '1'   # t=105, fresco
+            assert cache.get('A') == '2'   # t=111, expirado -> recarrega
+
+        assert loader.call_count == 2
+
+    def test_invalidate_forces_reload(self):
+        loader = MagicMock(side_effect=[{'A': '1'}, {'A': '2'}])
+        cache = ConfigCache(loader=loader, ttl=60)
+
+        assert cache.get('A') == '1'
+        cache.invalidate()
+        assert cache.get('A') == '2'
+
+    def test_load_failure_keeps_previous_snapshot(self):
+        loader = MagicMock(side_effect=[{'A': '1'}, RuntimeError('db down'), {'A': '3'}])
+        cache = ConfigCache(loader=loader, ttl=0)
+
+        assert cache.get('A') == '1'
+        assert cache.get('A') == '1'
+        assert cache.get('A') == '3'
+
+    def test_load_failure_without_snapshot_returns_none(self):
+        cache = ConfigCache(loader=MagicMock(side_effect=RuntimeError('db down')), ttl=60)
+        assert cache.get('A') is None
+
+    def test_ttl_from_env(self, monkeypatch):
+        monkeypatch.setenv('CONFIG_CACHE_TTL_SECONDS', '5')
+        assert ConfigCache(loader=dict).ttl == 5.0
+        monkeypatch.setenv('CONFIG_CACHE_TTL_SECONDS', 'invalido')
+        assert ConfigCache(loader=dict).ttl == 60.0
+
+
+class TestGetConfig:
+
+    def test_db_value_wins_over_env(self, monkeypatch):
+        monkeypatch.setenv('SOME_KEY', 'env')
+        cache = ConfigCache(loader=lambda: {'SOME_KEY': 'db'}, ttl=60)
+        with patch('src.config_helper.config_cache', cache):
+            assert get_config('SOME_KEY') == 'db'
+
+    def test_falls_back_to_env_then_default(self, monkeypatch):
+        monkeypatch.setenv('ENV_ONLY', 'env')
+        monkeypatch.delenv('NOWHERE', raising=False)
+        cache = ConfigCache(loader=dict, ttl=60)
+        with patch('src.config_helper.config_cache', cache):
+            assert get_config('ENV_ONLY') == 'env'
+            assert get_config('NOWHERE', 'default') == 'default'
@@ -5,7 +5,7 @@ Tests cover all factory functions:
 - get_uow: creates/reuses UnitOfWork per request
 - get_inspection_data_service: returns InspectionDataService
 - get_dashboard_service: returns DashboardService
-- get_upload_service: returns UploadService with processor and validator
+- get_upload_service: returns UploadService with storage and validator
 - get_plan_service: returns PlanService with optional pdf/storage
 - get_admin_service: returns AdminService with optional drive/email
 - get_tracker_service: returns TrackerService (stateless)
@@ -101,7 +101,7 @@ class TestGetUploadService:
 
     @patch('src.container.get_uow')
     def test_returns_upload_service(self, mock_get_uow, app):
-        """Should return an UploadService with UoW, processor, and file_validator."""
+        """Should return an UploadService with UoW, storage, and file_validator."""
         import sys
 
         mock_uow = MagicMock()
@@ -111,7 +111,6 @@ class TestGetUploadService:
         mock_validator_instance = MagicMock()
         mock_file_validator_cls.create_pdf_validator.return_value = mock_validator_instance
 
-        mock_processor_mod = MagicMock()
         mock_validators_mod = MagicMock()
         mock_validators_mod.FileValidator = mock_file_validator_cls
 
@@ -127,7 +126,7 @@ class TestGetUploadService:
 
                 assert isinstance(result, UploadService)
                 assert result._uow is mock_uow
-                assert result._processor is not None
+                assert result._storage is not None
 
     @patch('src.container.get_uow')
     def test_upload_service_uses_pdf_validator(self, mock_get_uow, app):
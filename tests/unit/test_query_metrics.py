@@ -0,0 +1,125 @@
+"""Unit tests for per-request query instrumentation (src/infrastructure/query_metrics)."""
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+
+from src.infrastructure.query_metrics import (
+    N_PLUS_ONE_THRESHOLD, SLOWEST_LIMIT, QueryMetricsRegistry, QueryRecorder, _current, instrument_engine,
+    registry, track_queries,
+)
+
+
+class TestQueryRecorder:
+
+    def test_counts_time_and_repeated_statements(self):
+        recorder = QueryRecorder()
+        recorder.record('SELECT * FROM users WHERE id = ?', 1.5)
+        recorder.record('SELECT * FROM users WHERE id = ?', 2.5)
+        recorder.record('SELECT * FROM jobs', 10.0)
+
+        assert recorder.count == 3
+        assert recorder.total_ms == 14.0
+        assert recorder.slowest(1) == [{'sql': 'SELECT * FROM jobs', 'ms': 10.0}]
+        assert recorder.repeated() == [{'sql': 'SELECT * FROM users WHERE id = ?', 'count': 2}]
+
+    def test_nested_scope_also_records_in_parent(self):
+        with track_queries() as outer:
+            with track_queries() as inner:
+                inner.record('SELECT 1', 1.0)
+
+        assert inner.count == 1
+        assert outer.count == 1
+
+
+class TestInstrumentEngine:
+
+    def test_records_statements_inside_scope_only(self):
+        engine = create_engine('sqlite:///:memory:')
+        instrument_engine(engine)
+        instrument_engine(engine)  # idempotente
+
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+            with track_queries() as recorder:
+                conn.execute(text('SELECT 2'))
+                conn.execute(text('SELECT 3'))
+
+        assert [sql for sql, _ in recorder.statements] == ['SELECT 2', 'SELECT 3']
+
+
+class TestQueryMetricsRegistry:
+
+    def test_aggregates_per_endpoint_and_flags_n_plus_one(self):
+        registry = QueryMetricsRegistry()
+        fine = QueryRecorder()
+        fine.record('SELECT 1', 1.0)
+        n_plus_one = QueryRecorder()
+        for _ in range(N_PLUS_ONE_THRESHOLD):
+            n_plus_one.record('SELECT * FROM companies WHERE id = ?', 1.0)
+
+        assert registry.add('admin.api_recent_errors', fine) == []
+        suspects = registry.add('admin.api_recent_errors', n_plus_one)
+
+        assert suspects[0]['count'] == N_PLUS_ONE_THRESHOLD
+        stats = registry.snapshot()['admin.api_recent_errors']
+        assert stats['requests'] == 2
+        assert stats['queries_max'] == N_PLUS_ONE_THRESHOLD
+        assert stats['queries_avg'] == (1 + N_PLUS_ONE_THRESHOLD) / 2
+        assert stats['n_plus_one_requests'] == 1
+
+        registry.reset()
+        assert registry.snapshot() == {}
+
+    def test_snapshot_keeps_slowest_statements_per_endpoint(self):
+        registry = QueryMetricsRegistry()
+        for ms in (3.0, 40.0):
+            recorder = QueryRecorder()
+            recorder.record('SELECT * FROM jobs', ms)
+            for i in range(SLOWEST_LIMIT):
+                recorder.record(f'SELECT {i}', float(i))
+            registry.add('manager.api_status', recorder)
+
+        slowest = registry.snapshot()['manager.api_status']['slowest']
+
+        assert len(slowest) == SLOWEST_LIMIT
+        assert slowest[0] == {'sql': 'SELECT * FROM jobs', 'ms': 40.0}  # um registro por SQL, maior tempo
+        assert [e['ms'] for e in slowest] == sorted((e['ms'] for e in slowest), reverse=True)
+
+
+class TestResponseHeaders:
+
+    def test_headers_only_when_enabled(self, client):
+        response = client.get('/login')
+        assert 'X-DB-Query-Count' not in response.headers
+
+        with patch.dict('os.environ', {'QUERY_METRICS_HEADERS': 'true'}):
+            response = client.get('/login')
+
+        assert response.headers['X-DB-Query-Count'] == '0'
+        assert 'X-DB-Time-Ms' in response.headers
+
+
+class TestRequestScope:
+
+    def test_scope_is_closed_and_aggregated_when_view_raises(self, app):
+        with app.test_request_context('/query-metrics-boom'):
+            app.preprocess_request()
+            _current.get().record('SELECT * FROM jobs', 12.5)
+            # view levantou: o Flask pula o after_request e chama só o teardown
+            app.do_teardown_request(RuntimeError('boom'))
+
+            assert _current.get() is None
+
+        stats = registry.snapshot()['/query-metrics-boom']
+        assert stats['queries_max'] == 1
+        assert stats['slowest'] == [{'sql': 'SELECT * FROM jobs', 'ms': 12.5}]
+
+    def test_slowest_statement_header(self, app):
+        with patch.dict('os.environ', {'QUERY_METRICS_HEADERS': 'true'}), \
+                app.test_request_context('/login'):
+            app.preprocess_request()
+            _current.get().record('SELECT *\n  FROM users', 7.25)
+            response = app.process_response(app.response_class('ok'))
+            app.do_teardown_request()
+
+        assert response.headers['X-DB-Slowest'] == '7.25ms SELECT * FROM users'
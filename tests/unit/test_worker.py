@@ -0,0 +1,162 @@
+"""
+Tests for src/worker.py (ReportWorker).
+
+The processor and storage are mocked; the worker runs against the
+SQLite test session through `session_factory`.
+"""
+import pytest
+import uuid
+from unittest.mock import MagicMock
+
+from src.models_db import Inspection, InspectionStatus, Job, JobStatus
+from src.worker import ReportWorker, JOB_TYPE_PROCESS_REPORT, stage_upload
+
+
+@pytest.fixture
+def worker_env(db_session, establishment_factory, user_factory):
+    est = establishment_factory.create(db_session)
+    uploader = user_factory.create(db_session, email='consultor@test.com', name='Consultor')
+    upload_id = f'upload:{uuid.uuid4()}'
+
+    db_session.add(Inspection(
+        drive_file_id=upload_id,
+        status=InspectionStatus.PROCESSING,
+        establishment_id=est.id,
+    ))
+    job = Job(
+        company_id=est.company_id,
+        type=JOB_TYPE_PROCESS_REPORT,
+        status=JobStatus.PENDING,
+        input_payload={
+            'file_id': upload_id,
+            'filename': 'report.pdf',
+            'establishment_id': str(est.id),
+            'staged_path': '/static/uploads/uploads/pending/report.pdf',
+            'uploaded_by_id': str(uploader.id),
+        },
+    )
+    db_session.add(job)
+    db_session.commit()
+
+    processor = MagicMock()
+    processor.process_single_file.return_value = {'usage': {}, 'output_link': None}
+    storage = MagicMock()
+    storage.download_file.return_value = b'%PDF-1.4 content'
+    email = MagicMock()
+
+    worker = ReportWorker(
+        concurrency=1,
+        poll_interval=0.01,
+        processor=processor,
+        storage=storage,
+        email_service=email,
+        session_factory=lambda: db_session,
+    )
+    return {
+        'worker': worker,
+        'job_id': job.id,
+        'upload_id': upload_id,
+        'processor': processor,
+        'storage': storage,
+        'email': email,
+        'session': db_session,
+    }
+
+
+class TestReportWorker:
+
+    def test_run_once_processes_pending_job(self, worker_env):
+        worker = worker_env['worker']
+
+        assert worker.run_once() is True
+
+        call = worker_env['processor'].process_single_file.call_args
+        assert call.args[0] == {'id': worker_env['upload_id'], 'name': 'report.pdf'}
+        assert call.kwargs['job_id'] == worker_env['job_id']
+        assert call.kwargs['file_content'] == b'%PDF-1.4 content'
+
+        job = worker_env['session'].get(Job, worker_env['job_id'])
+        assert job.status == JobStatus.COMPLETED
+        assert job.finished_at is not None
+        worker_env['storage'].delete_file.assert_called_once_with('/static/uploads/uploads/pending/report.pdf')
+
+    def test_run_once_empty_queue(self, worker_env):
+        worker = worker_env['worker']
+        worker.run_once()
+
+        assert worker.run_once() is False
+
+    def test_duplicate_marks_skipped_and_removes_orphan(self, worker_env):
+        worker_env['processor'].process_single_file.return_value = {
+            'status': 'skipped', 'reason': 'duplicate', 'existing_id': 'other',
+        }
+
+        worker_env['worker'].run_once()
+
+        session = worker_env['session']
+        assert session.get(Job, worker_env['job_id']).status == JobStatus.SKIPPED
+        assert session.query(Inspection).filter_by(drive_file_id=worker_env['upload_id']).first() is None
+
+    def test_failure_marks_failed_and_removes_orphan(self, worker_env):
+        worker_env['processor'].process_single_file.side_effect = Exception('AI error')
+
+        worker_env['worker'].run_once()
+
+        session = worker_env['session']
+        job = session.get(Job, worker_env['job_id'])
+        assert job.status == JobStatus.FAILED
+        assert 'AI error' in job.error_log
+        assert session.query(Inspection).filter_by(drive_file_id=worker_env['upload_id']).first() is None
+
+    def test_failure_deletes_staged_file(self, worker_env):
+        worker_env['processor'].process_single_file.side_effect = Exception('AI error')
+
+        worker_env['worker'].run_once()
+
+        worker_env['storage'].delete_file.assert_called_once_with('/static/uploads/uploads/pending/report.pdf')
+
+    def test_duplicate_deletes_staged_file(self, worker_env):
+        worker_env['processor'].process_single_file.return_value = {
+            'status': 'skipped', 'reason': 'duplicate', 'existing_id': 'other',
+        }
+
+        worker_env['worker'].run_once()
+
+        worker_env['storage'].delete_file.assert_called_once_with('/static/uploads/uploads/pending/report.pdf')
+
+    def test_failure_notifies_uploader(self, worker_env):
+        worker_env['processor'].process_single_file.side_effect = Exception('AI crash')
+
+        worker_env['worker'].run_once()
+
+        worker_env['email'].send_email.assert_called_once()
+        args = worker_env['email'].send_email.call_args.args
+        assert args[0] == 'consultor@test.com'
+        assert 'report.pdf' in args[1]
+
+    def test_success_does_not_notify(self, worker_env):
+        worker_env['worker'].run_once()
+
+        worker_env['email'].send_email.assert_not_called()
+
+    def test_missing_staged_file_fails_job(self, worker_env):
+        worker_env['storage'].download_file.return_value = None
+
+        worker_env['worker'].run_once()
+
+        job = worker_env['session'].get(Job, worker_env['job_id'])
+        assert job.status == JobStatus.FAILED
+        worker_env['processor'].process_single_file.assert_not_called()
+
+    def test_drain_processes_all(self, worker_env):
+        assert worker_env['worker'].drain() == 1
+
+
+def test_stage_upload_uses_pending_folder():
+    storage = MagicMock()
+    storage.upload_file.return_value = 'path'
+
+    assert stage_upload(b'data', 'upload:abc', storage=storage) == 'path'
+    _, folder, filename = storage.upload_file.call_args.args
+    assert folder == 'uploads/pending'
+    assert filename == 'abc.pdf'